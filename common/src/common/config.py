@@ -51,3 +51,19 @@ API_BASE_URL = os.getenv("API_BASE_URL")
 SERVICE_NAME = os.getenv("SERVICE_NAME")
 
 MEMORYSTORE_ENABLED = os.environ.get("MEMORYSTORE_ENABLED", "false")
+
+# Fixed thread pool size and batched read size used while loading a learning
+# hierarchy for a single request
+HIERARCHY_LOADER_MAX_WORKERS = int(
+  os.getenv("HIERARCHY_LOADER_MAX_WORKERS", "8"))
+HIERARCHY_LOADER_BATCH_SIZE = int(
+  os.getenv("HIERARCHY_LOADER_BATCH_SIZE", "100"))
+
+# Seconds before the expiry of a cached Google API token at which it is
+# refreshed
+GOOGLE_API_TOKEN_REFRESH_MARGIN = int(
+  os.getenv("GOOGLE_API_TOKEN_REFRESH_MARGIN", "300"))
+# Delegated credentials kept per process and services kept per thread, the
+# least recently used ones are dropped
+GOOGLE_API_CLIENT_CACHE_SIZE = int(
+  os.getenv("GOOGLE_API_CLIENT_CACHE_SIZE", "256"))
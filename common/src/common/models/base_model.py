@@ -17,10 +17,13 @@ FireO BaseModel to be inherited by all other objects in ORM
 
 import datetime
 import fireo
+from fireo.database import db
 from fireo.models import Model
+from fireo.queries import query_wrapper
 from fireo.fields import DateTime, TextField
 from common.utils.errors import ResourceNotFoundException
 import common.config
+import common.utils.pagination
 
 
 # pylint: disable = too-few-public-methods
@@ -124,6 +127,28 @@ class BaseModel(Model):
           f"{cls.collection_name} with id {object_id} is not found")
     return obj
 
+  @classmethod
+  def get_by_ids(cls, object_ids):
+    """Fetches documents by id (not key) with a single batched read.
+       FireO's collection.get_all issues one read per key instead.
+        Args:
+            object_ids (list): document ids without collection_name
+        Returns:
+            list: objects in the order of object_ids, None for the ids
+            that do not exist
+        """
+    if not object_ids:
+      return []
+    collection = db.conn.collection(cls.collection_name)
+    refs = [collection.document(object_id) for object_id in object_ids]
+    objects = {}
+    for snapshot in db.conn.get_all(refs):
+      obj = query_wrapper.ModelWrapper.from_query_result(cls(), snapshot)
+      if obj is not None:
+        obj._update_doc = f"{cls.collection_name}/{snapshot.id}"  # pylint: disable = protected-access
+        objects[snapshot.id] = obj
+    return [objects.get(object_id) for object_id in object_ids]
+
   @classmethod
   def delete_by_id(cls, doc_id):
     """Deletes from the Database the object of this type by id (not key)
@@ -191,9 +216,27 @@ class BaseModel(Model):
         None).order(order_by).offset(skip).fetch(limit)
     return list(objects)
 
+  @classmethod
+  def fetch_page(cls, limit=1000, order_by="-created_time", page_token=None):
+    """ fetch a page of documents with keyset pagination. Unlike fetch_all
+    with skip, deep pages cost the same as the first one
+
+    Args:
+        limit (int, optional): _description_. Defaults to 1000.
+        order_by (str, optional): _description_. Defaults to "-created_time".
+        page_token (str, optional): token returned with the previous page.
+
+    Returns:
+        tuple: list of objects and the next page token, None on the last page
+    """
+    return common.utils.pagination.fetch_page(
+        cls.collection.filter("deleted_at_timestamp", "==", None), order_by,
+        limit, page_token)
+
   @classmethod
   def fetch_all_documents(cls, limit=1000):
-    """Fetches all documents of the collection in batches
+    """Fetches all documents of the collection in batches. Loads the whole
+    collection in memory, prefer iter_documents for large collections
 
     Args:
       limit (int): the number of documents to fetch in a batch
@@ -201,15 +244,46 @@ class BaseModel(Model):
     Returns:
       list (document objects): list of firestore document objects
     """
-    all_docs = []
-    docs = cls.collection.fetch(limit)
+    return list(cls.iter_documents(batch_size=limit))
+
+  @classmethod
+  def iter_documents(cls, batch_size=1000, fields=None, filters=None,
+                     as_dict=False):
+    """Streams the documents of the collection one page at a time, so memory
+    stays bounded by batch_size regardless of the collection size. Pages are
+    ordered by document id and resume after the last document of the
+    previous page
+
+    Args:
+      batch_size (int): the number of documents to fetch in a page
+      fields (list, optional): only fetch these fields (projection)
+      filters (list, optional): (field, operator, value) tuples to filter by
+      as_dict (bool): yield plain dicts with an "id" key instead of FireO
+        model objects
+
+    Yields:
+      document objects or dicts, only the requested fields are populated
+    """
+    query = db.conn.collection(cls.collection_name)
+    for field, operator, value in filters or []:
+      query = query.where(field, operator, value)
+    if fields:
+      query = query.select(fields)
+    query = query.order_by("__name__").limit(batch_size)
+    last_snapshot = None
     while True:
-      batch_docs = list(docs)
-      if not batch_docs:
+      page = query.start_after(last_snapshot) if last_snapshot else query
+      snapshots = list(page.stream())
+      for snapshot in snapshots:
+        if as_dict:
+          yield {**(snapshot.to_dict() or {}), "id": snapshot.id}
+        else:
+          obj = query_wrapper.ModelWrapper.from_query_result(cls(), snapshot)
+          if obj is not None:
+            yield obj
+      if len(snapshots) < batch_size:
         break
-      all_docs.extend(batch_docs)
-      docs.next_fetch(limit)
-    return all_docs
+      last_snapshot = snapshots[-1]
 
   @classmethod
   def delete_by_uuid(cls, uuid):
@@ -0,0 +1,64 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Unit test for base_model.py
+"""
+# disabling these rules, as they cause issues with pytest fixtures
+# pylint: disable=unused-import
+# pylint: disable=unused-argument,redefined-outer-name
+import pytest
+from common.models import CourseTemplate
+from common.testing.example_objects import TEST_COURSE_TEMPLATE
+from common.testing.firestore_emulator import firestore_emulator, clean_firestore
+
+
+@pytest.fixture
+def course_templates(clean_firestore):
+  ids = []
+  for index in range(5):
+    course_template = CourseTemplate.from_dict(TEST_COURSE_TEMPLATE)
+    course_template.name = f"course template {index}"
+    course_template.save()
+    ids.append(course_template.id)
+  return ids
+
+
+def test_get_by_ids(course_templates):
+  ids = course_templates[:3] + ["missing_id"]
+  objects = CourseTemplate.get_by_ids(ids)
+  assert [obj.id for obj in objects[:3]] == course_templates[:3]
+  assert objects[3] is None
+
+
+def test_iter_documents(course_templates):
+  documents = list(CourseTemplate.iter_documents(batch_size=2))
+  assert sorted(doc.id for doc in documents) == sorted(course_templates)
+
+  documents = list(CourseTemplate.iter_documents(
+      batch_size=2, fields=["name"], as_dict=True,
+      filters=[("name", "==", "course template 1")]))
+  assert documents == [{"id": course_templates[1],
+                        "name": "course template 1"}]
+
+
+def test_fetch_page(course_templates):
+  fetched = []
+  page_token = None
+  while True:
+    page, page_token = CourseTemplate.fetch_page(limit=2,
+                                                 page_token=page_token)
+    fetched.extend(page)
+    if page_token is None:
+      break
+  assert [obj.id for obj in fetched] == course_templates[::-1]
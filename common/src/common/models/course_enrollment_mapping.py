@@ -14,6 +14,7 @@
 """
 Module to add course enrollment in Fireo
 """
+from fireo.database import db
 from fireo.fields import TextField, ReferenceField, IDField
 from common.models import BaseModel, Section, User
 
@@ -86,6 +87,27 @@ class CourseEnrollmentMapping(BaseModel):
         "status", "in",["active","invited"]).filter("role", "==",role).fetch()
     return list(objects)
 
+  @classmethod
+  def fetch_user_ids_by_section(cls, section_key, role):
+    """Returns the ids of the active and invited users of a role in a
+    section. Unlike fetch_all_by_section, only the user references are read,
+    the users and the section are not loaded one by one
+
+    Args:
+        section_key (str): section unique key to filter data
+        role (str): role of the users
+
+    Returns:
+        list: user ids
+    """
+    documents = cls.iter_documents(
+      fields=["user"],
+      filters=[("section", "==", db.conn.document(section_key)),
+               ("status", "in", ["active", "invited"]),
+               ("role", "==", role)],
+      as_dict=True)
+    return [document["user"].id for document in documents]
+
   @classmethod
   def fetch_users_by_section(
       cls,
@@ -23,6 +23,7 @@ class LmsJob(BaseModel):
   status = TextField()
   logs = MapField(default={})
   input_data = MapField(default={})
+  checkpoint = MapField(default={})
   section_id = TextField()
   classroom_id = TextField()
   start_time = DateTime()
@@ -36,3 +37,4 @@ class LmsJob(BaseModel):
 # type -> LMS job type would be couse_copy/grade_import/cron_job(specific)
 # status -> ready, running, failed, success
 # logs -> {"errors": ["error1","error2"], "info": ["info1","info2"]}
+# checkpoint -> progress of a course copy, which a resumed copy skips
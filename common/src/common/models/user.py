@@ -406,6 +406,8 @@ class UserAbility(BaseModel):
 
   learning_unit = ReferenceField(LearningUnit, required=True, auto_load=False)
   ability = NumberField(default=0)
+  standard_error = NumberField(required=False)
+  num_responses = NumberField(default=0)
   user = ReferenceField(User, auto_load=False, required=True)
 
   class Meta:
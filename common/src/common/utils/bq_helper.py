@@ -16,24 +16,48 @@
 Bigquery helper Service
 """
 
+import threading
 from google.cloud import bigquery
 from common.utils.logging_handler import Logger
 from common.config import PROJECT_ID,BQ_REGION
 
 bq_client = bigquery.Client(location=BQ_REGION)
 
-def insert_rows_to_bq(rows,dataset,table_name):
+_tables = {}
+_tables_lock = threading.Lock()
+
+def get_table(dataset, table_name):
+  """Returns a BQ table with its schema, fetched on its first use
+
+  Args:
+    dataset (str): dataset of the table
+    table_name (str): name of the table
+
+  Returns:
+    Table: bigquery table object
+  """
+  table_id = f"{PROJECT_ID}.{dataset}.{table_name}"
+  table = _tables.get(table_id)
+  if table is None:
+    table = bq_client.get_table(table_id)
+    with _tables_lock:
+      _tables[table_id] = table
+  return table
+
+def insert_rows_to_bq(rows,dataset,table_name,row_ids=None):
   """Insert rows to BQ
 
   Args:
     rows (list): _description_
+    row_ids (list): insert ids of the rows, which BQ uses to drop rows
+      inserted again, generated if None
 
   Returns:
     Bool: _description_
   """
-  table = bq_client.get_table(f"{PROJECT_ID}.{dataset}.{table_name}")
+  table = get_table(dataset, table_name)
   errors = bq_client.insert_rows(
-    table=table, rows=rows)
+    table=table, rows=rows, row_ids=row_ids)
   if not errors:
     Logger.info(f"New data pushed data {rows[0]} in {table_name}")
     return True
@@ -1,18 +1,54 @@
-"""Utility methods for caching related operations."""
+"""Utility methods for caching related operations.
+
+Besides the module level key helpers this module provides `Cache`, a two
+tier cache shared across services: a bounded in-process LRU/TTL tier in
+front of Redis, with namespaced and versioned keys, pipelined batch
+operations, single-flight loading and hit/miss counters. The Redis client
+is created on first use and can be replaced with `set_redis_client`, e.g.
+with a fakeredis instance in tests.
+"""
 import datetime
+import functools
 import json
+import pickle
+import threading
+import time
+from collections import OrderedDict
 import redis
 from common.config import MEMORYSTORE_ENABLED
+from common.utils.logging_handler import Logger
 from common.utils.secrets import get_secret
 
-if MEMORYSTORE_ENABLED == "true":
-  host = get_secret("memorystore-master-host")
-  host = host.split(":")
-  host_ip = host[0]
-  host_port = host[1]
-  r = redis.Redis(host=host_ip, port=host_port, db=0)
-else:
-  r = redis.Redis(host="redis-master", port=6379, db=0)
+_redis_client = None
+_redis_client_lock = threading.Lock()
+
+_MISSING = object()
+
+
+def get_redis_client():
+  """Returns the shared Redis client, creating it on first use"""
+  global _redis_client  # pylint: disable = global-statement
+  if _redis_client is None:
+    with _redis_client_lock:
+      if _redis_client is None:
+        if MEMORYSTORE_ENABLED == "true":
+          host = get_secret("memorystore-master-host")
+          host = host.split(":")
+          host_ip = host[0]
+          host_port = host[1]
+          _redis_client = redis.Redis(host=host_ip, port=host_port, db=0)
+        else:
+          _redis_client = redis.Redis(host="redis-master", port=6379, db=0)
+  return _redis_client
+
+
+def set_redis_client(client):
+  """Replaces the shared Redis client, e.g. with a fake one for tests
+  Args:
+      client: redis.Redis compatible client or None to reset
+  """
+  global _redis_client  # pylint: disable = global-statement
+  _redis_client = client
 
 
 def json_serial(obj):
@@ -33,7 +69,7 @@ def set_key(key, value, expiry_time=3600):
             True or False
     """
   value = json.dumps(value, default=json_serial)
-  return r.set(key, value, ex=expiry_time)
+  return get_redis_client().set(key, value, ex=expiry_time)
 
 
 def get_key(key):
@@ -45,13 +81,13 @@ def get_key(key):
         Returns:
             value: String or Dict or Number or None
     """
-  value = r.get(key)
+  value = get_redis_client().get(key)
   return_value = json.loads(value) if value is not None else None
   return return_value
 
 
 def delete_key(key):
-  r.delete(key)
+  get_redis_client().delete(key)
 
 
 def set_key_normal(key, value, expiry_time=3600):
@@ -64,7 +100,7 @@ def set_key_normal(key, value, expiry_time=3600):
         Returns:
             True or False
     """
-  return r.set(key, value, ex=expiry_time)
+  return get_redis_client().set(key, value, ex=expiry_time)
 
 
 def get_key_normal(key):
@@ -77,4 +113,355 @@ def get_key_normal(key):
             value: String or Dict or Number or None
     """
 
-  return r.get(key)
+  return get_redis_client().get(key)
+
+
+class JsonSerializer():
+  """Serializes cache values as JSON, datetimes become ISO strings"""
+
+  @staticmethod
+  def dumps(value):
+    return json.dumps(value, default=json_serial).encode("utf-8")
+
+  @staticmethod
+  def loads(data):
+    return json.loads(data)
+
+
+class PickleSerializer():
+  """Serializes cache values with pickle, e.g. for FireO model instances.
+  Only to be used with a trusted Redis instance"""
+
+  @staticmethod
+  def dumps(value):
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+  @staticmethod
+  def loads(data):
+    return pickle.loads(data)
+
+
+class CacheStats():
+  """Thread safe hit/miss counters of a Cache"""
+
+  FIELDS = ("local_hits", "remote_hits", "misses", "loads", "errors")
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._counters = dict.fromkeys(self.FIELDS, 0)
+
+  def incr(self, name, amount=1):
+    with self._lock:
+      self._counters[name] += amount
+
+  def as_dict(self):
+    """Returns a copy of the counters along with the overall hit ratio"""
+    with self._lock:
+      counters = dict(self._counters)
+    lookups = counters["local_hits"] + counters["remote_hits"] + \
+      counters["misses"]
+    counters["hit_ratio"] = (
+      (counters["local_hits"] + counters["remote_hits"]) / lookups
+      if lookups else 0.0)
+    return counters
+
+  def reset(self):
+    with self._lock:
+      self._counters = dict.fromkeys(self.FIELDS, 0)
+
+
+class LocalCache():
+  """Bounded in-process LRU cache whose entries expire after ttl seconds"""
+
+  def __init__(self, max_size=1024, ttl=60):
+    self.max_size = max_size
+    self.ttl = ttl
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    """Returns the value stored against key or _MISSING"""
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return _MISSING
+      value, expires_at = entry
+      if expires_at <= time.monotonic():
+        del self._entries[key]
+        return _MISSING
+      self._entries.move_to_end(key)
+      return value
+
+  def set(self, key, value, ttl=None):
+    ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+    with self._lock:
+      self._entries[key] = (value, time.monotonic() + ttl)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_size:
+        self._entries.popitem(last=False)
+
+  def delete(self, key):
+    with self._lock:
+      self._entries.pop(key, None)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+  def __len__(self):
+    return len(self._entries)
+
+
+class Cache():
+  """Namespaced two tier cache: in-process LRU/TTL tier over Redis
+
+  Keys are stored in Redis as `<namespace>:v<version>:<key>`. Calling
+  `invalidate_namespace` bumps the version so every key of the namespace is
+  invalidated at once across processes; other processes see the new version
+  once their local copy of it expires after `local_ttl` seconds. Redis errors
+  are logged and treated as misses so the cache never fails a request.
+
+  Usage:
+    skills_cache = Cache("skills", ttl=600)
+    skill = skills_cache.get_or_load(skill_id, lambda: load_skill(skill_id))
+  """
+
+  def __init__(self,
+               namespace,
+               ttl=3600,
+               local_ttl=60,
+               local_max_size=1024,
+               serializer=JsonSerializer,
+               redis_client=None,
+               lock_stripes=64):
+    self.namespace = namespace
+    self.ttl = ttl
+    self.local_ttl = local_ttl
+    self.serializer = serializer
+    self.stats = CacheStats()
+    self._redis_client = redis_client
+    self._local = LocalCache(max_size=local_max_size, ttl=local_ttl)
+    self._version = None
+    self._version_expires_at = 0
+    self._load_locks = [threading.Lock() for _ in range(lock_stripes)]
+
+  @property
+  def redis(self):
+    return self._redis_client or get_redis_client()
+
+  @property
+  def version_key(self):
+    return f"{self.namespace}:__version__"
+
+  def _get_version(self):
+    """Returns the namespace version, re-read from Redis every local_ttl"""
+    now = time.monotonic()
+    if self._version is None or self._version_expires_at <= now:
+      try:
+        version = self.redis.get(self.version_key)
+        self._version = int(version) if version is not None else 0
+      except redis.exceptions.RedisError as e:
+        self.stats.incr("errors")
+        Logger.warning(f"Cache {self.namespace}: version lookup failed: {e}")
+        if self._version is None:
+          self._version = 0
+      self._version_expires_at = now + self.local_ttl
+    return self._version
+
+  def make_key(self, key):
+    """Returns the namespaced and versioned Redis key of a cache key"""
+    return f"{self.namespace}:v{self._get_version()}:{key}"
+
+  def get(self, key, default=None):
+    """Returns the value cached against key, looking up the local tier
+    before Redis
+    Args:
+        key: str - cache key within the namespace
+        default: value to return on a miss
+    """
+    value = self._get(self.make_key(key))
+    return default if value is _MISSING else value
+
+  def _get(self, full_key):
+    data = self._local.get(full_key)
+    if data is not _MISSING:
+      self.stats.incr("local_hits")
+      return self.serializer.loads(data)
+    try:
+      data = self.redis.get(full_key)
+    except redis.exceptions.RedisError as e:
+      self.stats.incr("errors")
+      Logger.warning(f"Cache {self.namespace}: get failed: {e}")
+      data = None
+    if data is None:
+      self.stats.incr("misses")
+      return _MISSING
+    self.stats.incr("remote_hits")
+    self._local.set(full_key, data)
+    return self.serializer.loads(data)
+
+  def set(self, key, value, ttl=None):
+    """Stores value against key in both tiers
+    Args:
+        key: str - cache key within the namespace
+        value: value serializable by the cache serializer
+        ttl: int - expiry in seconds, defaults to the cache ttl
+    """
+    self._set(self.make_key(key), self.serializer.dumps(value), ttl)
+
+  def _set(self, full_key, data, ttl=None):
+    ttl = self.ttl if ttl is None else ttl
+    self._local.set(full_key, data, ttl)
+    try:
+      self.redis.set(full_key, data, ex=ttl)
+    except redis.exceptions.RedisError as e:
+      self.stats.incr("errors")
+      Logger.warning(f"Cache {self.namespace}: set failed: {e}")
+
+  def delete(self, key):
+    """Removes key from both tiers of this process and from Redis"""
+    full_key = self.make_key(key)
+    self._local.delete(full_key)
+    try:
+      self.redis.delete(full_key)
+    except redis.exceptions.RedisError as e:
+      self.stats.incr("errors")
+      Logger.warning(f"Cache {self.namespace}: delete failed: {e}")
+
+  def mget(self, keys):
+    """Returns the cached values of keys, fetching the ones missing from the
+    local tier with a single MGET
+    Args:
+        keys: list - cache keys within the namespace
+    Returns:
+        dict - key to value for every key found in the cache
+    """
+    result = {}
+    remote_keys = {}
+    for key in keys:
+      full_key = self.make_key(key)
+      data = self._local.get(full_key)
+      if data is _MISSING:
+        remote_keys[full_key] = key
+      else:
+        self.stats.incr("local_hits")
+        result[key] = self.serializer.loads(data)
+    if not remote_keys:
+      return result
+    full_keys = list(remote_keys)
+    try:
+      values = self.redis.mget(full_keys)
+    except redis.exceptions.RedisError as e:
+      self.stats.incr("errors")
+      Logger.warning(f"Cache {self.namespace}: mget failed: {e}")
+      values = [None] * len(full_keys)
+    for full_key, data in zip(full_keys, values):
+      if data is None:
+        self.stats.incr("misses")
+        continue
+      self.stats.incr("remote_hits")
+      self._local.set(full_key, data)
+      result[remote_keys[full_key]] = self.serializer.loads(data)
+    return result
+
+  def mset(self, mapping, ttl=None):
+    """Stores every key/value of mapping in one Redis pipeline
+    Args:
+        mapping: dict - cache key to value
+        ttl: int - expiry in seconds, defaults to the cache ttl
+    """
+    ttl = self.ttl if ttl is None else ttl
+    if not mapping:
+      return
+    try:
+      pipeline = self.redis.pipeline(transaction=False)
+      for key, value in mapping.items():
+        full_key = self.make_key(key)
+        data = self.serializer.dumps(value)
+        self._local.set(full_key, data, ttl)
+        pipeline.set(full_key, data, ex=ttl)
+      pipeline.execute()
+    except redis.exceptions.RedisError as e:
+      self.stats.incr("errors")
+      Logger.warning(f"Cache {self.namespace}: mset failed: {e}")
+
+  def get_or_load(self, key, loader, ttl=None):
+    """Returns the cached value of key or loads, caches and returns it.
+    Concurrent callers in this process missing on the same key wait for a
+    single load instead of all calling the loader. Results of None are not
+    cached
+    Args:
+        key: str - cache key within the namespace
+        loader: callable without arguments returning the value
+        ttl: int - expiry in seconds, defaults to the cache ttl
+    """
+    full_key = self.make_key(key)
+    value = self._get(full_key)
+    if value is not _MISSING:
+      return value
+    lock = self._load_locks[hash(full_key) % len(self._load_locks)]
+    with lock:
+      data = self._local.get(full_key)
+      if data is not _MISSING:
+        return self.serializer.loads(data)
+      self.stats.incr("loads")
+      value = loader()
+      if value is not None:
+        self._set(full_key, self.serializer.dumps(value), ttl)
+    return value
+
+  def invalidate_namespace(self):
+    """Invalidates every key of the namespace by bumping its version"""
+    self._local.clear()
+    try:
+      self._version = int(self.redis.incr(self.version_key))
+      self._version_expires_at = time.monotonic() + self.local_ttl
+    except redis.exceptions.RedisError as e:
+      self.stats.incr("errors")
+      self._version = None
+      Logger.warning(f"Cache {self.namespace}: invalidation failed: {e}")
+
+
+def model_lookup_key(model_cls, object_id, *args, **kwargs):
+  """Cache key for find_by_id style class method lookups"""
+  # pylint: disable = unused-argument
+  return f"{model_cls.collection_name}/{object_id}"
+
+
+def read_through(cache, key_func=None, ttl=None):
+  """Decorator caching the results of a lookup function in a Cache
+
+  The decorated function is only called on a cache miss. Exceptions such as
+  ResourceNotFoundException propagate and are not cached.
+
+  Usage:
+    user_cache = Cache("users", serializer=PickleSerializer)
+
+    class User(BaseModel):
+      @classmethod
+      @read_through(user_cache, key_func=model_lookup_key)
+      def find_by_id(cls, object_id):
+        ...
+
+  Args:
+      cache: Cache - cache to read through
+      key_func: callable receiving the call arguments and returning the
+        cache key, defaults to joining the arguments
+      ttl: int - expiry in seconds, defaults to the cache ttl
+  """
+
+  def decorator(func):
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+      if key_func is not None:
+        key = key_func(*args, **kwargs)
+      else:
+        key = ":".join([str(arg) for arg in args] +
+                       [f"{k}={v}" for k, v in sorted(kwargs.items())])
+      return cache.get_or_load(key, lambda: func(*args, **kwargs), ttl=ttl)
+
+    wrapper.cache = cache
+    return wrapper
+
+  return decorator
@@ -0,0 +1,112 @@
+"""Unit test cases for the two tier cache service"""
+# disabling pylint rules that conflict with pytest fixtures
+# pylint: disable=unused-argument,redefined-outer-name,protected-access
+import threading
+import time
+import fakeredis
+import pytest
+from common.utils.cache_service import (Cache, LocalCache, read_through,
+                                        model_lookup_key, set_redis_client,
+                                        set_key, get_key)
+
+
+@pytest.fixture
+def fake_redis():
+  client = fakeredis.FakeRedis()
+  set_redis_client(client)
+  yield client
+  set_redis_client(None)
+
+
+def test_module_level_keys(fake_redis):
+  set_key("course", {"name": "Intro"})
+  assert get_key("course") == {"name": "Intro"}
+
+
+def test_local_cache_lru_and_ttl():
+  local = LocalCache(max_size=2, ttl=60)
+  local.set("a", 1)
+  local.set("b", 2)
+  local.get("a")
+  local.set("c", 3)
+  assert len(local) == 2
+  assert local.get("a") == 1
+  local.set("d", 4, ttl=0)
+  time.sleep(0.01)
+  local.get("d")
+  assert "d" not in local._entries
+
+
+def test_get_set_uses_both_tiers(fake_redis):
+  cache = Cache("skills", redis_client=fake_redis)
+  assert cache.get("skill_1") is None
+  cache.set("skill_1", {"name": "Algebra"})
+  assert cache.get("skill_1") == {"name": "Algebra"}
+  assert fake_redis.get("skills:v0:skill_1") is not None
+
+  other_process = Cache("skills", redis_client=fake_redis)
+  assert other_process.get("skill_1") == {"name": "Algebra"}
+  stats = cache.stats.as_dict()
+  assert stats["local_hits"] == 1
+  assert stats["misses"] == 1
+  assert other_process.stats.as_dict()["remote_hits"] == 1
+
+
+def test_mget_mset(fake_redis):
+  cache = Cache("skills", redis_client=fake_redis)
+  cache.mset({"a": 1, "b": 2, "c": 3})
+  cache._local.clear()
+  assert cache.mget(["a", "b", "missing"]) == {"a": 1, "b": 2}
+  assert cache.stats.as_dict()["remote_hits"] == 2
+  assert cache.mget(["a", "c"]) == {"a": 1, "c": 3}
+
+
+def test_invalidate_namespace(fake_redis):
+  cache = Cache("skills", redis_client=fake_redis)
+  other = Cache("skills", redis_client=fake_redis, local_ttl=0)
+  cache.set("a", 1)
+  assert other.get("a") == 1
+  cache.invalidate_namespace()
+  assert cache.get("a") is None
+  assert other.get("a") is None
+
+
+def test_get_or_load_single_flight(fake_redis):
+  cache = Cache("skills", redis_client=fake_redis)
+  calls = []
+
+  def loader():
+    calls.append(1)
+    time.sleep(0.05)
+    return {"name": "Algebra"}
+
+  results = []
+  threads = [
+    threading.Thread(
+      target=lambda: results.append(cache.get_or_load("a", loader)))
+    for _ in range(8)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert len(calls) == 1
+  assert results == [{"name": "Algebra"}] * 8
+
+
+def test_read_through(fake_redis):
+  cache = Cache("models", redis_client=fake_redis)
+  calls = []
+
+  class Model():
+    collection_name = "skills"
+
+    @classmethod
+    @read_through(cache, key_func=model_lookup_key)
+    def find_by_id(cls, object_id):
+      calls.append(object_id)
+      return {"id": object_id}
+
+  assert Model.find_by_id("s1") == {"id": "s1"}
+  assert Model.find_by_id("s1") == {"id": "s1"}
+  assert calls == ["s1"]
+  assert cache.get("skills/s1") == {"id": "s1"}
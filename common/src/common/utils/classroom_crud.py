@@ -2,9 +2,8 @@
 import requests
 import traceback
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from common.utils.jwt_creds import JwtCredentials
+from common.utils import google_api_client
 from common.utils.errors import InvalidTokenError, UserManagementServiceError, \
   ResourceNotFoundException,ValidationError
 from common.utils.http_exceptions import InternalServerError
@@ -17,6 +16,8 @@ from common.config import (CLASSROOM_ADMIN_EMAIL, USER_MANAGEMENT_BASE_URL,
 
 SUCCESS_RESPONSE = {"status": "Success"}
 FAILED_RESPONSE = {"status": "Failed"}
+# calls in a batch request, the Classroom API accepts up to 50
+BATCH_REQUEST_SIZE = 50
 FEED_TYPE_DICT = {
     "COURSE_WORK_CHANGES": "courseWorkChangesInfo",
     "COURSE_ROSTER_CHANGES": "courseRosterChangesInfo"
@@ -60,22 +61,16 @@ SCOPES = [
 ]
 
 def get_default_service_account_email():
-  metadata_url = "http://metadata.google.internal/computeMetadata/v1/"
-  metadata_headers = {"Metadata-Flavor": "Google"}
-  url = f"{metadata_url}instance/service-accounts"
-  r = requests.get(url, headers=metadata_headers, timeout=10)
-  service_account_email = r.text.split("/")[1].strip()
-  return service_account_email
+  return google_api_client.get_default_service_account_email()
 
 def get_credentials(email=CLASSROOM_ADMIN_EMAIL):
-  google_oauth_token_endpoint = "https://oauth2.googleapis.com/token"
-  service_account_email = get_default_service_account_email()
-  creds = JwtCredentials.from_default_with_subject(
-    subject=email,
-    service_account_email=service_account_email,
-    token_uri=google_oauth_token_endpoint,
-    scopes=SCOPES)
-  return creds
+  return google_api_client.get_credentials(email, SCOPES)
+
+def get_service(api, version, email=CLASSROOM_ADMIN_EMAIL, discovery_url=None):
+  """Returns the pooled service of an API acting as email, with the scopes
+  of this module"""
+  return google_api_client.get_service(
+    api, version, email, SCOPES, discovery_url=discovery_url)
 
 def create_course(name, description, section, owner_id):
   """Create course Function in classroom
@@ -85,7 +80,7 @@ def create_course(name, description, section, owner_id):
     new created course details
   """
 
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   new_course = {}
   new_course["name"] = name
   new_course["section"] = section
@@ -105,7 +100,7 @@ def get_course_by_id(course_id):
   """
 
   try:
-    service = build("classroom", "v1", credentials=get_credentials())
+    service = get_service("classroom", "v1")
     course = service.courses().get(id=course_id).execute()
     return course
 
@@ -126,7 +121,7 @@ def drive_copy(file_id, target_folder_id, name):
   """
 
   copied_file = {"name": name, "parents": [target_folder_id]}
-  service = build("drive", "v3", credentials=get_credentials())
+  service = get_service("drive", "v3")
   form_copy = service.files().copy(fileId=file_id,
                                    fields="webViewLink,name,mimeType,id",
                                    body=copied_file).execute()
@@ -165,7 +160,7 @@ def update_course(course_id, section_name, description, course_name=None):
     new created course details
   """
 
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
 
   course = service.courses().get(id=course_id).execute()
   if course_name is not None:
@@ -187,7 +182,7 @@ def update_course_state(course_id, course_state):
   Returns:
     new created course details
   """
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   course = service.courses().get(id=course_id).execute()
   course["course_state"] = course_state
   course = service.courses().update(id=course_id, body=course).execute()
@@ -203,7 +198,7 @@ def get_course_list():
     list of courses in classroom
   """
 
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   results = service.courses().list().execute()
   courses = results.get("courses", [])
   return courses
@@ -217,7 +212,7 @@ def get_topics(course_id):
     returns list of topics of given course in classroom
   """
 
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   try:
     topics = []
     page_token = None
@@ -246,7 +241,7 @@ def create_topics(course_id, topics):
     returns success
   """
 
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   topic_id_map = {}
   for topic in topics:
     old_topic_id = topic["topicId"]
@@ -267,7 +262,7 @@ def get_coursework_list(course_id,coursework_state="PUBLISHED"):
     returns list of coursework of given course in classroom
   """
 
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   page_token = None
   coursework_list=[]
   try:
@@ -294,7 +289,7 @@ def list_coursework_submissions_user(course_id, coursework_id, user_id):
     returns list of coursework of given course in classroom
     """ ""
 
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   submissions = []
   page_token = None
   while True:
@@ -318,7 +313,7 @@ def patch_student_submission(course_id, coursework_id, student_submission_id,
   Returns:
     returns list of coursework of given course in classroom
     """ ""
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   student_submission = {
       "assignedGrade": assigned_grade,
       "draftGrade": draft_grade
@@ -339,7 +334,7 @@ def get_coursework_material_list(course_id,coursework_material_state="PUBLISHED"
   Returns:
     returns list of coursework of given course in classroom
   """
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   page_token = None
   coursework_material_list=[]
   try:
@@ -367,7 +362,7 @@ def create_coursework(course_id, coursework):
     returns success
   """
 
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   data = service.courses().courseWork().create(courseId=course_id,
                                                body=coursework).execute()
   Logger.info("Create coursework method worked")
@@ -385,12 +380,8 @@ def patch_coursework_alpha(course_id, coursework_id, update_mask, updated_data):
   Returns:
     returns success
   """
-  service = build(
-      "classroom",
-      "v1",
-      credentials=get_credentials(),
-      static_discovery=False,
-      discoveryServiceUrl=DISCOVERY_SERVICE_URL)
+  service = get_service(
+      "classroom", "v1", discovery_url=DISCOVERY_SERVICE_URL)
   data = service.courses().courseWork().patch(
       courseId=course_id,
       id=coursework_id,
@@ -412,12 +403,8 @@ def patch_coursework_material_alpha(course_id, coursework_material_id,
   Returns:
     returns success
   """
-  service = build(
-      "classroom",
-      "v1",
-      credentials=get_credentials(),
-      static_discovery=False,
-      discoveryServiceUrl=DISCOVERY_SERVICE_URL)
+  service = get_service(
+      "classroom", "v1", discovery_url=DISCOVERY_SERVICE_URL)
   data = service.courses().courseWorkMaterials().patch(
       courseId=course_id,
       id=coursework_material_id,
@@ -437,7 +424,7 @@ def create_coursework_material(course_id, coursework_material):
     returns success
   """
   Logger.info("In Create coursework Material")
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
 
   data = service.courses().courseWorkMaterials().create(courseId=course_id,
                                                body=coursework_material).execute()
@@ -445,6 +432,65 @@ def create_coursework_material(course_id, coursework_material):
   return data
 
 
+def execute_in_batches(service, api_requests):
+  """Executes requests of a service in batch requests of up to
+  BATCH_REQUEST_SIZE calls, yielding the results of every batch request as
+  soon as it is executed
+
+  Args:
+    service: service the requests were created with
+    api_requests: list of googleapiclient HttpRequest
+  Yields:
+    list of (index in api_requests, response, HttpError or None) of the
+    requests of a batch request
+  """
+  for start in range(0, len(api_requests), BATCH_REQUEST_SIZE):
+    results = []
+
+    def callback(request_id, response, exception, results=results):
+      results.append((int(request_id), response, exception))
+
+    batch = service.new_batch_http_request(callback=callback)
+    for i in range(start, min(start + BATCH_REQUEST_SIZE, len(api_requests))):
+      batch.add(api_requests[i], request_id=str(i))
+    batch.execute()
+    yield results
+
+
+def create_courseworks_in_batch(course_id, courseworks):
+  """create courseworks in a classroom course with batch requests
+
+  Args:
+    course_id: where courseworks need to be created
+    courseworks : list of dictionary of coursework to be created
+  Yields:
+    list of (index in courseworks, created coursework, HttpError or None)
+    of every batch request
+  """
+  service = get_service("classroom", "v1")
+  yield from execute_in_batches(service, [
+      service.courses().courseWork().create(courseId=course_id, body=coursework)
+      for coursework in courseworks])
+
+
+def create_coursework_materials_in_batch(course_id, coursework_materials):
+  """create coursework materials in a classroom course with batch requests
+
+  Args:
+    course_id: where coursework materials need to be created
+    coursework_materials : list of dictionary of coursework material to be
+      created
+  Yields:
+    list of (index in coursework_materials, created coursework material,
+    HttpError or None) of every batch request
+  """
+  service = get_service("classroom", "v1")
+  yield from execute_in_batches(service, [
+      service.courses().courseWorkMaterials().create(
+          courseId=course_id, body=coursework_material)
+      for coursework_material in coursework_materials])
+
+
 def delete_course_by_id(course_id):
   """Delete a course from classroom
 
@@ -453,7 +499,7 @@ def delete_course_by_id(course_id):
     []
   """
 
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   course = service.courses().delete(id=course_id).execute()
   return course
 
@@ -470,7 +516,7 @@ def get_course_work_list(section_id):
   """
 
   section_details = Section.find_by_id(section_id)
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
 
   coursework_list = service.courses().courseWork().list(
       courseId=section_details.classroom_id).execute()
@@ -501,7 +547,7 @@ def get_submitted_course_work_list(section_id,
                           headers=headers,
                           timeout=60)
   user_email = response.json()["data"]["email"]
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
 
   submitted_course_work_list = service.courses().courseWork(
   ).studentSubmissions().list(courseId=section_details.classroom_id,
@@ -522,7 +568,7 @@ def add_teacher(course_id, teacher_email):
     course(dict): returns a dict which contains classroom details
   """
 
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   teacher = {"userId": teacher_email}
   course = service.courses().teachers().create(courseId=course_id,
                                                body=teacher).execute()
@@ -538,7 +584,7 @@ def delete_teacher(course_id, teacher_email):
     course(dict): returns a dict which contains classroom details
   """
 
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   course = service.courses().teachers().delete(courseId=course_id,
                                                userId=teacher_email).execute()
   return course
@@ -552,9 +598,8 @@ def create_student_in_course(access_token, student_email, course_id,
   Return:
     enrolled student object
   """
-  service = build("classroom",
-                  "v1",
-                  credentials=get_oauth_credentials(access_token))
+  service = google_api_client.build_service(
+      "classroom", "v1", get_oauth_credentials(access_token))
   student = {"userId": student_email}
   result = service.courses().students().create(
       courseId=course_id, body=student, enrollmentCode=course_code).execute()
@@ -569,8 +614,8 @@ def get_person_information(access_token):
   Return:
     profile: dictionary of users personal information
   """
-  people_service = build("people", "v1",\
-     credentials=get_oauth_credentials(access_token))
+  people_service = google_api_client.build_service(
+      "people", "v1", get_oauth_credentials(access_token))
   profile = people_service.people().get(
       resourceName="people/me",
       personFields="metadata,photos,names").execute()
@@ -676,7 +721,7 @@ def list_folders_children(folder_id,search_query=""):
   filters according to search query if given else gets all the 
   childrens of folder
   """
-  service = build("drive", "v2", credentials=get_credentials())
+  service = get_service("drive", "v2")
   page_token = None
   while True:
     param = {}
@@ -712,7 +757,7 @@ def get_edit_url_and_view_url_mapping_of_form():
   """  Query google drive api and get all the forms a user owns
       return a dictionary of view link as keys and edit link as values
   """
-  service = build("drive", "v3", credentials=get_credentials())
+  service = get_service("drive", "v3")
   page_token = None
   count =0
   view_link_and_edit_link_matching = {}
@@ -743,7 +788,7 @@ def get_edit_url_and_view_url_mapping_of_form():
 
 
 def get_file(file_id):
-  service = build("drive", "v3", credentials=get_credentials())
+  service = get_service("drive", "v3")
   response = service.files().get(fileId=file_id, fields="*").execute()
   return response
 
@@ -751,7 +796,7 @@ def get_file(file_id):
 def get_view_link_from_id(form_id):
   """Query google forms api using form id and get view url of google form"""
 
-  service = build("forms", "v1", credentials=get_credentials())
+  service = get_service("forms", "v1")
   result = service.forms().get(formId=form_id).execute()
   return result
 
@@ -759,11 +804,7 @@ def get_view_link_from_id(form_id):
 def retrieve_all_form_responses(form_id):
   "Query google forms api  using form id and get view url of  google form"
   discovery_doc = "https://forms.googleapis.com/$discovery/rest?version=v1"
-  service = build("forms",
-                  "v1",
-                  credentials=get_credentials(),
-                  discoveryServiceUrl=discovery_doc,
-                  static_discovery=False)
+  service = get_service("forms", "v1", discovery_url=discovery_doc)
   result = service.forms().responses().list(formId=form_id).execute()
   return result
 
@@ -779,7 +820,7 @@ def invite_user(course_id, email, role):
       dict: response from create invitation method
   """
   Logger.info(f"Inviting User {email} in course {course_id} as {role}")
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   body = {"courseId": course_id, "role": role, "userId": email}
   invitation = service.invitations().create(body=body).execute()
   return invitation
@@ -795,7 +836,7 @@ def get_invite(invitation_id):
   Returns:
       dict: response from create invitation method
   """
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   invitation = service.invitations().get(id=invitation_id).execute()
   return invitation
 
@@ -813,8 +854,7 @@ def enable_notifications(course_id, feed_type):
   Returns:
       _type_: _description_
   """
-  creds = get_credentials(CLASSROOM_ADMIN_EMAIL)
-  service = build("classroom", "v1", credentials=creds)
+  service = get_service("classroom", "v1", CLASSROOM_ADMIN_EMAIL)
   body = {
       "feed": {
           "feedType": feed_type,
@@ -838,7 +878,7 @@ def delete_student(course_id, student_email):
   Returns:
       dict: response from create invitation method
   """
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   student = {"userId": student_email}
   student = service.courses().students().delete(
       courseId=course_id, userId=student_email).execute()
@@ -894,8 +934,7 @@ def acceept_invite(invitation_id, email):
   Returns:
       dict: response from create invitation method
   """
-  service = build("classroom", "v1",
-    credentials=get_credentials(email))
+  service = get_service("classroom", "v1", email)
   course = service.invitations().accept(id=invitation_id).execute()
   return course
 
@@ -907,7 +946,7 @@ def get_user_profile_information(user_email):
     Returns:
       profile_information: User profile information of the user
   """
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
 
   profile_information = service.userProfiles().get(userId=user_email).execute()
   if not profile_information["photoUrl"].startswith("https:"):
@@ -924,7 +963,7 @@ def get_course_work(course_id, course_work_id):
   Returns:
     dict: _description_
   """
-  service = service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
 
   response =  service.courses().courseWork().get(courseId=course_id,
                                             id=course_work_id).execute()
@@ -938,7 +977,7 @@ def delete_course_work(course_id, course_work_id):
   Returns:
     dict: empty dict if success
   """
-  service = service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   data = service.courses().courseWork().delete(courseId=course_id,
                                                id=course_work_id).execute()
   Logger.info(
@@ -953,7 +992,7 @@ def delete_course_work_material(course_id, course_work_material_id):
   Returns:
     dict: empty dict if success
   """
-  service = service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   data = service.courses().courseWorkMaterials().delete(courseId=course_id,
                                                id=course_work_material_id).execute()
   Logger.info(
@@ -971,7 +1010,7 @@ def update_course_work(course_id, course_work_id, update_mask, updated_body):
   Returns:
     dict: empty dict if success
   """
-  service = service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   data = service.courses().courseWork().patch(
       courseId=course_id,
       id=course_work_id,
@@ -993,7 +1032,7 @@ def update_course_work_material(course_id, course_work_material_id, update_mask,
   Returns:
     dict: empty dict if success
   """
-  service = service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   data = service.courses().courseWorkMaterials().patch(
       courseId=course_id,
       id=course_work_material_id,
@@ -1018,7 +1057,7 @@ def post_grade_of_the_user(section_id: str,
   Returns:
       dict: Output response from the classroom for post grade
   """
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
 
   section_details = Section.find_by_id(section_id)
   course_id = section_details.classroom_id
@@ -1041,7 +1080,7 @@ def post_grade_of_the_user(section_id: str,
   return output
 
 def delete_drive_folder(folder_id):
-  service= build("drive", "v3", credentials=get_credentials())
+  service= get_service("drive", "v3")
   result=service.files().delete(fileId=folder_id).execute()
   return result
 
@@ -1054,7 +1093,7 @@ def list_coursework_submissions(course_id, coursework_id):
     returns list of coursework submissions for a coursework
     """ ""
 
-  service = build("classroom", "v1", credentials=get_credentials())
+  service = get_service("classroom", "v1")
   submissions = []
   page_token = None
   while True:
@@ -1076,12 +1115,8 @@ def copy_classroom_course(source_classroom_id, name):
   Returns:
       dict: Output response of the classroom course
   """
-  alpha_service = build(
-      "classroom",
-      "v1",
-      credentials=get_credentials(),
-      static_discovery=False,
-      discoveryServiceUrl=DISCOVERY_SERVICE_URL)
+  alpha_service = get_service(
+      "classroom", "v1", discovery_url=DISCOVERY_SERVICE_URL)
 
   input_data = {
       "sourceCourseId": source_classroom_id,
@@ -0,0 +1,253 @@
+"""Process wide factory of Google API clients
+
+Building a Google API client for every call pays for the service account
+lookup on the metadata server, new delegated credentials and their token,
+the discovery document and a new HTTP transport. This module keeps those
+per process instead:
+
+- the default service account email is looked up once
+- delegated credentials are kept per (subject, scopes) and their token is
+  only refreshed when it is about to expire, for the
+  GOOGLE_API_CLIENT_CACHE_SIZE most recently used keys
+- discovery documents fetched from a discovery URL are kept per URL
+- service objects and their authorized transports are kept per thread, as
+  httplib2 transports are not thread safe, and per (API, version, subject,
+  scopes, discovery URL), for the GOOGLE_API_CLIENT_CACHE_SIZE most
+  recently used keys of every thread
+
+Every request executed through a service of this module is timed, see
+`get_api_call_metrics`.
+"""
+import datetime
+import threading
+import time
+from collections import OrderedDict
+import requests
+from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+from googleapiclient.discovery_cache.base import Cache
+from googleapiclient.http import HttpRequest, build_http
+from common.utils.jwt_creds import JwtCredentials
+from common.config import (GOOGLE_API_TOKEN_REFRESH_MARGIN,
+                           GOOGLE_API_CLIENT_CACHE_SIZE)
+
+GOOGLE_OAUTH_TOKEN_ENDPOINT = "https://oauth2.googleapis.com/token"
+METADATA_URL = "http://metadata.google.internal/computeMetadata/v1/"
+
+
+class ApiCallMetrics():
+  """Calls, errors and latency of named operations"""
+
+  def __init__(self):
+    self._counters = {}
+    self._lock = threading.Lock()
+
+  def record(self, name, seconds, failed=False):
+    with self._lock:
+      counter = self._counters.setdefault(
+        name, {"calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0})
+      counter["calls"] += 1
+      counter["errors"] += int(failed)
+      counter["seconds"] += seconds
+      counter["max_seconds"] = max(counter["max_seconds"], seconds)
+
+  def timed(self, name, function, *args, **kwargs):
+    """Calls a function and records its latency under name"""
+    start = time.perf_counter()
+    failed = True
+    try:
+      result = function(*args, **kwargs)
+      failed = False
+      return result
+    finally:
+      self.record(name, time.perf_counter() - start, failed)
+
+  def snapshot(self):
+    """returns a copy of the counters with the mean seconds of every name"""
+    with self._lock:
+      return {
+        name: {**counter, "mean_seconds": counter["seconds"] / counter["calls"]}
+        for name, counter in self._counters.items()}
+
+  def reset(self):
+    with self._lock:
+      self._counters.clear()
+
+
+API_CALL_METRICS = ApiCallMetrics()
+
+
+class TimedHttpRequest(HttpRequest):
+  """HttpRequest recording the latency of every execution under the API
+  method id, e.g. classroom.courses.get"""
+
+  def execute(self, http=None, num_retries=0):  # pylint: disable=arguments-differ
+    return API_CALL_METRICS.timed(
+      self.methodId or "unknown", super().execute, http=http,
+      num_retries=num_retries)
+
+
+class DiscoveryCache(Cache):
+  """Discovery documents by URL, kept for the life of the process"""
+
+  def __init__(self):
+    self._documents = {}
+
+  def get(self, url):
+    return self._documents.get(url)
+
+  def set(self, url, content):
+    self._documents[url] = content
+
+
+DISCOVERY_CACHE = DiscoveryCache()
+
+_service_account_email = None
+# (subject, scopes) -> (credentials, refresh lock), least recently used first
+_credentials = OrderedDict()
+_credentials_lock = threading.Lock()
+_services = threading.local()
+
+
+def get_default_service_account_email():
+  """returns the email of the default service account of the instance,
+  looked up on the metadata server on the first call"""
+  global _service_account_email  # pylint: disable = global-statement
+  if _service_account_email is None:
+    url = f"{METADATA_URL}instance/service-accounts"
+    response = API_CALL_METRICS.timed(
+      "metadata.service_accounts", requests.get, url,
+      headers={"Metadata-Flavor": "Google"}, timeout=10)
+    _service_account_email = response.text.split("/")[1].strip()
+  return _service_account_email
+
+
+def get_credentials(subject, scopes):
+  """
+  Returns the delegated credentials of a subject, shared by the process
+
+  Args:
+    subject (str) - email of the user to act as
+    scopes (list) - OAuth scopes of the credentials
+
+  Returns:
+    credentials (JwtCredentials) - credentials with a token valid for at
+      least GOOGLE_API_TOKEN_REFRESH_MARGIN seconds
+  """
+  key = (subject, tuple(scopes))
+  with _credentials_lock:
+    entry = _credentials.get(key)
+    if entry is None:
+      credentials = JwtCredentials.from_default_with_subject(
+        subject=subject,
+        service_account_email=get_default_service_account_email(),
+        token_uri=GOOGLE_OAUTH_TOKEN_ENDPOINT,
+        scopes=list(scopes))
+      entry = _credentials[key] = (credentials, threading.Lock())
+      while len(_credentials) > GOOGLE_API_CLIENT_CACHE_SIZE:
+        _credentials.popitem(last=False)
+    else:
+      _credentials.move_to_end(key)
+    credentials, refresh_lock = entry
+  if needs_refresh(credentials):
+    with refresh_lock:
+      if needs_refresh(credentials):
+        API_CALL_METRICS.timed("oauth2.token", credentials.refresh, Request())
+  return credentials
+
+
+def needs_refresh(credentials):
+  """returns whether a token is missing or expires within the refresh
+  margin"""
+  if not credentials.token:
+    return True
+  if credentials.expiry is None:
+    return False
+  margin = datetime.timedelta(seconds=GOOGLE_API_TOKEN_REFRESH_MARGIN)
+  # google-auth keeps expiries as naive UTC datetimes
+  return credentials.expiry - margin <= datetime.datetime.utcnow()
+
+
+def build_service(api, version, credentials, discovery_url=None,
+                  num_retries=1):
+  """
+  Builds a service with credentials of the caller, e.g. the OAuth
+  credentials of a user, with cached discovery documents and timed requests
+
+  Args:
+    api (str) - API name, e.g. classroom
+    version (str) - API version, e.g. v1
+    credentials (google.auth.credentials.Credentials) - credentials
+    discovery_url (str) - discovery document URL, the static discovery
+      document of the library if None
+    num_retries (int) - retries of the discovery document download
+
+  Returns:
+    service (googleapiclient.discovery.Resource)
+  """
+  return API_CALL_METRICS.timed(
+    f"{api}.build", build, api, version,
+    http=AuthorizedHttp(credentials, http=build_http()),
+    discoveryServiceUrl=discovery_url,
+    static_discovery=discovery_url is None,
+    cache=DISCOVERY_CACHE,
+    num_retries=num_retries,
+    requestBuilder=TimedHttpRequest)
+
+
+def get_service(api, version, subject, scopes, discovery_url=None,
+                num_retries=1):
+  """
+  Returns the service of an API acting as a subject, reused by the calling
+  thread
+
+  Args:
+    api (str) - API name, e.g. classroom
+    version (str) - API version, e.g. v1
+    subject (str) - email of the user to act as
+    scopes (list) - OAuth scopes of the credentials
+    discovery_url (str) - discovery document URL, the static discovery
+      document of the library if None
+    num_retries (int) - retries of the discovery document download
+
+  Returns:
+    service (googleapiclient.discovery.Resource)
+  """
+  credentials = get_credentials(subject, scopes)
+  services = getattr(_services, "services", None)
+  if services is None:
+    services = _services.services = OrderedDict()
+  key = (api, version, subject, tuple(scopes), discovery_url)
+  service = services.get(key)
+  if service is None:
+    service = build_service(api, version, credentials, discovery_url,
+                            num_retries)
+    services[key] = service
+    while len(services) > GOOGLE_API_CLIENT_CACHE_SIZE:
+      services.popitem(last=False)
+  else:
+    services.move_to_end(key)
+  return service
+
+
+def get_api_call_metrics():
+  """
+  Returns the latency counters of the API calls of the process, by API
+  method id and for the metadata, token and build operations
+
+  Returns:
+    metrics (dict) - calls, errors, seconds, max_seconds and mean_seconds
+      by name
+  """
+  return API_CALL_METRICS.snapshot()
+
+
+def clear_clients():
+  """Forgets the cached credentials and the services of the calling
+  thread"""
+  global _service_account_email  # pylint: disable = global-statement
+  with _credentials_lock:
+    _service_account_email = None
+    _credentials.clear()
+  _services.services = OrderedDict()
@@ -0,0 +1,109 @@
+"""Unit test cases for the pooled Google API client factory"""
+# disabling pylint rules that conflict with pytest fixtures
+# pylint: disable=unused-argument,redefined-outer-name
+import datetime
+import threading
+from unittest import mock
+import pytest
+from googleapiclient.http import HttpMockSequence
+from common.utils import google_api_client
+
+SCOPES = ["https://www.googleapis.com/auth/classroom.courses"]
+
+
+class FakeCredentials():
+  """Credentials with a token valid for an hour after every refresh"""
+
+  def __init__(self):
+    self.token = None
+    self.expiry = None
+    self.refreshes = 0
+
+  def refresh(self, request):
+    self.refreshes += 1
+    self.token = f"token-{self.refreshes}"
+    self.expiry = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+
+  def before_request(self, request, method, url, headers):
+    headers["authorization"] = f"Bearer {self.token}"
+
+
+@pytest.fixture
+def clients():
+  google_api_client.clear_clients()
+  google_api_client.API_CALL_METRICS.reset()
+  response = mock.Mock(text="default/sa@project.iam.gserviceaccount.com/")
+  with mock.patch("common.utils.google_api_client.requests.get",
+                  return_value=response) as metadata, \
+    mock.patch("common.utils.google_api_client.JwtCredentials."
+               "from_default_with_subject",
+               side_effect=lambda **kwargs: FakeCredentials()):
+    yield metadata
+  google_api_client.clear_clients()
+
+
+def test_credentials_are_shared_and_refreshed_near_expiry(clients):
+  credentials = google_api_client.get_credentials("admin@example.com", SCOPES)
+  assert google_api_client.get_credentials(
+    "admin@example.com", SCOPES) is credentials
+  assert credentials.refreshes == 1
+  assert clients.call_count == 1
+
+  credentials.expiry = datetime.datetime.utcnow() + datetime.timedelta(
+    seconds=google_api_client.GOOGLE_API_TOKEN_REFRESH_MARGIN - 1)
+  google_api_client.get_credentials("admin@example.com", SCOPES)
+  assert credentials.refreshes == 2
+  assert google_api_client.get_credentials(
+    "user@example.com", SCOPES) is not credentials
+
+
+def test_cached_credentials_are_bounded(clients):
+  with mock.patch("common.utils.google_api_client.GOOGLE_API_CLIENT_CACHE_SIZE",
+                  2):
+    first = google_api_client.get_credentials("user1@example.com", SCOPES)
+    google_api_client.get_credentials("user2@example.com", SCOPES)
+    # user1 is the most recently used, user2 is dropped for user3
+    google_api_client.get_credentials("user1@example.com", SCOPES)
+    google_api_client.get_credentials("user3@example.com", SCOPES)
+    assert len(google_api_client._credentials) == 2  # pylint: disable=protected-access
+    assert google_api_client.get_credentials(
+      "user1@example.com", SCOPES) is first
+
+
+def test_services_use_the_default_http_timeout(clients):
+  service = google_api_client.get_service(
+    "classroom", "v1", "admin@example.com", SCOPES)
+  assert service._http.http.timeout is not None  # pylint: disable=protected-access
+  assert 308 not in service._http.http.redirect_codes  # pylint: disable=protected-access
+
+
+def test_services_are_reused_per_thread(clients):
+  service = google_api_client.get_service(
+    "classroom", "v1", "admin@example.com", SCOPES)
+  assert google_api_client.get_service(
+    "classroom", "v1", "admin@example.com", SCOPES) is service
+
+  services = []
+  thread = threading.Thread(target=lambda: services.append(
+    google_api_client.get_service(
+      "classroom", "v1", "admin@example.com", SCOPES)))
+  thread.start()
+  thread.join()
+  assert services[0] is not service
+  assert google_api_client.get_api_call_metrics()["classroom.build"][
+    "calls"] == 2
+
+
+def test_requests_are_timed(clients):
+  service = google_api_client.get_service(
+    "classroom", "v1", "admin@example.com", SCOPES)
+  http = HttpMockSequence([({"status": "200"}, "{\"id\": \"1\"}"),
+                           ({"status": "404"}, "{}")])
+  assert service.courses().get(id="1").execute(http=http) == {"id": "1"}
+  with pytest.raises(Exception):
+    service.courses().get(id="2").execute(http=http)
+
+  metrics = google_api_client.get_api_call_metrics()["classroom.courses.get"]
+  assert metrics["calls"] == 2
+  assert metrics["errors"] == 1
+  assert metrics["max_seconds"] >= metrics["mean_seconds"] >= 0
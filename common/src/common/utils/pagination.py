@@ -1,6 +1,11 @@
 """
 Functions for unified Pagination Logic
 """
+import base64
+import binascii
+import json
+from common.utils.errors import ValidationError
+
 
 def get_slice(sorted_list, skip, limit):
   """
@@ -12,3 +17,83 @@ def get_slice(sorted_list, skip, limit):
             limit `int`: step value
   """
   return sorted_list[skip * limit:skip * limit + limit]
+
+
+def encode_page_token(order_by, document_key):
+  """
+    Builds an opaque page token pointing after the given document
+    --------------------------------------------------------
+        Input:
+            order_by `str`: order of the query, e.g. "-created_time"
+            document_key `str`: FireO key of the last document of the page
+        Output:
+            page_token `str`: url safe page token
+  """
+  payload = json.dumps({"o": order_by, "k": document_key},
+                       separators=(",", ":"))
+  return base64.urlsafe_b64encode(payload.encode("utf-8")).decode(
+      "ascii").rstrip("=")
+
+
+def decode_page_token(page_token, order_by):
+  """
+    Returns the document key a page token points after
+    --------------------------------------------------------
+        Input:
+            page_token `str`: token returned with the previous page
+            order_by `str`: order of the query the token is used with
+        Output:
+            document_key `str`: FireO key of the last document of the page
+        Raises:
+            ValidationError: if the token is malformed or was issued for a
+            different order
+  """
+  try:
+    padding = "=" * (-len(page_token) % 4)
+    payload = json.loads(base64.urlsafe_b64decode(page_token + padding))
+    token_order_by = payload["o"]
+    document_key = payload["k"]
+  except (binascii.Error, ValueError, TypeError, KeyError) as e:
+    raise ValidationError("Invalid page token") from e
+  if token_order_by != order_by:
+    raise ValidationError(
+        f"Page token was issued for order {token_order_by}, not {order_by}")
+  return document_key
+
+
+def fetch_page(collection_manager, order_by, limit, page_token=None):
+  """
+    Keyset pagination over a FireO query. Instead of scanning `skip`
+    documents with an offset, the page starts after the document the page
+    token points to, so every page costs the same regardless of depth.
+    Firestore breaks ties of the order field by document id.
+    --------------------------------------------------------
+        Input:
+            collection_manager: FireO collection or collection.filter()
+            order_by `str`: field to order by, "-" prefix for descending
+            limit `int`: page size
+            page_token `str`: token returned with the previous page
+        Output:
+            documents `list`: FireO model objects of the page
+            next_page_token `str`: token for the next page, None on the
+            last page
+        Raises:
+            ValidationError: if the token is invalid or the document it
+            points to was deleted since, the client has to request the
+            first page again
+  """
+  query = collection_manager.order(order_by)
+  if page_token:
+    query = query.start_after(decode_page_token(page_token, order_by))
+    # FireO reads the document of the token to start after its snapshot,
+    # which does not exist once the document was hard deleted
+    if not query._start_after.exists:  # pylint: disable = protected-access
+      raise ValidationError(
+          "Page token points to a deleted document, request the first page "
+          "again")
+  documents = list(query.fetch(limit + 1))
+  next_page_token = None
+  if len(documents) > limit:
+    documents = documents[:limit]
+    next_page_token = encode_page_token(order_by, documents[-1].key)
+  return documents, next_page_token
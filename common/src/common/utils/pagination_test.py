@@ -0,0 +1,71 @@
+"""Unit test cases for keyset pagination"""
+from types import SimpleNamespace
+import pytest
+from common.utils.errors import ValidationError
+from common.utils.pagination import (encode_page_token, decode_page_token,
+                                     fetch_page)
+
+
+class FakeQuery():
+  """Ordered in-memory stand-in for a FireO query"""
+
+  def __init__(self, documents):
+    self.documents = documents
+    self.order_by = None
+    self.start_after_key = None
+    self._start_after = None
+
+  def order(self, order_by):
+    self.order_by = order_by
+    return self
+
+  def start_after(self, key):
+    self.start_after_key = key
+    self._start_after = SimpleNamespace(
+        exists=key in [document.key for document in self.documents])
+    return self
+
+  def fetch(self, limit):
+    documents = self.documents
+    if self.start_after_key:
+      keys = [document.key for document in documents]
+      documents = documents[keys.index(self.start_after_key) + 1:]
+    return iter(documents[:limit])
+
+
+def test_page_token_round_trip():
+  token = encode_page_token("-created_time", "users/abc")
+  assert "users" not in token
+  assert decode_page_token(token, "-created_time") == "users/abc"
+
+
+def test_page_token_rejects_invalid_tokens():
+  token = encode_page_token("-created_time", "users/abc")
+  with pytest.raises(ValidationError):
+    decode_page_token(token, "created_time")
+  with pytest.raises(ValidationError):
+    decode_page_token("not-a-token", "created_time")
+
+
+def test_fetch_page_walks_all_documents():
+  documents = [SimpleNamespace(key=f"users/{i}") for i in range(7)]
+  fetched = []
+  page_token = None
+  pages = 0
+  while True:
+    page, page_token = fetch_page(FakeQuery(documents), "-created_time", 3,
+                                  page_token)
+    fetched.extend(page)
+    pages += 1
+    if page_token is None:
+      break
+  assert fetched == documents
+  assert pages == 3
+
+
+def test_fetch_page_rejects_token_of_deleted_document():
+  documents = [SimpleNamespace(key=f"users/{i}") for i in range(7)]
+  _, page_token = fetch_page(FakeQuery(documents), "-created_time", 3)
+  del documents[2]
+  with pytest.raises(ValidationError):
+    fetch_page(FakeQuery(documents), "-created_time", 3, page_token)
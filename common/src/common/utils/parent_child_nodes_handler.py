@@ -1,9 +1,13 @@
 """Functions to get and update child and parent nodes data"""
-from typing_extensions import Literal
-from common.utils.collection_references import collection_references, LOS_COLLECTIONS
 import copy
+import threading
 from concurrent.futures import ThreadPoolExecutor
-from itertools import repeat
+from typing_extensions import Literal
+from common.config import (HIERARCHY_LOADER_MAX_WORKERS,
+                           HIERARCHY_LOADER_BATCH_SIZE)
+from common.utils.collection_references import collection_references, LOS_COLLECTIONS
+from common.utils.errors import ResourceNotFoundException
+from common.utils.progress_snapshot import ProgressSnapshot
 #pylint: disable=dangerous-default-value
 class ParentChildNodesHandler():
   """ Class to handle parent child node relationship operations """
@@ -30,16 +34,20 @@ class ParentChildNodesHandler():
                       coll_name,
                       learner_profile,
                       keys_to_expand,
-                      list_to_expand):
+                      list_to_expand,
+                      snapshot=None):
     """To fetch the data of the child nodes for a given document
         and their subsequent ones"""
+    if learner_profile is not None and snapshot is None:
+      snapshot = ProgressSnapshot(learner_profile)
     all_child_nodes = {}
     for key in keys_to_expand:
       all_child_nodes[key] = cls.get_nodes_by_key(document_fields, key)
     for key in list_to_expand:
       all_child_nodes[key] = cls.get_nodes_by_key(document_fields, key)
     document_fields = cls.update_hierarchy_with_profile_data(
-        learner_profile, document_fields, coll_name, document_fields["uuid"])
+        learner_profile, document_fields, coll_name, document_fields["uuid"],
+        snapshot=snapshot)
     for field_name, child_nodes_dict in all_child_nodes.items():
       if field_name in list_to_expand:
         child_nodes_list = child_nodes_dict
@@ -52,7 +60,8 @@ class ParentChildNodesHandler():
               field_name,
               learner_profile,
               keys_to_expand,
-              list_to_expand)
+              list_to_expand,
+              snapshot)
       else:
         for collection_name, document_id_list in child_nodes_dict.items():
           for list_index, child_node_document_id in enumerate(document_id_list):
@@ -61,84 +70,33 @@ class ParentChildNodesHandler():
             child_document_fields = document.get_fields(reformat_datetime=True)
             child_document_fields = cls.update_hierarchy_with_profile_data(
                 learner_profile, child_document_fields, collection_name,
-                child_node_document_id)
+                child_node_document_id, snapshot=snapshot)
             document_id_list[list_index] = cls.load_nodes_data(
                 child_document_fields,
                 collection_name,
                 learner_profile,
                 keys_to_expand,
-                list_to_expand)
+                list_to_expand,
+                snapshot)
     return document_fields
 
   @classmethod
   def load_hierarchy_progress(cls, document_fields, coll_name, learner_profile,
-    is_progress_updated = False):
+    is_progress_updated = False, loader=None):
     """To fetch learner progress for a given learning node
     Args:
       document_fields: dict - dictionary of fields of given learning node
       coll_name: str - collection name / hierarchy level of the learning node
       learner_profile: dict - learner profile dictionary
       is_progress_updated - whether progress is already updated
+      loader: HierarchyLoader - request scoped loader to reuse, optional
     Returns:
       dict - nested dictionary containing learner progress
     """
-    all_child_nodes = document_fields.get("child_nodes",{})
-    if not is_progress_updated:
-      document_fields = cls.update_hierarchy_with_profile_data(
-        learner_profile, document_fields, coll_name, document_fields["uuid"])
-    for collection_name, document_id_list in all_child_nodes.items():
-      if not document_id_list:
-        continue
-      learning_objects_counts = 0
-      if collection_name == "learning_objects":
-        learning_objects_counts = len(document_id_list)
-      collection_class = collection_references[collection_name]
-      keys = [f"{collection_class.collection_name}/{id}"
-      for id in document_id_list]
-      all_child_docs = [node.get_fields(reformat_datetime=True)
-      for node in collection_class.collection.get_all(keys)]
-      child_count = len(document_id_list)
-      # map the arguments to the function using threads in the thread pool
-      with ThreadPoolExecutor(max_workers=child_count) as executor:
-        all_child_docs = list(
-          executor.map(cls.update_hierarchy_with_profile_data,
-        repeat(learner_profile),all_child_docs,repeat(collection_name),
-        document_id_list,repeat(document_fields["uuid"])))
-
-      for list_index, child_document_fields in enumerate(all_child_docs):
-        if collection_name == "curriculum_pathways":
-          document_id_list[list_index] = cls.load_hierarchy_progress(
-            child_document_fields, collection_name, learner_profile,
-            is_progress_updated = True)
-        elif collection_name in ["learning_experiences", "learning_objects"]:
-          if not (collection_name == "learning_experiences" and \
-              child_document_fields.get("status") == "not_attempted"):
-            child_document_fields = cls.load_hierarchy_progress(
-            child_document_fields, collection_name, learner_profile,
-            is_progress_updated = True)
-          else:
-            child_document_fields["recent_child_node"] = {}
-          del child_document_fields["child_nodes"]
-          document_id_list[list_index] = child_document_fields
-        elif (coll_name=="learning_objects" and
-        collection_name=="assessments"
-        and not child_document_fields.get("is_autogradable")):
-          child_document_fields = \
-          cls.load_child_nodes_data(child_document_fields)
-          document_id_list[list_index] = child_document_fields
-        else:
-          document_id_list[list_index] = child_document_fields
-      all_child_nodes[collection_name] = cls.sort_nodes_by_recent_activity(
-        document_id_list, coll_name, learning_objects_counts)
-    # Condition to ensure we do not fill in recent child node data for
-    # curriculum pathways
-    if coll_name != "curriculum_pathways":
-      all_child_collection_nodes = []
-      for _, document_list in all_child_nodes.items():
-        all_child_collection_nodes.extend(document_list)
-      document_fields["recent_child_node"] = cls.recent_child_node(
-        all_child_collection_nodes, document_fields.get("uuid"))
-    return document_fields
+    if loader is None:
+      loader = HierarchyLoader()
+    return loader.load_hierarchy_progress(document_fields, coll_name,
+                                          learner_profile, is_progress_updated)
 
   @classmethod
   def reinitialize_ordering(cls, nodes):
@@ -257,6 +215,9 @@ class ParentChildNodesHandler():
                                        learner_profile=None):
     """To fetch the data of the immediate parent nodes of a given document"""
     parent_nodes_dict = cls.get_parent_nodes(document_fields)
+    snapshot = None
+    if learner_profile is not None:
+      snapshot = ProgressSnapshot(learner_profile)
 
     for collection_type, document_id_list in parent_nodes_dict.items():
       for list_index, each_document_id in enumerate(document_id_list):
@@ -266,7 +227,7 @@ class ParentChildNodesHandler():
             reformat_datetime=True)
         parent_document_fields = cls.update_hierarchy_with_profile_data(
             learner_profile, parent_document_fields, collection_type,
-            each_document_id)
+            each_document_id, snapshot=snapshot)
         document_id_list[list_index] = parent_document_fields
 
     return document_fields
@@ -501,33 +462,26 @@ class ParentChildNodesHandler():
   @classmethod
   def update_hierarchy_with_profile_data(cls, learner_profile, node_dict,
                                          collection_type, doc_id,
-                                         parent_id=None):
+                                         parent_id=None, loader=None,
+                                         snapshot=None):
     """This function will find the correct data for a Node Item in LOS in
-    LearnerProfile and update it in the hierarchy"""
+    LearnerProfile and update it in the hierarchy. Callers merging many nodes
+    should compile the ProgressSnapshot of the profile once and pass it.
+    When a HierarchyLoader is passed, nodes needed by the cognitive wrapper
+    lookup are read through its request scoped cache"""
+    if learner_profile is not None and snapshot is None:
+      snapshot = ProgressSnapshot(learner_profile)
     # Logic to check if the item is locked/unlocked
     # Update the is_locked flag and progress flag from LearnerProfile
     if learner_profile is not None and learner_profile.progress is not None\
         and collection_type in LOS_COLLECTIONS:
-
-      is_hidden = learner_profile.progress.get(
-            collection_type, {}).get(doc_id,
-                                    {}).get("is_hidden",
-                                            node_dict.get("is_hidden"))
-      is_locked = learner_profile.progress.get(
-          collection_type, {}).get(doc_id,
-                                   {}).get("is_locked",
-                                           node_dict.get("is_locked"))
-      is_optional = learner_profile.progress.get(
-          collection_type, {}).get(doc_id,
-                                   {}).get("is_optional",
-                                           node_dict.get("is_optional"))
-      instruction_completed = learner_profile.progress.get(
-          collection_type, {}).get(doc_id,
-                                   {}).get("instruction_completed",
-                                           node_dict.get(
-                                          "instruction_completed"))
-      progress_parent = learner_profile.progress.get(
-        collection_type, {}).get(doc_id, {}).get("parent_node", "")
+      progress = snapshot.get(collection_type, doc_id)
+      is_hidden = progress.get("is_hidden", node_dict.get("is_hidden"))
+      is_locked = progress.get("is_locked", node_dict.get("is_locked"))
+      is_optional = progress.get("is_optional", node_dict.get("is_optional"))
+      instruction_completed = progress.get(
+        "instruction_completed", node_dict.get("instruction_completed"))
+      progress_parent = progress.get("parent_node", "")
       if not progress_parent:
         progress_parent = ""
 
@@ -535,23 +489,10 @@ class ParentChildNodesHandler():
       # this flags specifies whether cognitive wrapper is unlocked
       # Ticket 4928
       if collection_type == "learning_resources" and node_dict["order"] == 1:
-        node = collection_references["learning_resources"].find_by_uuid(doc_id)
-        module = collection_references["learning_objects"]\
-          .find_by_uuid(node.parent_nodes["learning_objects"][0])
-        if module.type == "project":
-          cw_is_locked = True
-          unit = collection_references["learning_experiences"].find_by_uuid(
-            module.parent_nodes["learning_experiences"][0])
-          modules = unit.child_nodes
-          for level in modules:
-            for module_id in modules[level][::-1]:
-              neighbor = collection_references["learning_objects"].find_by_uuid(
-                module_id)
-              if neighbor.type == "cognitive_wrapper":
-                cw_is_locked = learner_profile.progress.get("learning_objects",
-                        {}).get(neighbor.id, {}).get("is_locked", True)
-                break
-          node_dict["ungate"] = not cw_is_locked
+        ungate = snapshot.project_ungate(
+          node_dict["parent_nodes"]["learning_objects"][0], loader)
+        if ungate is not None:
+          node_dict["ungate"] = ungate
 
       if not (progress_parent != parent_id and node_dict["type"] == "srl"
               and node_dict["alias"] == "module" and parent_id):
@@ -560,31 +501,24 @@ class ParentChildNodesHandler():
         node_dict["is_optional"] = is_optional
         node_dict["instruction_completed"] = instruction_completed
         if collection_type == "assessments":
-          node_dict["num_attempts"] = learner_profile.progress.get(
-        collection_type, {}).get(doc_id, {}).get("num_attempts", 0)
-      node_dict["progress"] = learner_profile.progress.get(
-          collection_type, {}).get(doc_id, {}).get("progress", 0)
-      node_dict["status"] = learner_profile.progress.get(
-          collection_type, {}).get(doc_id, {}).get("status", "not_attempted")
-      node_dict["last_attempted"] = learner_profile.progress.get(
-        collection_type, {}).get(doc_id, {}).get("last_attempted", "")
-      node_dict["parent_node"] = learner_profile.progress.get(
-        collection_type, {}).get(doc_id, {}).get("parent_node", "")
-      child_count =learner_profile.progress.get(
-        collection_type, {}).get(doc_id, {}).get("child_count", 0)
+          node_dict["num_attempts"] = progress.get("num_attempts", 0)
+      node_dict["progress"] = progress.get("progress", 0)
+      node_dict["status"] = progress.get("status", "not_attempted")
+      node_dict["last_attempted"] = progress.get("last_attempted", "")
+      node_dict["parent_node"] = progress.get("parent_node", "")
+      child_count = progress.get("child_count", 0)
       if child_count == 0 and node_dict.get("child_nodes"):
         child_count = sum(len(node_dict.get(
           "child_nodes",{}).get(child_type,[]))
          for child_type in node_dict.get("child_nodes",{}))
       node_dict["child_count"] = child_count
-      node_dict["completed_child_count"] = learner_profile.progress.get(
-        collection_type, {}).get(doc_id, {}).get("completed_child_count", 0)
+      node_dict["completed_child_count"] = progress.get(
+        "completed_child_count", 0)
 
     if learner_profile is not None and learner_profile.achievements is not None\
          and collection_type == "curriculum_pathways":
       achievement_intersection = list(
-          set(learner_profile.achievements)
-          & set(node_dict.get("achievements", [])))
+          snapshot.achievements & set(node_dict.get("achievements", [])))
       node_dict["earned_achievements"] = []
       for achievement in achievement_intersection:
         node_dict["earned_achievements"].append(
@@ -599,14 +533,11 @@ class ParentChildNodesHandler():
         for k, v in prereqs.items():
           if k != "learning_resources":
             for id_ in v:
-              if learner_profile.progress and \
-                isinstance(learner_profile.progress, dict) and \
-                learner_profile.progress.get(k, {}).get(id_, {}).get("status") \
-                  == "completed" or \
-                learner_profile.progress.get(k, {}).get(id_, {}).get("ungate") \
-                  or (not learner_profile.progress.get(k, {}).get(id_, {}).get(
-                "is_locked") and learner_profile.progress.get(k, {}).get(
-                id_, {}).get("is_hidden")):
+              prereq_progress = snapshot.get(k, id_)
+              if prereq_progress.get("status") == "completed" or \
+                prereq_progress.get("ungate") or \
+                (not prereq_progress.get("is_locked") and
+                 prereq_progress.get("is_hidden")):
                 node_dict["ungate"] = True
               else:
                 node_dict["ungate"] = False
@@ -620,3 +551,176 @@ class ParentChildNodesHandler():
     document = collection.find_by_uuid(doc_id)
     child_document_fields = document.get_fields(reformat_datetime=True)
     return child_document_fields
+
+
+class HierarchyLoader():
+  """Request scoped loader for learning hierarchies
+
+  The hierarchy is walked one level at a time: the child nodes of every
+  parent on a level are fetched with one batched read per collection,
+  node documents are memoized by (collection, uuid) for the lifetime of the
+  loader and the learner profile data is merged on a fixed size thread pool.
+  The number of Firestore reads made is available as `round_trips`.
+  """
+
+  def __init__(self, max_workers=HIERARCHY_LOADER_MAX_WORKERS,
+               batch_size=HIERARCHY_LOADER_BATCH_SIZE):
+    self.max_workers = max_workers
+    self.batch_size = batch_size
+    self.round_trips = 0
+    self._documents = {}
+    self._lock = threading.Lock()
+
+  def prefetch(self, collection_name, uuids):
+    """Fetches the documents that are not memoized yet in batched reads of
+    at most batch_size ids
+    Args:
+      collection_name: str - key of the collection in collection_references
+      uuids: list - uuids of the documents to fetch
+    """
+    missing = [
+      uuid for uuid in dict.fromkeys(uuids)
+      if (collection_name, uuid) not in self._documents]
+    if not missing:
+      return
+    collection_class = collection_references[collection_name]
+    for start in range(0, len(missing), self.batch_size):
+      chunk = missing[start:start + self.batch_size]
+      nodes = collection_class.get_by_ids(chunk)
+      with self._lock:
+        self.round_trips += 1
+        for uuid, node in zip(chunk, nodes):
+          self._documents[(collection_name, uuid)] = (
+            node.get_fields(reformat_datetime=True)
+            if node is not None else None)
+
+  def get_document(self, collection_name, uuid):
+    """Returns a copy of the fields of a node, fetching it when not memoized
+    Args:
+      collection_name: str - key of the collection in collection_references
+      uuid: str - uuid of the node
+    Raises:
+      ResourceNotFoundException: if the node does not exist
+    Returns:
+      dict - fields of the node
+    """
+    if (collection_name, uuid) not in self._documents:
+      self.prefetch(collection_name, [uuid])
+    fields = self._documents[(collection_name, uuid)]
+    if fields is None:
+      raise ResourceNotFoundException(
+        f"{collection_name} with uuid {uuid} not found")
+    return copy.deepcopy(fields)
+
+  def load_hierarchy_progress(self, document_fields, coll_name,
+                              learner_profile, is_progress_updated=False):
+    """To fetch learner progress for a given learning node, see
+    ParentChildNodesHandler.load_hierarchy_progress"""
+    snapshot = None
+    if learner_profile is not None:
+      snapshot = ProgressSnapshot(learner_profile)
+    if not is_progress_updated:
+      document_fields = \
+        ParentChildNodesHandler.update_hierarchy_with_profile_data(
+          learner_profile, document_fields, coll_name, document_fields["uuid"],
+          loader=self, snapshot=snapshot)
+    expanded_nodes = []
+    level = [(document_fields, coll_name, True)]
+    with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+      while level:
+        expanded_nodes.extend(level)
+        level = self._load_level(level, learner_profile, snapshot, executor)
+    # Children are always on a later level than their parent, so finalizing
+    # in reverse order sorts every subtree before its parent reads it
+    for node, node_coll, with_progress in reversed(expanded_nodes):
+      if with_progress:
+        self._finalize_progress_node(node, node_coll)
+    return document_fields
+
+  def _load_level(self, level, learner_profile, snapshot, executor):
+    """Replaces the child node ids of every node on a level with the child
+    documents and returns the nodes of the next level that need expanding.
+    Each level entry is (node fields, collection name, with progress)"""
+    ids_by_collection = {}
+    for node, _, _ in level:
+      for collection_name, document_id_list in \
+        ParentChildNodesHandler.get_child_nodes(node).items():
+        if document_id_list:
+          ids_by_collection.setdefault(collection_name, []).extend(
+            document_id_list)
+    for collection_name, document_ids in ids_by_collection.items():
+      self.prefetch(collection_name, document_ids)
+
+    children = []
+    for node, node_coll, with_progress in level:
+      for collection_name, document_id_list in \
+        ParentChildNodesHandler.get_child_nodes(node).items():
+        for list_index, child_id in enumerate(document_id_list):
+          children.append((node, node_coll, with_progress, collection_name,
+                           document_id_list, list_index,
+                           self.get_document(collection_name, child_id)))
+
+    # Index the projects of first learning resources up front so merging
+    # profile data on the thread pool is dictionary lookups only
+    if snapshot is not None and learner_profile.progress is not None:
+      for _, _, with_progress, collection_name, _, _, child_fields in children:
+        if with_progress and collection_name == "learning_resources" and \
+          child_fields.get("order") == 1:
+          snapshot.index_project(
+            child_fields["parent_nodes"]["learning_objects"][0], self)
+
+    def merge_profile_data(child):
+      node, _, with_progress, collection_name, document_id_list, \
+        list_index, child_fields = child
+      if not with_progress:
+        return child_fields
+      return ParentChildNodesHandler.update_hierarchy_with_profile_data(
+        learner_profile, child_fields, collection_name,
+        document_id_list[list_index], node["uuid"], self, snapshot)
+
+    next_level = []
+    for child, child_fields in zip(
+      children, executor.map(merge_profile_data, children)):
+      _, node_coll, with_progress, collection_name, document_id_list, \
+        list_index, _ = child
+      document_id_list[list_index] = child_fields
+      if not with_progress:
+        next_level.append((child_fields, collection_name, False))
+      elif collection_name == "curriculum_pathways":
+        next_level.append((child_fields, collection_name, True))
+      elif collection_name in ["learning_experiences", "learning_objects"]:
+        if not (collection_name == "learning_experiences" and \
+            child_fields.get("status") == "not_attempted"):
+          next_level.append((child_fields, collection_name, True))
+        else:
+          child_fields["recent_child_node"] = {}
+      elif (node_coll == "learning_objects" and
+            collection_name == "assessments"
+            and not child_fields.get("is_autogradable")):
+        next_level.append((child_fields, collection_name, False))
+    return next_level
+
+  def _finalize_progress_node(self, document_fields, coll_name):
+    """Sorts the loaded child nodes and fills in the recent child node"""
+    all_child_nodes = ParentChildNodesHandler.get_child_nodes(document_fields)
+    for collection_name, document_list in all_child_nodes.items():
+      if not document_list:
+        continue
+      learning_objects_counts = 0
+      if collection_name == "learning_objects":
+        learning_objects_counts = len(document_list)
+      if collection_name in ["learning_experiences", "learning_objects"]:
+        for child_document_fields in document_list:
+          child_document_fields.pop("child_nodes", None)
+      all_child_nodes[collection_name] = \
+        ParentChildNodesHandler.sort_nodes_by_recent_activity(
+          document_list, coll_name, learning_objects_counts)
+    # Condition to ensure we do not fill in recent child node data for
+    # curriculum pathways
+    if coll_name != "curriculum_pathways":
+      all_child_collection_nodes = []
+      for _, document_list in all_child_nodes.items():
+        all_child_collection_nodes.extend(document_list)
+      document_fields["recent_child_node"] = \
+        ParentChildNodesHandler.recent_child_node(
+          all_child_collection_nodes, document_fields.get("uuid"))
@@ -10,7 +10,8 @@ from common.testing.example_objects import (PARENT_LEARNING_OBJECT,
                                             CHILD_CURRICULUM_PATHWAY_OBJECTS)
 from common.testing.firestore_emulator import (clean_firestore,
                                                firestore_emulator)
-from common.utils.parent_child_nodes_handler import ParentChildNodesHandler
+from common.utils.parent_child_nodes_handler import (ParentChildNodesHandler,
+                                                     HierarchyLoader)
 from common.utils.collection_references import collection_references
 from common.utils.errors import ResourceNotFoundException
 
@@ -267,3 +268,33 @@ def test_load_nodes_data(clean_firestore, insert_cirriculum_data_to_db):
                 expansion_list)
   assert func_output != {}
 
+
+def test_hierarchy_loader_memoizes_documents(clean_firestore,
+                                             insert_data_to_db):
+  child_ids = insert_data_to_db[1]
+  loader = HierarchyLoader(batch_size=len(child_ids))
+  loader.prefetch("learning_objects", child_ids)
+  assert loader.round_trips == 1
+  for child_id in child_ids:
+    assert loader.get_document("learning_objects", child_id)["uuid"] == child_id
+  assert loader.round_trips == 1
+  with pytest.raises(ResourceNotFoundException):
+    loader.get_document("learning_objects", "missing_uuid")
+  assert loader.round_trips == 2
+
+def test_hierarchy_loader_load_hierarchy_progress(clean_firestore,
+                                                  insert_data_to_db):
+  document = insert_data_to_db[0]
+  child_ids = insert_data_to_db[1]
+  for order, child_id in enumerate(child_ids, start=1):
+    child_lo = LearningObject.find_by_id(child_id)
+    child_lo.order = order
+    child_lo.update()
+  document_dict = document.get_fields(reformat_datetime=True)
+  loader = HierarchyLoader()
+  func_output = loader.load_hierarchy_progress(document_dict,
+                                               "learning_objects", None)
+  uuid_list = [
+    node["uuid"] for node in func_output["child_nodes"]["learning_objects"]]
+  assert set(uuid_list) == set(child_ids)
+  assert loader.round_trips == 1
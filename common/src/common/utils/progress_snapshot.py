@@ -0,0 +1,104 @@
+"""Compiled view of a learner's progress used when merging LearnerProfile
+data into a learning hierarchy"""
+from types import MappingProxyType
+from common.utils.collection_references import collection_references
+
+EMPTY_PROGRESS = MappingProxyType({})
+
+
+class ProgressSnapshot():
+  """Flat (collection, id) -> progress view of a LearnerProfile
+
+  The snapshot is compiled once per request so merging profile data into a
+  node is a single dictionary lookup. The cognitive wrapper of every project
+  module is indexed once and whether it is unlocked for the learner is cached
+  until invalidate is called.
+  """
+
+  def __init__(self, learner_profile):
+    self.learner_profile = learner_profile
+    self.achievements = set(learner_profile.achievements or [])
+    self._progress = {}
+    self._project_cognitive_wrappers = {}
+    self._unlocked_projects = {}
+    self.invalidate()
+
+  def invalidate(self):
+    """Recompiles the progress view from the learner profile. To be called
+    when the progress of the profile changes, the indexed project structure
+    is kept"""
+    progress = self.learner_profile.progress or {}
+    self._progress = {(collection_type, doc_id): entry or {}
+                      for collection_type, entries in progress.items()
+                      for doc_id, entry in (entries or {}).items()}
+    self._unlocked_projects = {}
+
+  def get(self, collection_type, doc_id):
+    """Returns the progress entry of a node, empty if the learner has none
+    Args:
+      collection_type: str - collection name of the node
+      doc_id: str - uuid of the node
+    Returns:
+      Mapping - progress entry of the node
+    """
+    return self._progress.get((collection_type, doc_id), EMPTY_PROGRESS)
+
+  def index_project(self, module_uuid, loader=None):
+    """Finds the cognitive wrapper of the learning experience a module
+    belongs to, if the module is a project. Nodes are read through the
+    HierarchyLoader cache when a loader is passed
+    Args:
+      module_uuid: str - uuid of the learning object
+      loader: HierarchyLoader - request scoped loader, optional
+    """
+    if module_uuid in self._project_cognitive_wrappers:
+      return
+    module = _get_node_fields("learning_objects", module_uuid, loader)
+    if module["type"] != "project":
+      self._project_cognitive_wrappers[module_uuid] = (False, None)
+      return
+    cognitive_wrapper = None
+    unit = _get_node_fields("learning_experiences",
+                            module["parent_nodes"]["learning_experiences"][0],
+                            loader)
+    modules = unit["child_nodes"]
+    for level in modules:
+      if loader is not None:
+        loader.prefetch("learning_objects", modules[level])
+      for module_id in modules[level][::-1]:
+        neighbor = _get_node_fields("learning_objects", module_id, loader)
+        if neighbor["type"] == "cognitive_wrapper":
+          cognitive_wrapper = neighbor["uuid"]
+          break
+    self._project_cognitive_wrappers[module_uuid] = (True, cognitive_wrapper)
+
+  def project_ungate(self, module_uuid, loader=None):
+    """Returns whether the cognitive wrapper of a project module is unlocked
+    for the learner, None if the module is not a project. Makes no reads
+    once the module is indexed
+    Args:
+      module_uuid: str - uuid of the learning object
+      loader: HierarchyLoader - request scoped loader, optional
+    Returns:
+      bool or None
+    """
+    self.index_project(module_uuid, loader)
+    is_project, cognitive_wrapper = \
+      self._project_cognitive_wrappers[module_uuid]
+    if not is_project:
+      return None
+    if module_uuid not in self._unlocked_projects:
+      cw_is_locked = True
+      if cognitive_wrapper:
+        cw_is_locked = self.get("learning_objects",
+                                cognitive_wrapper).get("is_locked", True)
+      self._unlocked_projects[module_uuid] = not cw_is_locked
+    return self._unlocked_projects[module_uuid]
+
+
+def _get_node_fields(collection_type, doc_id, loader=None):
+  """Returns the fields of a node, through the loader cache if given"""
+  if loader is not None:
+    return loader.get_document(collection_type, doc_id)
+  document = collection_references[collection_type].find_by_uuid(doc_id)
+  return document.get_fields(reformat_datetime=True)
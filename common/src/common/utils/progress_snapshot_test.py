@@ -0,0 +1,69 @@
+"""Unit test cases for the learner progress snapshot"""
+import copy
+from types import SimpleNamespace
+from common.utils.progress_snapshot import ProgressSnapshot
+
+PROGRESS = {
+  "learning_objects": {
+    "cw_module": {"is_locked": False, "status": "completed"},
+    "project_module": {"is_locked": True, "progress": 40}
+  },
+  "learning_resources": {
+    "resource_1": {"status": "in_progress"}
+  }
+}
+
+NODES = {
+  ("learning_objects", "project_module"): {
+    "uuid": "project_module", "type": "project",
+    "parent_nodes": {"learning_experiences": ["unit_1"]}},
+  ("learning_objects", "cw_module"): {
+    "uuid": "cw_module", "type": "cognitive_wrapper"},
+  ("learning_objects", "other_module"): {
+    "uuid": "other_module", "type": "learning_module"},
+  ("learning_experiences", "unit_1"): {
+    "uuid": "unit_1",
+    "child_nodes": {
+      "learning_objects": ["cw_module", "project_module", "other_module"]}}
+}
+
+
+class FakeLoader():
+  """Stand-in for HierarchyLoader serving nodes from memory"""
+
+  def __init__(self):
+    self.reads = 0
+
+  def prefetch(self, collection_name, uuids):
+    pass
+
+  def get_document(self, collection_name, uuid):
+    self.reads += 1
+    return dict(NODES[(collection_name, uuid)])
+
+
+def test_snapshot_get():
+  profile = SimpleNamespace(progress=PROGRESS, achievements=None)
+  snapshot = ProgressSnapshot(profile)
+  assert snapshot.get("learning_objects", "project_module")["progress"] == 40
+  assert snapshot.get("learning_resources", "resource_1")["status"] == \
+    "in_progress"
+  assert snapshot.get("learning_resources", "missing") == {}
+  assert snapshot.achievements == set()
+
+
+def test_snapshot_project_ungate():
+  profile = SimpleNamespace(progress=copy.deepcopy(PROGRESS), achievements=[])
+  snapshot = ProgressSnapshot(profile)
+  loader = FakeLoader()
+  assert snapshot.project_ungate("project_module", loader) is True
+  assert snapshot.project_ungate("other_module", loader) is None
+  reads = loader.reads
+  assert snapshot.project_ungate("project_module", loader) is True
+  assert loader.reads == reads
+
+  profile.progress["learning_objects"]["cw_module"]["is_locked"] = True
+  assert snapshot.project_ungate("project_module", loader) is True
+  snapshot.invalidate()
+  assert snapshot.project_ungate("project_module", loader) is False
+  assert loader.reads == reads
@@ -1,6 +1,7 @@
 """
 Generic function for Sorting is implemented
 """
+from common.utils.pagination import fetch_page
 
 
 def collection_sorting(collection_manager: any, sort_by: str,
@@ -23,9 +24,32 @@ def collection_sorting(collection_manager: any, sort_by: str,
     collection_manager.order(f"-{sort_by}").offset(skip).fetch(limit)
 
 
+def collection_sorting_page(collection_manager: any, sort_by: str,
+                            sort_order: str, limit: int,
+                            page_token: str = None) -> tuple:
+  """
+    Generic Function for Firestore Collection Sorting Logic with keyset
+    pagination, to be used instead of collection_sorting by endpoints that
+    accept a page token
+    ----------------------------------------------------------------
+    Args:
+      collection_manager: Firestore Collection Manager
+      sort_by: Sort By Field
+      sort_order: Sort Order
+      limit: Limit Count
+      page_token: Token returned with the previous page
+    Returns:
+      tuple: list of firestore records and the next page token
+  """
+  order_by = sort_by if sort_order == "ascending" else f"-{sort_by}"
+  return fetch_page(collection_manager, order_by, limit, page_token)
+
+
 def get_sorted_list(sort_by, sort_order, collection_manager) -> list:
   """
-    Generic Function for Sorting Logic through pythonic way
+    Generic Function for Sorting Logic, the documents are ordered by
+    Firestore instead of being sorted in memory. Documents without sort_by
+    are left out
     ----------------------------------------------------------------
     Args:
       collection_manager: Firestore Collection Manager
@@ -34,13 +58,31 @@ def get_sorted_list(sort_by, sort_order, collection_manager) -> list:
     Returns:
       Collection Manager: list of firestore records in dictionary
   """
-  reverse = sort_order == "descending"
+  order_by = sort_by if sort_order == "ascending" else f"-{sort_by}"
+  return [i.get_fields(reformat_datetime=True) for i in
+          collection_manager.order(order_by).fetch()]
+
 
-  collection_contents = collection_manager.fetch()
-  collection_contents = [i.get_fields(reformat_datetime=True) for i in
-                         collection_contents if hasattr(i, sort_by)]
-  return sorted(collection_contents, key=lambda document: document.get(
-    sort_by), reverse=reverse)
+def get_sorted_page(sort_by, sort_order, collection_manager, limit,
+                    page_token=None) -> tuple:
+  """
+    Generic Function for Sorting Logic with keyset pagination, to be used
+    instead of get_sorted_list and get_slice by endpoints that accept a
+    page token
+    ----------------------------------------------------------------
+    Args:
+      collection_manager: Firestore Collection Manager
+      sort_by: Sort By Field
+      sort_order: Sort Order
+      limit: Limit Count
+      page_token: Token returned with the previous page
+    Returns:
+      tuple: list of firestore records in dictionary and the next page token
+  """
+  documents, next_page_token = collection_sorting_page(
+    collection_manager, sort_by, sort_order, limit, page_token)
+  return [i.get_fields(reformat_datetime=True) for i in documents], \
+    next_page_token
 
 
 def sort_records(sort_by: str, sort_order: str, records: list,
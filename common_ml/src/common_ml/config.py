@@ -44,3 +44,16 @@ DEFAULT_JOB_REQUESTS = {
 RETRY_EXCEPTIONS = (ConnectionError, ResourceExhausted,
     requests.exceptions.ConnectionError)
 SPLIT_THRESHOLD = 9000
+
+# Learning units with more sentences than this are ranked without the dense
+# similarity matrix, on a sparse similarity graph keeping the LEXRANK_TOP_K
+# most similar sentences of every sentence, or with the same scores as the
+# dense matrix when LEXRANK_TOP_K is 0
+LEXRANK_DENSE_MAX_SENTENCES = int(os.getenv("LEXRANK_DENSE_MAX_SENTENCES",
+                                            "1000"))
+LEXRANK_TOP_K = int(os.getenv("LEXRANK_TOP_K", "0"))
+# spaCy documents memoized across the common ML utilities
+SPACY_DOC_CACHE_SIZE = int(os.getenv("SPACY_DOC_CACHE_SIZE", "20000"))
+# Texts in a batch and processes of nlp.pipe
+SPACY_PIPE_BATCH_SIZE = int(os.getenv("SPACY_PIPE_BATCH_SIZE", "256"))
+SPACY_PIPE_PROCESSES = int(os.getenv("SPACY_PIPE_PROCESSES", "1"))
@@ -1,14 +1,29 @@
-"""LexRank Module"""
+"""LexRank Module
+
+Similarity matrices can be dense arrays or scipy sparse matrices. Sparse
+similarity graphs keep the top_k most similar sentences of every sentence,
+see similarity_graph, so that memory and power iterations grow with
+n * top_k instead of n^2. cosine_centrality_scores ranks sentences on their
+dense cosine similarities without building the n x n matrix.
+"""
 import numpy as np
+from scipy.sparse import csr_matrix, diags, issparse
 from scipy.sparse.csgraph import connected_components
 
+# bounds of the power iteration
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-6
+
 
 def degree_centrality_scores(
     similarity_matrix,
     threshold=None,
     increase_power=True,
+    max_iterations=MAX_ITERATIONS,
+    tolerance=TOLERANCE,
 ):
-  """Function to Calculate degree centrality scores"""
+  """Function to Calculate degree centrality scores. increase_power only
+  applies to dense similarity matrices"""
   if not (threshold is None or
           isinstance(threshold, float) and 0 <= threshold < 1):
     raise ValueError(
@@ -28,23 +43,33 @@ def degree_centrality_scores(
       markov_matrix,
       increase_power=increase_power,
       normalized=False,
+      max_iterations=max_iterations,
+      tolerance=tolerance,
   )
 
   return scores
 
 
-def _power_method(transition_matrix, increase_power=True):
-  eigenvector = np.ones(len(transition_matrix))
+def _power_method(transition_matrix, increase_power=True,
+                  max_iterations=MAX_ITERATIONS, tolerance=TOLERANCE):
+  """Iterates until no score moves more than tolerance, or max_iterations.
+  With increase_power, a dense transition matrix is squared every iteration,
+  so that iteration k applies its 2^k power. Sparse matrices are never
+  squared, their powers fill in"""
+  eigenvector = np.ones(transition_matrix.shape[0])
 
   if len(eigenvector) == 1:
     return eigenvector
 
   transition = transition_matrix.transpose()
+  if issparse(transition):
+    transition = transition.tocsr()
+    increase_power = False
 
-  while True:
-    eigenvector_next = np.dot(transition, eigenvector)
+  for _ in range(max_iterations):
+    eigenvector_next = transition @ eigenvector
 
-    if np.allclose(eigenvector_next, eigenvector):
+    if np.abs(eigenvector_next - eigenvector).max() <= tolerance:
       return eigenvector_next
 
     eigenvector = eigenvector_next
@@ -52,6 +77,8 @@ def _power_method(transition_matrix, increase_power=True):
     if increase_power:
       transition = np.dot(transition, transition)
 
+  return eigenvector
+
 
 def connected_nodes(matrix):
   _, labels = connected_components(matrix)
@@ -70,12 +97,20 @@ def create_markov_matrix(weights_matrix):
   if n_1 != n_2:
     raise ValueError("\"weights_matrix\" should be square")
 
+  if issparse(weights_matrix):
+    row_sum = np.asarray(weights_matrix.sum(axis=1)).ravel()
+    return diags(1 / row_sum) @ weights_matrix.tocsr()
+
   row_sum = weights_matrix.sum(axis=1, keepdims=True)
 
   return weights_matrix / row_sum
 
 
 def create_markov_matrix_discrete(weights_matrix, threshold):
+  if issparse(weights_matrix):
+    discrete_weights_matrix = (weights_matrix >= threshold).astype(np.float64)
+    return create_markov_matrix(discrete_weights_matrix)
+
   discrete_weights_matrix = np.zeros(weights_matrix.shape)
   ixs = np.where(weights_matrix >= threshold)
   discrete_weights_matrix[ixs] = 1
@@ -87,6 +122,8 @@ def stationary_distribution(
     transition_matrix,
     increase_power=True,
     normalized=True,
+    max_iterations=MAX_ITERATIONS,
+    tolerance=TOLERANCE,
 ):
   n_1, n_2 = transition_matrix.shape
   if n_1 != n_2:
@@ -96,12 +133,80 @@ def stationary_distribution(
 
   grouped_indices = connected_nodes(transition_matrix)
 
+  if issparse(transition_matrix):
+    transition_matrix = transition_matrix.tocsr()
+
   for group in grouped_indices:
-    t_matrix = transition_matrix[np.ix_(group, group)]
-    eigenvector = _power_method(t_matrix, increase_power=increase_power)
+    if issparse(transition_matrix):
+      t_matrix = transition_matrix[group][:, group]
+    else:
+      t_matrix = transition_matrix[np.ix_(group, group)]
+    eigenvector = _power_method(t_matrix, increase_power=increase_power,
+                                max_iterations=max_iterations,
+                                tolerance=tolerance)
     distribution[group] = eigenvector
 
   if normalized:
     distribution /= n_1
 
   return distribution
+
+
+def similarity_graph(embeddings, top_k, chunk_size=1024):
+  """
+  Builds the sparse LexRank similarity graph of sentence embeddings without
+  the dense n x n similarity matrix
+
+  Similarities are the cosine similarities rescaled to [0, 1], computed
+  chunk_size rows at a time. Every sentence keeps its top_k most similar
+  sentences, itself included, and the graph is symmetrized with the largest
+  of the two directions.
+
+  Args:
+    embeddings (np.ndarray) - n x d sentence embeddings
+    top_k (int) - similar sentences kept for every sentence
+    chunk_size (int) - rows of similarities computed at once
+
+  Returns:
+    graph (scipy.sparse.csr_matrix) - n x n similarities
+  """
+  embeddings = np.asarray(embeddings, dtype=np.float32)
+  norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+  embeddings = embeddings / np.maximum(norms, 1e-12)
+  nb_sentences = len(embeddings)
+  top_k = min(top_k, nb_sentences)
+  rows, columns, values = [], [], []
+  for start in range(0, nb_sentences, chunk_size):
+    similarities = embeddings[start:start + chunk_size] @ embeddings.T
+    similarities = np.clip(similarities * 0.5 + 0.5, 0.0, 1.0)
+    nearest = np.argpartition(-similarities, top_k - 1, axis=1)[:, :top_k]
+    rows.append(np.repeat(np.arange(start, start + len(similarities)), top_k))
+    columns.append(nearest.ravel())
+    values.append(np.take_along_axis(similarities, nearest, axis=1).ravel())
+  graph = csr_matrix(
+      (np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))),
+      shape=(nb_sentences, nb_sentences))
+  return graph.maximum(graph.transpose()).tocsr()
+
+
+def cosine_centrality_scores(embeddings):
+  """
+  Returns the scores of degree_centrality_scores on the dense similarity
+  matrix of sentence embeddings, cosine similarities rescaled to [0, 1] and
+  no threshold, without building the matrix
+
+  The similarities are symmetric, so the stationary distribution of their
+  Markov chain is proportional to the similarity degrees of the sentences,
+  and the degrees are dot products with the sum of the embeddings.
+
+  Args:
+    embeddings (np.ndarray) - n x d sentence embeddings
+
+  Returns:
+    scores (np.ndarray) - n scores summing to n
+  """
+  embeddings = np.asarray(embeddings, dtype=np.float64)
+  norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+  embeddings = embeddings / np.maximum(norms, 1e-12)
+  degrees = 0.5 * len(embeddings) + 0.5 * (embeddings @ embeddings.sum(axis=0))
+  return len(embeddings) * degrees / degrees.sum()
@@ -0,0 +1,59 @@
+"""Tests for the LexRank module"""
+import numpy as np
+from scipy.sparse import csr_matrix
+from common_ml import lexrank
+
+
+def random_similarities(nb_sentences=30, seed=0):
+  rng = np.random.default_rng(seed)
+  embeddings = rng.normal(size=(nb_sentences, 8))
+  normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+  similarities = np.clip(normalized @ normalized.T * 0.5 + 0.5, 0.0, 1.0)
+  return embeddings, similarities
+
+
+def test_sparse_matches_dense_scores():
+  _, similarities = random_similarities()
+  dense_scores = lexrank.degree_centrality_scores(similarities)
+  sparse_scores = lexrank.degree_centrality_scores(csr_matrix(similarities))
+  assert np.allclose(dense_scores, sparse_scores, atol=1e-4)
+
+
+def test_sparse_matches_dense_scores_with_threshold():
+  _, similarities = random_similarities()
+  dense_scores = lexrank.degree_centrality_scores(similarities, threshold=0.6)
+  sparse_scores = lexrank.degree_centrality_scores(
+      csr_matrix(similarities), threshold=0.6)
+  assert np.allclose(dense_scores, sparse_scores, atol=1e-4)
+
+
+def test_power_method_is_bounded():
+  # a periodic chain oscillates between two vectors and never converges
+  transition = np.array([[0.0, 0.5, 0.5], [1.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+  eigenvector = lexrank._power_method(  # pylint: disable=protected-access
+      transition, increase_power=False, max_iterations=5)
+  assert np.allclose(eigenvector, [2.0, 0.5, 0.5]) or \
+    np.allclose(eigenvector, [1.0, 1.0, 1.0])
+
+
+def test_similarity_graph_keeps_top_k():
+  embeddings, similarities = random_similarities()
+  graph = lexrank.similarity_graph(embeddings, top_k=5, chunk_size=7)
+  assert (graph != graph.transpose()).nnz == 0
+  assert (np.diff(graph.indptr) >= 5).all()
+  rows, columns = graph.nonzero()
+  assert np.allclose(graph[rows, columns].A1, similarities[rows, columns],
+                     atol=1e-5)
+
+
+def test_full_similarity_graph_matches_dense():
+  embeddings, similarities = random_similarities()
+  graph = lexrank.similarity_graph(embeddings, top_k=len(embeddings))
+  assert np.allclose(graph.toarray(), similarities, atol=1e-5)
+
+
+def test_cosine_centrality_matches_dense():
+  embeddings, similarities = random_similarities()
+  assert np.allclose(lexrank.cosine_centrality_scores(embeddings),
+                     lexrank.degree_centrality_scores(similarities),
+                     atol=1e-4)
@@ -0,0 +1,138 @@
+"""Lazily loaded spaCy models with batched and memoized parsing
+
+spaCy models load on their first use instead of all at once. Texts are
+parsed in batches with nlp.pipe, with the pipeline components a caller does
+not need disabled, and the documents are memoized per model, disabled
+components and text, so that utilities parsing the same sentences again
+reuse their documents. Memoized documents are shared, callers must not
+modify them.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+import spacy
+from common_ml.config import (SPACY_MODEL_TYPES, SPACY_DOC_CACHE_SIZE,
+                              SPACY_PIPE_BATCH_SIZE, SPACY_PIPE_PROCESSES)
+
+# pylint: disable=bare-except
+
+# components a parse disables, for the attributes its caller reads. TOKENS
+# only runs the tokenizer and TAGS keeps part of speech tags and lemmas
+TOKENS = None
+TAGS = ("parser", "ner")
+FULL = ()
+
+_load_lock = threading.Lock()
+
+
+class SpacyModels(dict):
+  """spaCy models by model type of SPACY_MODEL_TYPES, loaded on their first
+  use"""
+
+  def __missing__(self, model_type):
+    with _load_lock:
+      if not dict.__contains__(self, model_type):
+        try:
+          model = spacy.load(SPACY_MODEL_TYPES[model_type])
+        except:
+          model = spacy.load("en_core_web_sm")
+        self[model_type] = model
+    return dict.__getitem__(self, model_type)
+
+
+SPACY_MODELS = SpacyModels()
+
+
+class DocCache():
+  """spaCy documents in LRU order"""
+
+  def __init__(self, max_docs=0):
+    """
+    Args:
+      max_docs (int) - documents to keep, 0 disables the cache
+    """
+    self.max_docs = max_docs
+    self.metrics = {"hits": 0, "misses": 0}
+    self._docs = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    with self._lock:
+      doc = self._docs.get(key)
+      if doc is None:
+        self.metrics["misses"] += 1
+      else:
+        self._docs.move_to_end(key)
+        self.metrics["hits"] += 1
+      return doc
+
+  def put(self, key, doc):
+    if not self.max_docs:
+      return
+    with self._lock:
+      self._docs[key] = doc
+      self._docs.move_to_end(key)
+      while len(self._docs) > self.max_docs:
+        self._docs.popitem(last=False)
+
+  def clear(self):
+    with self._lock:
+      self._docs.clear()
+
+
+DOC_CACHE = DocCache(SPACY_DOC_CACHE_SIZE)
+
+
+def disabled_components(nlp, disable):
+  """returns the components of a pipeline to disable, every component for
+  TOKENS"""
+  if disable is None:
+    return tuple(nlp.pipe_names)
+  return tuple(name for name in disable if name in nlp.pipe_names)
+
+
+def parse_texts(texts, spacy_model_type="default", disable=FULL,
+                batch_size=SPACY_PIPE_BATCH_SIZE,
+                n_process=SPACY_PIPE_PROCESSES):
+  """
+  Parses texts with nlp.pipe, except texts with memoized documents
+
+  Args:
+    texts (list) - texts to parse
+    spacy_model_type (str) - model type of SPACY_MODEL_TYPES
+    disable (tuple) - components the caller does not need: TOKENS, TAGS or
+      FULL
+    batch_size (int) - texts in a batch of nlp.pipe
+    n_process (int) - processes of nlp.pipe, used when there are more texts
+      to parse than a batch
+
+  Returns:
+    docs (list) - spaCy documents in the order of texts
+  """
+  nlp = SPACY_MODELS[spacy_model_type]
+  disable = disabled_components(nlp, disable)
+  keys = [(spacy_model_type, disable,
+           hashlib.sha1(text.encode("utf-8")).digest()) for text in texts]
+  docs = {}
+  missing = OrderedDict()
+  for key, text in zip(keys, texts):
+    if key in docs or key in missing:
+      continue
+    doc = DOC_CACHE.get(key)
+    if doc is None:
+      missing[key] = text
+    else:
+      docs[key] = doc
+  if missing:
+    parsed = nlp.pipe(
+      missing.values(), disable=list(disable), batch_size=batch_size,
+      n_process=n_process if len(missing) > batch_size else 1)
+    for key, doc in zip(missing, parsed):
+      DOC_CACHE.put(key, doc)
+      docs[key] = doc
+  return [docs[key] for key in keys]
+
+
+def parse(text, spacy_model_type="default", disable=FULL):
+  """returns the memoized spaCy document of a text"""
+  return parse_texts([text], spacy_model_type, disable)[0]
@@ -0,0 +1,39 @@
+"""Tests for the lazily loaded and memoized spaCy models"""
+import spacy
+import pytest
+from common_ml import nlp_models
+
+
+@pytest.fixture(autouse=True)
+def blank_model():
+  nlp = spacy.blank("en")
+  nlp.add_pipe("sentencizer")
+  nlp_models.SPACY_MODELS["blank"] = nlp
+  nlp_models.DOC_CACHE.clear()
+  yield nlp
+  del nlp_models.SPACY_MODELS["blank"]
+
+
+def test_parse_texts_keeps_order_and_memoizes():
+  texts = ["Gold rings dangled.", "Cows eat grass.", "Gold rings dangled."]
+  docs = nlp_models.parse_texts(texts, "blank")
+  assert [doc.text for doc in docs] == texts
+  assert docs[0] is docs[2]
+  assert nlp_models.parse("Cows eat grass.", "blank") is docs[1]
+
+
+def test_disabled_components_are_memoized_separately():
+  tokens = nlp_models.parse("Cows eat grass. Gold rings.", "blank",
+                            nlp_models.TOKENS)
+  full = nlp_models.parse("Cows eat grass. Gold rings.", "blank")
+  assert tokens is not full
+  assert not tokens.has_annotation("SENT_START")
+  assert len(list(full.sents)) == 2
+
+
+def test_cache_is_bounded():
+  cache = nlp_models.DocCache(max_docs=2)
+  for key in range(3):
+    cache.put(key, str(key))
+  assert cache.get(0) is None
+  assert cache.get(2) == "2"
@@ -4,7 +4,6 @@ import json
 import nltk
 import requests
 import numpy as np
-import spacy
 import editdistance
 from keybert import KeyBERT
 import inflect
@@ -13,10 +12,14 @@ from nltk.corpus import stopwords, wordnet
 from retrying import retry
 from sentence_transformers import SentenceTransformer, util
 from sklearn.linear_model import LogisticRegression
-from common_ml.lexrank import degree_centrality_scores
+from common_ml.nlp_models import (SPACY_MODELS, TOKENS, TAGS, FULL, parse,
+                                  parse_texts)
+from common_ml.lexrank import (degree_centrality_scores, similarity_graph,
+                              cosine_centrality_scores)
 from common_ml.config import (SERVICES, LONG_SENT_THRESHOLD, SPLIT_THRESHOLD,
                               FEEDBACK_FACT_KEYBERT_THRESHOLD, RETRY_EXCEPTIONS,
-                              SPACY_MODEL_TYPES)
+                              SPACY_MODEL_TYPES, LEXRANK_DENSE_MAX_SENTENCES,
+                              LEXRANK_TOP_K)
 from common.models import LearningUnit
 #pylint: disable=len-as-condition,bare-except,unnecessary-list-index-lookup,unrecognized-option
 
@@ -29,7 +32,6 @@ MODEL_SENTENCE_RANK = None
 MODEL_ENTITY_RANK = None
 MODEL_STS = None
 INFLECT_ENGINE = None
-SPACY_MODELS = {}
 
 
 def retry_on_exception(exception):
@@ -46,41 +48,65 @@ def check_status_code(status_code):
   if status_code !=500 and 400<= status_code <= 511:
     raise ConnectionError
 
+def get_entity_rank_model():
+  """Returns the KeyBERT model ranking entities, loaded on its first use"""
+  global MODEL_ENTITY_RANK
+  if MODEL_ENTITY_RANK is None:
+    MODEL_ENTITY_RANK = KeyBERT("distilbert-base-nli-stsb-mean-tokens")
+  return MODEL_ENTITY_RANK
+
+
+def get_sts_model():
+  """Returns the sentence similarity model, loaded on its first use"""
+  global MODEL_STS
+  if MODEL_STS is None:
+    MODEL_STS = SentenceTransformer(
+        "distilbert-base-nli-stsb-mean-tokens", device="cpu")
+  return MODEL_STS
+
+
+def get_sentence_rank_model():
+  """Returns the model ranking sentences, loaded on its first use"""
+  global MODEL_SENTENCE_RANK
+  if MODEL_SENTENCE_RANK is None:
+    MODEL_SENTENCE_RANK = SentenceTransformer(
+        "paraphrase-distilroberta-base-v1", device="cpu")
+  return MODEL_SENTENCE_RANK
+
+
+def get_inflect_engine():
+  """Returns the inflect engine, loaded on its first use"""
+  global INFLECT_ENGINE
+  if INFLECT_ENGINE is None:
+    INFLECT_ENGINE = inflect.engine()
+    INFLECT_ENGINE.classical(all=True)
+  return INFLECT_ENGINE
+
+
 def load_utils_models(
     spacy_models=False,
     model_sentence_rank=False,
     model_entity_rank=False,
     model_sts=False,
     inflect_engine=False):
-  """Loads Models as per the configurations"""
-
-  global MODEL_ENTITY_RANK
-  global MODEL_STS
-  global MODEL_SENTENCE_RANK
-  global INFLECT_ENGINE
-  global SPACY_MODELS
+  """Loads Models as per the configurations. Models not loaded here are
+  loaded on their first use"""
 
   if spacy_models:
-    for model_type, model_name in SPACY_MODEL_TYPES.items():
-      try:
-        SPACY_MODELS[model_type] = spacy.load(model_name)
-      except:
-        SPACY_MODELS[model_type] = spacy.load("en_core_web_sm")
+    for model_type in SPACY_MODEL_TYPES:
+      SPACY_MODELS[model_type]  # pylint: disable=pointless-statement
 
   if model_entity_rank:
-    MODEL_ENTITY_RANK = KeyBERT("distilbert-base-nli-stsb-mean-tokens")
+    get_entity_rank_model()
 
   if model_sts:
-    MODEL_STS = SentenceTransformer(
-        "distilbert-base-nli-stsb-mean-tokens", device="cpu")
+    get_sts_model()
 
   if model_sentence_rank:
-    MODEL_SENTENCE_RANK = SentenceTransformer(
-        "paraphrase-distilroberta-base-v1", device="cpu")
+    get_sentence_rank_model()
 
   if inflect_engine:
-    INFLECT_ENGINE = inflect.engine()
-    INFLECT_ENGINE.classical(all=True)
+    get_inflect_engine()
 
   return (SPACY_MODELS, MODEL_SENTENCE_RANK, MODEL_ENTITY_RANK, MODEL_STS,
           INFLECT_ENGINE)
@@ -159,7 +185,7 @@ def check_pronoun(sent, spacy_model_type="default"):
   """
   resolved_text = get_coref_text(
     sent, resolve_all_mentions=True, spacy_model_type=spacy_model_type)
-  doc_resolved = SPACY_MODELS[spacy_model_type](resolved_text)
+  doc_resolved = parse(resolved_text, spacy_model_type, TAGS)
   if len([
       tok.text
       for tok in doc_resolved
@@ -194,15 +220,10 @@ def lemma_ent(ent, spacy_model_type="default"):
   Returns:
     lemma_list: list of lemma entities in the input entity
   """
-  lemma_list = []
-  ans_lemma = ""
-  for word in word_split(ent, spacy_model_type):
-    word = word.lower()
-    if word not in stopwords.words() and word.isalpha():
-      doc = SPACY_MODELS[spacy_model_type](word)
-      ans_lemma = doc[0].lemma_
-      lemma_list.append(ans_lemma)
-  return lemma_list
+  stop_words = set(stopwords.words())
+  words = [word.lower() for word in word_split(ent, spacy_model_type)]
+  words = [word for word in words if word not in stop_words and word.isalpha()]
+  return [doc[0].lemma_ for doc in parse_texts(words, spacy_model_type, TAGS)]
 
 
 def sentence_selection(lu_sentences, sent_len_thresh=5,
@@ -216,17 +237,18 @@ spacy_model_type="default"):
     [<text1>]
   """
   try:
+    parse_texts(lu_sentences, spacy_model_type, TAGS)
     # Remove sentences that are absolute questions:
     non_question_sents = [
       sent for sent in lu_sentences if not (
       (word_split(sent, spacy_model_type)[0].lower() in question_words and \
-      SPACY_MODELS[spacy_model_type](sent)[1].pos_ in ["VERB", "ADP"]) or \
+      parse(sent, spacy_model_type, TAGS)[1].pos_ in ["VERB", "ADP"]) or \
       (word_split(sent, spacy_model_type)[-1] == "?"))
     ]
     # Remove sentences starting with Bloom's taxonomy verbs:
     sentences = [
         sents for sents in non_question_sents
-        if SPACY_MODELS[spacy_model_type](sents)[0].tag_  != "VB"
+        if parse(sents, spacy_model_type, TAGS)[0].tag_  != "VB"
         ]
     # Remove sentences having refererence to objects which are not present:
     # eg: "below image" or "following table" or "next diagram"
@@ -239,7 +261,7 @@ spacy_model_type="default"):
     # eg: "Image 2" or "Table 3a" or "Slideshow 1"
     valid_sentences = []
     for sent in sentences:
-      doc = SPACY_MODELS[spacy_model_type](sent)
+      doc = parse(sent, spacy_model_type, TAGS)
       discard_sent = False
       for i, tok in enumerate(doc):
         if tok.text.lower() in low_context_objects and i < (len(doc) - 1):
@@ -253,7 +275,7 @@ spacy_model_type="default"):
     filtered_sentences = []
     for sentence in valid_sentences:
       if any(word in sentence.lower() for word in ["above", "below"]):
-        doc = SPACY_MODELS[spacy_model_type](sentence)
+        doc = parse(sentence, spacy_model_type, TAGS)
         for token in doc:
           if token.text in ["above", "below"]:
             word_position = token.i
@@ -308,7 +330,7 @@ spacy_model_type="default"):
     valid_sentences = []
     for sentence in sentences:
       discard_sent = False
-      doc = SPACY_MODELS[spacy_model_type](sentence)
+      doc = parse(sentence, spacy_model_type, TAGS)
       if doc[0].text.lower() in low_context_objects + ["that"]:
         discard_sent = True
       else:
@@ -358,7 +380,8 @@ def sentence_transformations(sentences, spacy_model_type="default"):
     for phrase in introductory_phrases:
       if phrase in sent:
         masked_sent = sent.replace(phrase, "MASKEDWORD")
-        if SPACY_MODELS[spacy_model_type](masked_sent)[0].text == "MASKEDWORD":
+        if parse(masked_sent, spacy_model_type, TOKENS)[0].text == \
+          "MASKEDWORD":
           transformed_sent = masked_sent.replace("MASKEDWORD", "")
           transformed_sentences.append(transformed_sent)
   # When 1st word, replace "another"/"other" with either "a/an" when followed
@@ -367,30 +390,29 @@ def sentence_transformations(sentences, spacy_model_type="default"):
   for sent in transformed_sentences:
     if word_split(
       sent, spacy_model_type)[0].lower() in ["another", "other"] and \
-      SPACY_MODELS[spacy_model_type](sent)[1].pos_ in ["NOUN", "ADJ"]:
+      parse(sent, spacy_model_type, TAGS)[1].pos_ in ["NOUN", "ADJ"]:
       second_word = word_split(sent, spacy_model_type)[1]
-      if SPACY_MODELS[spacy_model_type](sent)[1].pos_ == "ADJ":
-        sent = INFLECT_ENGINE.an(sent.replace(
+      if parse(sent, spacy_model_type, TAGS)[1].pos_ == "ADJ":
+        sent = get_inflect_engine().an(sent.replace(
                                   word_split(
                                     sent, spacy_model_type)[0], "", 1).strip())
         valid_sentences.append(sent)
-      elif SPACY_MODELS[spacy_model_type](
-        sent)[1].pos_ == "NOUN" and SPACY_MODELS[spacy_model_type](
-          sent)[2].pos_ == "NOUN":
-        sent = INFLECT_ENGINE.an(sent.replace(
+      elif parse(sent, spacy_model_type, TAGS)[1].pos_ == "NOUN" and \
+        parse(sent, spacy_model_type, TAGS)[2].pos_ == "NOUN":
+        sent = get_inflect_engine().an(sent.replace(
                                   word_split(
                                     sent, spacy_model_type)[0], "", 1).strip())
         valid_sentences.append(sent)
-      elif SPACY_MODELS[spacy_model_type](sent)[1].pos_ == "NOUN":
-        if INFLECT_ENGINE.singular_noun(second_word) is False:
-          plural_noun = INFLECT_ENGINE.plural(second_word)
+      elif parse(sent, spacy_model_type, TAGS)[1].pos_ == "NOUN":
+        if get_inflect_engine().singular_noun(second_word) is False:
+          plural_noun = get_inflect_engine().plural(second_word)
           if check_valid_words(plural_noun):
             sent = sent.replace(second_word, plural_noun, 1)
             sent = sent.replace(word_split(
               sent, spacy_model_type)[0], "One of the", 1)
             valid_sentences.append(sent)
           else:
-            sent = INFLECT_ENGINE.an(
+            sent = get_inflect_engine().an(
                 sent.replace(word_split(
                   sent, spacy_model_type)[0], "", 1).strip())
             valid_sentences.append(sent)
@@ -434,7 +456,7 @@ def word_split(text, spacy_model_type="default"):
     list of words
     [<text1>, <text2>]
     """
-  doc = SPACY_MODELS[spacy_model_type](text)
+  doc = parse(text, spacy_model_type, TOKENS)
   return [tok.text for tok in doc]
 
 
@@ -596,13 +618,21 @@ def get_ranked_sentences(model, sent_text):
     A list of tuples in the format [(idx, sentence, sentence_score)]
   """
   sent_text = sentence_split(sent_text)
-  embeddings = model.encode(sent_text, convert_to_tensor=True)
-  cosine_scores = util.pytorch_cos_sim(embeddings, embeddings)
-  cosine_scores = cosine_scores * 0.5 + 0.5
-  cosine_scores[cosine_scores > 1.0] = 1.0
-  cosine_scores[cosine_scores < 0.0] = 0.0
-  centrality_scores = degree_centrality_scores(
-      cosine_scores.cpu().numpy(), threshold=None)
+  if len(sent_text) > LEXRANK_DENSE_MAX_SENTENCES:
+    embeddings = model.encode(sent_text, convert_to_numpy=True)
+    if LEXRANK_TOP_K:
+      centrality_scores = degree_centrality_scores(
+          similarity_graph(embeddings, LEXRANK_TOP_K), threshold=None)
+    else:
+      centrality_scores = cosine_centrality_scores(embeddings)
+  else:
+    embeddings = model.encode(sent_text, convert_to_tensor=True)
+    cosine_scores = util.pytorch_cos_sim(embeddings, embeddings)
+    cosine_scores = cosine_scores * 0.5 + 0.5
+    cosine_scores[cosine_scores > 1.0] = 1.0
+    cosine_scores[cosine_scores < 0.0] = 0.0
+    centrality_scores = degree_centrality_scores(
+        cosine_scores.cpu().numpy(), threshold=None)
   sorted_centrality_scores = np.sort(centrality_scores)[::-1]
   most_central_sentence_indices = np.argsort(-centrality_scores)
   sentence_scores = [(i, sent_text[i], sorted_centrality_scores[i])
@@ -624,7 +654,7 @@ def softmax(x):
 def get_ranked_entities(entity_list,
                         lu_text,
                         pos_required=True,
-                        model=MODEL_ENTITY_RANK):
+                        model=None):
   """Function to get ranked entites from text
   args:
     model: model to be used for entity ranking
@@ -634,6 +664,8 @@ def get_ranked_entities(entity_list,
     entity_scores: (list) - of entities & thier scores with respect to
                             given context
   """
+  if model is None:
+    model = get_entity_rank_model()
   if pos_required:
     answer = [ent[0] for ent in entity_list["answer"]]
     entity_scores = model.extract_keywords(lu_text, candidates=answer)
@@ -824,8 +856,7 @@ def get_coref_clusters(text_list, model_type="spanbert",
       for prediction in response["prediction"]:
         all_clusters.append(prediction["clusters"])
     else:
-      for text in text_list:
-        doc = SPACY_MODELS[spacy_model_type](text)
+      for doc in parse_texts(text_list, spacy_model_type, FULL):
         clusters = doc._.coref_clusters
         new_clusters = []
         for cluster in clusters:
@@ -860,8 +891,8 @@ def get_resolved_sents(sentences, clusters, resolve_all_mentions = False,
   """
   sentence_docs = []
   sentence_start_end = {}
-  for i, sent in enumerate(sentences):
-    doc = SPACY_MODELS[spacy_model_type](sent)
+  docs = parse_texts(sentences, spacy_model_type, TAGS)
+  for i, doc in enumerate(docs):
     if i == 0:
       sentence_start_end[i] = {"start": 0, "end": len(doc) - 1}
     else:
@@ -1123,7 +1154,7 @@ def rank_entities(text, candidates):
      {"text": rings, "start_idx": 1}]
   """
   entities = [item["text"] for item in candidates]
-  keywords = MODEL_ENTITY_RANK.extract_keywords(
+  keywords = get_entity_rank_model().extract_keywords(
       text, candidates=entities, top_n=len(candidates))
   result = []
   added_index = []
@@ -1316,10 +1347,10 @@ def extract_entities(text, assessment_type=None, spacy_model_type="default"):
     "non_named_entities": "<text>"}]
   """
   sentences = sentence_split(text)
+  docs = parse_texts(sentences, spacy_model_type, FULL)
   result = []
-  for sentence in sentences:
+  for sentence, doc in zip(sentences, docs):
     entities = {}
-    doc = SPACY_MODELS[spacy_model_type](sentence)
     named_entities, non_named_entities = generate_entities(doc, assessment_type)
     non_named_entities = rank_entities(text, non_named_entities)
     entities["sentence"] = sentence
@@ -1338,9 +1369,9 @@ def answer_in_question(question, answer, spacy_model_type="default"):
       (bool): True - if answer lies in question
               Flase - if not
   """
-  answer_doc = SPACY_MODELS[spacy_model_type](answer)
+  answer_doc, question_doc = parse_texts([answer, question], spacy_model_type,
+                                         TAGS)
   count = 0
-  question_doc = SPACY_MODELS[spacy_model_type](question)
   answer_lemmas = [token.lemma_ for token in answer_doc]
   question_lemmas = [token.lemma_ for token in question_doc]
   for word in answer_lemmas:
@@ -1364,7 +1395,7 @@ def entity_in_topn(entity, context, top_n=7):
     bool: True if "entity" is in "top_n" entities of the "context", else False.
   """
   entity_len = len(entity.split())
-  top_entities = MODEL_ENTITY_RANK.extract_keywords(context,
+  top_entities = get_entity_rank_model().extract_keywords(context,
       keyphrase_ngram_range=(entity_len, entity_len), top_n=top_n)
   for item in top_entities:
     if item[0].lower() == entity.lower():
@@ -1412,7 +1443,7 @@ def get_facts_for_correct_incorrect_feedback(candidate_sentences, answer,
     if len(sent.split()) < LONG_SENT_THRESHOLD:
       if (re.search(r"\b" + answer.strip(".,") + r"\b", sent, re.IGNORECASE))\
           and sent.lower() not in context:
-        answer_sent_keybert_score = MODEL_ENTITY_RANK.extract_keywords(
+        answer_sent_keybert_score = get_entity_rank_model().extract_keywords(
           sent, candidates=[answer])[0][1]
         if use_two_filter:
           if entity_in_topn(answer, sent):
@@ -1460,8 +1491,8 @@ def get_similarity_score(sent1, sent2):
   >>> question_lu_sim_score
   >>> 0.32670873403549194
   """
-  sent1_embd = MODEL_STS.encode(sent1.lower())
-  sent2_embd = MODEL_STS.encode(sent2.lower())
+  sent1_embd = get_sts_model().encode(sent1.lower())
+  sent2_embd = get_sts_model().encode(sent2.lower())
   cosine_sim = util.pytorch_cos_sim(sent1_embd, sent2_embd)[0][0].item()
   return cosine_sim
 
@@ -1732,9 +1763,10 @@ def convert_to_truecase(text, spacy_model_type="default"):
   """Function for ensuring proper capitalization
    of words in the given text"""
   truecased_sents = []
-  for sentence in sentence_split(text):
+  sentences = sentence_split(text)
+  for doc in parse_texts(sentences, spacy_model_type, TAGS):
     truecased_sentence = ""
-    for tok in SPACY_MODELS[spacy_model_type](sentence):
+    for tok in doc:
       tok_text = tok.text_with_ws
       if tok.pos_ != "PROPN":
         tok_text = tok_text.lower()
@@ -1901,7 +1933,7 @@ def drop_blooms_verb(sentence, spacy_model_type="default"):
    or converting the sentence to how based question"""
   phrase = ""
   sentence = sentence.strip()
-  doc = SPACY_MODELS[spacy_model_type](sentence)
+  doc = parse(sentence, spacy_model_type, TAGS)
   flag = False
   for tok in doc:
     if tok.tag_ == "WP":
@@ -1924,7 +1956,7 @@ def is_long(text, spacy_model_type="default"):
   the given text input.
   Return: hint (string)
   """
-  doc = SPACY_MODELS[spacy_model_type](text)
+  doc = parse(text, spacy_model_type, TAGS)
   conj_tags = ["CCONJ", "CONJ", "SCONJ", "CC"]
   flag = False
   for token in doc:
@@ -34,3 +34,29 @@ BQ_TABLE_DICT = {
 
 CLASSROOM_ADMIN_EMAIL = os.getenv("CLASSROOM_ADMIN_EMAIL")
 
+
+# Rows buffered per BQ table before they are written, and seconds after
+# which buffered rows are written anyway
+BQ_WRITER_MAX_ROWS = int(os.getenv("BQ_WRITER_MAX_ROWS", "500"))
+BQ_WRITER_MAX_LATENCY = float(os.getenv("BQ_WRITER_MAX_LATENCY", "2"))
+
+# Batching of the published LMS notifications
+PUBLISHER_MAX_MESSAGES = int(os.getenv("PUBLISHER_MAX_MESSAGES", "100"))
+PUBLISHER_MAX_LATENCY = float(os.getenv("PUBLISHER_MAX_LATENCY", "0.05"))
+
+# Subscriber flow control: messages and bytes leased at a time, and the
+# threads processing them
+SUBSCRIBER_MAX_MESSAGES = int(os.getenv("SUBSCRIBER_MAX_MESSAGES", "1000"))
+SUBSCRIBER_MAX_BYTES = int(os.getenv("SUBSCRIBER_MAX_BYTES",
+                                     str(100 * 1024 * 1024)))
+SUBSCRIBER_WORKERS = int(os.getenv("SUBSCRIBER_WORKERS", "16"))
+
+# Seconds a fetched course work, material or submission is reused by the
+# notifications published before it was fetched, seconds a user profile is
+# cached, and resources kept per cache
+CLASSROOM_FETCH_WINDOW = float(os.getenv("CLASSROOM_FETCH_WINDOW", "10"))
+USER_PROFILE_TTL = float(os.getenv("USER_PROFILE_TTL", "3600"))
+FETCH_CACHE_MAX_ITEMS = int(os.getenv("FETCH_CACHE_MAX_ITEMS", "10000"))
+
+# Seconds between logs of the ingestion metrics
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", "60"))
@@ -0,0 +1,215 @@
+"""
+Buffered BQ writer for the rows of Pub/Sub messages
+
+The services add the rows of a message to the RowBatch of the message
+instead of inserting them one call at a time. Once a message is processed,
+its batch is submitted to the BQ_WRITER, which buffers rows per table and
+streams them to BQ when a table has BQ_WRITER_MAX_ROWS rows or
+BQ_WRITER_MAX_LATENCY seconds after the oldest buffered row. The commit
+callback of a batch is called once all its rows are written, so that its
+message is only acked after its rows are in BQ.
+"""
+import threading
+import time
+from common.utils import bq_helper
+from common.utils.logging_handler import Logger
+from config import BQ_WRITER_MAX_ROWS, BQ_WRITER_MAX_LATENCY
+
+# disabling for linting to pass
+# pylint: disable = broad-except
+
+_current = threading.local()
+
+
+class RowBatch():
+  """Rows of a message by (dataset, table name), collected while the
+  batch is the current batch of the thread"""
+
+  def __init__(self, message_id):
+    self.message_id = message_id
+    self.rows = {}
+
+  def __enter__(self):
+    _current.batch = self
+    return self
+
+  def __exit__(self, *args):
+    _current.batch = None
+
+  def add(self, rows, dataset, table_name):
+    self.rows.setdefault((dataset, table_name), []).extend(rows)
+
+  def row_ids(self, dataset, table_name):
+    """returns insert ids of the rows of a table, the same when a message
+    is redelivered so that BQ drops rows inserted again"""
+    return [f"{self.message_id}-{dataset}.{table_name}-{i}"
+            for i in range(len(self.rows[(dataset, table_name)]))]
+
+
+def insert_rows_to_bq(rows, dataset, table_name):
+  """Adds rows to the current batch of the thread, or inserts them if there
+  is none
+
+  Returns:
+    Bool: whether the rows are added or inserted
+  """
+  batch = getattr(_current, "batch", None)
+  if batch is None:
+    return bq_helper.insert_rows_to_bq(rows, dataset, table_name)
+  batch.add(rows, dataset, table_name)
+  return True
+
+
+class _Commit():
+  """Calls the commit callback of a batch once all its tables are
+  written"""
+
+  def __init__(self, tables, on_commit):
+    self.remaining = tables
+    self.committed = True
+    self.on_commit = on_commit
+    self._lock = threading.Lock()
+
+  def done(self, committed):
+    with self._lock:
+      self.committed = self.committed and committed
+      self.remaining -= 1
+      if self.remaining:
+        return
+    try:
+      self.on_commit(self.committed)
+    except Exception as e:
+      Logger.error(f"Commit callback failed with error {e}")
+
+
+class BufferedBigQueryWriter():
+  """Buffers the rows of batches per table and writes them from a
+  background thread"""
+
+  def __init__(self, max_rows=BQ_WRITER_MAX_ROWS,
+               max_latency=BQ_WRITER_MAX_LATENCY):
+    self.max_rows = max_rows
+    self.max_latency = max_latency
+    # (dataset, table name) -> [(rows, row ids, commit)]
+    self._buffers = {}
+    self._row_counts = {}
+    self._oldest = None
+    self._condition = threading.Condition()
+    self._thread = None
+    self._closed = False
+
+  def start(self):
+    with self._condition:
+      if self._thread is None:
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="bq-writer")
+        self._thread.start()
+
+  def submit(self, batch, on_commit):
+    """
+    Buffers the rows of a batch
+
+    Args:
+      batch (RowBatch): rows of a message
+      on_commit (callable): called with True once all the rows are written,
+        with False if some could not be written
+    """
+    if not batch.rows:
+      on_commit(True)
+      return
+    commit = _Commit(len(batch.rows), on_commit)
+    with self._condition:
+      for (dataset, table_name), rows in batch.rows.items():
+        key = (dataset, table_name)
+        self._buffers.setdefault(key, []).append(
+          (rows, batch.row_ids(dataset, table_name), commit))
+        self._row_counts[key] = self._row_counts.get(key, 0) + len(rows)
+      if self._oldest is None:
+        self._oldest = time.monotonic()
+      self._condition.notify()
+
+  def _due(self):
+    if not self._buffers:
+      return False
+    return self._closed or \
+      max(self._row_counts.values()) >= self.max_rows or \
+      time.monotonic() - self._oldest >= self.max_latency
+
+  def _take_buffers(self):
+    buffers = self._buffers
+    self._buffers = {}
+    self._row_counts = {}
+    self._oldest = None
+    return buffers
+
+  def _run(self):
+    while True:
+      with self._condition:
+        while not self._due():
+          if self._closed:
+            return
+          timeout = None
+          if self._oldest is not None:
+            timeout = max(0, self.max_latency -
+                          (time.monotonic() - self._oldest))
+          self._condition.wait(timeout)
+        buffers = self._take_buffers()
+      for key, entries in buffers.items():
+        self._write(key, entries)
+
+  def _write(self, key, entries):
+    """Writes the buffered rows of a table in requests of up to max_rows
+    rows and reports every batch as written or failed"""
+    dataset, table_name = key
+    chunk = []
+    chunk_rows = 0
+    for entry in entries:
+      chunk.append(entry)
+      chunk_rows += len(entry[0])
+      if chunk_rows >= self.max_rows:
+        self._write_chunk(dataset, table_name, chunk)
+        chunk, chunk_rows = [], 0
+    if chunk:
+      self._write_chunk(dataset, table_name, chunk)
+
+  def _write_chunk(self, dataset, table_name, chunk):
+    rows = [row for entry in chunk for row in entry[0]]
+    row_ids = [row_id for entry in chunk for row_id in entry[1]]
+    try:
+      table = bq_helper.get_table(dataset, table_name)
+      errors = bq_helper.get_client().insert_rows(
+        table=table, rows=rows, row_ids=row_ids)
+    except Exception as e:
+      Logger.error(f"Failed to write {len(rows)} rows in {table_name}: {e}")
+      for entry in chunk:
+        entry[2].done(False)
+      return
+    failed_rows = {error["index"] for error in errors}
+    if errors:
+      Logger.error(f"Encountered errors while inserting rows in {table_name}:"
+                   f" {errors}")
+    else:
+      Logger.info(f"New data pushed {len(rows)} rows in {table_name}")
+    start = 0
+    for rows_of_batch, _, commit in chunk:
+      commit.done(not failed_rows.intersection(
+        range(start, start + len(rows_of_batch))))
+      start += len(rows_of_batch)
+
+  def close(self):
+    """Writes the buffered rows and stops the background thread"""
+    with self._condition:
+      self._closed = True
+      thread = self._thread
+      self._condition.notify()
+    if thread is not None:
+      thread.join()
+    with self._condition:
+      self._thread = None
+      buffers = self._take_buffers()
+    for key, entries in buffers.items():
+      self._write(key, entries)
+
+
+BQ_WRITER = BufferedBigQueryWriter()
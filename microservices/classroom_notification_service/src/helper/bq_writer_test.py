@@ -0,0 +1,65 @@
+"""
+Buffered BQ Writer Unit Test
+"""
+import threading
+import mock
+from helper.bq_writer import BufferedBigQueryWriter, RowBatch, insert_rows_to_bq
+
+
+def make_batch(message_id, tables):
+  with RowBatch(message_id) as batch:
+    for table_name, rows in tables.items():
+      assert insert_rows_to_bq(rows, "dataset", table_name) is True
+  return batch
+
+
+def test_rows_are_collected_in_the_current_batch():
+  with mock.patch("helper.bq_writer.bq_helper.insert_rows_to_bq") as insert:
+    batch = make_batch("1", {"logs": [{"a": 1}], "users": [{"b": 2}]})
+    assert batch.rows == {("dataset", "logs"): [{"a": 1}],
+                          ("dataset", "users"): [{"b": 2}]}
+    insert.assert_not_called()
+    insert_rows_to_bq([{"c": 3}], "dataset", "logs")
+    insert.assert_called_once()
+
+
+def test_batches_commit_once_all_their_tables_are_written():
+  client = mock.Mock()
+  client.insert_rows.return_value = []
+  writer = BufferedBigQueryWriter(max_rows=3, max_latency=60)
+  committed = threading.Event()
+  results = []
+
+  def on_commit(result):
+    results.append(result)
+    committed.set()
+
+  with mock.patch("helper.bq_writer.bq_helper.get_table"), \
+    mock.patch("helper.bq_writer.bq_helper.get_client", return_value=client):
+    writer.start()
+    writer.submit(make_batch("1", {"logs": [{"a": 1}], "users": [{"b": 2}]}),
+                  on_commit)
+    writer.submit(make_batch("2", {"logs": [{"a": 2}, {"a": 3}]}), on_commit)
+    # the logs table is full, the buffers are written before the latency
+    assert committed.wait(5)
+    writer.close()
+  assert results == [True, True]
+  logs_call = client.insert_rows.call_args_list[0].kwargs
+  assert logs_call["rows"] == [{"a": 1}, {"a": 2}, {"a": 3}]
+  assert logs_call["row_ids"] == ["1-dataset.logs-0", "2-dataset.logs-0",
+                                  "2-dataset.logs-1"]
+
+
+def test_failed_rows_fail_only_their_batch():
+  client = mock.Mock()
+  client.insert_rows.return_value = [{"index": 2, "errors": ["invalid"]}]
+  writer = BufferedBigQueryWriter(max_rows=10, max_latency=60)
+  results = {}
+  with mock.patch("helper.bq_writer.bq_helper.get_table"), \
+    mock.patch("helper.bq_writer.bq_helper.get_client", return_value=client):
+    writer.submit(make_batch("1", {"logs": [{"a": 1}, {"a": 2}]}),
+                  lambda result: results.update({"1": result}))
+    writer.submit(make_batch("2", {"logs": [{"a": 3}]}),
+                  lambda result: results.update({"2": result}))
+    writer.close()
+  assert results == {"1": True, "2": False}
@@ -1,8 +1,9 @@
 """ Hepler functions for classroom crud API """
-from googleapiclient.discovery import build
-from config import CLASSROOM_ADMIN_EMAIL
-from common.utils.jwt_creds import JwtCredentials
-from common.utils import classroom_crud
+import threading
+from config import (CLASSROOM_ADMIN_EMAIL, CLASSROOM_FETCH_WINDOW,
+                    USER_PROFILE_TTL, FETCH_CACHE_MAX_ITEMS)
+from common.utils import google_api_client
+from helper.fetch_cache import FetchCache
 
 FEED_TYPE_DICT = {
     "COURSE_WORK_CHANGES": "courseWorkChangesInfo",
@@ -26,21 +27,46 @@ SCOPES = [
     "https://www.googleapis.com/auth/classroom.courseworkmaterials.readonly"
 ]
 
+# Fetches of the resources of notifications are reused for a short window,
+# user profiles for a longer time to live
+RESOURCE_CACHE = FetchCache(CLASSROOM_FETCH_WINDOW, FETCH_CACHE_MAX_ITEMS)
+USER_PROFILE_CACHE = FetchCache(USER_PROFILE_TTL, FETCH_CACHE_MAX_ITEMS)
+
+_fetched_after = threading.local()
+
+
+class fetched_after():  # pylint: disable = invalid-name
+  """Makes the resource fetches of the thread reuse only the fetches
+  started after a time, e.g. the publish time of the processed notification
+
+  Args:
+    publish_time (datetime): time of the change the resources are fetched for
+  """
+
+  def __init__(self, publish_time):
+    self.timestamp = publish_time.timestamp()
+
+  def __enter__(self):
+    _fetched_after.timestamp = self.timestamp
+    return self
+
+  def __exit__(self, *args):
+    _fetched_after.timestamp = None
+
+
+def _fetch_resource(key, fetch_function):
+  return RESOURCE_CACHE.get(key, fetch_function,
+                            getattr(_fetched_after, "timestamp", None))
+
 
 def get_service():
-  """_summary_
+  """Returns the pooled classroom service acting as the classroom admin
 
   Returns:
-    _type_: _description_
+    googleapiclient.discovery.Resource: classroom service
   """
-  google_oauth_token_endpoint = "https://oauth2.googleapis.com/token"
-  service_account_email = classroom_crud.get_default_service_account_email()
-  creds = JwtCredentials.from_default_with_subject(
-    CLASSROOM_ADMIN_EMAIL,
-    service_account_email,
-    google_oauth_token_endpoint,
-    scopes=SCOPES)
-  return build("classroom", "v1", credentials=creds,num_retries=15)
+  return google_api_client.get_service(
+    "classroom", "v1", CLASSROOM_ADMIN_EMAIL, SCOPES, num_retries=15)
 
 def get_user(user_id):
   """ get user details from classroom
@@ -50,8 +76,9 @@ def get_user(user_id):
   Returns:
     dict: User details
   """
-  service=get_service()
-  return service.userProfiles().get(userId=user_id).execute()
+  return USER_PROFILE_CACHE.get(
+    user_id,
+    lambda: get_service().userProfiles().get(userId=user_id).execute())
 
 
 def get_course_by_id(course_id):
@@ -62,9 +89,9 @@ def get_course_by_id(course_id):
         course details
   """
 
-  service = get_service()
-  course = service.courses().get(id=course_id).execute()
-  return course
+  return _fetch_resource(
+    ("course", course_id),
+    lambda: get_service().courses().get(id=course_id).execute())
 
 def get_course_work(course_id,course_work_id):
   """get course work details
@@ -76,9 +103,10 @@ def get_course_work(course_id,course_work_id):
   Returns:
     _type_: _description_
   """
-  service=get_service()
-  return service.courses().courseWork().get(
-    courseId=course_id,id=course_work_id).execute()
+  return _fetch_resource(
+    ("courseWork", course_id, course_work_id),
+    lambda: get_service().courses().courseWork().get(
+      courseId=course_id,id=course_work_id).execute())
 
 def get_course_work_material(course_id,course_work_id):
   """get course work material details
@@ -90,9 +118,10 @@ def get_course_work_material(course_id,course_work_id):
   Returns:
     _type_: _description_
   """
-  service=get_service()
-  return service.courses().courseWorkMaterials().get(
-    courseId=course_id,id=course_work_id).execute()
+  return _fetch_resource(
+    ("courseWorkMaterial", course_id, course_work_id),
+    lambda: get_service().courses().courseWorkMaterials().get(
+      courseId=course_id,id=course_work_id).execute())
 
 
 def get_student_submissions(course_id, course_work_id,submissions_id):
@@ -106,6 +135,8 @@ def get_student_submissions(course_id, course_work_id,submissions_id):
   Returns:
     _type_: _description_
   """
-  service = get_service()
-  return service.courses().courseWork().studentSubmissions().get(
-    courseId=course_id, courseWorkId=course_work_id,id=submissions_id).execute()
+  return _fetch_resource(
+    ("studentSubmission", course_id, course_work_id, submissions_id),
+    lambda: get_service().courses().courseWork().studentSubmissions().get(
+      courseId=course_id, courseWorkId=course_work_id,
+      id=submissions_id).execute())
@@ -0,0 +1,89 @@
+"""
+Cache of Classroom resource fetches
+
+Bursts of notifications about the same resource would each fetch it from
+Classroom. A FetchCache keeps the fetched resources for a time to live and
+makes the concurrent fetches of a resource wait for the fetch in flight.
+A caller can require a resource fetched after a time, e.g. after the
+publish time of its notification, so that reused resources are never older
+than the change they are fetched for.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Fetch():
+  """A fetch of a resource, in flight until done is set"""
+
+  def __init__(self):
+    self.started = time.time()
+    self.done = threading.Event()
+    self.value = None
+    self.error = None
+
+
+class FetchCache():
+  """Fetched resources by key, kept for ttl seconds"""
+
+  def __init__(self, ttl, max_items=10000):
+    """
+    Args:
+      ttl (float): seconds a fetched resource is reused
+      max_items (int): resources to keep, least recently used are dropped
+    """
+    self.ttl = ttl
+    self.max_items = max_items
+    self.metrics = {"hits": 0, "coalesced": 0, "misses": 0}
+    self._fetches = OrderedDict()
+    self._lock = threading.Lock()
+
+  def _reusable(self, fetch, not_before):
+    if not_before is not None and fetch.started < not_before:
+      return False
+    if not fetch.done.is_set():
+      return True
+    return fetch.error is None and time.time() - fetch.started < self.ttl
+
+  def get(self, key, fetch_function, not_before=None):
+    """
+    Returns a copy of the resource of a key, fetched with fetch_function
+    unless a fetch of the key started after not_before and at most ttl
+    seconds ago is done or in flight
+
+    Args:
+      key (hashable): key of the resource
+      fetch_function (callable): fetches the resource
+      not_before (float): POSIX timestamp the reused fetch must have
+        started after, any if None
+
+    Returns:
+      resource: deep copy of the fetched resource, callers may modify it
+    """
+    with self._lock:
+      fetch = self._fetches.get(key)
+      if fetch is not None and self._reusable(fetch, not_before):
+        self._fetches.move_to_end(key)
+        owner = False
+        self.metrics["hits" if fetch.done.is_set() else "coalesced"] += 1
+      else:
+        fetch = self._fetches[key] = _Fetch()
+        self._fetches.move_to_end(key)
+        while len(self._fetches) > self.max_items:
+          self._fetches.popitem(last=False)
+        owner = True
+        self.metrics["misses"] += 1
+
+    if owner:
+      try:
+        fetch.value = fetch_function()
+      except Exception as e:  # pylint: disable = broad-except
+        fetch.error = e
+      finally:
+        fetch.done.set()
+    else:
+      fetch.done.wait()
+    if fetch.error is not None:
+      raise fetch.error
+    return copy.deepcopy(fetch.value)
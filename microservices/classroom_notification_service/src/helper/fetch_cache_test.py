@@ -0,0 +1,56 @@
+"""
+Fetch Cache Unit Test
+"""
+import threading
+import time
+import mock
+import pytest
+from helper.fetch_cache import FetchCache
+
+
+def test_concurrent_fetches_of_a_key_are_coalesced():
+  cache = FetchCache(ttl=60)
+  release = threading.Event()
+  fetch = mock.Mock(side_effect=lambda: release.wait(5) and {"id": "1"})
+  results = []
+  threads = [threading.Thread(
+    target=lambda: results.append(cache.get("1", fetch))) for _ in range(5)]
+  for thread in threads:
+    thread.start()
+  time.sleep(0.1)
+  release.set()
+  for thread in threads:
+    thread.join()
+  assert fetch.call_count == 1
+  assert results == [{"id": "1"}] * 5
+  assert cache.metrics["misses"] == 1
+
+
+def test_fetches_started_before_not_before_are_not_reused():
+  cache = FetchCache(ttl=60)
+  fetch = mock.Mock(return_value={"state": "CREATED"})
+  assert cache.get("1", fetch) == {"state": "CREATED"}
+  cache.get("1", fetch, not_before=time.time() - 60)
+  assert fetch.call_count == 1
+  fetch.return_value = {"state": "TURNED_IN"}
+  assert cache.get("1", fetch, not_before=time.time()) == \
+    {"state": "TURNED_IN"}
+  assert fetch.call_count == 2
+
+
+def test_expired_and_failed_fetches_are_fetched_again():
+  cache = FetchCache(ttl=0)
+  fetch = mock.Mock(side_effect=[ValueError("quota"), {"id": "1"},
+                                 {"id": "2"}])
+  with pytest.raises(ValueError):
+    cache.get("1", fetch)
+  assert cache.get("1", fetch) == {"id": "1"}
+  assert cache.get("1", fetch) == {"id": "2"}
+
+
+def test_callers_get_copies_of_the_resource():
+  cache = FetchCache(ttl=60, max_items=1)
+  cache.get("1", lambda: {"id": "1"})["id"] = "changed"
+  assert cache.get("1", lambda: {"id": "other"}) == {"id": "1"}
+  cache.get("2", lambda: {"id": "2"})
+  assert cache.get("1", lambda: {"id": "other"}) == {"id": "other"}
@@ -0,0 +1,52 @@
+"""
+Ingestion metrics of the Classroom notifications
+
+The lag of a notification is the time from its publish time until it is
+processed (ingestion_lag) and until it is acked or nacked (ack_lag). The
+metrics are logged every METRICS_LOG_INTERVAL seconds with the Classroom
+API calls and the fetch caches, so that they can be charted from logs
+based metrics.
+"""
+import datetime
+import json
+import threading
+from common.utils.google_api_client import ApiCallMetrics, API_CALL_METRICS
+from common.utils.logging_handler import Logger
+from config import METRICS_LOG_INTERVAL
+from helper import classroom_helper
+
+INGESTION_METRICS = ApiCallMetrics()
+
+
+def record_lag(name, publish_time, failed=False):
+  """Records the seconds since the publish time of a message under name"""
+  lag = datetime.datetime.now(datetime.timezone.utc) - publish_time
+  INGESTION_METRICS.record(name, lag.total_seconds(), failed)
+
+
+def log_metrics():
+  """Logs the metrics of the last interval and resets them"""
+  metrics = {
+    "ingestion": INGESTION_METRICS.snapshot(),
+    "api_calls": API_CALL_METRICS.snapshot(),
+    "resource_cache": dict(classroom_helper.RESOURCE_CACHE.metrics),
+    "user_profile_cache": dict(classroom_helper.USER_PROFILE_CACHE.metrics)
+  }
+  INGESTION_METRICS.reset()
+  API_CALL_METRICS.reset()
+  Logger.info(f"Ingestion metrics: {json.dumps(metrics)}")
+
+
+def start_metrics_logging(stop, interval=METRICS_LOG_INTERVAL):
+  """Logs the metrics every interval seconds until stop is set
+
+  Args:
+    stop (threading.Event): stops the logging when set
+    interval (float): seconds between the logs
+  """
+  def run():
+    while not stop.wait(interval):
+      log_metrics()
+  thread = threading.Thread(target=run, daemon=True, name="metrics")
+  thread.start()
+  return thread
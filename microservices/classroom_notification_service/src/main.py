@@ -16,19 +16,30 @@
 Pub Sub to BQ service
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from concurrent.futures import TimeoutError as TimeoutException
+import functools
 import json
+import threading
 from google.cloud import pubsub_v1
+from google.cloud.pubsub_v1.subscriber.scheduler import ThreadScheduler
 from common.utils.logging_handler import Logger
-from config import PUB_SUB_PROJECT_ID, DATABASE_PREFIX
+from config import (PUB_SUB_PROJECT_ID, DATABASE_PREFIX,
+                    SUBSCRIBER_MAX_MESSAGES, SUBSCRIBER_MAX_BYTES,
+                    SUBSCRIBER_WORKERS)
 from service import roster_service,course_work_service,pub_sub_publish_message
 from helper.bq_check import check_bq_tables
+from helper.bq_writer import BQ_WRITER, RowBatch
+from helper.classroom_helper import fetched_after
+from helper.metrics import record_lag, start_metrics_logging, log_metrics
 
 # disabling for linting to pass
 # pylint: disable = broad-except
 
 def callback(message: pubsub_v1.subscriber.message.Message) -> None:
-  """_summary_
+  """Saves the rows of a Classroom notification in a batch of the BQ
+  writer, the message is acked once the rows are written and the LMS
+  notification is published
 
   Args:
       message (pubsub_v1.subscriber.message.Message): _description_
@@ -37,34 +48,80 @@ def callback(message: pubsub_v1.subscriber.message.Message) -> None:
     data = json.loads(message.data)
     data["message_id"]=message.message_id
     data["publish_time"] = message.publish_time
+    record_lag("ingestion_lag", message.publish_time)
     result_flag=False
-    if data["collection"].split(".")[1] == "courseWork":
-      result_flag,notification_message=course_work_service.save_course_work(
-        data)
-    else:
-      result_flag,notification_message=roster_service.save_roster(data)
+    with RowBatch(message.message_id) as batch, \
+      fetched_after(message.publish_time):
+      if data["collection"].split(".")[1] == "courseWork":
+        result_flag,notification_message=course_work_service.save_course_work(
+          data)
+      else:
+        result_flag,notification_message=roster_service.save_roster(data)
 
     if result_flag:
-      if pub_sub_publish_message.send_message(notification_message):
-        message.ack()
-      else:
-        message.nack()
+      BQ_WRITER.submit(batch, functools.partial(
+        on_rows_committed, message, notification_message))
     else:
-      message.nack()
+      nack(message)
   except KeyError as ke:
     Logger.info(str(ke))
-    message.nack()
+    nack(message)
+
+def ack(message):
+  record_lag("ack_lag", message.publish_time)
+  message.ack()
+
+def nack(message):
+  record_lag("ack_lag", message.publish_time, failed=True)
+  message.nack()
+
+def on_rows_committed(message, notification_message, committed):
+  """Publishes the LMS notification of a message once the rows of the
+  message are written and acks the message once the notification is
+  published
+
+  Args:
+      message (pubsub_v1.subscriber.message.Message): Classroom notification
+      notification_message (dict): LMS notification, None if there is none
+      committed (bool): whether the rows of the message are written
+  """
+  if not committed:
+    nack(message)
+    return
+  try:
+    future = pub_sub_publish_message.publish_message(notification_message)
+  except Exception as e:
+    Logger.error(f"Failed to publish notification with error {e}")
+    nack(message)
+    return
+  if future is None:
+    ack(message)
+    return
+  future.add_done_callback(
+    lambda future: nack(message) if future.exception() else ack(message))
 
 def main():
   if not check_bq_tables():
     return 0
+  BQ_WRITER.start()
   subscriber = pubsub_v1.SubscriberClient()
   # The `subscription_path` method creates a fully qualified identifier
   # in the form `projects/{project_id}/subscriptions/{subscription_id}`
   subscription_path = subscriber.subscription_path(
     PUB_SUB_PROJECT_ID, DATABASE_PREFIX+"classroom-notifications-sub")
+  # Lease at most SUBSCRIBER_MAX_MESSAGES messages, processed by
+  # SUBSCRIBER_WORKERS threads, the leased messages include the ones
+  # waiting for their rows to be written
   streaming_pull_future = subscriber.subscribe(
-      subscription_path, callback=callback)
+      subscription_path, callback=callback,
+      flow_control=pubsub_v1.types.FlowControl(
+        max_messages=SUBSCRIBER_MAX_MESSAGES,
+        max_bytes=SUBSCRIBER_MAX_BYTES),
+      scheduler=ThreadScheduler(ThreadPoolExecutor(
+        max_workers=SUBSCRIBER_WORKERS,
+        thread_name_prefix="notification-worker")))
+  stop_metrics = threading.Event()
+  start_metrics_logging(stop_metrics)
   Logger.info(f"Listening for messages on {subscription_path}..\n")
 
   with subscriber:
@@ -79,6 +136,11 @@ def main():
       streaming_pull_future.cancel()  # Trigger the shutdown.
       streaming_pull_future.result()  # Block until the shutdown is complete.
       Logger.error(f"Some error occured.\nError:{e}")
+    finally:
+      # Write the rows buffered before the shutdown
+      BQ_WRITER.close()
+      stop_metrics.set()
+      log_metrics()
 
 # check if BQ table exist or not
 if __name__ == "__main__" :
@@ -18,7 +18,7 @@ import datetime
 import json
 import uuid
 from common.utils.logging_handler import Logger
-from common.utils.bq_helper import insert_rows_to_bq
+from helper.bq_writer import insert_rows_to_bq
 from googleapiclient.errors import HttpError
 from helper.classroom_helper import (get_course_work, get_student_submissions,
                                      get_course_work_material, get_user)
@@ -1,27 +1,57 @@
 """Pub/Sub message publish helper file
 """
-from config import PUB_SUB_PROJECT_ID, DATABASE_PREFIX
-from google.cloud import pubsub_v1
 import json
+import threading
+from config import (PUB_SUB_PROJECT_ID, DATABASE_PREFIX,
+                    PUBLISHER_MAX_MESSAGES, PUBLISHER_MAX_LATENCY)
+from google.cloud import pubsub_v1
 
+_publisher = None
+_publisher_lock = threading.Lock()
 
-def send_message(message):
-  """Method to publish a message to pubsub
+
+def get_publisher():
+  """Returns the publisher client of the service, which batches the
+  published messages"""
+  global _publisher  # pylint: disable = global-statement
+  with _publisher_lock:
+    if _publisher is None:
+      _publisher = pubsub_v1.PublisherClient(
+        batch_settings=pubsub_v1.types.BatchSettings(
+          max_messages=PUBLISHER_MAX_MESSAGES,
+          max_latency=PUBLISHER_MAX_LATENCY))
+    return _publisher
+
+
+def publish_message(message):
+  """Method to publish a message to pubsub without waiting for it
 
   Args:
       message (dict): The data dict which contains details of messages.
 
   Returns:
-      Bool: return bool based on message publish
+      Future: future of the published message id, None if message is None
   """
   if message is None:
-    return True
-  publisher = pubsub_v1.PublisherClient()
+    return None
+  publisher = get_publisher()
   topic_path = publisher.topic_path(
     PUB_SUB_PROJECT_ID, (DATABASE_PREFIX + "lms-notifications"))
-  future = publisher.publish(topic_path,
-                             data=json.dumps(message).encode("utf-8"),
-                             store_to_bq="true")
-  if future.result():
+  return publisher.publish(topic_path,
+                           data=json.dumps(message).encode("utf-8"),
+                           store_to_bq="true")
+
+
+def send_message(message):
+  """Method to publish a message to pubsub
+
+  Args:
+      message (dict): The data dict which contains details of messages.
+
+  Returns:
+      Bool: return bool based on message publish
+  """
+  future = publish_message(message)
+  if future is None or future.result():
     return True
   return False
@@ -17,7 +17,7 @@ Save User Data to BQ Service
 import datetime
 import uuid
 from common.utils.logging_handler import Logger
-from common.utils.bq_helper import insert_rows_to_bq
+from helper.bq_writer import insert_rows_to_bq
 from helper.classroom_helper import get_user,get_course_by_id
 from helper.json_helper import convert_dict_array_to_json
 from googleapiclient.errors import HttpError
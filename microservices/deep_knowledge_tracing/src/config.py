@@ -36,6 +36,37 @@ MODEL_PARAMS_DIR = "model_params"
 IS_DEVELOPMENT = bool(os.getenv("IS_DEVELOPMENT", "").lower() \
     in ("True", "true"))
 DKT_JOB_TYPE = "deep-knowledge-tracing"
+# User events read per Firestore page when building a course dataset
+DKT_EVENTS_BATCH_SIZE = int(os.getenv("DKT_EVENTS_BATCH_SIZE", "5000"))
+# Parquet snapshots of the course datasets, reused for DKT_DATASET_CACHE_TTL
+# seconds. Off by default so that trainings read the latest events
+DKT_DATASET_CACHE_DIR = os.getenv("DKT_DATASET_CACHE_DIR", "dataset_cache")
+DKT_DATASET_CACHE_TTL = int(os.getenv("DKT_DATASET_CACHE_TTL", "0"))
+# Input encoding of newly trained models: "sparse" feeds interaction ids to an
+# embedding layer, "one_hot" feeds one-hot vectors of every interaction
+DKT_INPUT_MODE = os.getenv("DKT_INPUT_MODE", "sparse")
+# Size of the interaction embeddings of sparse models
+DKT_EMBEDDING_DIM = int(os.getenv("DKT_EMBEDDING_DIM", "64"))
+# Sequences are batched with sequences of similar length, split into this many
+# length buckets. Set to 1 to pad every batch to its longest sequence
+DKT_LENGTH_BUCKETS = int(os.getenv("DKT_LENGTH_BUCKETS", "8"))
+# Course models kept loaded by the inference service, least recently used
+# models are evicted past either limit. 0 disables a limit
+DKT_MODEL_CACHE_SIZE = int(os.getenv("DKT_MODEL_CACHE_SIZE", "100"))
+DKT_MODEL_CACHE_MB = int(os.getenv("DKT_MODEL_CACHE_MB", "1024"))
+# Seconds before a cached model checks GCS for new weights
+DKT_MODEL_REFRESH_INTERVAL = int(
+  os.getenv("DKT_MODEL_REFRESH_INTERVAL", "600"))
+# Courses with the most recent user events loaded at startup, 0 to disable
+DKT_WARM_UP_COURSES = int(os.getenv("DKT_WARM_UP_COURSES", "20"))
+DKT_WARM_UP_WORKERS = int(os.getenv("DKT_WARM_UP_WORKERS", "4"))
+# Recent user events sampled to find the most active courses
+DKT_WARM_UP_EVENTS_SAMPLE = int(
+  os.getenv("DKT_WARM_UP_EVENTS_SAMPLE", "5000"))
+# LSTM states of the latest sessions kept per course model, so that new
+# session events are scored from the state of the previous ones
+DKT_SESSION_STATE_CACHE_SIZE = int(
+  os.getenv("DKT_SESSION_STATE_CACHE_SIZE", "2000"))
 
 SERVICES = {}
 
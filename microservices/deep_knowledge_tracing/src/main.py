@@ -3,7 +3,7 @@ import uvicorn
 import config
 from fastapi import FastAPI,Depends
 from routes import dkt_routes, job_status, user_events
-from common.utils.gcs_adapter import download_blob
+from services.inference import Inference
 from common.utils.http_exceptions import add_exception_handlers
 from common.utils.auth_service import validate_token
 
@@ -18,7 +18,12 @@ os.environ["GOOGLE_CLOUD_PROJECT"] = "fake-project"
 
 app = FastAPI()
 
-download_blob(config.MODEL_WEIGHTS_PATH, config.MODEL_PARAMS_DIR)
+
+@app.on_event("startup")
+def warm_up_models():
+  """Loads the models of the most active courses without blocking startup,
+  other courses are loaded on their first prediction"""
+  Inference.warm_up()
 
 
 @app.get("/ping")
@@ -6,7 +6,8 @@ from fastapi import APIRouter  #, HTTPException
 from schemas.dkt_schema import (TrainDKTRequest, TrainDKTResponse,
                                 CreateDataDKTRequest, CreateDataDKTResponse,
                                 PredictDKTRequest,InferenceDKTRequest,
-                                PredictDKTResponse)
+                                PredictDKTResponse,BatchInferenceDKTRequest,
+                                BatchInferenceDKTResponse)
 from schemas.error_schema import (InternalServerErrorResponseModel,
                                   ValidationErrorResponseModel)
 from services.create_fake_data import generate_dkt_data
@@ -79,6 +80,26 @@ def inference_dkt(request_body: InferenceDKTRequest):
       "data": response
   }
 
+@router.post("/inference/batch/",
+ response_model=BatchInferenceDKTResponse)
+def batch_inference_dkt(request_body: BatchInferenceDKTRequest):
+  """Returns the top learning units of many learners of a course, scored
+  together in one forward pass of the course model"""
+  try:
+    response = Inference.predict_batch(
+        course_id=request_body.course_id,
+        learners=[learner.dict() for learner in request_body.learners],
+        top_k=request_body.top_k)
+  except Exception as e:
+    Logger.error(e)
+    Logger.error(traceback.print_exc())
+    raise InternalServerError(str(e)) from e
+  return {
+      "success": True,
+      "message": "Successfully generated predictions from dkt model",
+      "data": response
+  }
+
 @router.post("/predict/",include_in_schema=False,
  response_model=PredictDKTResponse)
 def predict_dkt(request_body: PredictDKTRequest):
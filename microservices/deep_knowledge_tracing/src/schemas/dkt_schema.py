@@ -2,7 +2,7 @@
   Pydantic schemas for DKT API's
 """
 from typing import Optional,Dict,List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, root_validator
 from typing_extensions import Literal
 
 
@@ -120,3 +120,69 @@ class InferenceDKTRequest(BaseModel):
             "user_events": [{"learning_unit": "sample_lu_id", "is_correct": 0}]
         }
     }
+
+class LearnerDKTRequest(BaseModel):
+  user_id: str
+  session_id: Optional[str]
+  user_events: Optional[List[UserEventModel]]
+
+  @root_validator(skip_on_failure=True)
+  def check_events_source(cls, values):  # pylint: disable=no-self-argument
+    if bool(values.get("session_id")) == bool(values.get("user_events")):
+      raise ValueError("Either session_id or user_events is required")
+    return values
+
+class BatchInferenceDKTRequest(BaseModel):
+  course_id: str
+  learners: List[LearnerDKTRequest]
+  top_k: int = Field(10, gt=0)
+
+  class Config:
+    orm_mode = True
+    schema_extra = {
+        "example": {
+            "course_id": "sample_course_id",
+            "learners": [{
+                "user_id": "sample_user_id",
+                "session_id": "sample_session_id"
+            }, {
+                "user_id": "sample_user_id_2",
+                "user_events": [{
+                    "learning_unit": "sample_lu_id",
+                    "is_correct": 0
+                }]
+            }],
+            "top_k": 10
+        }
+    }
+
+class LURecommendation(BaseModel):
+  learning_unit: str
+  score: float
+
+class LearnerDKTPrediction(BaseModel):
+  user_id: str
+  session_id: Optional[str]
+  recommendations: List[LURecommendation]
+
+class BatchInferenceDKTResponse(BaseModel):
+  success: bool
+  message: str
+  data: List[LearnerDKTPrediction]
+
+  class Config:
+    orm_mode = True
+    schema_extra = {
+        "example": {
+            "success": True,
+            "message": "Successfully generated predictions from dkt model",
+            "data": [{
+                "user_id": "sample_user_id",
+                "session_id": "sample_session_id",
+                "recommendations": [{
+                    "learning_unit": "sample_lu_id",
+                    "score": 0.91
+                }]
+            }]
+        }
+    }
@@ -1,5 +1,6 @@
 """"contains data models related functions"""
-from common.models import Course
+from collections import Counter
+from common.models import Course, UserEvent
 #pylint: disable=unnecessary-comprehension
 def get_learning_units(course_id):
   """returns all learning units for a given course"""
@@ -27,3 +28,12 @@ def filter_events_with_empty_feedback(user_event):
     if "evaluation_flag" in user_event["feedback"]["first_attempt"]:
       return True
   return False
+
+def get_active_course_ids(sample_size):
+  """returns the ids of the courses of the most recent user events, most
+  active course first"""
+  user_events = UserEvent.collection.order(
+    "-last_modified_time").fetch(sample_size)
+  counts = Counter(
+    event.course_id for event in user_events if event.course_id)
+  return [course_id for course_id, _ in counts.most_common()]
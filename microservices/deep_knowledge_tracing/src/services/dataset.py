@@ -1,10 +1,16 @@
 """to load and process dataset"""
+import os
+import time
 import pandas as pd
 import tensorflow as tf
 import numpy as np
 from common.models import UserEvent
 from services.data_models_utils import filter_events_with_empty_feedback
 from sklearn.preprocessing import LabelEncoder
+from common.utils.logging_handler import Logger
+from config import (DKT_EVENTS_BATCH_SIZE, DKT_DATASET_CACHE_DIR,
+                    DKT_DATASET_CACHE_TTL, DKT_INPUT_MODE,
+                    DKT_LENGTH_BUCKETS)
 #pylint: disable=no-value-for-parameter,unexpected-keyword-arg,redundant-keyword-arg
 class Dataset():
   """docstring for Dataset class"""
@@ -13,99 +19,190 @@ class Dataset():
   batch_size = 2
   MASK_VALUE = -1.
   all_lu_ids = []
-  @staticmethod
-  def import_dataset(course_id=None):
-    """imports user events from firestore and
-    creates dataset with required fields"""
+  input_mode = DKT_INPUT_MODE
+  EVENT_FIELDS = ["user_id", "parent_node", "session_ref", "learning_unit",
+                  "feedback", "last_modified_time"]
 
-    if course_id:
-      events =  list(UserEvent.collection.filter(
-        "course_id","==",course_id).fetch())
-    else:
-      events = list(UserEvent.collection.fetch())
-    events_list = []
-    for i in events:
+  @staticmethod
+  def read_events(course_id=None):
+    """streams the user events of a course from firestore into columns,
+    keeping only the fields needed for training"""
+    filters = [("course_id", "==", course_id)] if course_id else None
+    user_ids, session_refs, lu_ids, correct, times = [], [], [], [], []
+    for event in UserEvent.iter_documents(
+      batch_size=DKT_EVENTS_BATCH_SIZE, fields=Dataset.EVENT_FIELDS,
+      filters=filters, as_dict=True):
+      event.setdefault("feedback", {})
+      if not filter_events_with_empty_feedback(event):
+        continue
+      feedback = event["feedback"]
+      attempt = feedback["second_attempt"] if "second_attempt" in feedback \
+        else feedback["first_attempt"]
       #TODO logic to be removed
       #temporary logic for transition parent_node to user_id
-      event_dict = i.get_fields()
-      if i.parent_node:
-        event_dict["user_id"] = i.parent_node
-      events_list.append(event_dict)
+      user_ids.append(event.get("parent_node") or event.get("user_id"))
+      session_refs.append(event.get("session_ref", ""))
+      lu_ids.append(event.get("learning_unit"))
+      correct.append(attempt["evaluation_flag"] == "correct")
+      times.append(event.get("last_modified_time"))
+    return pd.DataFrame({
+      "user_ids": pd.Categorical(user_ids),
+      "session_ref": pd.Categorical(session_refs),
+      "lu_ids": pd.Categorical(lu_ids),
+      "correct": np.array(correct, dtype=np.float32),
+      "last_modified_time": pd.to_datetime(times, utc=True)
+    })
 
-    events_df = pd.DataFrame(events_list)
-    events_df = events_df[events_df.apply(
-      filter_events_with_empty_feedback,axis=1)]
-    events_df["correct"] = events_df["feedback"].apply(
-      lambda x : x["second_attempt"]["evaluation_flag"]
-       if "second_attempt" in x.keys() else
-        x["first_attempt"]["evaluation_flag"])
-    events_df["correct"] = events_df["correct"].apply(
-      lambda x: 1.0 if x=="correct" else 0.0)
-    events_df["user_ids"] = events_df["user_id"]
-    events_df["lu_ids"] = events_df["learning_unit"]
-    events_df = events_df.sort_values(by=["last_modified_time"])
+  @staticmethod
+  def load_events(course_id=None, refresh=False):
+    """returns the events of a course from its parquet snapshot if it is
+    recent enough, otherwise reads them from firestore and saves a new
+    snapshot"""
+    path = os.path.join(DKT_DATASET_CACHE_DIR,
+                        "{}.parquet".format(course_id or "all"))
+    if not refresh and DKT_DATASET_CACHE_TTL and os.path.exists(path) and \
+      time.time() - os.path.getmtime(path) < DKT_DATASET_CACHE_TTL:
+      Logger.info("Loading user events snapshot {}".format(path))
+      return pd.read_parquet(path)
+    events_df = Dataset.read_events(course_id)
+    if DKT_DATASET_CACHE_TTL:
+      os.makedirs(DKT_DATASET_CACHE_DIR, exist_ok=True)
+      events_df.to_parquet(path + ".tmp", index=False)
+      os.replace(path + ".tmp", path)
+    return events_df
+
+  @staticmethod
+  def import_dataset(course_id=None, refresh=False):
+    """imports user events from firestore and
+    creates dataset with required fields"""
+    events_df = Dataset.load_events(course_id, refresh)
+    events_df = events_df.sort_values(by=["last_modified_time"],
+                                      kind="stable")
     #TODO to be replaced with all lus from lu collection
     all_lu_ids = list(events_df["lu_ids"].unique())
-    events_df = events_df.groupby(["user_ids","session_ref"]).filter(
-      lambda q: len(q) > 1)
+    session_sizes = events_df.groupby(
+      ["user_ids", "session_ref"], observed=True, sort=False
+    )["correct"].transform("size")
+    events_df = events_df[session_sizes.to_numpy() > 1].copy()
     Dataset.lu_id_encoder.fit(all_lu_ids)
-    events_df["encoded_lu"] = events_df["lu_ids"].apply(
-      lambda x : Dataset.lu_id_encoder.transform([x])[0])
-    events_df["lu_skill_with_answer"] =  events_df.apply(
-      lambda x: x["encoded_lu"]* 2 + x["correct"],axis=1)
+    events_df["encoded_lu"] = Dataset.lu_id_encoder.transform(
+      events_df["lu_ids"].to_numpy(dtype=object))
+    events_df["lu_skill_with_answer"] = \
+      events_df["encoded_lu"] * 2 + events_df["correct"]
     return events_df,all_lu_ids
 
   @staticmethod
-  def load_dataset(course_id=None, batch_size=None, shuffle=True):
-    """imports dataset, encodes and creates TF dataset"""
-    if batch_size is not None:
-      Dataset.batch_size = batch_size
-    df,all_lu_ids = Dataset.import_dataset(course_id)
-    seq = df.groupby(["user_ids","session_ref"]).apply(
-      lambda r: (
-          r["lu_skill_with_answer"].values[:-1],
-          r["encoded_lu"].values[1:],
-          r["correct"].values[1:],
-      ))
-
-    nb_users = len(seq)
+  def session_sequences(events_df):
+    """returns the events of every (user, session) as contiguous ranges.
+    The events of session i are rows offsets[i]:offsets[i + 1] of the
+    returned arrays, in time order"""
+    events_df = events_df.sort_values(by=["user_ids", "session_ref"],
+                                      kind="stable")
+    user_codes = events_df["user_ids"].cat.codes.to_numpy()
+    session_codes = events_df["session_ref"].cat.codes.to_numpy()
+    boundaries = np.flatnonzero((np.diff(user_codes) != 0) |
+                                (np.diff(session_codes) != 0)) + 1
+    offsets = np.concatenate([[0], boundaries, [len(events_df)]]) \
+      if len(events_df) else np.zeros(1, dtype=np.int64)
+    return (events_df["lu_skill_with_answer"].to_numpy(dtype=np.int32),
+            events_df["encoded_lu"].to_numpy(dtype=np.int32),
+            events_df["correct"].to_numpy(dtype=np.float32),
+            offsets)
+
+  @staticmethod
+  def bucket_boundaries(lengths, nb_buckets=DKT_LENGTH_BUCKETS):
+    """returns the sequence length boundaries splitting lengths into
+    nb_buckets buckets of about the same number of sequences"""
+    if nb_buckets <= 1 or not len(lengths):
+      return []
+    quantiles = np.quantile(lengths, np.linspace(0, 1, nb_buckets + 1)[1:-1])
+    return sorted({int(q) + 1 for q in quantiles})
+
+  @staticmethod
+  def build_tf_dataset(features, skills, labels, offsets, shuffle=True,
+                       input_mode=None):
+    """creates the TF dataset of the session sequences, batched by length.
+    In sparse mode the inputs are interaction ids and the targets
+    (skill index, label) pairs, in one_hot mode both are one-hot encoded.
+    Returns the dataset and its number of batches"""
+    input_mode = input_mode or Dataset.input_mode
+    lengths = np.diff(offsets) - 1
+
+    def sequences():
+      for start, end in zip(offsets[:-1], offsets[1:]):
+        yield features[start:end - 1], skills[start + 1:end], \
+          labels[start + 1:end]
+
     dataset = tf.data.Dataset.from_generator(
-        generator=lambda: seq,
-        output_types=(tf.int32, tf.int32, tf.float32)
+        generator=sequences,
+        output_signature=(tf.TensorSpec(shape=(None,), dtype=tf.int32),
+                          tf.TensorSpec(shape=(None,), dtype=tf.int32),
+                          tf.TensorSpec(shape=(None,), dtype=tf.float32))
     )
 
     if shuffle:
-      dataset = dataset.shuffle(buffer_size=nb_users)
+      dataset = dataset.shuffle(buffer_size=max(len(lengths), 1))
 
     # Step 6 - Encode categorical features and merge skills with labels to
     #compute target loss.
     # More info: https://github.com/tensorflow/tensorflow/issues/32142
-    Dataset.features_depth = int(df["lu_skill_with_answer"].max()+1)
-    Dataset.skill_depth = int(df["encoded_lu"].max()+1)
-    Dataset.all_lu_ids = all_lu_ids
-    dataset = dataset.map(
-      lambda feat, skill, label: (
-          tf.one_hot(feat, depth=Dataset.features_depth),
-          tf.concat(
-              values=[
-                  tf.one_hot(skill, depth=Dataset.skill_depth),
-                  tf.expand_dims(label, -1)
-              ],
-              axis=-1
-          )
-      ))
-
-    # Step 7 - Pad sequences per batch
-    dataset = dataset.padded_batch(
-        batch_size=Dataset.batch_size,
-        padding_values=(Dataset.MASK_VALUE, Dataset.MASK_VALUE),
-        padded_shapes=([None, None], [None, None]),
+    if input_mode == "sparse":
+      # interaction ids are shifted by one so that 0 pads the inputs
+      dataset = dataset.map(
+        lambda feat, skill, label: (
+            feat + 1,
+            tf.stack([tf.cast(skill, tf.float32), label], axis=-1)
+        ))
+      padding_values = (tf.constant(0, tf.int32),
+                        tf.constant(Dataset.MASK_VALUE, tf.float32))
+    else:
+      dataset = dataset.map(
+        lambda feat, skill, label: (
+            tf.one_hot(feat, depth=Dataset.features_depth),
+            tf.concat(
+                values=[
+                    tf.one_hot(skill, depth=Dataset.skill_depth),
+                    tf.expand_dims(label, -1)
+                ],
+                axis=-1
+            )
+        ))
+      padding_values = (Dataset.MASK_VALUE, Dataset.MASK_VALUE)
+
+    # Step 7 - Pad sequences per batch of sequences of similar length
+    boundaries = Dataset.bucket_boundaries(lengths)
+    dataset = dataset.bucket_by_sequence_length(
+        element_length_func=lambda inputs, target: tf.shape(inputs)[0],
+        bucket_boundaries=boundaries,
+        bucket_batch_sizes=[Dataset.batch_size] * (len(boundaries) + 1),
+        padding_values=padding_values,
         drop_remainder=True
     )
 
-    length = nb_users // Dataset.batch_size
+    buckets = np.searchsorted(boundaries, lengths, side="right")
+    length = int(np.sum(np.bincount(
+      buckets, minlength=len(boundaries) + 1) // Dataset.batch_size))
+    return dataset, length
+
+  @staticmethod
+  def load_dataset(course_id=None, batch_size=None, shuffle=True,
+                   input_mode=None):
+    """imports dataset, encodes and creates TF dataset in input_mode,
+    DKT_INPUT_MODE if None. Returns the input mode with the dataset"""
+    if batch_size is not None:
+      Dataset.batch_size = batch_size
+    input_mode = input_mode or Dataset.input_mode
+    df,all_lu_ids = Dataset.import_dataset(course_id)
+    features, skills, labels, offsets = Dataset.session_sequences(df)
+
+    Dataset.features_depth = int(df["lu_skill_with_answer"].max()+1)
+    Dataset.skill_depth = int(df["encoded_lu"].max()+1)
+    Dataset.all_lu_ids = all_lu_ids
+    dataset, length = Dataset.build_tf_dataset(features, skills, labels,
+                                               offsets, shuffle=shuffle,
+                                               input_mode=input_mode)
     #pylint: disable=line-too-long
-    return dataset,length,Dataset.features_depth,Dataset.skill_depth,Dataset.lu_id_encoder
+    return dataset,length,Dataset.features_depth,Dataset.skill_depth,Dataset.lu_id_encoder,input_mode
 
   @staticmethod
   def split_dataset(dataset, total_size, test_fraction, val_fraction=None):
@@ -140,8 +237,11 @@ class Dataset():
     return train_set, test_set, val_set
 
   @staticmethod
-  def get_target(y_true, y_pred):
-    """"encodes target vectors"""
+  def get_target(y_true, y_pred, input_mode=None):
+    """"encodes target vectors of a model taking inputs in input_mode,
+    DKT_INPUT_MODE if None"""
+    if (input_mode or Dataset.input_mode) == "sparse":
+      return Dataset.get_sparse_target(y_true, y_pred)
     # Get skills and labels from y_true
     mask = 1. - tf.cast(tf.equal(y_true, Dataset.MASK_VALUE), y_true.dtype)
     y_true = y_true * mask
@@ -153,32 +253,69 @@ class Dataset():
 
     return y_true, y_pred
 
-  #pylint: disable=unused-argument
   @staticmethod
-  def process_request_user_events(lu_encoder,user_id, user_events,
-  features_depth):
-    """returns encoded user events passed through API request"""
-    events_df = pd.DataFrame(user_events)
+  def get_sparse_target(y_true, y_pred):
+    """gathers the predictions of the answered skills, y_true holds
+    (skill index, label) pairs"""
+    mask = 1. - tf.cast(tf.equal(y_true, Dataset.MASK_VALUE), y_true.dtype)
+    y_true = y_true * mask
 
-    events_df["encoded_lu"] = events_df["learning_unit"].apply(
-      lambda x : lu_encoder.transform([x])[0])
-    events_df["lu_skill_with_answer"] =  events_df.apply(
-      lambda x: x["encoded_lu"]* 2 + x["is_correct"],axis=1)
-    casted_input = tf.cast(
-    [events_df["lu_skill_with_answer"]], tf.int32, name=None)
-    encoded_input = tf.one_hot(casted_input,depth=features_depth)
-    return encoded_input
+    skills, y_true = tf.split(y_true, num_or_size_splits=[1, 1], axis=-1)
+
+    # Get predictions for each skill, padded steps predict 0
+    y_pred = tf.gather(y_pred, tf.cast(skills, tf.int32), batch_dims=2)
+    y_pred = y_pred * mask[..., :1]
+
+    return y_true, y_pred
 
   @staticmethod
-  def process_db_user_events(lu_encoder,user_id=None,
-  session_id=None,features_depth=None):
-    """returns preprocessed, encoded data taken from database for inference"""
+  def encode_interactions(interactions, features_depth, input_mode="one_hot"):
+    """returns the model inputs of a batch of interaction id sequences"""
+    interactions = tf.cast(interactions, tf.int32)
+    if input_mode == "sparse":
+      return interactions + 1
+    return tf.one_hot(interactions, depth=features_depth)
+
+  @staticmethod
+  def encode_padded_interactions(sequences, features_depth,
+                                 input_mode="one_hot"):
+    """returns the model inputs of interaction id sequences of different
+    lengths, padded after their last interaction"""
+    lengths = np.array([len(sequence) for sequence in sequences], dtype=int)
+    max_length = max(int(lengths.max()) if len(lengths) else 0, 1)
+    padded = np.zeros((len(sequences), max_length), dtype=np.int32)
+    for i, sequence in enumerate(sequences):
+      padded[i, :len(sequence)] = sequence
+    mask = np.arange(max_length)[None, :] < lengths[:, None]
+    if input_mode == "sparse":
+      return np.where(mask, padded + 1, 0).astype(np.int32)
+    inputs = tf.one_hot(padded, depth=features_depth).numpy()
+    inputs[~mask] = Dataset.MASK_VALUE
+    return inputs
+
+  @staticmethod
+  def request_interactions(lu_encoder, user_events):
+    """returns the interaction ids of user events passed through API
+    request"""
+    if not user_events:
+      return np.zeros(0, dtype=np.int32)
+    encoded_lus = lu_encoder.transform(
+      [event["learning_unit"] for event in user_events])
+    is_correct = np.array([event["is_correct"] for event in user_events])
+    return (encoded_lus * 2 + is_correct).astype(np.int32)
+
+  @staticmethod
+  def db_interactions(lu_encoder, user_id=None, session_id=None):
+    """returns the interaction ids of the user events of a session, in time
+    order"""
     user_events = UserEvent.collection.filter(user_id=user_id).filter(
       session_ref=session_id).fetch()
     events_list = []
     for i in user_events:
       events_list.append(i.get_fields())
     events_df = pd.DataFrame(events_list)
+    if events_df.empty:
+      return np.zeros(0, dtype=np.int32)
     events_df = events_df[events_df.apply(
       filter_events_with_empty_feedback,axis=1)]
     events_df["correct"] = events_df["feedback"].apply(
@@ -187,13 +324,25 @@ class Dataset():
         "first_attempt"]["evaluation_flag"])
     events_df["correct"] = events_df["correct"].apply(
       lambda x : 1.0 if x=="correct" else 0.0)
-    events_df["lu_ids"] = events_df["learning_unit"]
     events_df = events_df.sort_values(by=["last_modified_time"])
-    events_df["encoded_lu"] = events_df["lu_ids"].apply(
-      lambda x : lu_encoder.transform([x])[0])
-    events_df["lu_skill_with_answer"] =  events_df.apply(
-      lambda x: x["encoded_lu"]* 2 + x["correct"],axis=1)
-    casted_input = tf.cast(
-    [events_df["lu_skill_with_answer"]], tf.int32, name=None)
-    encoded_input = tf.one_hot(casted_input,depth=features_depth)
-    return encoded_input
+    encoded_lus = lu_encoder.transform(
+      events_df["learning_unit"].to_numpy(dtype=object))
+    return (encoded_lus * 2 + events_df["correct"].to_numpy()).astype(
+      np.int32)
+
+  #pylint: disable=unused-argument
+  @staticmethod
+  def process_request_user_events(lu_encoder,user_id, user_events,
+  features_depth, input_mode="one_hot"):
+    """returns encoded user events passed through API request"""
+    return Dataset.encode_interactions(
+      [Dataset.request_interactions(lu_encoder, user_events)],
+      features_depth, input_mode)
+
+  @staticmethod
+  def process_db_user_events(lu_encoder,user_id=None,
+  session_id=None,features_depth=None,input_mode="one_hot"):
+    """returns preprocessed, encoded data taken from database for inference"""
+    return Dataset.encode_interactions(
+      [Dataset.db_interactions(lu_encoder, user_id, session_id)],
+      features_depth, input_mode)
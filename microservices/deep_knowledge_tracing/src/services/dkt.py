@@ -8,17 +8,28 @@ class DKTModel(tf.keras.Model):
       nb_skills: The number of skills in the dataset.
       hidden_units: Positive integer. The number of units of the LSTM layer.
       dropout_rate: Float between 0 and 1. Fraction of the units to drop.
+      input_mode: "one_hot" to take one-hot encoded interactions or "sparse"
+          to take interaction ids, shifted by one so that 0 is padding, into
+          an embedding layer.
+      embedding_dim: Positive integer. The size of the interaction
+          embeddings in sparse mode.
   Raises:
       ValueError: In case of mismatch between the provided input data
           and what the model expects.
   """
   def __init__(self, nb_features,
-  nb_skills, hidden_units=100, dropout_rate=0.2):
-    inputs = tf.keras.Input(shape=(None, nb_features), name="inputs")
+  nb_skills, hidden_units=100, dropout_rate=0.2, input_mode="one_hot",
+  embedding_dim=64):
+    if input_mode == "sparse":
+      inputs = tf.keras.Input(shape=(None,), dtype=tf.int32, name="inputs")
+      x = tf.keras.layers.Embedding(nb_features + 1, embedding_dim,
+                                    mask_zero=True)(inputs)
+    else:
+      inputs = tf.keras.Input(shape=(None, nb_features), name="inputs")
 
-    mask_value = -1
+      mask_value = -1
 
-    x = tf.keras.layers.Masking(mask_value=mask_value)(inputs)
+      x = tf.keras.layers.Masking(mask_value=mask_value)(inputs)
 
     x = tf.keras.layers.LSTM(hidden_units,
                               return_sequences=True,
@@ -30,6 +41,7 @@ class DKTModel(tf.keras.Model):
     super().__init__(inputs=inputs,
                                     outputs=outputs,
                                     name="DKTModel")
+    self.input_mode = input_mode
 
   def compile(self, optimizer, metrics=None):
     """Configures the model for training.
@@ -49,10 +61,15 @@ class DKTModel(tf.keras.Model):
             `optimizer` or `metrics`.
     """
 
+    input_mode = self.input_mode
+
     def custom_loss(y_true, y_pred):
-      y_true, y_pred = Dataset.get_target(y_true, y_pred)
+      y_true, y_pred = Dataset.get_target(y_true, y_pred, input_mode)
       return tf.keras.losses.binary_crossentropy(y_true, y_pred)
 
+    for metric in metrics or []:
+      metric.input_mode = input_mode
+
     super().compile(
         loss=custom_loss,
         optimizer=optimizer,
@@ -175,6 +192,28 @@ class DKTModel(tf.keras.Model):
                                           callbacks=callbacks,
                                           return_dict=False)
 
+  def build_step_model(self):
+    """Returns a model sharing the weights of this one that starts from a
+    given LSTM state, so that a sequence can be continued from its last
+    event instead of run again from its start.
+    Inputs: (inputs, state_h, state_c), inputs padded after the last event.
+    Outputs: (scores of the skills after the last event, state_h, state_c)
+    """
+    lstm = next(layer for layer in self.layers
+                if isinstance(layer, tf.keras.layers.LSTM))
+    output_layer = self.layers[-1].layer
+    inputs = tf.keras.Input(shape=self.input_shape[1:],
+                            dtype=self.inputs[0].dtype, name="inputs")
+    state_h = tf.keras.Input(shape=(lstm.units,), name="state_h")
+    state_c = tf.keras.Input(shape=(lstm.units,), name="state_c")
+    # the mask keeps the state of a sequence past its last event
+    x = self.layers[1](inputs)
+    _, next_h, next_c = tf.keras.layers.RNN(lstm.cell, return_state=True)(
+      x, initial_state=[state_h, state_c])
+    return tf.keras.Model(inputs=[inputs, state_h, state_c],
+                          outputs=[output_layer(next_h), next_h, next_c],
+                          name="DKTStepModel")
+
   def evaluate_generator(self, *args, **kwargs):
     raise SyntaxError("Not supported")
 
@@ -4,50 +4,83 @@ from services.metrics import (BinaryAccuracy,AUC,Precision,
 Recall)
 from services.dkt import DKTModel
 from services.train import Trainer
-from services.data_models_utils import get_learning_units,get_all_courses
-from config import MODEL_PARAMS_DIR,MODEL_WEIGHTS_PATH
+from services.data_models_utils import (get_learning_units,
+                                        get_active_course_ids)
+from services.model_cache import (ModelCache, SessionStateCache,
+                                  sync_model_files)
+from config import (MODEL_PARAMS_DIR,MODEL_WEIGHTS_PATH,DKT_INPUT_MODE,
+                    DKT_EMBEDDING_DIM,DKT_MODEL_CACHE_SIZE,DKT_MODEL_CACHE_MB,
+                    DKT_MODEL_REFRESH_INTERVAL,DKT_WARM_UP_COURSES,
+                    DKT_WARM_UP_WORKERS,DKT_WARM_UP_EVENTS_SAMPLE,
+                    DKT_SESSION_STATE_CACHE_SIZE)
 from sklearn.preprocessing import LabelEncoder
+import numpy as np
 import json
 import pickle
-import os
 import ast
+import threading
 from common.utils.logging_handler import Logger
-from common.utils.gcs_adapter import download_blob
 #pylint: disable=unnecessary-comprehension,broad-exception-raised
+
+
+class CourseModel():
+  """model of a course with what is needed to encode its user events"""
+
+  def __init__(self, model, lu_encoder, lu_ids, nb_features, nb_skills,
+               input_mode, generations=None):
+    self.model = model
+    self.lu_encoder = lu_encoder
+    self.lu_ids = lu_ids
+    self.nb_features = nb_features
+    self.nb_skills = nb_skills
+    self.input_mode = input_mode
+    # GCS generations of the model files, empty for default weights
+    self.generations = generations or {}
+    # float32 weights
+    self.size = model.count_params() * 4 if model is not None else 0
+    self.session_states = SessionStateCache(DKT_SESSION_STATE_CACHE_SIZE)
+    self._step_model = None
+
+  @property
+  def step_model(self):
+    """model continuing sequences from an LSTM state, built on first use"""
+    if self._step_model is None:
+      self._step_model = self.model.build_step_model()
+    return self._step_model
+
+
 class Inference():
   """docstring for Inference class"""
-  course_ids = []
-  lu_encoders = {}
-  nb_skills = {}
-  nb_features = {}
-  models = {}
-  lu_ids = {}
+  model_cache = ModelCache(max_models=DKT_MODEL_CACHE_SIZE,
+                           memory_budget=DKT_MODEL_CACHE_MB * 2**20,
+                           refresh_interval=DKT_MODEL_REFRESH_INTERVAL)
 
   @staticmethod
   def predict(course_id = None,user_id = None,
   user_events = None, session_id = None):
     """returns prediction scores for all lus for a given course"""
     if course_id:
-      if course_id not in Inference.course_ids:
-        Inference.set_params(course_id)
-      if Inference.models[course_id] is not None:
+      course_model = Inference.get_course_model(course_id)
+      if course_model.model is not None:
         if session_id and not user_events:
           encoded_user_events = Dataset.process_db_user_events(
-            Inference.lu_encoders[course_id],
+            course_model.lu_encoder,
             user_id=user_id,session_id = session_id,
-            features_depth=Inference.nb_features[course_id])
+            features_depth=course_model.nb_features,
+            input_mode=course_model.input_mode)
         elif user_events and not session_id:
           encoded_user_events = Dataset.process_request_user_events(
-            Inference.lu_encoders[course_id],
+            course_model.lu_encoder,
             user_id=user_id,user_events = user_events,
-            features_depth=Inference.nb_features[course_id]
+            features_depth=course_model.nb_features,
+            input_mode=course_model.input_mode
           )
-        lu_scores = Inference.models[course_id].predict(
+        lu_scores = course_model.model.predict(
           encoded_user_events)[:,-1,:]
         flatten_scores = (lu_scores.flatten().tolist())
-        response = {}
-        for i in range(len(Inference.lu_ids[course_id])):
-          response[Inference.lu_ids[course_id][i]]=flatten_scores[i]
+        # scores are in the order of the encoded learning units
+        response = dict(zip(course_model.lu_encoder.classes_.tolist(),
+                            flatten_scores))
         response_sorted = {k: v for k, v in sorted(
           response.items(), key=lambda item: item[1],reverse=True)}
         return response_sorted
@@ -58,64 +91,161 @@ class Inference():
       raise Exception("Course id is required")
 
   @staticmethod
-  def get_model(nb_features=101,nb_skills=50):
+  def predict_batch(course_id, learners, top_k=10):
+    """
+    returns the top_k learning units of many learners of a course, scored in
+    one forward pass
+
+    Args:
+      course_id (str) - course of the learners
+      learners (List[dict]) - user_id with either session_id, to score the
+        events of the session, or user_events
+      top_k (int) - learning units returned per learner
+
+    Returns:
+      predictions (List[dict]) - user_id, session_id and the top learning
+        units with their scores of every learner, highest score first
+    """
+    course_model = Inference.get_course_model(course_id)
+    if course_model.model is None:
+      raise Exception("The course does not have learning units")
+
+    # sessions continue from the cached state of their previous events, so
+    # that only their new events are run through the LSTM
+    units = course_model.step_model.inputs[1].shape[-1]
+    interactions, keys, new_events = [], [], []
+    state_h = np.zeros((len(learners), units), dtype=np.float32)
+    state_c = np.zeros((len(learners), units), dtype=np.float32)
+    for i, learner in enumerate(learners):
+      if learner.get("session_id"):
+        key = (learner["user_id"], learner["session_id"])
+        learner_interactions = Dataset.db_interactions(
+          course_model.lu_encoder, learner["user_id"],
+          learner["session_id"])
+        state = course_model.session_states.get(key, learner_interactions)
+      else:
+        key = None
+        learner_interactions = Dataset.request_interactions(
+          course_model.lu_encoder, learner.get("user_events"))
+        state = None
+      nb_scored = 0
+      if state is not None:
+        state_h[i], state_c[i], nb_scored = state
+      interactions.append(learner_interactions)
+      keys.append(key)
+      new_events.append(learner_interactions[nb_scored:])
+
+    inputs = Dataset.encode_padded_interactions(
+      new_events, course_model.nb_features, course_model.input_mode)
+    scores, next_h, next_c = course_model.step_model(
+      [inputs, state_h, state_c], training=False)
+    scores, next_h, next_c = scores.numpy(), next_h.numpy(), next_c.numpy()
+    for i, key in enumerate(keys):
+      if key is not None and len(interactions[i]):
+        course_model.session_states.put(key, interactions[i], next_h[i],
+                                        next_c[i])
+
+    top_lus = Inference.top_k(scores, top_k)
+    lu_ids = course_model.lu_encoder.classes_
+    predictions = []
+    for i, learner in enumerate(learners):
+      recommendations = [] if not len(interactions[i]) else [
+        {"learning_unit": str(lu_ids[j]),
+         "score": float(scores[i, j])} for j in top_lus[i]]
+      predictions.append({"user_id": learner["user_id"],
+                          "session_id": learner.get("session_id"),
+                          "recommendations": recommendations})
+    return predictions
+
+  @staticmethod
+  def top_k(scores, k):
+    """returns the indices of the k highest scores of every row, highest
+    first"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+      return np.zeros((scores.shape[0], 0), dtype=int)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1,
+                       kind="stable")
+    return np.take_along_axis(top, order, axis=1)
+
+  @staticmethod
+  def get_model(nb_features=101,nb_skills=50,input_mode="one_hot",
+  embedding_dim=DKT_EMBEDDING_DIM):
     """returns model"""
     dkt_model = DKTModel(
       nb_features=nb_features,
-      nb_skills=nb_skills)
+      nb_skills=nb_skills,
+      input_mode=input_mode,
+      embedding_dim=embedding_dim)
     dkt_model.compile(
       optimizer=Trainer.optimizer,
       metrics=[BinaryAccuracy(), AUC(), Precision(), Recall()])
     return dkt_model
 
   @staticmethod
-  def set_params(course_id):
-    """loads model params and model weights"""
-    Inference.course_ids.append(course_id)
+  def get_course_model(course_id):
+    """returns the cached model of a course, loading it if needed"""
+    return Inference.model_cache.get(course_id, Inference.load_course_model)
+
+  @staticmethod
+  def load_course_model(course_id, current=None):
+    """loads model params and model weights. Files are only downloaded when
+    their GCS generation changed, and current is returned as is when the
+    weights did not change"""
     base_path = MODEL_PARAMS_DIR+"/"+course_id+"/"
-    download_blob(MODEL_WEIGHTS_PATH+"/"+course_id,
-    MODEL_PARAMS_DIR+"/"+course_id)
-    if os.path.exists(base_path):
+    generations = sync_model_files(MODEL_WEIGHTS_PATH+"/"+course_id,
+    base_path)
+    if current is not None and current.generations == generations:
+      return current
+    if generations:
       with open(base_path+"params.json","rb") as params_file:
         model_params = ast.literal_eval(json.loads(params_file.read()))
-      Inference.nb_skills[course_id] = model_params["nb_skills"]
-      Inference.nb_features[course_id] = model_params["nb_features"]
-      Inference.lu_ids[course_id] = model_params["lu_ids"]
+      # models trained before sparse inputs have no input_mode
+      input_mode = model_params.get("input_mode", "one_hot")
       model = Inference.get_model(
-        nb_features = Inference.nb_features[course_id],
-        nb_skills = Inference.nb_skills[course_id])
+        nb_features = model_params["nb_features"],
+        nb_skills = model_params["nb_skills"],
+        input_mode = input_mode,
+        embedding_dim = model_params.get("embedding_dim", DKT_EMBEDDING_DIM))
       model.load_weights(base_path+"weights/bestmodel")
-      Inference.models[course_id] = model
       with open(base_path+"lu_encoder.pkl","rb") as lu_encoder_file:
-        Inference.lu_encoders[course_id] = pickle.load(lu_encoder_file)
+        lu_encoder = pickle.load(lu_encoder_file)
+      return CourseModel(model, lu_encoder, model_params["lu_ids"],
+                         model_params["nb_features"],
+                         model_params["nb_skills"], input_mode, generations)
+    Logger.info(
+      "No model weights found for the given course. Using default weights"
+      )
+    lu_ids = get_learning_units(course_id)
+    if len(lu_ids)>0:
+      lu_encoder = LabelEncoder().fit(lu_ids)
+      model = Inference.get_model(
+      nb_features = 2*len(lu_ids)+1,
+      nb_skills = len(lu_ids),
+      input_mode = DKT_INPUT_MODE)
     else:
-      Logger.info(
-        "No model weights found for the given course. Using default weights"
-        )
-      lu_ids = get_learning_units(course_id)
-      if len(lu_ids)>0:
-        Inference.lu_encoders[course_id] = LabelEncoder().fit(lu_ids)
-        Inference.models[course_id] = Inference.get_model(
-        nb_features = 2*len(lu_ids)+1,
-        nb_skills = len(lu_ids))
-      else:
-        Logger.info("The course does not have learning units")
-        Inference.lu_encoders[course_id] = None
-        Inference.models[course_id] = None
-      Inference.nb_skills[course_id] = len(lu_ids)
-      Inference.nb_features[course_id] = 2*len(lu_ids)+1
-      Inference.lu_ids[course_id] = lu_ids
+      Logger.info("The course does not have learning units")
+      lu_encoder = None
+      model = None
+    return CourseModel(model, lu_encoder, lu_ids, 2*len(lu_ids)+1,
+                       len(lu_ids), DKT_INPUT_MODE)
 
   @staticmethod
-  def load_all_models():
-    """loads models for all possible courses"""
-    courses = get_all_courses()
-    for course in courses:
-      Logger.info("Loading model weights ----")
-      Logger.info("Course id - %s" % course.id)
-      Logger.info("Course Title - %s" % course.title)
-      Inference.set_params(course.id)
-
-
-
+  def warm_up(course_ids=None):
+    """loads the models of the most active courses in a background thread
+    and returns the thread"""
+    def run():
+      ids = course_ids
+      if ids is None:
+        ids = get_active_course_ids(
+          DKT_WARM_UP_EVENTS_SAMPLE)[:DKT_WARM_UP_COURSES]
+      Logger.info("Warming up DKT models of {} courses".format(len(ids)))
+      Inference.model_cache.warm_up(ids, Inference.load_course_model,
+                                    max_workers=DKT_WARM_UP_WORKERS)
 
+    if course_ids is None and not DKT_WARM_UP_COURSES:
+      return None
+    thread = threading.Thread(target=run, name="dkt-warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,237 @@
+"""Bounded caches of the DKT models of the courses and of the LSTM states of
+their sessions
+
+Course models are loaded on first use and kept in LRU order within a number
+of models and a memory budget. Cached models check GCS for new weights once
+they are older than the refresh interval, and model files are only
+downloaded again when their GCS generation changed.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from google.cloud import storage
+from common.utils.logging_handler import Logger
+
+GENERATIONS_FILE = ".generations.json"
+
+_storage_client = None
+
+
+def get_storage_client():
+  """Returns the storage client shared by the model downloads"""
+  global _storage_client  # pylint: disable=global-statement
+  if _storage_client is None:
+    _storage_client = storage.Client()
+  return _storage_client
+
+
+def sync_model_files(gcs_path, local_dir):
+  """
+  Downloads the files under a GCS folder whose generation changed since the
+  last sync into a local folder
+
+  Args:
+    gcs_path (str) - gs://bucket/path of the folder
+    local_dir (str) - local folder mirroring it
+
+  Returns:
+    generations (dict) - GCS generation of every file, empty if the folder
+      has no files
+  """
+  bucket_name, _, prefix = gcs_path.replace("gs://", "").partition("/")
+  prefix = prefix.rstrip("/") + "/"
+  manifest_path = os.path.join(local_dir, GENERATIONS_FILE)
+  try:
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+      synced = json.load(manifest_file)
+  except (FileNotFoundError, ValueError):
+    synced = {}
+
+  generations = {}
+  for blob in get_storage_client().list_blobs(bucket_name, prefix=prefix):
+    name = blob.name[len(prefix):]
+    if not name or name.endswith("/"):
+      continue
+    generations[name] = blob.generation
+    destination = os.path.join(local_dir, name)
+    if synced.get(name) == blob.generation and os.path.isfile(destination):
+      continue
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    blob.download_to_filename(destination + ".tmp")
+    os.replace(destination + ".tmp", destination)
+
+  if generations and generations != synced:
+    with open(manifest_path, "w", encoding="utf-8") as manifest_file:
+      json.dump(generations, manifest_file)
+  return generations
+
+
+class ModelCache():
+  """Course models in LRU order. Entries must have a size attribute with the
+  bytes they take"""
+
+  def __init__(self, max_models=0, memory_budget=0, refresh_interval=0):
+    """
+    Args:
+      max_models (int) - models to keep loaded, 0 for no limit
+      memory_budget (int) - bytes of models to keep loaded, 0 for no limit.
+        The most recently used model is always kept
+      refresh_interval (int) - seconds after which a cached model is
+        passed back to its loader to check for new weights, 0 to never check
+    """
+    self.max_models = max_models
+    self.memory_budget = memory_budget
+    self.refresh_interval = refresh_interval
+    self.metrics = {"hits": 0, "loads": 0, "refreshes": 0, "evictions": 0}
+    self._entries = OrderedDict()
+    self._checked_at = {}
+    self._lock = threading.Lock()
+    self._load_locks = {}
+
+  def get(self, course_id, loader):
+    """
+    Returns the cached model of a course, loading it if needed
+
+    Args:
+      course_id (str) - course of the model
+      loader (callable) - loader(course_id, current) returns the model of
+        the course. current is the stale cached model or None, the loader
+        returns it as is when its weights did not change
+    """
+    entry, fresh = self._lookup(course_id)
+    if fresh:
+      return entry
+    with self._lock:
+      load_lock = self._load_locks.setdefault(course_id, threading.Lock())
+    with load_lock:
+      entry, fresh = self._lookup(course_id)
+      if fresh:
+        return entry
+      start = time.perf_counter()
+      try:
+        loaded = loader(course_id, entry)
+      except Exception as e:  # pylint: disable=broad-except
+        if entry is None:
+          raise
+        # keeps serving the cached model until the next refresh
+        Logger.error(f"Could not refresh DKT model of course {course_id}: {e}")
+        loaded = entry
+      with self._lock:
+        if loaded is entry:
+          self.metrics["refreshes"] += 1
+        else:
+          self.metrics["loads"] += 1
+          Logger.info(f"Loaded DKT model of course {course_id} in "
+                      f"{time.perf_counter() - start:.1f}s")
+        self._entries[course_id] = loaded
+        self._entries.move_to_end(course_id)
+        self._checked_at[course_id] = time.monotonic()
+        self._evict()
+      return loaded
+
+  def evict(self, course_id):
+    """Drops the model of a course, it is loaded again on its next use"""
+    with self._lock:
+      if self._entries.pop(course_id, None) is not None:
+        self._checked_at.pop(course_id)
+        self.metrics["evictions"] += 1
+
+  def loaded(self):
+    """Returns the cached courses, least recently used first"""
+    with self._lock:
+      return list(self._entries)
+
+  def warm_up(self, course_ids, loader, max_workers=4):
+    """Loads the models of courses concurrently. Only as many courses as the
+    cache holds are loaded"""
+    if self.max_models:
+      course_ids = course_ids[:self.max_models]
+
+    def load(course_id):
+      try:
+        self.get(course_id, loader)
+      except Exception as e:  # pylint: disable=broad-except
+        Logger.error(f"Could not warm up DKT model of course {course_id}: {e}")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+      list(executor.map(load, course_ids))
+    Logger.info(f"Warmed up {len(course_ids)} DKT models in "
+                f"{time.perf_counter() - start:.1f}s")
+
+  def _lookup(self, course_id):
+    with self._lock:
+      entry = self._entries.get(course_id)
+      if entry is None:
+        return None, False
+      if self.refresh_interval and time.monotonic() - \
+        self._checked_at[course_id] >= self.refresh_interval:
+        return entry, False
+      self._entries.move_to_end(course_id)
+      self.metrics["hits"] += 1
+      return entry, True
+
+  def _evict(self):
+    while len(self._entries) > 1 and (
+      (self.max_models and len(self._entries) > self.max_models) or
+      (self.memory_budget and sum(
+        entry.size for entry in self._entries.values()) > self.memory_budget)):
+      course_id, _ = self._entries.popitem(last=False)
+      self._checked_at.pop(course_id)
+      self.metrics["evictions"] += 1
+      Logger.info(f"Evicted DKT model of course {course_id}")
+
+
+class SessionStateCache():
+  """LSTM states of sessions after their latest scored event, in LRU order"""
+
+  def __init__(self, max_sessions=0):
+    """
+    Args:
+      max_sessions (int) - sessions to keep, 0 disables the cache
+    """
+    self.max_sessions = max_sessions
+    self.metrics = {"hits": 0, "misses": 0}
+    self._states = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key, interactions):
+    """
+    Returns the cached state of a session if it was computed from a prefix
+    of interactions
+
+    Returns:
+      (state_h, state_c, nb_events) or None
+    """
+    with self._lock:
+      state = self._states.get(key)
+      if state is not None:
+        nb_events = state[2]
+        if nb_events <= len(interactions) and \
+          state[3] == _digest(interactions[:nb_events]):
+          self._states.move_to_end(key)
+          self.metrics["hits"] += 1
+          return state[:3]
+      self.metrics["misses"] += 1
+      return None
+
+  def put(self, key, interactions, state_h, state_c):
+    """Saves the state of a session after all of interactions"""
+    if not self.max_sessions:
+      return
+    with self._lock:
+      self._states[key] = (state_h, state_c, len(interactions),
+                           _digest(interactions))
+      self._states.move_to_end(key)
+      while len(self._states) > self.max_sessions:
+        self._states.popitem(last=False)
+
+
+def _digest(interactions):
+  return hashlib.sha1(
+    np.asarray(interactions, dtype=np.int32).tobytes()).digest()
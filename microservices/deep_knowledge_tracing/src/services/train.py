@@ -9,7 +9,7 @@ from common.utils.gcs_adapter import upload_folder
 import tensorflow as tf
 import json
 import pickle
-from config import MODEL_PARAMS_DIR,GCS_BUCKET
+from config import MODEL_PARAMS_DIR,GCS_BUCKET,DKT_EMBEDDING_DIM
 
 class Trainer():
   """docstring for Trainer class"""
@@ -21,6 +21,7 @@ class Trainer():
   batch_size = 32 # Batch size
   epochs = 10 # Number of epochs to train
   dropout_rate = 0.3 # Dropout rate
+  embedding_dim = DKT_EMBEDDING_DIM # Size of the interaction embeddings
   test_fraction = 0.2 # Portion of data to be used for testing
   validation_fraction = 0.2 # Portion of training data to be used for
   #validation
@@ -30,13 +31,14 @@ class Trainer():
   nb_features = None
   nb_skills = None
   lu_encoder = None
+  input_mode = None
   model = None
   all_lu_ids = []
   @staticmethod
   def get_train_params(request_body):
     course_id = request_body.get("course_id","")
-    dataset, length, nb_features, nb_skills,lu_encoder = Dataset.load_dataset(
-      course_id=course_id)
+    dataset, length, nb_features, nb_skills,lu_encoder,input_mode = \
+      Dataset.load_dataset(course_id=course_id)
     Trainer.train_set,Trainer.test_set,Trainer.val_set = Dataset.split_dataset(
       dataset, length,
       test_fraction=Trainer.test_fraction,
@@ -55,6 +57,7 @@ class Trainer():
     Trainer.nb_features = nb_features
     Trainer.nb_skills = nb_skills
     Trainer.lu_encoder = lu_encoder
+    Trainer.input_mode = input_mode
 
   @staticmethod
   def save_model_parameters(path):
@@ -62,6 +65,8 @@ class Trainer():
     config_json["nb_skills"] = Trainer.nb_skills
     config_json["nb_features"] = Trainer.nb_features
     config_json["lu_ids"] = Dataset.all_lu_ids
+    config_json["input_mode"] = Trainer.input_mode
+    config_json["embedding_dim"] = Trainer.embedding_dim
     with open(path+"params.json", "w", encoding="utf-8", errors="ignore") as fp:
       json_string = json.dumps(str(config_json), indent=2)
       fp.write(json_string)
@@ -75,7 +80,9 @@ class Trainer():
       nb_features=Trainer.nb_features,
       nb_skills=Trainer.nb_skills,
       hidden_units=Trainer.lstm_units,
-      dropout_rate=Trainer.dropout_rate)
+      dropout_rate=Trainer.dropout_rate,
+      input_mode=Trainer.input_mode,
+      embedding_dim=Trainer.embedding_dim)
     Trainer.model.compile(
       optimizer=Trainer.optimizer,
       metrics=[BinaryAccuracy(), AUC(), Precision(), Recall()])
@@ -22,6 +22,14 @@ SERVICE_NAME = os.getenv("SERVICE_NAME")
 
 MODEL_TYPE = os.getenv("MODEL_TYPE")
 
+# Sentence embeddings and summaries kept in memory, by text hash
+SUMMARY_EMBEDDING_CACHE_SIZE = int(
+    os.getenv("SUMMARY_EMBEDDING_CACHE_SIZE", "50000"))
+SUMMARY_RESULT_CACHE_SIZE = int(os.getenv("SUMMARY_RESULT_CACHE_SIZE", "2000"))
+# Sentences embedded in one forward pass of the summarizer model
+SUMMARY_EMBEDDING_BATCH_SIZE = int(
+    os.getenv("SUMMARY_EMBEDDING_BATCH_SIZE", "32"))
+
 IS_CLOUD_LOGGING_ENABLED = bool(os.getenv
             ("IS_CLOUD_LOGGING_ENABLED", "true").lower() in ("true",))
 
@@ -2,6 +2,7 @@
 import uvicorn
 from fastapi import FastAPI
 from routes import extractive_summarization
+from services.inference import load_models
 from config import IS_DEVELOPMENT, SERVICE_NAME, API_BASE_URL, PORT
 from utils.http_exceptions import add_exception_handlers
 
@@ -10,6 +11,11 @@ BASE_URL = f"/{SERVICE_NAME}/{API_BASE_URL}"
 app = FastAPI()
 
 
+@app.on_event("startup")
+def startup_event():
+  load_models()
+
+
 @app.get("/ping")
 def health_check():
   return {
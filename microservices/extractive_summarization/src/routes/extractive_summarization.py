@@ -4,8 +4,11 @@ from fastapi import APIRouter
 from utils.errors import ValidationError
 from utils.http_exceptions import InternalServerError, BadRequest
 from utils.logging_handler import Logger
-from services.inference import summarize_text
-from schemas.extractive_summarization_schema import RequestModel, ResponseModel
+from services.inference import summarize_text, summarize_texts
+from schemas.extractive_summarization_schema import (RequestModel,
+                                                     ResponseModel,
+                                                     BatchRequestModel,
+                                                     BatchResponseModel)
 from schemas.error_schema import (InternalServerErrorResponseModel,
                                   ValidationErrorResponseModel)
 
@@ -54,3 +57,39 @@ def summarize(req_body: RequestModel):
     Logger.error(e)
     Logger.error(traceback.print_exc())
     raise InternalServerError(str(e)) from e
+
+
+@router.post("/summarize/batch", response_model=BatchResponseModel)
+def summarize_batch(req_body: BatchRequestModel):
+  """
+  Generates Extractive Summarization model predictions for many documents,
+  embedding the sentences of all of them together
+
+  Args:
+    req_body (BatchRequestModel): Documents with the request body of
+      /summarize
+
+  Raises:
+    InternalServerError: 500 Internal Server Error if something fails
+    BadRequest: 422 Validation Error if request body is not correct
+
+  Returns:
+    [JSON]: Summaries in the order of the documents.
+    error message if the summarization raises an exception
+  """
+  try:
+    summaries = summarize_texts(
+      [document.__dict__ for document in req_body.documents])
+    return {
+      "success": True,
+      "message": "All good",
+      "data": {"summaries": summaries}
+    }
+  except ValidationError as e:
+    Logger.error(e)
+    Logger.error(traceback.print_exc())
+    raise BadRequest(str(e)) from e
+  except Exception as e:
+    Logger.error(e)
+    Logger.error(traceback.print_exc())
+    raise InternalServerError(str(e)) from e
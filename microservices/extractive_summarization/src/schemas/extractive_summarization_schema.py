@@ -1,6 +1,6 @@
 """Pydantic models for Extractive Summarization APIs"""
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class RequestModel(BaseModel):
   """Extractive Summarization request pydantic model"""
@@ -39,3 +39,44 @@ class ResponseModel(BaseModel):
     }
       }
     }
+
+
+class BatchRequestModel(BaseModel):
+  """Batch Extractive Summarization request pydantic model"""
+  documents: List[RequestModel] = Field(min_items=1)
+
+  class Config():
+    orm_mode = True
+    schema_extra = {
+      "example": {
+        "documents": [{
+          "data": "Social science is any branch of academic study or science "
+          "that deals with human behaviour in its social and cultural "
+          "aspects.",
+          "ratio": 0.3
+        }]
+      }
+    }
+
+
+class BatchResponseModel(BaseModel):
+  """Batch Extractive Summarization response pydantic model"""
+  success: bool
+  message: str
+  data: Optional[dict]
+
+  class Config():
+    orm_mode = True
+    schema_extra = {
+      "example": {
+        "success": True,
+        "message": "All good",
+        "data": {
+          "summaries": [{
+            "summary": "Social science is any branch of academic study or "
+            "science that deals with human behaviour in its social and "
+            "cultural aspects."
+          }]
+        }
+      }
+    }
@@ -1,13 +1,83 @@
 """Module to get output response from Summarizer API"""
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
 from typing import List
 import nltk
+import numpy as np
+import torch
 from summarizer import Summarizer
+from summarizer.cluster_features import ClusterFeatures
+from config import (SUMMARY_EMBEDDING_CACHE_SIZE, SUMMARY_RESULT_CACHE_SIZE,
+                    SUMMARY_EMBEDDING_BATCH_SIZE)
 
-summarizer_model = Summarizer(
+NLTK_RESOURCES = {
+  "punkt": "tokenizers/punkt",
+  "averaged_perceptron_tagger": "taggers/averaged_perceptron_tagger"
+}
+
+_summarizer_model = None
+_model_lock = threading.Lock()
+
+
+def load_nltk_data():
+  """Downloads the NLTK data the parser needs, unless it is installed"""
+  for resource, path in NLTK_RESOURCES.items():
+    try:
+      nltk.data.find(path)
+    except LookupError:
+      nltk.download(resource)
+
+
+def get_summarizer():
+  """Returns the summarizer model, loaded on its first use"""
+  global _summarizer_model  # pylint: disable=global-statement
+  with _model_lock:
+    if _summarizer_model is None:
+      _summarizer_model = Summarizer(
         model="distilbert-base-uncased", hidden=-2, reduce_option="mean")
+    return _summarizer_model
+
+
+def load_models():
+  """Loads the NLTK data and the summarizer model, on service startup"""
+  load_nltk_data()
+  get_summarizer()
+
+
+def text_hash(text):
+  return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class LRUCache():
+  """Values in LRU order"""
+
+  def __init__(self, max_items=0):
+    """
+    Args:
+      max_items (int) - values to keep, 0 disables the cache
+    """
+    self.max_items = max_items
+    self._items = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    with self._lock:
+      value = self._items.get(key)
+      if value is not None:
+        self._items.move_to_end(key)
+      return value
+
+  def put(self, key, value):
+    if not self.max_items:
+      return
+    with self._lock:
+      self._items[key] = value
+      self._items.move_to_end(key)
+      while len(self._items) > self.max_items:
+        self._items.popitem(last=False)
 
-nltk.download("punkt")
-nltk.download("averaged_perceptron_tagger")
 
 class Parser(object):  #pylint: disable=useless-object-inheritance
   """Class to parse text"""
@@ -49,7 +119,162 @@ class Parser(object):  #pylint: disable=useless-object-inheritance
     text = " ".join([sentence.strip() for sentence in sentences]).strip()
     return (text, perform_summarization)
 
-def summarize_text(request_body, model=summarizer_model):
+
+class BatchSummarizer():
+  """Summarizes documents with a summarizer model, embedding the sentences
+  of all the documents of a batch together
+
+  Sentence embeddings are cached by sentence hash and summaries by document
+  hash and summarization parameters, so that documents and sentences seen
+  before are not embedded again.
+  """
+
+  def __init__(self, model):
+    self.model = model
+    self.embeddings = LRUCache(SUMMARY_EMBEDDING_CACHE_SIZE)
+    self.summaries = LRUCache(SUMMARY_RESULT_CACHE_SIZE)
+
+  def embed(self, sentences):
+    """
+    Returns the embeddings of sentences, embedding the sentences without
+    cached embeddings in padded batches
+
+    Returns:
+      embeddings (np.ndarray) - sentences X hidden size
+    """
+    keys = [text_hash(sentence) for sentence in sentences]
+    embeddings = {}
+    missing = {}
+    for key, sentence in zip(keys, sentences):
+      embedding = self.embeddings.get(key)
+      if embedding is None:
+        missing[key] = sentence
+      else:
+        embeddings[key] = embedding
+    if missing:
+      computed = self.embed_sentences(list(missing.values()))
+      for key, embedding in zip(missing, computed):
+        self.embeddings.put(key, embedding)
+        embeddings[key] = embedding
+    return np.asarray([embeddings[key] for key in keys])
+
+  def embed_sentences(self, sentences):
+    """Embeds sentences like BertParent.create_matrix, with one forward pass
+    per batch of sentences of similar lengths"""
+    bert = self.model.model
+    hidden, reduce_option = self.model.hidden, self.model.reduce_option
+    if not isinstance(hidden, int) or reduce_option != "mean":
+      return bert.create_matrix(sentences, hidden, reduce_option,
+                                self.model.hidden_concat)
+    token_ids = [
+      bert.tokenizer.convert_tokens_to_ids(bert.tokenizer.tokenize(sentence))
+      for sentence in sentences]
+    embeddings = [None] * len(sentences)
+    order = np.argsort([len(ids) for ids in token_ids], kind="stable")
+    for start in range(0, len(order), SUMMARY_EMBEDDING_BATCH_SIZE):
+      batch = order[start:start + SUMMARY_EMBEDDING_BATCH_SIZE]
+      max_length = max(len(token_ids[i]) for i in batch)
+      input_ids = torch.zeros((len(batch), max_length), dtype=torch.long)
+      attention_mask = torch.zeros((len(batch), max_length), dtype=torch.long)
+      for row, i in enumerate(batch):
+        input_ids[row, :len(token_ids[i])] = torch.tensor(token_ids[i])
+        attention_mask[row, :len(token_ids[i])] = 1
+      with torch.no_grad():
+        hidden_states = bert.model(
+          input_ids.to(bert.device),
+          attention_mask=attention_mask.to(bert.device))[-1][hidden]
+      mask = attention_mask.to(bert.device).unsqueeze(-1).to(
+        hidden_states.dtype)
+      means = (hidden_states * mask).sum(dim=1) / mask.sum(dim=1)
+      for row, i in enumerate(batch):
+        embeddings[i] = means[row].cpu().numpy()
+    return embeddings
+
+  def cluster(self, sentences, embeddings, ratio):
+    """Selects the summary sentences like ModelProcessor.run, keeping the
+    first sentence"""
+    selected = ClusterFeatures(
+      embeddings, "kmeans", random_state=self.model.random_state).cluster(
+        ratio, None)
+    if not selected:
+      selected.append(0)
+    elif selected[0] != 0:
+      selected.insert(0, 0)
+    return " ".join(sentences[i] for i in selected)
+
+  def summarize(self, request_bodies):
+    """
+    Summarizes documents
+
+    Args:
+      request_bodies (list) - dicts with the keys of summarize_text
+
+    Returns:
+      response_bodies (list) - {"summary": str} of every document
+    """
+    responses = [None] * len(request_bodies)
+    pending = []
+    for i, request_body in enumerate(request_bodies):
+      ratio = request_body.get("ratio", 0.2)
+      min_length = request_body.get("min_length", 25)
+      max_length = request_body.get("max_length", 500)
+      key = (text_hash(request_body["data"]), ratio, min_length, max_length)
+      summary = self.summaries.get(key)
+      if summary is not None:
+        responses[i] = {"summary": summary}
+        continue
+      parsed, perform_summarization = Parser(
+        request_body["data"]).convert_to_paragraphs()
+      if perform_summarization:
+        sentences = self.model.sentence_handler(parsed, min_length, max_length)
+        pending.append((i, key, sentences, ratio))
+        continue
+      summary = parsed if ratio >= 1 else ""
+      self.summaries.put(key, summary)
+      responses[i] = {"summary": summary}
+
+    all_sentences = [sentence for _, _, sentences, _ in pending
+                     for sentence in sentences]
+    embeddings = self.embed(all_sentences) if all_sentences else None
+    start = 0
+    for i, key, sentences, ratio in pending:
+      summary = ""
+      if sentences:
+        summary = self.cluster(
+          sentences, embeddings[start:start + len(sentences)], ratio)
+      start += len(sentences)
+      self.summaries.put(key, summary)
+      responses[i] = {"summary": summary}
+    return responses
+
+
+_batch_summarizers = weakref.WeakKeyDictionary()
+
+
+def get_batch_summarizer(model=None):
+  """Returns the batch summarizer of a model, of the default summarizer
+  model if None"""
+  model = model or get_summarizer()
+  with _model_lock:
+    batch_summarizer = _batch_summarizers.get(model)
+    if batch_summarizer is None:
+      batch_summarizer = BatchSummarizer(model)
+      _batch_summarizers[model] = batch_summarizer
+    return batch_summarizer
+
+
+def summarize_texts(request_bodies, model=None):
+  """
+    Batch inference method
+    Args:
+        request_bodies(list) - Request bodies of summarize_text
+    Returns:
+        list of {"summary": str}, in the order of request_bodies
+  """
+  return get_batch_summarizer(model).summarize(request_bodies)
+
+
+def summarize_text(request_body, model=None):
   """
     Inference method
     Args:
@@ -60,18 +285,4 @@ def summarize_text(request_body, model=summarizer_model):
         "max_length" -  The maximum length to accept as a sentence.
 
     """
-  text = request_body["data"]
-  ratio = request_body.get("ratio", 0.2)
-  parsed, perform_summarization = Parser(text).convert_to_paragraphs()
-  if perform_summarization:
-    summary = model(parsed,
-                    ratio=ratio,
-                    min_length=request_body.get("min_length", 25),
-                    max_length=request_body.get("max_length", 500))
-
-    response_body = {"summary": summary}
-  elif ratio >= 1:
-    response_body = {"summary": parsed}
-  else:
-    response_body = {"summary": ""}
-  return response_body
+  return summarize_texts([request_body], model)[0]
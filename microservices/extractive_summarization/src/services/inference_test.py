@@ -79,3 +79,35 @@ def test_convert_to_paragraphs(get_parser, inputs, outputs):
   """Unit testing of function convert_to_paragraphs part of class Parser"""
   result = get_parser(inputs).convert_to_paragraphs()
   assert result == outputs
+
+
+def test_summarize_texts(get_summarizer):  #pylint: disable=redefined-outer-name
+  """Unit testing for batch summarize function, which must select the same
+  sentences as the summarizer model"""
+  passage = (
+    "The Chrysler Building, the famous art deco New York skyscraper, will "
+    "be sold for a small fraction of its previous sales price.\n"
+    "The deal, first reported by The Real Deal, was for $150 million, "
+    "according to a source familiar with the deal.\n"
+    "Mubadala, an Abu Dhabi investment fund, purchased 90% of the building "
+    "for $800 million in 2008.\n"
+    "Real estate firm Tishman Speyer had owned the other 10%.\n"
+    "The buyer is RFR Holding, a New York real estate company.\n"
+    "Officials with Tishman and RFR did not immediately respond to a request "
+    "for comments.")
+  inputs = [
+    {"data": passage, "ratio": 0.4, "min_length": 25, "max_length": 500},
+    {"data": "Apple", "ratio": 1},
+    {"data": passage, "ratio": 0.2, "min_length": 25, "max_length": 500}
+  ]
+  parsed, _ = inference.Parser(passage).convert_to_paragraphs()
+  expected = [
+    {"summary": get_summarizer(parsed, ratio=0.4, min_length=25,
+                               max_length=500)},
+    {"summary": "Apple"},
+    {"summary": get_summarizer(parsed, ratio=0.2, min_length=25,
+                               max_length=500)}
+  ]
+  assert inference.summarize_texts(inputs, get_summarizer) == expected
+  # cached summaries
+  assert inference.summarize_texts(inputs, get_summarizer) == expected
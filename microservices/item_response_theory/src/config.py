@@ -5,6 +5,7 @@ from common.utils.logging_handler import Logger
 PORT = os.environ["PORT"] if os.environ.get("PORT") is not None else 80
 GCP_PROJECT = os.environ.get("GCP_PROJECT", "gcp-classroom-dev")
 os.environ["GOOGLE_CLOUD_PROJECT"] = GCP_PROJECT
+PROJECT_ID = os.environ.get("PROJECT_ID") or GCP_PROJECT
 
 
 SCOPES = [
@@ -30,6 +31,21 @@ CONTAINER_NAME = os.getenv("CONTAINER_NAME")
 DEPLOYMENT_NAME = os.getenv("DEPLOYMENT_NAME")
 IS_DEVELOPMENT = bool(os.getenv("IS_DEVELOPMENT", "").lower() \
     in ("True", "true"))
+# Seconds an in-memory item bank of a learning unit is reused before reading
+# its assessment items again
+ITEM_BANK_TTL = int(os.getenv("ITEM_BANK_TTL", "600"))
+# Seconds between checks of the shared version of the item banks, which is
+# bumped whenever new item parameters are written
+ITEM_BANK_VERSION_TTL = int(os.getenv("ITEM_BANK_VERSION_TTL", "10"))
+# Standard deviation of the ability prior of learners without responses
+ABILITY_PRIOR_SD = float(os.getenv("ABILITY_PRIOR_SD", "1.0"))
+# Abilities between -4 and 4 at which ability posteriors are evaluated
+ABILITY_GRID_POINTS = int(os.getenv("ABILITY_GRID_POINTS", "161"))
+# Rounds alternating ability estimation and item fits in a calibration
+CALIBRATION_ROUNDS = int(os.getenv("CALIBRATION_ROUNDS", "5"))
+# Processes training learning units in parallel in a batch job, one per cpu
+# of BATCH_JOB_LIMITS
+IRT_TRAINING_WORKERS = int(os.getenv("IRT_TRAINING_WORKERS", "3"))
 
 SERVICES = {
 }
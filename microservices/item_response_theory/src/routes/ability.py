@@ -3,11 +3,12 @@
 from fastapi import APIRouter
 import traceback
 from services.ability_tree import get_ability_tree
+from services.online_ability import record_response
 from common.models import User
 from common.utils.http_exceptions import InternalServerError, ResourceNotFound
 from common.utils.errors import ResourceNotFoundException
 from common.utils.logging_handler import Logger
-from schemas.ability_schema import LevelEnum
+from schemas.ability_schema import LevelEnum, AbilityResponseRequest
 from schemas.error_schema import (InternalServerErrorResponseModel,
                                   ValidationErrorResponseModel,
                                   NotFoundErrorResponseModel)
@@ -41,3 +42,27 @@ def get_user_ability(user_id: str, level: LevelEnum, doc_id: str):
     Logger.error(traceback.print_exc())
     raise InternalServerError(str(e)) from e
   return data
+
+
+@router.post("/response", responses={404: {"model": NotFoundErrorResponseModel}})
+def update_user_ability(request_body: AbilityResponseRequest):
+  """Updates the ability of a user in a learning unit after a response to
+  an assessment item"""
+  try:
+    data = record_response(request_body.user_id,
+                           request_body.learning_unit_id,
+                           request_body.activity_type.value,
+                           request_body.item_id, request_body.is_correct)
+  except ResourceNotFoundException as e:
+    Logger.error(e)
+    Logger.error(traceback.print_exc())
+    raise ResourceNotFound(str(e)) from e
+  except Exception as e:
+    Logger.error(e)
+    Logger.error(traceback.print_exc())
+    raise InternalServerError(str(e)) from e
+  return {
+      "success": True,
+      "message": "Successfully updated the user ability",
+      "data": data
+  }
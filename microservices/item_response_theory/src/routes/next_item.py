@@ -4,7 +4,7 @@ import traceback
 from typing import Optional
 from fastapi import APIRouter
 from services.next_item import next_item
-from schemas.next_item_schema import ActivityType
+from schemas.next_item_schema import ActivityType, ItemSelection
 from schemas.error_schema import (InternalServerErrorResponseModel,
                                   ValidationErrorResponseModel)
 from common.utils.logging_handler import Logger
@@ -29,11 +29,15 @@ def get_next_item(user_id: str,
                   learning_unit_id: str,
                   activity_type: ActivityType,
                   session_id: str,
-                  prev_context_count: Optional[int] = -1):
-  """Return next item to give to the user based on irt"""
+                  prev_context_count: Optional[int] = -1,
+                  selection: Optional[ItemSelection] = ItemSelection.category):
+  """Return next item to give to the user based on irt. The category
+  selection alternates difficulty levels based on the previous answer, the
+  max_information selection picks the most informative item at the
+  ability of the user"""
   try:
     data = next_item(learning_unit_id, user_id, activity_type, session_id,
-                     prev_context_count)
+                     prev_context_count, selection)
   except Exception as e:
     Logger.error(e)
     Logger.error(traceback.print_exc())
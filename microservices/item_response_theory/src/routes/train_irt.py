@@ -1,6 +1,8 @@
 """Train IRT Model"""
 
+import multiprocessing
 import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import Optional
 from schemas.train_irt_schema import TrainIRTRequest
 from schemas.error_schema import (InternalServerErrorResponseModel,
@@ -9,7 +11,8 @@ from schemas.error_schema import (InternalServerErrorResponseModel,
 from services.update_assessment_items import update_assessment_items
 from services.update_user_abilities import update_user_abilites
 from services.get_all_learning_units import get_all_learning_units
-from services.train import train_type_one, train_type_two
+from services.train import train_learning_unit
+from services.prepare_data import build_response_matrices
 from fastapi import APIRouter
 import json
 from common.utils.errors import ResourceNotFoundException
@@ -18,7 +21,9 @@ from common.utils.kf_job_app import (kube_create_job,
                                      kube_get_namespaced_deployment_image_path)
 from common.utils.logging_handler import Logger
 from config import (JOB_NAMESPACE, GCP_PROJECT, CONTAINER_NAME, DEPLOYMENT_NAME,
-                    BATCH_JOB_LIMITS, BATCH_JOB_REQUESTS)
+                    BATCH_JOB_LIMITS, BATCH_JOB_REQUESTS,
+                    IRT_TRAINING_WORKERS)
+from common.config import MEMORYSTORE_ENABLED
 
 router = APIRouter(
     prefix="/train",
@@ -48,7 +53,10 @@ def train_irt_on_level(request_body: TrainIRTRequest):
         "limits": BATCH_JOB_LIMITS,
         "requests": BATCH_JOB_REQUESTS
     }
-    env_vars = {"GCP_PROJECT": GCP_PROJECT}
+    # the batch job invalidates the item banks of the serving pods in the
+    # same Redis
+    env_vars = {"GCP_PROJECT": GCP_PROJECT,
+                "MEMORYSTORE_ENABLED": MEMORYSTORE_ENABLED}
     data = kube_create_job(job_specs, JOB_NAMESPACE, env_vars)
   except Exception as e:
     Logger.error(e)
@@ -61,13 +69,45 @@ def train_irt_on_level(request_body: TrainIRTRequest):
   }
 
 
+def update_training_results(result, learning_unit, model_type):
+  """Saves the abilities and item parameters of a trained learning unit"""
+  update_user_abilites(result["user_ability"], learning_unit,
+                       result.get("user_ability_standard_error"),
+                       result.get("user_correctness"))
+  update_assessment_items(result["item_difficulty"],
+                          result["item_discrimination"],
+                          result["item_type_dict"], model_type)
+
+
 def start_training_in_batch_job(request_body):
+  """Trains the learning units of a level in parallel processes. The user
+  events of all the learning units are read once, before the trainings"""
   all_learning_units = get_all_learning_units(
       level=request_body["level"], doc_id=request_body["id"])
-  for index, lu in enumerate(all_learning_units):
-    print("Count: ", index)
-    train_irt(lu, request_body["update_collections"], "2pl", "2")
-  return {"success": True, "message": "Successfully trained the IRT Model"}
+  method = request_body.get("method", "2")
+  matrices = build_response_matrices(all_learning_units)
+  timings = {}
+  # spawned processes do not inherit the gRPC channels of the parent
+  with ProcessPoolExecutor(
+      max_workers=IRT_TRAINING_WORKERS,
+      mp_context=multiprocessing.get_context("spawn")) as executor:
+    futures = {
+        executor.submit(train_learning_unit, lu, method, "2pl",
+                        matrices[lu]): lu for lu in matrices
+    }
+    for index, future in enumerate(as_completed(futures)):
+      lu = futures[future]
+      result, seconds = future.result()
+      timings[lu] = round(seconds, 2)
+      Logger.info(f"Trained learning unit {lu} ({index + 1}/{len(futures)}) "
+                  f"in {seconds:.1f}s")
+      if request_body["update_collections"] and result:
+        update_training_results(result, lu, "2pl")
+  return {
+      "success": True,
+      "message": "Successfully trained the IRT Model",
+      "data": {"timings": timings}
+  }
 
 
 @router.post("/", responses={404: {"model": NotFoundErrorResponseModel}})
@@ -77,16 +117,9 @@ def train_irt(learning_unit: str,
               method: Optional[str] = "2"):
   """Starts IRT training at a learning unit level"""
   try:
-    if method == "1":
-      result = train_type_one(learning_unit, model_type)
-    else:
-      result = train_type_two(learning_unit, model_type)
-
+    result, _ = train_learning_unit(learning_unit, method, model_type)
     if update_collections:
-      update_user_abilites(result["user_ability"], learning_unit)
-      update_assessment_items(result["item_difficulty"],
-                              result["item_discrimination"],
-                              result["item_type_dict"], model_type)
+      update_training_results(result, learning_unit, model_type)
   except ResourceNotFoundException as e:
     Logger.error(e)
     Logger.error(traceback.print_exc())
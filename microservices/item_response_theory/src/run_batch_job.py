@@ -20,8 +20,9 @@ def main(argv):
     del argv  # Unused.
     job = BatchJobModel.find_by_uuid(FLAGS.container_name)
     request_body = json.loads(job.input_data)
-    start_training_in_batch_job(request_body)
+    response = start_training_in_batch_job(request_body)
     job.status = "succeeded"
+    job.metadata = {"timings": response["data"]["timings"]}
     job.update()
     if JOB_NAMESPACE == "default":
       kube_delete_job(FLAGS.container_name, JOB_NAMESPACE)
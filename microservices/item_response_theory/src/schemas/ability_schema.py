@@ -2,6 +2,7 @@
 
 from pydantic import BaseModel
 from enum import Enum
+from schemas.next_item_schema import ActivityType
 
 
 # pylint: disable=invalid-name
@@ -26,3 +27,23 @@ class AbilityRequest(BaseModel):
             "doc_id": "asdf3dsfaafd4trq"
         }
     }
+
+
+class AbilityResponseRequest(BaseModel):
+  user_id: str
+  learning_unit_id: str
+  activity_type: ActivityType
+  item_id: str
+  is_correct: bool
+
+  class Config:
+    orm_mode = True
+    schema_extra = {
+        "example": {
+            "user_id": "kfda435jkdsfka",
+            "learning_unit_id": "asdf3dsfaafd4trq",
+            "activity_type": "choose_the_fact",
+            "item_id": "fd3asd5ftq2aa",
+            "is_correct": True
+        }
+    }
@@ -8,3 +8,8 @@ class ActivityType(str, Enum):
   answer_a_question= "answer_a_question"
   paraphrase_practice= "paraphrasing_practice"
   create_knowledge_notes= "create_knowledge_notes"
+
+
+class ItemSelection(str, Enum):
+  category= "category"
+  max_information= "max_information"
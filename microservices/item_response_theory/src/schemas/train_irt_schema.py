@@ -8,5 +8,7 @@ class TrainIRTRequest(BaseModel):
   level: str
   update_collections: Optional[bool] = False
   id : str
+  # "calibrate" refits from response statistics instead of MCMC
+  method: Optional[str] = "2"
 
 
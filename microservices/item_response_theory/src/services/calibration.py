@@ -0,0 +1,134 @@
+"""Calibration of item parameters from sufficient statistics
+
+With the abilities of the learners held at their estimates, the responses to
+an item only enter the 2PL likelihood through the number of attempts and of
+correct answers at every ability. Abilities are binned on the ability grid,
+so every item is summarized by two counts per grid point, and its parameters
+are refit from the counts with a few Newton steps. A calibration alternates
+ability estimation and item fits for CALIBRATION_ROUNDS rounds.
+"""
+import numpy as np
+from scipy.special import expit
+from services.online_ability import (ABILITY_GRID, response_log_likelihood,
+                                     posterior_moments)
+from services.prepare_data import build_response_matrices
+from config import ABILITY_PRIOR_SD, CALIBRATION_ROUNDS
+
+# weak priors keeping the items with few responses near a = 1 and b = 0
+DISCRIMINATION_PRIOR_SD = 1.0
+INTERCEPT_PRIOR_SD = 2.0
+NEWTON_STEPS = 10
+# responses evaluated on the ability grid at once
+RESPONSES_CHUNK_SIZE = 50000
+
+
+def estimate_abilities(nb_users, user_index, item_index, correct, difficulty,
+                       discrimination):
+  """returns the EAP ability and standard error of every user from their
+  responses, with a standard normal prior"""
+  log_posterior = np.tile(-0.5 * (ABILITY_GRID / ABILITY_PRIOR_SD)**2,
+                          (nb_users, 1))
+  for start in range(0, len(correct), RESPONSES_CHUNK_SIZE):
+    end = start + RESPONSES_CHUNK_SIZE
+    items = item_index[start:end]
+    np.add.at(log_posterior, user_index[start:end], response_log_likelihood(
+      difficulty[items], discrimination[items], correct[start:end]))
+  return posterior_moments(log_posterior)
+
+
+def response_statistics(nb_items, abilities, user_index, item_index,
+                        correct):
+  """returns the attempts and correct answers of every item at every grid
+  ability, items X grid"""
+  step = ABILITY_GRID[1] - ABILITY_GRID[0]
+  bins = np.clip(np.rint((abilities - ABILITY_GRID[0]) / step), 0,
+                 len(ABILITY_GRID) - 1).astype(np.int64)[user_index]
+  attempts = np.zeros((nb_items, len(ABILITY_GRID)))
+  corrects = np.zeros((nb_items, len(ABILITY_GRID)))
+  np.add.at(attempts, (item_index, bins), 1)
+  np.add.at(corrects, (item_index, bins), correct)
+  return attempts, corrects
+
+
+def fit_items(attempts, corrects, discrimination, intercept,
+              fit_discrimination=True):
+  """
+  refits the 2PL parameters of items, P = expit(a * theta + c), from their
+  response statistics with Newton steps on the penalized likelihood
+
+  Returns:
+    difficulty (np.ndarray), discrimination (np.ndarray)
+  """
+  a, c = discrimination.copy(), intercept.copy()
+  theta = ABILITY_GRID
+  for _ in range(NEWTON_STEPS):
+    probs = expit(a[:, None] * theta + c[:, None])
+    residuals = corrects - attempts * probs
+    weights = attempts * probs * (1 - probs)
+    grad_c = residuals.sum(axis=1) - c / INTERCEPT_PRIOR_SD**2
+    hess_cc = weights.sum(axis=1) + 1 / INTERCEPT_PRIOR_SD**2
+    if not fit_discrimination:
+      c += grad_c / hess_cc
+      continue
+    grad_a = residuals @ theta - (a - 1) / DISCRIMINATION_PRIOR_SD**2
+    hess_aa = weights @ theta**2 + 1 / DISCRIMINATION_PRIOR_SD**2
+    hess_ac = weights @ theta
+    det = hess_aa * hess_cc - hess_ac**2
+    a = np.clip(a + (hess_cc * grad_a - hess_ac * grad_c) / det, 0.05, 4.0)
+    c += (hess_aa * grad_c - hess_ac * grad_a) / det
+  return -c / a, a
+
+
+def calibrate_learning_unit(learning_unit_id, model_type="2pl", matrix=None):
+  """Calibrates the items and abilities of a learning unit from its
+  ResponseMatrix, read from one pass over its user events when not given.
+  Returns the same results as the training pipelines, along with the
+  standard errors of the abilities"""
+  if matrix is None:
+    matrix = build_response_matrices([learning_unit_id])[learning_unit_id]
+  if not len(matrix):
+    print("No Data to train IRT. Skipping training")
+    return {}
+  user_ids, item_ids = matrix.user_ids, matrix.item_ids
+  user_index, item_index, correct = matrix.coordinates()
+  fit_discrimination = model_type == "2pl"
+  discrimination = np.ones(len(item_ids))
+  difficulty = np.zeros(len(item_ids))
+  for _ in range(CALIBRATION_ROUNDS):
+    abilities, _ = estimate_abilities(len(user_ids), user_index, item_index,
+                                      correct, difficulty, discrimination)
+    attempts, corrects = response_statistics(
+      len(item_ids), abilities, user_index, item_index, correct)
+    difficulty, discrimination = fit_items(
+      attempts, corrects, discrimination, -difficulty * discrimination,
+      fit_discrimination)
+  abilities, standard_errors = estimate_abilities(
+    len(user_ids), user_index, item_index, correct, difficulty,
+    discrimination)
+
+  user_attempts = np.bincount(user_index, minlength=len(user_ids))
+  user_corrects = np.bincount(user_index, weights=correct,
+                              minlength=len(user_ids))
+  item_attempts = np.bincount(item_index, minlength=len(item_ids))
+  item_corrects = np.bincount(item_index, weights=correct,
+                              minlength=len(item_ids))
+  return {
+    "user_ability": dict(sorted(zip(user_ids, abilities.tolist()),
+                                key=lambda x:x[1])),
+    "user_ability_standard_error": dict(
+      zip(user_ids, standard_errors.tolist())),
+    "item_difficulty": dict(sorted(zip(item_ids, difficulty.tolist()),
+                                   key=lambda x:x[1])),
+    "item_correctness": {
+      item_id: {"correct": int(item_corrects[i]),
+                "total": int(item_attempts[i])}
+      for i, item_id in enumerate(item_ids)},
+    "item_discrimination": dict(sorted(
+      zip(item_ids, discrimination.tolist()), key=lambda x:x[1]))
+      if fit_discrimination else {},
+    "user_correctness": {
+      user_id: {"correct": int(user_corrects[i]),
+                "total": int(user_attempts[i])}
+      for i, user_id in enumerate(user_ids)},
+    "item_type_dict": matrix.item_type_dict
+  }
@@ -0,0 +1,101 @@
+"""In-memory banks of the assessment items of the learning units
+
+An item bank keeps the IRT parameters of the items of a learning unit and
+activity type as arrays, along with their normalized contexts, so that
+selecting the next item is a few array operations instead of a Firestore
+scan. Banks are rebuilt once older than ITEM_BANK_TTL seconds, or once the
+version of the item banks shared through Redis changed. Writing new
+parameters, e.g. in the batch job, bumps the version so the banks of every
+serving pod are rebuilt within ITEM_BANK_VERSION_TTL seconds.
+"""
+import threading
+import time
+import numpy as np
+from scipy.special import expit
+from common_ml.item_selection import get_all_assessment_items, get_context
+from common.utils.cache_service import Cache
+from config import ITEM_BANK_TTL, ITEM_BANK_VERSION_TTL
+
+
+def normalize_context(context):
+  """returns a context in lower case with collapsed whitespace"""
+  return " ".join((context or "").split()).lower()
+
+
+class ItemBank():
+  """IRT parameters and contexts of the assessment items of a learning unit
+  and activity type"""
+
+  def __init__(self, item_ids, difficulty, discrimination, contexts):
+    self.item_ids = list(item_ids)
+    self.index = {item_id: i for i, item_id in enumerate(self.item_ids)}
+    self.difficulty = np.asarray(difficulty, dtype=np.float64)
+    self.discrimination = np.asarray(discrimination, dtype=np.float64)
+    self.context_codes = {}
+    for context in contexts:
+      self.context_codes.setdefault(context, len(self.context_codes))
+    self.item_contexts = np.array(
+      [self.context_codes[context] for context in contexts], dtype=np.int64)
+    self.built_at = time.monotonic()
+    self.version = None
+
+  @classmethod
+  def build(cls, learning_unit_id, activity_type):
+    """reads the assessment items of a learning unit and activity type.
+    Items without a discrimination are scored as in the 1PL model"""
+    items = get_all_assessment_items(learning_unit_id, activity_type, None)
+    return cls([item.id for item in items],
+               [item.difficulty_score or 0.0 for item in items],
+               [item.discrimination or 1.0 for item in items],
+               [normalize_context(get_context(activity_type, item))
+                for item in items])
+
+  def __len__(self):
+    return len(self.item_ids)
+
+  def probabilities(self, ability):
+    """returns the probability of a correct answer to every item"""
+    return expit(self.discrimination * (ability - self.difficulty))
+
+  def fisher_information(self, ability):
+    """returns the Fisher information of every item at an ability"""
+    probabilities = self.probabilities(ability)
+    return self.discrimination ** 2 * probabilities * (1 - probabilities)
+
+  def has_context(self, contexts):
+    """returns which items have one of the given contexts"""
+    codes = [self.context_codes[context] for context in
+             map(normalize_context, contexts) if context in self.context_codes]
+    return np.isin(self.item_contexts, codes)
+
+
+_banks = {}
+_banks_lock = threading.Lock()
+# only the version of the namespace is used, it is re-read from Redis every
+# ITEM_BANK_VERSION_TTL seconds
+ITEM_BANK_VERSIONS = Cache("irt_item_banks", local_ttl=ITEM_BANK_VERSION_TTL)
+
+
+def get_item_bank(learning_unit_id, activity_type):
+  """returns the item bank of a learning unit and activity type, rebuilt
+  once it is older than ITEM_BANK_TTL seconds or the item banks were
+  invalidated"""
+  key = (learning_unit_id, activity_type)
+  version = ITEM_BANK_VERSIONS.make_key(f"{learning_unit_id}:{activity_type}")
+  with _banks_lock:
+    bank = _banks.get(key)
+  if bank is None or bank.version != version or \
+      time.monotonic() - bank.built_at >= ITEM_BANK_TTL:
+    bank = ItemBank.build(learning_unit_id, activity_type)
+    bank.version = version
+    with _banks_lock:
+      _banks[key] = bank
+  return bank
+
+
+def invalidate_item_banks():
+  """drops the item banks of every process, they are rebuilt on their next
+  use"""
+  with _banks_lock:
+    _banks.clear()
+  ITEM_BANK_VERSIONS.invalidate_namespace()
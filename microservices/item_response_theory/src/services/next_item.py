@@ -1,14 +1,14 @@
 """script for selecting next item"""
 # pylint: disable=singleton-comparison,broad-exception-raised
 from common.models import (UserAbility)
+from common.utils.logging_handler import Logger
 from common_ml.item_selection import (
   get_prev_contexts, filter_empty_user_events,
-  get_all_user_events, get_all_assessment_items,
-  get_context
+  get_all_user_events
 )
 from scipy.special import expit
+from services.item_bank import get_item_bank
 import numpy as np
-import random
 
 # pylint: disable=simplifiable-if-statement,use-a-generator
 def irt_evaluation(difficulty, discrimination, thetas):
@@ -44,6 +44,22 @@ def get_user_ability(user_id, learning_unit_id):
   return [item.ability]
 
 
+EASY, MEDIUM, DIFFICULT = 0, 1, 2
+
+# order in which categories are tried after an answer to an item of a
+# category, by (category, answered correctly)
+NEXT_CATEGORIES = {
+  (EASY, True): [MEDIUM, DIFFICULT, EASY],
+  (EASY, False): [EASY, MEDIUM, DIFFICULT],
+  (MEDIUM, True): [DIFFICULT, MEDIUM, EASY],
+  (MEDIUM, False): [EASY, MEDIUM, DIFFICULT],
+  (DIFFICULT, True): [DIFFICULT, MEDIUM, EASY],
+  (DIFFICULT, False): [MEDIUM, EASY, DIFFICULT]
+}
+
+rng = np.random.default_rng()
+
+
 def find_answer_probabilities(ability, difficulty, discrimination):
   """gets answer probabilities using irt evaluation"""
   ability = np.array(ability)
@@ -52,113 +68,63 @@ def find_answer_probabilities(ability, difficulty, discrimination):
   probabilites = irt_evaluation(difficulty, discrimination, ability)
   return probabilites[:, 0]
 
-def get_category(categories, index):
-  """ returns difficulty level """
-  if index in categories["easy"]:
-    return "easy"
-  elif index in categories["difficult"]:
-    return "difficult"
-  else:
-    return "medium"
-
-
-def filter_same_context_items(
-    activity_type, prev_contexts, next_items, assessment_items, item_seq):
-  print("Filtering same context items")
-  print("Prev contexts: ", prev_contexts)
-  for index in next_items:
-    print("Index: ", index)
-    item = assessment_items[item_seq[index]]
-    item_context = get_context(activity_type, item).strip()
-    print("Current item context:", item_context)
-    if item_context in prev_contexts:
-      continue
-    else:
-      return index
-  return next_items[0]
-
-def get_next_category_item(activity_type,
-  mask, categories, prev_category, prev_correct,
-  contexts, assessment_items, consider_prev_context):
-  """returns next category,item based on previous responses"""
-  if prev_category == "easy":
-    if prev_correct:
-      seq = ["medium", "difficult", "easy"]
-    else:
-      seq = ["easy", "medium", "difficult"]
-  elif prev_category == "medium":
-    if prev_correct:
-      seq = ["difficult", "medium", "easy"]
-    else:
-      seq = ["easy", "medium", "difficult"]
-  else:
-    if prev_correct:
-      seq = ["difficult", "medium", "easy"]
-    else:
-      seq = ["medium", "easy", "difficult"]
-
-  item_seq = np.concatenate(
-    (categories[seq[0]], categories[seq[1]], categories[seq[2]]))
-  item_seq = item_seq.astype(int)
-  print("Item Seq: ", item_seq)
-  mask_seq = mask[item_seq]
-  print("mask: ", mask)
-  print("mask seq: ", mask_seq)
-  next_items = np.argwhere(mask_seq==False).flatten()
-  print("next item: ", next_items)
-  if consider_prev_context and contexts:
-    index = filter_same_context_items(activity_type,
-      contexts, next_items, assessment_items, item_seq)
-    print("Output: ", index)
-    # index = next_items[output]
-  else:
-    index = next_items[0]
-  print("Final Index: ", index)
-  item_ind = item_seq[index]
-  print("Item Ind: ", item_ind)
-  return item_ind
-
-def select_from_category(
-    mask, categories, activity_type, prev_item_ind=None, prev_correct=None,
-    contexts=None, assessment_items=None, consider_prev_context=False):
-  """selects next item based on previous responses"""
-  if prev_item_ind!=None:
-    prev_category = get_category(categories, prev_item_ind)
-    return get_next_category_item(activity_type,
-      mask, categories, prev_category, prev_correct,
-      contexts, assessment_items, consider_prev_context)
-  else:
-    choices = []
-    for key, value in categories.items():
-      if len(value) > 0:
-        choices.append(key)
-    choice = random.choice(choices)
-    return categories[choice][random.choice(
-      list(range(len(categories[choice]))))]
 
 def create_categories(probs):
-  """returns custom categories"""
-  categories = {
-    "easy": [],
-    "medium": [],
-    "difficult": []
-  }
-  sorted_index = np.argsort(probs)
+  """returns the category of every item, a third of the items by answer
+  probability in each category"""
+  sorted_index = np.argsort(probs, kind="stable")
   num_items = len(probs)
-  if num_items <3:
-    categories["easy"] = sorted_index[:1]
-    categories["difficult"] = sorted_index[1:]
+  categories = np.full(num_items, MEDIUM)
+  if num_items < 3:
+    categories[sorted_index[:1]] = EASY
+    categories[sorted_index[1:]] = DIFFICULT
     return categories
   limit = num_items // 3
-  categories["easy"] = sorted_index[:limit]
-  categories["medium"] = sorted_index[limit:-limit]
-  categories["difficult"] = sorted_index[-limit:]
-
-  np.random.shuffle(sorted_index[:limit])
-  np.random.shuffle(sorted_index[limit:-limit])
-  np.random.shuffle(sorted_index[-limit:])
+  categories[sorted_index[:limit]] = EASY
+  categories[sorted_index[num_items - limit:]] = DIFFICULT
   return categories
 
+
+def select_from_category(categories, answered, prev_item_ind=None,
+                         prev_correct=None, same_context=None):
+  """
+  selects the next item based on the previous response. Items of the first
+  category to try come first, in random order within a category, and
+  answered items are skipped. Items sharing a context with the previous
+  items are only selected when every other item is answered
+
+  Args:
+    categories (np.ndarray) - category of every item
+    answered (np.ndarray) - whether every item was answered
+    prev_item_ind (int) - previous item, None selects a random item
+    prev_correct (bool) - whether the previous item was answered correctly
+    same_context (np.ndarray) - whether every item shares a context with
+      the previous items
+  """
+  if prev_item_ind is None:
+    category = rng.choice(np.unique(categories))
+    return int(rng.choice(np.flatnonzero(categories == category)))
+  priority = np.empty(3, dtype=int)
+  priority[NEXT_CATEGORIES[(categories[prev_item_ind], prev_correct)]] = \
+    np.arange(3)
+  order = np.lexsort((rng.random(len(categories)), priority[categories]))
+  candidates = order[~answered[order]]
+  if same_context is not None:
+    new_context = candidates[~same_context[candidates]]
+    if len(new_context):
+      return int(new_context[0])
+  return int(candidates[0])
+
+
+def select_max_information(information, answered, same_context=None):
+  """selects the unanswered item with the most Fisher information,
+  preferring items with a new context"""
+  available = ~answered
+  if same_context is not None and np.any(available & ~same_context):
+    available &= ~same_context
+  return int(np.argmax(np.where(available, information, -np.inf)))
+
+
 def find_prev_correct(feeback):
   """returns flag to check previous response"""
   if feeback["first_attempt"]["evaluation_flag"]=="correct" or\
@@ -170,71 +136,44 @@ def find_prev_correct(feeback):
 
 
 def next_item(
-  learning_unit_id, user_id, activity_type, session_id, prev_context_count):
+  learning_unit_id, user_id, activity_type, session_id, prev_context_count,
+  selection="category"):
   """main method for item selection"""
-  assessment_items = get_all_assessment_items(learning_unit_id, activity_type)
-  print("No of assessment items: ", len(assessment_items))
-  if not assessment_items:
-    print("No Assessment Items found")
+  bank = get_item_bank(learning_unit_id, activity_type)
+  if not len(bank):
+    Logger.error("No Assessment Items found")
     raise Exception("No Assessment Items found")
-  ability = get_user_ability(user_id, learning_unit_id)
+  ability = get_user_ability(user_id, learning_unit_id)[0]
   prev_user_events = get_all_user_events(
     user_id, learning_unit_id, activity_type,
-    session_id, len(assessment_items))
-  prev_user_events = filter_empty_user_events(prev_user_events)
-  contexts =[]
+    session_id, len(bank))
+  prev_user_events = [
+    user_event for user_event in filter_empty_user_events(prev_user_events)
+    if user_event.learning_item_id in bank.index]
+  same_context = None
   if prev_context_count >=1:
-    contexts = get_prev_contexts(prev_user_events[-prev_context_count:])
-    consider_prev_context = True
-  else:
-    consider_prev_context = False
-
-  difficulty = []
-  discrimination = []
-  id_to_idx = {}
-  idx_to_id = {}
-  for i, item in enumerate(assessment_items):
-    if item.difficulty_score:
-      difficulty.append(item.difficulty_score)
-    else:
-      difficulty.append(0.0)
-    if item.discrimination:
-      discrimination.append(item.discrimination)
-    else:
-      discrimination.append(0.0)
-    id_to_idx[item.id] = i
-    idx_to_id[i] = item.id
-
-  assessment_probs = find_answer_probabilities(
-    np.array(ability),
-    np.array(difficulty),
-    np.array(discrimination)
-  )
-
-  mask = np.full(len(difficulty), False, dtype=bool)
-  for user_event in prev_user_events:
-    assessment_id = user_event.learning_item_id
-    mask[id_to_idx[assessment_id]] = True
-  if np.sum(mask) == len(difficulty):
-    mask = ~mask
+    same_context = bank.has_context(
+      get_prev_contexts(prev_user_events[-prev_context_count:]))
+
+  answered = np.zeros(len(bank), dtype=bool)
+  answered[[bank.index[user_event.learning_item_id]
+            for user_event in prev_user_events]] = True
+  if answered.all():
+    answered[:] = False
     prev_user_events = []
 
-  categories = create_categories(assessment_probs)
-
-
-  if prev_user_events:
-    prev_item_ind = id_to_idx[prev_user_events[-1].learning_item_id]
-    prev_correct = find_prev_correct(prev_user_events[-1].feedback)
+  if selection == "max_information":
+    result = select_max_information(bank.fisher_information(ability),
+                                    answered, same_context)
+  elif prev_user_events:
     result = select_from_category(
-      mask, categories, activity_type, prev_item_ind, prev_correct,
-      contexts, assessment_items, consider_prev_context)
+      create_categories(bank.probabilities(ability)), answered,
+      bank.index[prev_user_events[-1].learning_item_id],
+      find_prev_correct(prev_user_events[-1].feedback), same_context)
   else:
-    result = select_from_category(mask, categories, activity_type)
-
-  print("Item id to index: ", id_to_idx)
-  print("Index to ID: ", idx_to_id)
+    result = select_from_category(
+      create_categories(bank.probabilities(ability)), answered)
 
-  assessment_id = idx_to_id[result]
   return {"data": {
-    "item_id": assessment_id
+    "item_id": bank.item_ids[result]
     }}
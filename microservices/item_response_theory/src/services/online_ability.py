@@ -0,0 +1,140 @@
+"""Online estimation of learner abilities with fixed item parameters
+
+Every answered item updates the ability of the learner in its learning unit.
+The stored ability and standard error are the normal prior, the 2PL
+likelihood of the response is applied on a grid of abilities, and the
+expected a posteriori (EAP) mean and standard deviation are stored back.
+The stored ability is read and written in a Firestore transaction, retried
+when a concurrent response of the learner changed it.
+"""
+import fireo
+import numpy as np
+from common.models import UserAbility, User, LearningUnit
+from common.utils.errors import ResourceNotFoundException
+from services.item_bank import get_item_bank
+from config import ABILITY_PRIOR_SD, ABILITY_GRID_POINTS
+
+ABILITY_GRID = np.linspace(-4, 4, ABILITY_GRID_POINTS)
+# posteriors narrower than two grid steps are not resolved by the grid
+MIN_STANDARD_ERROR = 2 * (ABILITY_GRID[1] - ABILITY_GRID[0])
+
+
+def response_log_likelihood(difficulty, discrimination, correct):
+  """
+  returns the log likelihood of responses at every grid ability. Items
+  without a discrimination, from a 1PL calibration, have a discrimination
+  of 1
+
+  Returns:
+    log_likelihood (np.ndarray) - responses X grid abilities
+  """
+  difficulty = np.asarray(difficulty, dtype=np.float64)
+  discrimination = np.asarray(discrimination, dtype=np.float64)
+  discrimination = np.where(discrimination == 0, 1.0, discrimination)
+  kernel = discrimination[:, None] * (ABILITY_GRID[None, :] -
+                                      difficulty[:, None])
+  # log(p) and log(1 - p) without overflow
+  return np.where(np.asarray(correct, dtype=bool)[:, None],
+                  -np.logaddexp(0, -kernel), -np.logaddexp(0, kernel))
+
+
+def posterior_moments(log_posterior):
+  """returns the mean and standard deviation of grid posteriors, one per
+  row of log_posterior"""
+  log_posterior = np.atleast_2d(log_posterior)
+  weights = np.exp(log_posterior - log_posterior.max(axis=1, keepdims=True))
+  weights /= weights.sum(axis=1, keepdims=True)
+  mean = weights @ ABILITY_GRID
+  variance = np.sum(weights * (ABILITY_GRID[None, :] - mean[:, None])**2,
+                    axis=1)
+  return mean, np.maximum(np.sqrt(variance), MIN_STANDARD_ERROR)
+
+
+def estimate_ability(difficulty, discrimination, correct, prior_mean=0.0,
+                     prior_sd=ABILITY_PRIOR_SD):
+  """
+  returns the EAP ability after responses to items and its standard error
+
+  Args:
+    difficulty (array) - difficulty of the answered items
+    discrimination (array) - discrimination of the answered items
+    correct (array) - whether every item was answered correctly
+    prior_mean (float) - ability before the responses
+    prior_sd (float) - standard error of the ability before the responses
+  """
+  log_posterior = -0.5 * ((ABILITY_GRID - prior_mean) / prior_sd)**2 + \
+    response_log_likelihood(difficulty, discrimination, correct).sum(axis=0)
+  mean, standard_error = posterior_moments(log_posterior)
+  return float(mean[0]), float(standard_error[0])
+
+
+def find_user_ability(user_id, learning_unit_id, transaction=None):
+  """returns the stored ability of a user in a learning unit, or None"""
+  query = UserAbility.collection.filter(
+    user="users/"+user_id).filter(
+      learning_unit="learning_units/"+learning_unit_id)
+  if transaction is not None:
+    query = query.transaction(transaction)
+  return query.get()
+
+
+@fireo.transactional
+def update_user_ability(transaction, user, learning_unit, difficulty,
+                        discrimination, correct):
+  """applies a response to the stored ability of a user in a learning unit
+  within a transaction, returns the updated UserAbility"""
+  ability_item = find_user_ability(user.id, learning_unit.id, transaction)
+  prior_mean, prior_sd = 0.0, ABILITY_PRIOR_SD
+  if ability_item:
+    prior_mean = ability_item.ability or 0.0
+    prior_sd = ability_item.standard_error or ABILITY_PRIOR_SD
+  ability, standard_error = estimate_ability(
+    [difficulty], [discrimination], [correct], prior_mean, prior_sd)
+
+  if ability_item:
+    ability_item.num_responses = (ability_item.num_responses or 0) + 1
+    ability_item.ability = ability
+    ability_item.standard_error = standard_error
+    ability_item.learning_unit = learning_unit
+    ability_item.user = user
+    ability_item.update(transaction=transaction)
+  else:
+    ability_item = UserAbility()
+    ability_item.user = user
+    ability_item.learning_unit = learning_unit
+    ability_item.ability = ability
+    ability_item.standard_error = standard_error
+    ability_item.num_responses = 1
+    ability_item.save(transaction=transaction)
+  return ability_item
+
+
+def record_response(user_id, learning_unit_id, activity_type, item_id,
+                    correct):
+  """
+  updates the ability of a user in a learning unit after answering an
+  assessment item
+
+  Returns:
+    ability (dict) - ability, standard error and number of responses of the
+      user in the learning unit
+  """
+  bank = get_item_bank(learning_unit_id, activity_type)
+  if item_id not in bank.index:
+    raise ResourceNotFoundException(
+      f"Assessment item {item_id} not found in learning unit "
+      f"{learning_unit_id}")
+  index = bank.index[item_id]
+
+  user = User.find_by_id(user_id)
+  learning_unit = LearningUnit.find_by_id(learning_unit_id)
+  ability_item = update_user_ability(
+    fireo.transaction(), user, learning_unit, bank.difficulty[index],
+    bank.discrimination[index], correct)
+  return {
+    "user_id": user_id,
+    "learning_unit_id": learning_unit_id,
+    "ability": ability_item.ability,
+    "standard_error": ability_item.standard_error,
+    "num_responses": ability_item.num_responses
+  }
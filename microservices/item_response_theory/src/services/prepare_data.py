@@ -1,12 +1,129 @@
 """Prepare data for training IRT models"""
 
 import os
-from common.models import UserEvent
-from collections import defaultdict
 import json
-import pandas as pd
+import numpy as np
+from scipy.sparse import csr_matrix
+from common.models import UserEvent
 from girth_mcmc.utils import tag_missing_data_mcmc
 
+# learning units in one Firestore "in" filter
+IN_FILTER_SIZE = 10
+
+
+class ResponseMatrix():
+  """Latest responses of users to the items of a learning unit, as a sparse
+  users X items matrix holding 1 for a correct and -1 for an incorrect
+  response"""
+
+  def __init__(self, user_ids, item_ids, responses, item_type_dict):
+    self.user_ids = user_ids
+    self.item_ids = item_ids
+    self.responses = responses
+    self.item_type_dict = item_type_dict
+
+  @classmethod
+  def from_responses(cls, responses, item_type_dict):
+    """
+    builds the matrix of a learning unit
+
+    Args:
+      responses (dict) - (user_id, item_id) to whether the response is correct
+      item_type_dict (dict) - item_id to its activity type
+    """
+    user_ids = sorted({user_id for user_id, _ in responses})
+    item_ids = sorted({item_id for _, item_id in responses})
+    user_positions = {user_id: i for i, user_id in enumerate(user_ids)}
+    item_positions = {item_id: i for i, item_id in enumerate(item_ids)}
+    rows = np.fromiter((user_positions[user_id] for user_id, _ in responses),
+                       dtype=np.int64, count=len(responses))
+    columns = np.fromiter(
+      (item_positions[item_id] for _, item_id in responses), dtype=np.int64,
+      count=len(responses))
+    values = np.where(np.fromiter(responses.values(), dtype=bool,
+                                  count=len(responses)), 1, -1).astype(np.int8)
+    matrix = csr_matrix((values, (rows, columns)),
+                        shape=(len(user_ids), len(item_ids)))
+    return cls(user_ids, item_ids, matrix, item_type_dict)
+
+  def __len__(self):
+    """returns the number of responses"""
+    return self.responses.nnz
+
+  def coordinates(self):
+    """
+    returns the responses as arrays
+
+    Returns:
+      user_index (np.ndarray), item_index (np.ndarray), correct (np.ndarray)
+    """
+    user_index = np.repeat(np.arange(len(self.user_ids)),
+                           np.diff(self.responses.indptr))
+    return user_index, self.responses.indices.astype(np.int64), \
+      self.responses.data > 0
+
+  def to_jsonlines(self, output_file_path):
+    """writes the responses in the py-irt format, one line per user"""
+    indptr, indices = self.responses.indptr, self.responses.indices
+    correct = self.responses.data > 0
+    os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+    with open(output_file_path, "w", encoding="utf-8", errors="ignore") as f:
+      for i, user_id in enumerate(self.user_ids):
+        start, end = indptr[i], indptr[i + 1]
+        f.write(json.dumps({
+          "subject_id": user_id,
+          "responses": {self.item_ids[item]: bool(response) for item, response
+                        in zip(indices[start:end], correct[start:end])}
+        }) + "\n")
+
+  def to_dense(self, missing=-999):
+    """returns the items X users responses with 1 for correct, 0 for
+    incorrect and missing for items a user did not answer"""
+    data = np.full(self.responses.shape, missing, dtype=np.int64)
+    user_index, item_index, correct = self.coordinates()
+    data[user_index, item_index] = correct
+    return data.transpose()
+
+
+def build_response_matrices(learning_unit_ids, batch_size=1000):
+  """
+  streams the answered user events of learning units once and keeps the
+  latest response of every user to every item
+
+  Returns:
+    matrices (dict) - learning unit id to its ResponseMatrix
+  """
+  learning_unit_ids = list(dict.fromkeys(learning_unit_ids))
+  responses = {learning_unit_id: {} for learning_unit_id in learning_unit_ids}
+  modified_times = {learning_unit_id: {}
+                    for learning_unit_id in learning_unit_ids}
+  item_types = {learning_unit_id: {} for learning_unit_id in learning_unit_ids}
+  irt_data = IRTData()
+  for start in range(0, len(learning_unit_ids), IN_FILTER_SIZE):
+    for event in UserEvent.iter_documents(
+      batch_size=batch_size,
+      fields=["user_id", "learning_item_id", "learning_unit", "activity_type",
+              "feedback", "last_modified_time"],
+      filters=[("learning_unit", "in",
+                learning_unit_ids[start:start + IN_FILTER_SIZE])],
+      as_dict=True):
+      feedback = event.get("feedback") or {}
+      if "first_attempt" not in feedback:
+        continue
+      learning_unit_id = event["learning_unit"]
+      key = (event.get("user_id"), event.get("learning_item_id"))
+      modified = event.get("last_modified_time")
+      previous = modified_times[learning_unit_id].get(key)
+      if modified is not None and previous is not None and modified < previous:
+        continue
+      responses[learning_unit_id][key] = irt_data.response(feedback)
+      modified_times[learning_unit_id][key] = modified
+      item_types[learning_unit_id][key[1]] = event.get("activity_type")
+  return {learning_unit_id: ResponseMatrix.from_responses(
+    responses[learning_unit_id], item_types[learning_unit_id])
+          for learning_unit_id in learning_unit_ids}
+
+
 # pylint: disable=simplifiable-if-statement
 class IRTData():
   """Prepare data for training IRT Models"""
@@ -14,31 +131,12 @@ class IRTData():
     pass
 
   def create_type_one_train_data(
-      self, learning_unit_id, output_file_path="data/irt_data.jsonlines"):
+      self, learning_unit_id, output_file_path, matrix=None):
     """Prepares data for type 1 irt model"""
-    all_user_events = list(UserEvent.collection.\
-      filter(learning_unit=learning_unit_id).fetch())
-    all_user_events = self.filter_empty_user_events(all_user_events)
-    item_type_dict = {}
-    user_item_mapping = defaultdict(list)
-    for user_event in all_user_events:
-      user_id = user_event.user_id
-      assessment_id = user_event.learning_item_id
-      item_type_dict[assessment_id] = user_event.activity_type
-      item = {
-        assessment_id: self.response(user_event.feedback)
-      }
-      user_item_mapping[user_id].append(item)
-    irt_data = []
-    for user_id, assessment_items in user_item_mapping.items():
-      user_data = {"subject_id": user_id , "responses": {}}
-      for item in assessment_items:
-        user_data["responses"] = {**user_data["responses"], **item}
-      irt_data.append(user_data)
-    os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-    with open(output_file_path, "w", encoding="utf-8", errors="ignore") as f:
-      f.write("\n".join(map(json.dumps, irt_data)))
-    return output_file_path, item_type_dict
+    if matrix is None:
+      matrix = build_response_matrices([learning_unit_id])[learning_unit_id]
+    matrix.to_jsonlines(output_file_path)
+    return output_file_path, matrix.item_type_dict
 
   def response(self, feeback):
     """Returns whether user answered an item correctly or not"""
@@ -59,48 +157,17 @@ class IRTData():
     filtered_user_events = filter(empty_feedback, all_user_events)
     return list(filtered_user_events)
 
-  def create_type_two_train_data(self, learning_unit_id):
+  def create_type_two_train_data(self, learning_unit_id, matrix=None):
     """Prepares data for training type 2 IRT model"""
-    learning_unit_key = "learning_units/" + learning_unit_id
-    print("Learning Unit key: {}".format(learning_unit_key))
-    all_user_events = list(UserEvent.collection.filter(
-      learning_unit=learning_unit_id).fetch())
-    all_user_events = self.filter_empty_user_events(all_user_events)
-    print("Fetched ALL USER EVENTS: {}".format(len(all_user_events)))
-    if len(all_user_events) == 0:
+    if matrix is None:
+      matrix = build_response_matrices([learning_unit_id])[learning_unit_id]
+    print("Fetched responses: {}".format(len(matrix)))
+    if len(matrix) == 0:
       print("No User Events to train IRT.")
       return ([], {}, {}, {})
-    item_type_dict = {}
-    user_item_mapping = defaultdict(list)
-    for i, user_event in enumerate(all_user_events):
-      if i%200 ==0:
-        print(i)
-      user_id = user_event.user_id
-      assessment_id = user_event.learning_item_id
-      item_type_dict[assessment_id] = user_event.activity_type
-      item = {
-        assessment_id: self.response(user_event.feedback)
-      }
-      user_item_mapping[user_id].append(item)
-    df = pd.DataFrame(columns=item_type_dict.keys())
-    item_index_to_id = {}
-    for i, column in enumerate(df.columns):
-      item_index_to_id[i] = column
-    for user_id, items in user_item_mapping.items():
-      user_items = {}
-      for item in items:
-        user_items = {**user_items, ** item}
-      user_items = {**user_items, **{"user_id": user_id}}
-      df = df.append(user_items, ignore_index=True)
-    user_index_to_id = {}
-    for i, user_id in enumerate(df["user_id"]):
-      user_index_to_id[i] = user_id
-
-    df = df.drop(["user_id"], axis = 1)
-    df = df.fillna(-999)
-    data = df.to_numpy().transpose()
-    data = tag_missing_data_mcmc(data, [0, 1])
-    result = (data, item_type_dict, user_index_to_id, item_index_to_id)
+    item_index_to_id = dict(enumerate(matrix.item_ids))
+    user_index_to_id = dict(enumerate(matrix.user_ids))
+    data = tag_missing_data_mcmc(matrix.to_dense(), [0, 1])
+    result = (data, matrix.item_type_dict, user_index_to_id, item_index_to_id)
     print("Data Shape: ",result[0].shape)
     return result
-
@@ -1,26 +1,33 @@
 """Functions to train IRT Models"""
 
 # pylint: disable=protected-access
+import os
+import tempfile
+import time
 from typing import Optional
 import pyro
 from py_irt.config import IrtConfig
 from py_irt.training import IrtModelTrainer
 from collections import defaultdict
 from services.prepare_data import IRTData
+from services.calibration import calibrate_learning_unit
 from girth_mcmc import GirthMCMC
 
 def train_type_one(
-    learning_unit: str, model_type: Optional[str] = "2pl"):
+    learning_unit: str, model_type: Optional[str] = "2pl", matrix=None):
   """Training pipeline for type 1 IRT model"""
   pyro.clear_param_store()
   model_type = "2pl"
-  irt_data_path, item_type_dict = \
-    IRTData().create_type_one_train_data(learning_unit)
-  config = IrtConfig(
-    model_type=model_type, initializers=["difficulty_sign"],
-    epochs=5000, lr=0.1, priors="hierarchical")
-  trainer = IrtModelTrainer(config=config, data_path=irt_data_path)
-  trainer.train(device="cpu")
+  # every training writes its data in its own folder, so that concurrent
+  # trainings do not overwrite each other
+  with tempfile.TemporaryDirectory(prefix="irt-") as data_dir:
+    irt_data_path, item_type_dict = IRTData().create_type_one_train_data(
+      learning_unit, os.path.join(data_dir, "irt_data.jsonlines"), matrix)
+    config = IrtConfig(
+      model_type=model_type, initializers=["difficulty_sign"],
+      epochs=5000, lr=0.1, priors="hierarchical")
+    trainer = IrtModelTrainer(config=config, data_path=irt_data_path)
+    trainer.train(device="cpu")
   item_correctness = trainer._dataset.get_item_accuracies()
   summary = trainer.best_params
 
@@ -69,10 +76,11 @@ def train_type_one(
     "item_type_dict": item_type_dict
   }
 
-def train_type_two(learning_unit: str, model_type: Optional[str] = "2pl"):
+def train_type_two(learning_unit: str, model_type: Optional[str] = "2pl",
+                   matrix=None):
   """Training pipeline for type 2 IRT model"""
   data, item_type_dict, user_index_to_id, item_index_to_id = \
-    IRTData().create_type_two_train_data(learning_unit)
+    IRTData().create_type_two_train_data(learning_unit, matrix)
   print("DATA PREPERATION COMPLETE")
   if len(data) == 0:
     print("No Data to train IRT. Skipping training")
@@ -126,4 +134,15 @@ def train_type_two(learning_unit: str, model_type: Optional[str] = "2pl"):
   }
 
 
-  
\ No newline at end of file
+def train_learning_unit(learning_unit: str, method: Optional[str] = "2",
+                        model_type: Optional[str] = "2pl", matrix=None):
+  """Trains the IRT model of a learning unit with one of the training
+  methods. Returns the training results and the seconds it took"""
+  start = time.perf_counter()
+  if method == "1":
+    result = train_type_one(learning_unit, model_type, matrix)
+  elif method == "calibrate":
+    result = calibrate_learning_unit(learning_unit, model_type, matrix)
+  else:
+    result = train_type_two(learning_unit, model_type, matrix)
+  return result, time.perf_counter() - start
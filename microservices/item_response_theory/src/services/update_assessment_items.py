@@ -2,6 +2,7 @@
 
 from common.models import ChooseTheFactItem, AnswerAQuestionItem, ParaphrasingPracticeItem, CreateKnowledgeNotesItem
 import fireo
+from services.item_bank import invalidate_item_banks
 
 def update_assessment_items(
     item_difficulty, item_discrimination, item_type_dict, model_type):
@@ -53,5 +54,4 @@ def update_assessment_items(
           create_knowledge_notes_item.learning_unit.get()
         create_knowledge_notes_item.update(batch=batch)
   batch.commit()
-
-
+  invalidate_item_banks()
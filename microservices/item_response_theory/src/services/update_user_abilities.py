@@ -2,10 +2,17 @@
 import fireo
 
 from common.models import UserAbility, LearningUnit, User
+from config import ABILITY_PRIOR_SD
 
-def update_user_abilites(user_ability, learning_unit_id):
-  """Updates User ability for a particular learning unit"""
+def update_user_abilites(user_ability, learning_unit_id,
+                         standard_errors=None, user_correctness=None):
+  """Updates User ability for a particular learning unit. The standard error
+  and the number of responses of the online ability updates are replaced
+  with the ones of the trained ability, the standard error is reset to the
+  prior one when the training method does not estimate it"""
   print("Updating User Abilitites")
+  standard_errors = standard_errors or {}
+  user_correctness = user_correctness or {}
   learning_unit = LearningUnit.find_by_id(learning_unit_id)
   if learning_unit:
     batch = fireo.batch()
@@ -17,10 +24,15 @@ def update_user_abilites(user_ability, learning_unit_id):
         count = 0
       count += 1
       if user:
+        standard_error = float(standard_errors.get(user_id, ABILITY_PRIOR_SD))
+        num_responses = int(
+          user_correctness.get(user_id, {}).get("total", 0))
         ability_item = UserAbility.collection.filter(
           user=user.key).filter(learning_unit=learning_unit.key).get()
         if ability_item:
           ability_item.ability = float(ability)
+          ability_item.standard_error = standard_error
+          ability_item.num_responses = num_responses
           ability_item.learning_unit = learning_unit
           ability_item.user = user
           ability_item.update(batch=batch)
@@ -29,5 +41,7 @@ def update_user_abilites(user_ability, learning_unit_id):
           ability_item.user = user
           ability_item.learning_unit = learning_unit
           ability_item.ability = float(ability)
+          ability_item.standard_error = standard_error
+          ability_item.num_responses = num_responses
           ability_item.save(batch=batch)
     batch.commit()
@@ -10,8 +10,7 @@ from common.utils.errors import (ResourceNotFoundException, ValidationError)
 from common.utils.http_exceptions import (BadRequest, ResourceNotFound)
 from common.utils.logging_handler import Logger
 from common.utils.gcs_adapter import is_valid_path
-from common.utils.sorting_logic import get_sorted_list
-from common.utils.pagination_logic import get_slice
+from common.utils.sorting_logic import collection_sorting, get_sorted_page
 from config import (CONTENT_SERVING_BUCKET, ERROR_RESPONSES, FAQ_BASE_PATH)
 
 # pylint: disable = line-too-long
@@ -55,10 +54,14 @@ def get_faq_by_uuid(uuid: str):
     }})
 def filter_faq(skip: int = Query(0, ge=0, le=2000),
                limit: int = Query(10, ge=1, le=100),
-               curriculum_pathway_id: str = None):
-  """Function to filter FAQs
+               curriculum_pathway_id: str = None,
+               page_token: str = None):
+  """Function to filter FAQs. Pass the next_page_token of a response as
+  page_token to fetch the following page without an offset scan, skip is
+  ignored then
   Args:
-    curriculum_pathway_id(str): ID of the CurriculumPathway"""
+    curriculum_pathway_id(str): ID of the CurriculumPathway
+    page_token(str): token to fetch the next page"""
   try:
     collection_manager = FAQContent.collection.filter("is_deleted", "==", False)
     if curriculum_pathway_id is not None:
@@ -67,12 +70,20 @@ def filter_faq(skip: int = Query(0, ge=0, le=2000),
       collection_manager = collection_manager.filter("curriculum_pathway_id", "==",
                                                       curriculum_pathway_id)
 
-    sorted_list = get_sorted_list(sort_by="created_time",
-                                  sort_order="descending",
-                                  collection_manager=collection_manager)
-    faq_contents = get_slice(sorted_list,skip,limit)
+    next_page_token = None
+    if page_token or skip == 0:
+      faq_contents, next_page_token = get_sorted_page(
+          sort_by="created_time", sort_order="descending",
+          collection_manager=collection_manager, limit=limit,
+          page_token=page_token)
+    else:
+      # skip counts pages of limit FAQs
+      faq_contents = [i.get_fields(reformat_datetime=True) for i in
+                      collection_sorting(collection_manager, "created_time",
+                                         "descending", skip * limit, limit)]
     count = 10000
-    response = {"records": faq_contents, "total_count": count}
+    response = {"records": faq_contents, "total_count": count,
+                "next_page_token": next_page_token}
     return {
         "success": True,
         "message": "Successfully Fetched FAQs",
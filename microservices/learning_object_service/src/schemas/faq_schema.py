@@ -56,6 +56,7 @@ class GetFAQResponseModel(BaseModel):
 class TotalCountResponseModel(BaseModel):
   records: Optional[List[FullFAQModel]]
   total_count: int
+  next_page_token: Optional[str] = None
 
 class SearchFAQResponseModel(BaseModel):
   """Search FAQ Response Pydantic Model"""
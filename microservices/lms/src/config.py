@@ -38,7 +38,8 @@ BQ_TABLE_DICT = {
     "EXISTS_IN_CLASSROOM_NOT_IN_DB_VIEW":"roastersExitsInClassroomNotInDB",
     "EXISTS_IN_DB_NOT_IN_CLASSROOM_VIEW":"roastersExitsInDBNotInClassroom",
     "BQ_ENROLLMENT_FAILURE_LOGS":"enrollmentFailureLogs",
-    "BQ_NOTIFICATION_TABLE":"lms-notifications"
+    "BQ_NOTIFICATION_TABLE":"lms-notifications",
+    "BQ_SECTION_PROGRESS_VIEW":"sectionProgressView"
 }
 
 ENABLE_UVICORN_LOGS = bool(
@@ -63,6 +64,27 @@ USER_MANAGEMENT_BASE_URL = f"http://{SERVICES['user-management']['host']}:" \
                   f"{SERVICES['user-management']['port']}" \
                   f"/user-management/api/v1"
 
+# Concurrent Drive copies and LTI assignment calls of a course copy, the
+# Drive copies started per second, and the retries with exponential backoff
+# of calls failing on quota errors
+COPY_COURSE_MAX_WORKERS = int(os.getenv("COPY_COURSE_MAX_WORKERS", "8"))
+COPY_COURSE_DRIVE_COPIES_PER_SECOND = float(
+    os.getenv("COPY_COURSE_DRIVE_COPIES_PER_SECOND", "5"))
+COPY_COURSE_MAX_RETRIES = int(os.getenv("COPY_COURSE_MAX_RETRIES", "6"))
+COPY_COURSE_BACKOFF_SECONDS = float(
+    os.getenv("COPY_COURSE_BACKOFF_SECONDS", "1"))
+# Minimum seconds between checkpoints of the finished copies of a phase
+COPY_COURSE_CHECKPOINT_SECONDS = float(
+    os.getenv("COPY_COURSE_CHECKPOINT_SECONDS", "1"))
+# Seconds without a checkpoint after which a running course copy is
+# considered interrupted and can be resumed
+COPY_COURSE_STALE_SECONDS = int(os.getenv("COPY_COURSE_STALE_SECONDS", "900"))
+
+# Seconds the progress of students computed from Classroom is cached, until
+# their progress is in the section progress view
+SECTION_PROGRESS_CACHE_TTL = int(
+    os.getenv("SECTION_PROGRESS_CACHE_TTL", "3600"))
+
 try:
   LMS_BACKEND_ROBOT_USERNAME = secrets.access_secret_version(
       request={
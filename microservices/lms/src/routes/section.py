@@ -2,7 +2,8 @@
 import traceback
 import datetime
 from common.models import Cohort, CourseTemplate, Section, LmsJob, CourseEnrollmentMapping
-from common.utils.errors import ResourceNotFoundException, ValidationError
+from common.utils.errors import (ResourceNotFoundException, ValidationError,
+                                 ConflictError)
 from common.utils.http_exceptions import (ClassroomHttpException,
                                           InternalServerError,
                                           ResourceNotFound, BadRequest,
@@ -37,7 +38,7 @@ from utils.helper import (convert_section_to_section_model,
                           convert_coursework_to_short_coursework_model)
 from utils.user_helper import (course_enrollment_user_model, get_user_id,
                                check_user_can_enroll_in_section)
-from config import BQ_TABLE_DICT, BQ_DATASET
+from config import BQ_TABLE_DICT, BQ_DATASET, COPY_COURSE_STALE_SECONDS
 # disabling for linting to pass
 # pylint: disable = broad-except
 
@@ -139,6 +140,97 @@ def create_section(sections_details: SectionDetails,
     raise InternalServerError(str(e)) from e
 
 
+def is_stale_job(lms_job):
+  """returns whether a job was not updated for COPY_COURSE_STALE_SECONDS"""
+  last_modified_time = lms_job.last_modified_time
+  if last_modified_time is None:
+    return True
+  if last_modified_time.tzinfo is None:
+    last_modified_time = last_modified_time.replace(
+        tzinfo=datetime.timezone.utc)
+  return (datetime.datetime.now(datetime.timezone.utc) - last_modified_time
+          ).total_seconds() > COPY_COURSE_STALE_SECONDS
+
+
+@router.post("/copy/{lms_job_id}/resume",
+             status_code=status.HTTP_202_ACCEPTED)
+def resume_section_copy(lms_job_id: str, background_tasks: BackgroundTasks):
+  """Resume the course copy of a section creation job which failed or was
+  interrupted, skipping the courseworks and coursework materials which the
+  job already copied. A job which is not failed is considered interrupted
+  once it was not updated for COPY_COURSE_STALE_SECONDS
+  Args:
+    lms_job_id (str): id of the course copy job
+  Raises:
+    HTTPException: 422 if the job is completed
+    HTTPException: 409 if the job is still copying
+    HTTPException: 500 Internal Server Error if something fails
+
+  Returns:
+    {"success":True,"message":str,"data":None}
+  """
+  try:
+    lms_job = LmsJob.find_by_id(lms_job_id)
+    if lms_job.job_type != "course_copy":
+      raise ValidationError(f"LMS job {lms_job_id} is not a course copy job")
+    if lms_job.status == "success":
+      raise ValidationError(f"Course copy job {lms_job_id} is completed")
+    if lms_job.status != "failed" and not is_stale_job(lms_job):
+      raise ConflictError(
+          f"Course copy job {lms_job_id} is {lms_job.status}, only failed" +
+          " or interrupted jobs can be resumed")
+
+    sections_details = SectionDetails(**lms_job.input_data)
+    course_template_details = CourseTemplate.find_by_id(
+        sections_details.course_template)
+    cohort_details = Cohort.find_by_id(sections_details.cohort)
+    current_course = classroom_crud.get_course_by_id(
+        course_template_details.classroom_id)
+    if current_course is None:
+      raise ResourceNotFoundException(
+          "classroom with id" +
+          f" {course_template_details.classroom_id} is not found")
+
+    background_tasks.add_task(
+        copy_course_background_task,
+        course_template_details=course_template_details,
+        sections_details=sections_details,
+        cohort_details=cohort_details,
+        lms_job_id=lms_job.id,current_course=current_course,
+        message="Resume section copy background task completed")
+    info_msg = f"Background Task called to resume the course copy job\
+                {lms_job_id}"
+    Logger.info(info_msg)
+
+    lms_job.logs["info"].append(info_msg)
+    # a second resume is rejected until this one fails or is interrupted
+    lms_job.status = "running"
+    lms_job.update()
+
+    return {
+        "success": True,
+        "message": "Section copy will be resumed shortly, " +
+                    f"use this job id - '{lms_job.id}' for more info",
+        "data": None
+    }
+  except ValidationError as ve:
+    raise BadRequest(str(ve)) from ve
+  except ConflictError as ce:
+    raise Conflict(str(ce)) from ce
+  except ResourceNotFoundException as err:
+    Logger.error(err)
+    raise ResourceNotFound(str(err)) from err
+  except HttpError as hte:
+    Logger.error(hte)
+    raise ClassroomHttpException(status_code=hte.resp.status,
+                                 message=str(hte)) from hte
+  except Exception as e:
+    error = traceback.format_exc().replace("\n", " ")
+    Logger.error(error)
+    Logger.error(e)
+    raise InternalServerError(str(e)) from e
+
+
 @router.post("/alpha/v1", status_code=status.HTTP_202_ACCEPTED)
 def create_section_apha(sections_details: SectionDetails,
                    background_tasks: BackgroundTasks):
@@ -475,10 +567,14 @@ def delete_section(section_id: str):
 
 
 @router.get("", response_model=SectionListResponseModel)
-def section_list(skip: int = 0, limit: int = 10):
+def section_list(skip: int = 0, limit: int = 10, page_token: str = None):
   """Get a all section details from db
 
   Args:
+    skip(int): number of sections to skip, ignored when page_token is given
+    limit(int): number of sections to return
+    page_token(str): next_page_token of the previous response, fetches the
+      next page without an offset scan
   Raises:
       HTTPException: 500 Internal Server Error if something fails
       HTTPException:
@@ -494,9 +590,14 @@ def section_list(skip: int = 0, limit: int = 10):
       raise ValidationError(
           "Invalid value passed to \"limit\" query parameter")
 
-    sections = Section.fetch_all(skip, limit)
+    next_page_token = None
+    if page_token or skip == 0:
+      sections, next_page_token = Section.fetch_page(
+          limit=limit, page_token=page_token)
+    else:
+      sections = Section.fetch_all(skip, limit)
     sections_list = list(map(convert_section_to_section_model, sections))
-    return {"data": sections_list}
+    return {"data": sections_list, "next_page_token": next_page_token}
   except ValidationError as ve:
     raise BadRequest(str(ve)) from ve
   except Exception as e:
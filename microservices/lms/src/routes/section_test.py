@@ -11,7 +11,7 @@ from datetime import timedelta
 from common.models.section import Section
 from common.models import (CourseTemplate, Cohort, User,
                            CourseEnrollmentMapping,
-                           CourseTemplateEnrollmentMapping)
+                           CourseTemplateEnrollmentMapping, LmsJob)
 from common.testing.client_with_emulator import client_with_emulator
 from common.testing.firestore_emulator import firestore_emulator, clean_firestore
 from testing.test_config import (BASE_URL, LIST_COURSEWORK_SUBMISSION_USER,
@@ -182,6 +182,79 @@ def test_create_section(client_with_emulator, create_fake_data):
                                     url, json=section_details)
   assert resp.status_code == 202
 
+def create_course_copy_job(create_fake_data, status, input_datetime=None):
+  lms_job = LmsJob.from_dict({
+      "job_type": "course_copy",
+      "status": status,
+      "input_data": {
+          "name": "section_20",
+          "description": "This is description",
+          "course_template": create_fake_data["course_template"],
+          "cohort": create_fake_data["cohort"],
+          "max_students": 50
+      },
+      "logs": {
+          "info": [],
+          "errors": []
+      },
+      "checkpoint": {
+          "section_id": create_fake_data["section"]
+      }
+  })
+  lms_job.save(input_datetime=input_datetime)
+  return lms_job
+
+
+def test_resume_section_copy(client_with_emulator, create_fake_data):
+  lms_job = create_course_copy_job(create_fake_data, "failed")
+  url = BASE_URL + f"/sections/copy/{lms_job.id}/resume"
+  with mock.patch("routes.section.classroom_crud.get_course_by_id"):
+    with mock.patch(
+        "routes.section.copy_course_background_task") as copy_course:
+      resp = client_with_emulator.post(url)
+  assert resp.status_code == 202
+  assert copy_course.call_args.kwargs["lms_job_id"] == lms_job.id
+  assert copy_course.call_args.kwargs["sections_details"].cohort == \
+    create_fake_data["cohort"]
+
+
+def test_resume_completed_section_copy(client_with_emulator,
+                                       create_fake_data):
+  lms_job = create_course_copy_job(create_fake_data, "success")
+  url = BASE_URL + f"/sections/copy/{lms_job.id}/resume"
+  with mock.patch(
+      "routes.section.copy_course_background_task") as copy_course:
+    resp = client_with_emulator.post(url)
+  assert resp.status_code == 422
+  copy_course.assert_not_called()
+
+
+def test_resume_running_section_copy(client_with_emulator, create_fake_data):
+  lms_job = create_course_copy_job(create_fake_data, "running")
+  url = BASE_URL + f"/sections/copy/{lms_job.id}/resume"
+  with mock.patch(
+      "routes.section.copy_course_background_task") as copy_course:
+    resp = client_with_emulator.post(url)
+  assert resp.status_code == 409
+  copy_course.assert_not_called()
+
+
+def test_resume_interrupted_section_copy(client_with_emulator,
+                                         create_fake_data):
+  lms_job = create_course_copy_job(
+      create_fake_data, "running",
+      datetime.datetime.utcnow() - timedelta(days=1))
+  url = BASE_URL + f"/sections/copy/{lms_job.id}/resume"
+  with mock.patch("routes.section.classroom_crud.get_course_by_id"):
+    with mock.patch(
+        "routes.section.copy_course_background_task") as copy_course:
+      resp = client_with_emulator.post(url)
+      second_resp = client_with_emulator.post(url)
+  assert resp.status_code == 202
+  assert second_resp.status_code == 409
+  copy_course.assert_called_once()
+
+
 def test_create_section_alpha(client_with_emulator, create_fake_data):
   url = BASE_URL + "/sections/alpha/v1"
   section_details = {
@@ -2,7 +2,7 @@
 import traceback
 from fastapi import APIRouter, Request
 from googleapiclient.errors import HttpError
-from services import student_service,section_service
+from services import student_service,section_service,progress_service
 from utils.user_helper import (
   course_enrollment_user_model,get_user_id)
 from utils.helper import bq_query_results_to_dict_list
@@ -25,6 +25,7 @@ from schemas.section import(StudentListResponseModel,\
 from schemas.student import(AddStudentResponseModel,
   AddStudentModel,GetStudentDetailsResponseModel,
     GetProgressPercentageResponseModel,
+    GetSectionProgressPercentageResponseModel,
     InviteStudentToSectionResponseModel,
     StudentsRecordsResponseModel
 )
@@ -92,6 +93,46 @@ NOT_CLASSROOM_TABLE_ID=(
   f"`{PROJECT_ID}.{BQ_DATASET}"
   + f".{BQ_TABLE_DICT['EXISTS_IN_DB_NOT_IN_CLASSROOM_VIEW']}`")
 
+@section_student_router.get("/{section_id}/get_progress_percentage",
+                    response_model=GetSectionProgressPercentageResponseModel)
+def get_section_progress_percentage(section_id: str):
+  """Get progress percentage of all the students of a section
+
+  Args:
+    section_id : section id for which progess is required
+
+  Raises:
+    HTTPException: 500 Internal Server Error if something fails
+
+  Returns:
+    The user id, email and progress percentage of every student of the
+    section,
+    {'status': 'Failed'} if any exception is raised
+  """
+  try:
+    section = Section.find_by_id(section_id)
+    user_ids = CourseEnrollmentMapping.fetch_user_ids_by_section(
+      section.key, "learner")
+    users = [user for user in User.get_by_ids(user_ids) if user is not None]
+    progress = progress_service.get_section_progress(section, users)
+    return {"data": [{
+      "user_id": user.user_id,
+      "email": user.email,
+      "progress_percentage": progress[user.user_id]
+    } for user in users]}
+
+  except ResourceNotFoundException as err:
+    Logger.error(err)
+    raise ResourceNotFound(str(err)) from err
+  except ValidationError as ve:
+    raise BadRequest(str(ve)) from ve
+  except Exception as e:
+    Logger.error(e)
+    err = traceback.format_exc().replace("\n", " ")
+    Logger.error(err)
+    raise InternalServerError(str(e)) from e
+
+
 @section_student_router.get("/{section_id}/get_progress_percentage/{user}",
                             response_model=GetProgressPercentageResponseModel)
 def get_progress_percentage(section_id: str, user: str, request: Request):
@@ -112,15 +153,10 @@ def get_progress_percentage(section_id: str, user: str, request: Request):
   try:
     headers = {"Authorization": request.headers.get("Authorization")}
     user_id = get_user_id(user=user, headers=headers)
-    submitted_course_work_list = 0
-    course_work_list = len(classroom_crud.get_course_work_list(section_id))
-    submitted_course_work = classroom_crud.get_submitted_course_work_list(
-        section_id, user_id, headers)
-    for x in submitted_course_work:
-      if x["state"] == "TURNED_IN":
-        submitted_course_work_list = submitted_course_work_list + 1
-    return {"data":\
-    round((submitted_course_work_list / course_work_list) * 100, 2)}
+    section = Section.find_by_id(section_id)
+    student = User.find_by_user_id(user_id)
+    progress = progress_service.get_section_progress(section, [student])
+    return {"data": progress[user_id]}
 
   except ResourceNotFoundException as err:
     Logger.error(err)
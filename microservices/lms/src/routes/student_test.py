@@ -82,22 +82,37 @@ def create_fake_data():
   }
 
 
-def test_get_progress_percentage(client_with_emulator):
-  url = BASE_URL + "/sections/9xieFlma8bcWYyLPOg0c/" + \
-    "get_progress_percentage/clplmstestuser1@gmail.com"
-  with mock.patch\
-  ("routes.student.get_user_id",return_value="user_id"):
-    with mock.patch("routes.student.classroom_crud.get_course_work_list",
-                    return_value=[{}, {}]):
-      with mock.patch(
-          "routes.student.classroom_crud.get_submitted_course_work_list",
-          return_value=[{
-              "state": "TURNED_IN"
-          }, {
-              "state": "TURNED_IN"
-          }]):
-        resp = client_with_emulator.get(url)
+def test_get_progress_percentage(client_with_emulator,create_fake_data):
+  url = (BASE_URL + f"/sections/{create_fake_data['section']}/" +
+    "get_progress_percentage/clplmstestuser1@gmail.com")
+  with mock.patch("routes.student.get_user_id",
+                  return_value=create_fake_data["user_id"]):
+    with mock.patch("services.progress_service.run_query",
+                    return_value=[]):
+      with mock.patch("services.progress_service.PROGRESS_CACHE"):
+        with mock.patch(
+            "services.progress_service.classroom_course_progress",
+            return_value={TEMP_USER["gaia_id"]: 50.0}):
+          resp = client_with_emulator.get(url)
+  assert resp.status_code == 200
+  assert resp.json()["data"] == 50
+
+def test_get_section_progress_percentage(client_with_emulator,
+                                         create_fake_data):
+  url = (BASE_URL + f"/sections/{create_fake_data['section']}/" +
+    "get_progress_percentage")
+  with mock.patch("services.progress_service.run_query",
+                  return_value=[{"userId": TEMP_USER["gaia_id"],
+                                 "courseWorkCount": 4,
+                                 "turnedInCount": 3}]):
+    with mock.patch(
+        "services.progress_service.classroom_course_progress") as classroom:
+      resp = client_with_emulator.get(url)
   assert resp.status_code == 200
+  assert resp.json()["data"] == [{"user_id": create_fake_data["user_id"],
+                                  "email": create_fake_data["email"],
+                                  "progress_percentage": 75.0}]
+  classroom.assert_not_called()
 
 def test_get_student_in_section(client_with_emulator,create_fake_data):
   url = (BASE_URL
@@ -1,7 +1,7 @@
 """
 Pydantic Model for copy course API's
 """
-from typing import Optional
+from typing import Optional, List
 from pydantic import BaseModel, constr
 from schemas.schema_examples import INVITE_STUDENT, COURSE_ENROLLMENT_USER_EXAMPLE,STUDENT_RECORDS_MODEL
 
@@ -111,6 +111,17 @@ class GetProgressPercentageResponseModel(BaseModel):
   success: Optional[bool] = True
   data: int = None
 
+class SectionProgressPercentageModel(BaseModel):
+  """Progress percentage of a student of a section"""
+  user_id: str
+  email: str
+  progress_percentage: float
+
+class GetSectionProgressPercentageResponseModel(BaseModel):
+  """Get Progress Percentage of the students of a section"""
+  success: Optional[bool] = True
+  data: List[SectionProgressPercentageModel] = None
+
 class GetProgressPercentageCohortResponseModel(BaseModel):
   """Get Progress Percentage"""
   success: Optional[bool] = True
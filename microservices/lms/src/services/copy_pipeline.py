@@ -0,0 +1,456 @@
+"""Pipeline copying the courseworks and coursework materials of a course
+template classroom into the classroom of a section
+
+Instead of copying one coursework at a time, the items of a kind are copied
+in phases:
+
+1. the Drive files, forms and LTI assignments attached to the items are
+   copied concurrently, the Drive copies under a rate limit
+2. the items are created in Classroom with batch requests
+3. the copied LTI assignments are updated with the ids of the new items
+
+Google API calls failing on quota errors are retried with exponential
+backoff. The progress of every phase is checkpointed in the LmsJob of the
+copy as the copies and batch requests finish, by the ids of the template
+items, so that a resumed copy skips what is already copied.
+"""
+import copy
+import datetime
+import random
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from googleapiclient.errors import HttpError
+from common.utils import classroom_crud
+from common.utils.errors import ResourceNotFoundException
+from common.utils.logging_handler import Logger
+from config import (auth_client, COPY_COURSE_MAX_WORKERS,
+                    COPY_COURSE_DRIVE_COPIES_PER_SECOND,
+                    COPY_COURSE_MAX_RETRIES, COPY_COURSE_BACKOFF_SECONDS,
+                    COPY_COURSE_CHECKPOINT_SECONDS)
+# pylint: disable = broad-except, line-too-long
+
+COURSEWORK = "courseWork"
+COURSEWORK_MATERIAL = "courseWorkMaterials"
+
+LTI_LAUNCH_PATH = "/classroom-shim/api/v1/launch?lti_assignment_id="
+LTI_ASSIGNMENT_URL = "http://classroom-shim/classroom-shim/api/v1/lti-assignment"
+QUOTA_ERROR_REASONS = ("rateLimitExceeded", "userRateLimitExceeded",
+                       "quotaExceeded", "RATE_LIMIT_EXCEEDED")
+
+
+class RateLimiter():
+  """Spaces out the calls of all threads to a number of calls per second"""
+
+  def __init__(self, calls_per_second):
+    self.interval = 1 / calls_per_second if calls_per_second > 0 else 0
+    self._next_call = 0.0
+    self._lock = threading.Lock()
+
+  def wait(self):
+    with self._lock:
+      now = time.monotonic()
+      call_time = max(now, self._next_call)
+      self._next_call = call_time + self.interval
+    if call_time > now:
+      time.sleep(call_time - now)
+
+
+def is_quota_error(error):
+  """returns whether an error is a rate limit or quota error of a Google
+  API"""
+  if not isinstance(error, HttpError):
+    return False
+  if error.resp.status == 429:
+    return True
+  content = error.content.decode("utf-8", "ignore")
+  return error.resp.status == 403 and any(
+      reason in content for reason in QUOTA_ERROR_REASONS)
+
+
+def backoff_seconds(attempt):
+  """returns the jittered exponential backoff before a retry"""
+  return COPY_COURSE_BACKOFF_SECONDS * 2**attempt * random.uniform(0.5, 1.5)
+
+
+def call_with_backoff(function, *args, rate_limiter=None, **kwargs):
+  """Calls a function, retrying it with exponential backoff while it fails
+  on quota errors"""
+  for attempt in range(COPY_COURSE_MAX_RETRIES + 1):
+    if rate_limiter is not None:
+      rate_limiter.wait()
+    try:
+      return function(*args, **kwargs)
+    except HttpError as error:
+      if attempt == COPY_COURSE_MAX_RETRIES or not is_quota_error(error):
+        raise
+      time.sleep(backoff_seconds(attempt))
+
+
+def run_concurrently(calls):
+  """
+  Runs calls on COPY_COURSE_MAX_WORKERS threads
+
+  Args:
+    calls (dict) - functions without arguments by key
+
+  Yields:
+    (key, result, exception or None) of every call as soon as it finishes
+  """
+  if not calls:
+    return
+  with ThreadPoolExecutor(max_workers=COPY_COURSE_MAX_WORKERS) as executor:
+    futures = {executor.submit(call): key for key, call in calls.items()}
+    for future in as_completed(futures):
+      try:
+        yield futures[future], future.result(), None
+      except Exception as error:
+        yield futures[future], None, error
+
+
+def lti_assignment_dates(coursework, cohort_details):
+  """returns the start, end and due dates of the LTI assignments of a
+  coursework with a due date"""
+  dates = {}
+  coursework_due_date = coursework.get("dueDate")
+  if not coursework_due_date:
+    return dates
+  coursework_due_time = coursework.get("dueTime", {})
+  coursework_due_datetime = datetime.datetime(
+      coursework_due_date.get("year"), coursework_due_date.get("month"),
+      coursework_due_date.get("day"), coursework_due_time.get("hours", 0),
+      coursework_due_time.get("minutes", 0))
+  dates["start_date"] = (
+      cohort_details.start_date).strftime("%Y-%m-%dT%H:%M:%S%z")
+  # due dates in the past are supposed to be updated by the user before
+  # starting the copy course process, LTI assignments end with the cohort
+  if coursework_due_datetime < datetime.datetime.utcnow():
+    dates["end_date"] = dates["due_date"] = (
+        cohort_details.end_date).strftime("%Y-%m-%dT%H:%M:%S%z")
+  else:
+    dates["end_date"] = dates["due_date"] = coursework_due_datetime.strftime(
+        "%Y-%m-%dT%H:%M:%S%z")
+  return dates
+
+
+class CourseCopy():
+  """Copies courseworks and coursework materials into a section classroom,
+  checkpointing the progress in the LmsJob of the copy
+
+  The checkpoint has the new Drive files and LTI assignments by template
+  item id and source id, the new item ids by template item id and the LTI
+  assignments updated with their new item id.
+  """
+
+  def __init__(self, lms_job, source_course_id, course_id, target_folder_id,
+               section_id, source_context_id):
+    """
+    Args:
+      lms_job (LmsJob) - job of the copy, with the checkpoint to resume
+      source_course_id (str) - classroom id of the course template
+      course_id (str) - classroom id of the section
+      target_folder_id (str) - teacher Drive folder of the section
+      section_id (str) - id of the section, the context of the LTI
+        assignment copies
+      source_context_id (str) - id of the course template
+    """
+    self.lms_job = lms_job
+    self.logs = lms_job.logs
+    self.source_course_id = source_course_id
+    self.course_id = course_id
+    self.target_folder_id = target_folder_id
+    self.section_id = section_id
+    self.source_context_id = source_context_id
+    self.checkpoint = dict(lms_job.checkpoint or {})
+    for name in ("drive_files", "lti_assignments", COURSEWORK,
+                 COURSEWORK_MATERIAL, "lti_course_works"):
+      self.checkpoint[name] = dict(self.checkpoint.get(name) or {})
+    self.error_flag = False
+    self.saved_at = time.monotonic()
+    self.drive_rate_limiter = RateLimiter(COPY_COURSE_DRIVE_COPIES_PER_SECOND)
+
+  def save(self):
+    self.lms_job.checkpoint = self.checkpoint
+    self.lms_job.logs = self.logs
+    self.lms_job.update()
+    self.saved_at = time.monotonic()
+
+  def save_progress(self):
+    """Saves the checkpoint unless it was saved less than
+    COPY_COURSE_CHECKPOINT_SECONDS ago, so that finished copies are not
+    copied again by a resumed copy"""
+    if time.monotonic() - self.saved_at >= COPY_COURSE_CHECKPOINT_SECONDS:
+      self.save()
+
+  def log_info(self, message):
+    self.logs["info"].append(message)
+    Logger.info(message)
+
+  def log_error(self, message):
+    self.logs["errors"].append(message)
+    Logger.error(message)
+
+  def item_failed(self, title, error):
+    self.error_flag = True
+    self.logs["errors"].append(f"Error - {error} for '{title}'")
+    self.log_error(f"Copy coursework failed for \
+              course_id {self.source_course_id} for '{title}'")
+
+  def copy_items(self, items, kind, topic_id_map, cohort_details=None):
+    """
+    Copies the courseworks or coursework materials of the course template
+    which are not copied yet
+
+    Args:
+      items (list) - courseworks or coursework materials of the template
+      kind (str) - COURSEWORK or COURSEWORK_MATERIAL
+      topic_id_map (dict) - new topic ids by template topic id
+      cohort_details (Cohort) - cohort of the section, which sets the dates
+        of the LTI assignments of courseworks
+    """
+    plans = []
+    for item in items:
+      if item["id"] in self.checkpoint[kind]:
+        continue
+      try:
+        plans.append(self.plan_item(item, kind, topic_id_map, cohort_details))
+      except Exception as error:
+        self.item_failed(item["title"], error)
+        Logger.error(traceback.format_exc().replace("\n", " "))
+    self.copy_attachments(plans)
+    self.save()
+    self.create_items(plans, kind)
+    self.update_lti_assignments(kind)
+    self.save()
+
+  def plan_item(self, item, kind, topic_id_map, cohort_details):
+    """Returns the body of a new item and the attachments to copy for it,
+    without duplicate Drive files, YouTube videos and links"""
+    body = copy.deepcopy(item)
+    lti_details = {
+        "section_id": self.section_id,
+        "source_context_id": self.source_context_id,
+        "coursework_title": item["title"],
+        "start_date": None,
+        "end_date": None,
+        "due_date": None
+    }
+    if kind == COURSEWORK:
+      lti_details.update(lti_assignment_dates(body, cohort_details))
+    if "topicId" in body:
+      body["topicId"] = topic_id_map[body["topicId"]]
+
+    attachments = []
+    drive_ids, youtube_ids, link_urls = set(), set(), set()
+    for material in body.get("materials", []):
+      if "driveFile" in material:
+        drive_file = material["driveFile"]["driveFile"]
+        if drive_file["id"] not in drive_ids:
+          if "title" not in drive_file:
+            raise ResourceNotFoundException(
+                f"File with id {drive_file['id']} not found")
+          drive_ids.add(drive_file["id"])
+          attachments.append(("drive", drive_file["id"], material))
+      if "youtubeVideo" in material:
+        if material["youtubeVideo"]["id"] not in youtube_ids:
+          youtube_ids.add(material["youtubeVideo"]["id"])
+          attachments.append(
+              ("material", None, {"youtubeVideo": material["youtubeVideo"]}))
+      if "link" in material:
+        url = material["link"]["url"]
+        if url not in link_urls:
+          link_urls.add(url)
+          if LTI_LAUNCH_PATH in url:
+            attachments.append(("lti", url.split(LTI_LAUNCH_PATH)[-1], url))
+          else:
+            attachments.append(("material", None, {"link": material["link"]}))
+      if "form" in material:
+        if "title" not in material["form"]:
+          raise ResourceNotFoundException("Form to be copied is deleted")
+        form_id = material["form"]["formUrl"].split("/")[-2]
+        attachments.append(("form", form_id, material))
+    return {
+        "source_id": item["id"],
+        "title": item["title"],
+        "body": body,
+        "lti_details": lti_details,
+        "attachments": attachments,
+        "error": None
+    }
+
+  def copy_attachments(self, plans):
+    """Copies the Drive files, forms and LTI assignments of items
+    concurrently, the Drive copies under a rate limit"""
+    calls = {}
+    for index, plan in enumerate(plans):
+      drive_files = self.checkpoint["drive_files"].setdefault(
+          plan["source_id"], {})
+      lti_assignments = self.checkpoint["lti_assignments"].setdefault(
+          plan["source_id"], {})
+      for attachment_type, source_id, attachment in plan["attachments"]:
+        if attachment_type == "drive" and source_id not in drive_files:
+          title = attachment["driveFile"]["driveFile"]["title"]
+        elif attachment_type == "form" and source_id not in drive_files:
+          title = attachment["form"]["title"]
+        elif attachment_type == "lti" and source_id not in lti_assignments:
+          calls[(index, attachment_type, source_id)] = (
+              lambda source_id=source_id, plan=plan: self.copy_lti_assignment(
+                  source_id, plan["lti_details"]))
+          continue
+        else:
+          continue
+        calls[(index, attachment_type, source_id)] = (
+            lambda source_id=source_id, title=title: call_with_backoff(
+                classroom_crud.drive_copy, source_id, self.target_folder_id,
+                title, rate_limiter=self.drive_rate_limiter))
+
+    for (index, attachment_type, source_id), result, error in \
+        run_concurrently(calls):
+      plan = plans[index]
+      if attachment_type == "lti":
+        if result is not None:
+          self.checkpoint["lti_assignments"][plan["source_id"]][
+              source_id] = result
+          self.save_progress()
+        continue
+      if error is not None:
+        plan["error"] = error
+        continue
+      self.checkpoint["drive_files"][plan["source_id"]][source_id] = {
+          "id": result["id"],
+          "webViewLink": result["webViewLink"]
+      }
+      self.save_progress()
+
+  def copy_lti_assignment(self, lti_assignment_id, lti_details):
+    """Copies an LTI assignment into the section, returns the id of the copy
+    or None if the copy failed"""
+    coursework_title = lti_details.get("coursework_title")
+    self.log_info(
+        f"LTI Course copy started for assignment - {lti_assignment_id}, coursework title - '{coursework_title}'")
+    copy_assignment = requests.post(
+        f"{LTI_ASSIGNMENT_URL}/copy",
+        headers={"Authorization": f"Bearer {auth_client.get_id_token()}"},
+        json={
+            "lti_assignment_id": lti_assignment_id,
+            "context_id": lti_details.get("section_id"),
+            "source_context_id": lti_details.get("source_context_id"),
+            "start_date": lti_details.get("start_date"),
+            "end_date": lti_details.get("end_date"),
+            "due_date": lti_details.get("due_date")
+        },
+        timeout=60)
+    if copy_assignment.status_code == 200:
+      new_lti_assignment_id = copy_assignment.json().get("data").get("id")
+      self.log_info(
+          f"LTI Course copy completed for assignment - {lti_assignment_id}, coursework title - '{coursework_title}', new assignment id - {new_lti_assignment_id}")
+      return new_lti_assignment_id
+    self.logs["info"].append(
+        f"LTI Course copy failed for assignment - {lti_assignment_id}, coursework title - '{coursework_title}'")
+    self.error_flag = True
+    self.log_error(
+        f"Copying an LTI Assignment failed for {lti_assignment_id}, coursework title - '{coursework_title}'\
+                          in the new section {lti_details.get('section_id')} with status code: \
+                          {copy_assignment.status_code} and error msg: {copy_assignment.text}")
+    return None
+
+  def item_body(self, plan):
+    """returns the body of a new item with its copied attachments"""
+    body = plan["body"]
+    if "materials" not in body:
+      return body
+    drive_files = self.checkpoint["drive_files"].get(plan["source_id"], {})
+    lti_assignments = self.checkpoint["lti_assignments"].get(
+        plan["source_id"], {})
+    materials = []
+    for attachment_type, source_id, attachment in plan["attachments"]:
+      if attachment_type == "material":
+        materials.append(attachment)
+      elif attachment_type == "drive":
+        drive_file = attachment["driveFile"]["driveFile"]
+        drive_file["id"] = drive_files[source_id]["id"]
+        drive_file.pop("alternateLink", None)
+        drive_file.pop("thumbnailUrl", None)
+        materials.append({"driveFile": attachment["driveFile"]})
+      elif attachment_type == "form":
+        materials.append({"link": {
+            "title": attachment["form"]["title"],
+            "url": drive_files[source_id]["webViewLink"]
+        }})
+      elif source_id in lti_assignments:
+        materials.append({"link": {
+            "url": attachment.replace(source_id, lti_assignments[source_id])
+        }})
+    body["materials"] = materials
+    return body
+
+  def create_items(self, plans, kind):
+    """Creates items in Classroom with batch requests, retrying the items
+    failing on quota errors with exponential backoff"""
+    create_in_batch = (classroom_crud.create_courseworks_in_batch
+                       if kind == COURSEWORK else
+                       classroom_crud.create_coursework_materials_in_batch)
+    pending = []
+    for plan in plans:
+      if plan["error"] is not None:
+        self.item_failed(plan["title"], plan["error"])
+      else:
+        pending.append(plan)
+    for attempt in range(COPY_COURSE_MAX_RETRIES + 1):
+      if not pending:
+        break
+      if attempt:
+        time.sleep(backoff_seconds(attempt - 1))
+      retries = []
+      # the items created by every batch request are saved before the next
+      # one, a resumed copy would create them again otherwise
+      for results in create_in_batch(
+          self.course_id, [self.item_body(plan) for plan in pending]):
+        for index, response, error in results:
+          plan = pending[index]
+          if error is None:
+            self.checkpoint[kind][plan["source_id"]] = response["id"]
+          elif is_quota_error(error) and attempt < COPY_COURSE_MAX_RETRIES:
+            retries.append(plan)
+          else:
+            self.item_failed(plan["title"], error)
+        self.save()
+      pending = retries
+
+  def update_lti_assignments(self, kind):
+    """Updates the LTI assignments copied for the new items of a kind with
+    the id of their item"""
+    calls = {}
+    course_work_ids = {}
+    for source_id, course_work_id in self.checkpoint[kind].items():
+      lti_assignments = self.checkpoint["lti_assignments"].get(source_id, {})
+      for assignment_id in lti_assignments.values():
+        if assignment_id and \
+            assignment_id not in self.checkpoint["lti_course_works"]:
+          course_work_ids[assignment_id] = course_work_id
+          calls[assignment_id] = (
+              lambda assignment_id=assignment_id,
+              course_work_id=course_work_id: requests.patch(
+                  f"{LTI_ASSIGNMENT_URL}/{assignment_id}",
+                  headers={
+                      "Authorization": f"Bearer {auth_client.get_id_token()}"
+                  },
+                  json={"course_work_id": course_work_id},
+                  timeout=60))
+    item_name = "course work" if kind == COURSEWORK else \
+      "course work material"
+    for assignment_id, response, error in run_concurrently(calls):
+      course_work_id = course_work_ids[assignment_id]
+      if error is None and response.status_code == 200:
+        self.checkpoint["lti_course_works"][assignment_id] = course_work_id
+        self.log_info(
+            f"Updated the {item_name} id for new LTI assignment - {assignment_id}")
+        self.save_progress()
+        continue
+      self.error_flag = True
+      self.log_error(
+          f"Failed to update assignment {assignment_id} with course work id \
+                          {course_work_id} due to error - {error or response.text} with \
+                            status code - {getattr(response, 'status_code', None)} for {item_name}")
@@ -0,0 +1,147 @@
+"""
+Progress percentage of the students of sections
+
+The classroom notification service streams the course works and the student
+submissions of Classroom into BQ, where the sectionProgressView keeps the
+published course works and the turned in submissions of every (course,
+student). The progress of the students of a section is read from the view
+with one query. Students without a row in the view, e.g. before the first
+notification of their submissions, fall back to Classroom: the course works
+and the submissions of the section are listed once for all of them and their
+progress is cached for SECTION_PROGRESS_CACHE_TTL seconds.
+"""
+import collections
+from common.utils import classroom_crud
+from common.utils.bq_helper import run_query
+from common.utils.cache_service import Cache
+from common.utils.logging_handler import Logger
+from config import (BQ_TABLE_DICT, BQ_DATASET, PROJECT_ID,
+                    SECTION_PROGRESS_CACHE_TTL)
+
+# disabling for linting to pass
+# pylint: disable = broad-except
+
+PROGRESS_VIEW_ID = (f"`{PROJECT_ID}.{BQ_DATASET}."
+                    + f"{BQ_TABLE_DICT['BQ_SECTION_PROGRESS_VIEW']}`")
+
+PROGRESS_CACHE = Cache("section_progress", ttl=SECTION_PROGRESS_CACHE_TTL)
+
+
+def progress_percentage(turned_in, course_works):
+  """Returns the percentage of turned in course works, 0 without any"""
+  if not course_works:
+    return 0
+  return round((turned_in / course_works) * 100, 2)
+
+
+def query_course_progress(classroom_id, gaia_ids):
+  """Returns the progress percentage by gaia id of the students of a course
+  that have a row in the section progress view, none if the view can not be
+  queried
+
+  Args:
+    classroom_id (str): id of the Classroom course of the section
+    gaia_ids (list): gaia ids of the students
+  Returns:
+    dict: progress percentage by gaia id
+  """
+  if not gaia_ids:
+    return {}
+  user_ids = ",".join(f"\"{gaia_id}\"" for gaia_id in gaia_ids)
+  query = f"""SELECT userId, courseWorkCount, turnedInCount
+      FROM {PROGRESS_VIEW_ID}
+      WHERE courseId = "{classroom_id}" AND userId IN ({user_ids})"""
+  try:
+    rows = run_query(query)
+  except Exception as e:
+    Logger.error(f"Failed to query the progress of course {classroom_id}: {e}")
+    return {}
+  return {
+    row["userId"]: progress_percentage(row["turnedInCount"],
+                                       row["courseWorkCount"])
+    for row in rows
+  }
+
+
+def list_all(list_function, field, **kwargs):
+  """Returns the items of all the pages of a Classroom list request"""
+  items = []
+  page_token = None
+  while True:
+    response = list_function(pageToken=page_token, **kwargs).execute()
+    items.extend(response.get(field, []))
+    page_token = response.get("nextPageToken")
+    if not page_token:
+      return items
+
+
+def classroom_course_progress(classroom_id):
+  """Returns the progress percentage by gaia id of the students of a course,
+  listing the course works and the turned in submissions of all the
+  students of the course once
+
+  Args:
+    classroom_id (str): id of the Classroom course of the section
+  Returns:
+    collections.defaultdict: progress percentage by gaia id, 0 for students
+      without turned in submissions
+  """
+  course_works = classroom_crud.get_service(
+    "classroom", "v1").courses().courseWork()
+  course_work_ids = {
+    course_work["id"] for course_work in list_all(
+      course_works.list, "courseWork", courseId=classroom_id)}
+  turned_in = collections.Counter(
+    submission["userId"] for submission in list_all(
+      course_works.studentSubmissions().list, "studentSubmissions",
+      courseId=classroom_id, courseWorkId="-", states=["TURNED_IN"])
+    if submission["courseWorkId"] in course_work_ids)
+  progress = collections.defaultdict(int)
+  for gaia_id, count in turned_in.items():
+    progress[gaia_id] = progress_percentage(count, len(course_work_ids))
+  return progress
+
+
+def get_section_progress(section, users):
+  """Returns the progress percentage of users in a section, from the
+  section progress view, else from the cache, else from Classroom
+
+  Args:
+    section (Section): section of the users
+    users (list): User objects of the students
+  Returns:
+    dict: progress percentage by user id
+  """
+  view_progress = query_course_progress(
+    section.classroom_id, [user.gaia_id for user in users if user.gaia_id])
+  progress = {}
+  missing = []
+  for user in users:
+    if user.gaia_id in view_progress:
+      progress[user.user_id] = view_progress[user.gaia_id]
+    else:
+      missing.append(user)
+  if not missing:
+    return progress
+
+  cache_keys = {user.user_id: f"{section.id}::{user.user_id}"
+                for user in missing}
+  cached = PROGRESS_CACHE.mget(list(cache_keys.values()))
+  uncached = [user for user in missing
+              if cache_keys[user.user_id] not in cached]
+  for user in missing:
+    if cache_keys[user.user_id] in cached:
+      progress[user.user_id] = cached[cache_keys[user.user_id]]
+  if not uncached:
+    return progress
+
+  Logger.info(f"Computing the progress of {len(uncached)} students of"
+              f" section {section.id} from Classroom")
+  classroom_progress = classroom_course_progress(section.classroom_id)
+  computed = {}
+  for user in uncached:
+    progress[user.user_id] = classroom_progress[user.gaia_id] \
+      if user.gaia_id else 0
+    computed[cache_keys[user.user_id]] = progress[user.user_id]
+  PROGRESS_CACHE.mset(computed)
+  return progress
@@ -8,10 +8,10 @@ from common.utils.bq_helper import insert_rows_to_bq
 from common.utils.logging_handler import Logger
 from common.models import (Section, CourseEnrollmentMapping,
                            CourseTemplateEnrollmentMapping, User, LmsJob)
-from common.utils.http_exceptions import (InternalServerError,
-                                          ResourceNotFound)
+from common.utils.http_exceptions import InternalServerError
 from common.utils.errors import ValidationError
 from services import common_service
+from services.copy_pipeline import CourseCopy, COURSEWORK, COURSEWORK_MATERIAL
 from config import BQ_TABLE_DICT, BQ_DATASET, auth_client
 from googleapiclient.errors import HttpError
 
@@ -42,46 +42,60 @@ def copy_course_background_task(course_template_details,
   """
   lms_job = LmsJob.find_by_id(lms_job_id)
   logs = lms_job.logs
+  checkpoint = lms_job.checkpoint or {}
   Logger.info(current_course)
   try:
-    # Create a new course
-    info_msg = f"Background Task started for the cohort id {cohort_details.id}\
+    if checkpoint.get("section_id"):
+      # Resume a copy which was interrupted after creating the section
+      section = Section.find_by_id(checkpoint["section_id"])
+      section_id = section.id
+      new_course = classroom_crud.get_course_by_id(section.classroom_id)
+      info_msg = f"Background Task resumed for the cohort id {cohort_details.id}\
+                course template {course_template_details.id} \
+                with section id {section_id}"
+      logs["info"].append(info_msg)
+      Logger.info(info_msg)
+      lms_job.status = "running"
+      lms_job.update()
+    else:
+      # Create a new course
+      info_msg = f"Background Task started for the cohort id {cohort_details.id}\
                 course template {course_template_details.id} \
                 with section name{sections_details.name}"
 
-    logs["info"].append(info_msg)
-    Logger.info(info_msg)
+      logs["info"].append(info_msg)
+      Logger.info(info_msg)
 
-    new_course = classroom_crud.create_course(course_template_details.name,
-                                              sections_details.description,
-                                              sections_details.name, "me")
+      new_course = classroom_crud.create_course(course_template_details.name,
+                                                sections_details.description,
+                                                sections_details.name, "me")
 
-    lms_job.classroom_id = new_course["id"]
-    lms_job.start_time = datetime.datetime.utcnow()
-    lms_job.status = "running"
-    lms_job.update()
+      lms_job.classroom_id = new_course["id"]
+      lms_job.start_time = datetime.datetime.utcnow()
+      lms_job.status = "running"
+      lms_job.update()
 
-    # Create section with the required fields
-    section = Section()
-    section.name = course_template_details.name
-    section.section = sections_details.name
-    section.description = sections_details.description
-    section.max_students = sections_details.max_students
-    # Reference document can be get using get() method
-    section.course_template = course_template_details
-    section.cohort = cohort_details
-    section.classroom_id = new_course["id"]
-    section.classroom_code = new_course["enrollmentCode"]
-    section.classroom_url = new_course["alternateLink"]
-    section.enrolled_students_count = 0
-    section.status = "PROVISIONING"
-    section_id = section.save().id
+      # Create section with the required fields
+      section = Section()
+      section.name = course_template_details.name
+      section.section = sections_details.name
+      section.description = sections_details.description
+      section.max_students = sections_details.max_students
+      # Reference document can be get using get() method
+      section.course_template = course_template_details
+      section.cohort = cohort_details
+      section.classroom_id = new_course["id"]
+      section.classroom_code = new_course["enrollmentCode"]
+      section.classroom_url = new_course["alternateLink"]
+      section.enrolled_students_count = 0
+      section.status = "PROVISIONING"
+      section_id = section.save().id
+
+      lms_job.section_id = section_id
+      lms_job.checkpoint = checkpoint = {"section_id": section_id}
+      lms_job.update()
     classroom_id = new_course["id"]
 
-    lms_job.section_id = section_id
-    lms_job.update()
-
-    error_flag = False
     target_folder_id = new_course["teacherFolder"]["id"]
     logs["info"].append(
         f"ID of target drive folder for section {target_folder_id}")
@@ -89,251 +103,60 @@ def copy_course_background_task(course_template_details,
 
     # Get topics of current course
     topics = classroom_crud.get_topics(course_template_details.classroom_id)
-    # add new_course to pubsub topic for both course work and roaster changes
-    classroom_crud.enable_notifications(new_course["id"], "COURSE_WORK_CHANGES")
-    classroom_crud.enable_notifications(new_course["id"],
-                                        "COURSE_ROSTER_CHANGES")
-    # add instructional designer
-    list_course_template_enrollment_mapping = CourseTemplateEnrollmentMapping\
-      .fetch_all_by_course_template(course_template_details.key)
-    if list_course_template_enrollment_mapping:
-      for course_template_mapping in list_course_template_enrollment_mapping:
-        try:
-          add_instructional_designer_into_section(section,
-                                                  course_template_mapping)
-        except Exception as error:
-          error = traceback.format_exc().replace("\n", " ")
-          Logger.error(f"Create teacher failed for \
-              for {course_template_details.instructional_designer}")
-          Logger.error(error)
-
-    #If topics are present in course create topics returns a dict
-    # with keys a current topicID and new topic id as values
-    if topics is not None:
-      topic_id_map = classroom_crud.create_topics(new_course["id"], topics)
-    # Calling function to get edit_url and view url of
-    # google form which returns
-    # a dictionary of view_links as keys and edit
-    #  links/  and file_id as values for all drive files
-    # url_mapping = classroom_crud.get_edit_url_and_view_url_mapping_of_folder(
-    #   current_course["teacherFolder"]["id"])
-
-    # Get coursework of current course and create a new course
+    if not checkpoint.get("topics_copied"):
+      # add new_course to pubsub topic for both course work and roaster changes
+      classroom_crud.enable_notifications(new_course["id"],
+                                          "COURSE_WORK_CHANGES")
+      classroom_crud.enable_notifications(new_course["id"],
+                                          "COURSE_ROSTER_CHANGES")
+      # add instructional designer
+      list_course_template_enrollment_mapping = CourseTemplateEnrollmentMapping\
+        .fetch_all_by_course_template(course_template_details.key)
+      if list_course_template_enrollment_mapping:
+        for course_template_mapping in list_course_template_enrollment_mapping:
+          try:
+            add_instructional_designer_into_section(section,
+                                                    course_template_mapping)
+          except Exception as error:
+            error = traceback.format_exc().replace("\n", " ")
+            Logger.error(f"Create teacher failed for \
+                for {course_template_details.instructional_designer}")
+            Logger.error(error)
+
+      #If topics are present in course create topics returns a dict
+      # with keys a current topicID and new topic id as values
+      topic_id_map = {}
+      if topics is not None:
+        topic_id_map = classroom_crud.create_topics(new_course["id"], topics)
+      checkpoint["topics_copied"] = True
+      lms_job.checkpoint = checkpoint
+      lms_job.update()
+    else:
+      # Topic names are unique in a classroom, map the topics copied before
+      new_topic_ids = {
+          topic["name"]: topic["topicId"]
+          for topic in classroom_crud.get_topics(new_course["id"]) or []}
+      topic_id_map = {
+          topic["topicId"]: new_topic_ids[topic["name"]]
+          for topic in topics or [] if topic["name"] in new_topic_ids}
+
+    # Copy the coursework and the coursework materials of current course
+    # into the new course, skipping what a previous run already copied
+    course_copy = CourseCopy(lms_job=lms_job,
+                             source_course_id=course_template_details.classroom_id,
+                             course_id=new_course["id"],
+                             target_folder_id=target_folder_id,
+                             section_id=section_id,
+                             source_context_id=course_template_details.id)
     coursework_list = classroom_crud.get_coursework_list(
         course_template_details.classroom_id)
-
-    # final_coursewok=[]
-    for coursework in coursework_list:
-      coursework_lti_assignment_ids = []
-      try:
-        #Check if a coursework is linked to a topic if yes then
-        # replace the old topic id to new topic id using topic_id_map
-
-        lti_assignment_details = {
-            "section_id": section_id,
-            "source_context_id": course_template_details.id,
-            "coursework_title": coursework["title"],
-            "start_date": None,
-            "end_date": None,
-            "due_date": None
-        }
-
-        # Update the due date of the course work if exists
-        if coursework.get("dueDate"):
-          coursework_due_date = coursework.get("dueDate")
-
-          if coursework.get("dueTime"):
-            coursework_due_time = coursework.get("dueTime")
-            coursework_due_datetime = datetime.datetime(
-                coursework_due_date.get("year"),
-                coursework_due_date.get("month"),
-                coursework_due_date.get("day"),
-                coursework_due_time.get("hours", 0),
-                coursework_due_time.get("minutes", 0))
-          else:
-            coursework_due_datetime = datetime.datetime(
-                coursework_due_date.get("year"),
-                coursework_due_date.get("month"),
-                coursework_due_date.get("day"))
-
-          curr_utc_timestamp = datetime.datetime.utcnow()
-          lti_assignment_details["start_date"] = (
-              cohort_details.start_date).strftime("%Y-%m-%dT%H:%M:%S%z")
-
-          if coursework_due_datetime < curr_utc_timestamp:
-            # Commented for now as the due dates are supposed to be updated by the user before
-            # starting the copy course process
-
-            # coursework["dueDate"] = {
-            #   "year": cohort_details.end_date.year,
-            #   "month": cohort_details.end_date.month,
-            #   "day": cohort_details.end_date.day
-            # }
-            # coursework["dueTime"] = {
-            #   "hours": cohort_details.end_date.hour,
-            #   "minutes": cohort_details.end_date.minute
-            # }
-
-            lti_assignment_details["end_date"] = lti_assignment_details[
-                "due_date"] = (
-                    cohort_details.end_date).strftime("%Y-%m-%dT%H:%M:%S%z")
-
-          else:
-            lti_assignment_details["end_date"] = lti_assignment_details[
-                "due_date"] = coursework_due_datetime.strftime(
-                    "%Y-%m-%dT%H:%M:%S%z")
-
-        if "topicId" in coursework.keys():
-          coursework["topicId"] = topic_id_map[coursework["topicId"]]
-        #Check if a material is present in coursework
-        if "materials" in coursework.keys():
-          coursework_update_output = update_coursework_material(
-              materials=coursework["materials"],
-              target_folder_id=target_folder_id,
-              error_flag=error_flag,
-              lti_assignment_details=lti_assignment_details,
-              logs=logs)
-          coursework["materials"] = coursework_update_output["material"]
-          error_flag = coursework_update_output["error_flag"]
-          coursework_lti_assignment_ids.extend(
-              coursework_update_output["lti_assignment_ids"])
-        # final_coursewok.append(coursework)
-
-        coursework_data = classroom_crud.create_coursework(
-            new_course["id"], coursework)
-
-        for assignment_id in coursework_lti_assignment_ids:
-          coursework_id = coursework_data.get("id")
-          input_json = {"course_work_id": coursework_id}
-          # update assignment with new coursework id
-          lti_assignment_req = requests.patch(
-              f"http://classroom-shim/classroom-shim/api/v1/lti-assignment/{assignment_id}",
-              headers={
-                  "Authorization": f"Bearer {auth_client.get_id_token()}"
-              },
-              json=input_json,
-              timeout=60)
-
-          if lti_assignment_req.status_code != 200:
-            error_flag = True
-            error_msg = f"Failed to update assignment {assignment_id} with course work id \
-                          {coursework_id} due to error - {lti_assignment_req.text} with \
-                            status code - {lti_assignment_req.status_code} for course work"
-
-            logs["errors"].append(error_msg)
-            Logger.error(error_msg)
-
-          logs["info"].append(
-              f"Updated the course work id for new LTI assignment - {assignment_id}"
-          )
-          Logger.info(
-              f"Updated the course work id for new LTI assignment - {assignment_id}"
-          )
-
-      except Exception as error:
-        title = coursework["title"]
-        error_flag = True
-        logs["errors"].append(f"Error - {error} for '{title}'")
-        logs["errors"].append(f"Copy coursework failed for \
-              course_id {course_template_details.classroom_id} for '{title}'")
-        Logger.error(f"Copy coursework failed for \
-              course_id {course_template_details.classroom_id} for '{title}'")
-        error = traceback.format_exc().replace("\n", " ")
-        Logger.error(error)
-        continue
-
-    # # Create coursework in new course
-    # # return final_coursewok
-    # if final_coursewok is not None:
-    #   classroom_crud.create_coursework(new_course["id"],final_coursewok)
-    # Get the list of courseworkMaterial
-    # final_coursewok_material = []
+    course_copy.copy_items(coursework_list, COURSEWORK, topic_id_map,
+                           cohort_details)
     coursework_material_list = classroom_crud.get_coursework_material_list(
         course_template_details.classroom_id)
-    for coursework_material in coursework_material_list:
-      coursework_material_lti_assignment_ids = []
-      try:
-        #Check if a coursework material is linked to a topic if yes then
-        # replace the old topic id to new topic id using topic_id_map
-
-        lti_assignment_details = {
-            "section_id": section_id,
-            "source_context_id": course_template_details.id,
-            "coursework_title": coursework_material["title"],
-            "start_date": None,
-            "end_date": None,
-            "due_date": None
-        }
-
-        if "topicId" in coursework_material.keys():
-          coursework_material["topicId"] = topic_id_map[
-              coursework_material["topicId"]]
-        #Check if a material is present in coursework
-        if "materials" in coursework_material.keys():
-
-          coursework_material_update_output = update_coursework_material(
-              materials=coursework_material["materials"],
-              target_folder_id=target_folder_id,
-              error_flag=error_flag,
-              lti_assignment_details=lti_assignment_details,
-              logs=logs)
-
-          coursework_material["materials"] = coursework_material_update_output[
-              "material"]
-          error_flag = coursework_update_output["error_flag"]
-          coursework_material_lti_assignment_ids.extend(
-              coursework_update_output["lti_assignment_ids"])
-          print("Updated coursework material attached")
-
-        coursework_material_data = classroom_crud.create_coursework_material(new_course["id"],
-                                                coursework_material)
-
-        for assignment_id in coursework_material_lti_assignment_ids:
-          coursework_id = coursework_material_data.get("id")
-          input_json = {"course_work_id": coursework_id}
-          # update assignment with new coursework id
-          lti_assignment_req = requests.patch(
-              f"http://classroom-shim/classroom-shim/api/v1/lti-assignment/{assignment_id}",
-              headers={
-                  "Authorization": f"Bearer {auth_client.get_id_token()}"
-              },
-              json=input_json,
-              timeout=60)
-
-          if lti_assignment_req.status_code != 200:
-            error_flag = True
-            error_msg = f"Failed to update assignment {assignment_id} with course work id \
-                          {coursework_id} due to error - {lti_assignment_req.text} with \
-                            status code - {lti_assignment_req.status_code} for course work material"
-
-            logs["errors"].append(error_msg)
-            Logger.error(error_msg)
-
-          logs["info"].append(
-              f"Updated the id for course work material for new LTI assignment - {assignment_id}"
-          )
-          Logger.info(
-              f"Updated the id course work material for new LTI assignment - {assignment_id}"
-          )
-
-        # final_coursewok_material.append(coursework_material)
-      except Exception as error:
-        title = coursework_material["title"]
-        error_flag = True
-        Logger.error(f"Get coursework material failed for\
-        course_id {course_template_details.classroom_id} for {title}")
-
-        logs["errors"].append(f"Error - {error}")
-        logs["errors"].append(f"Get coursework material failed for\
-        course_id {course_template_details.classroom_id} for {title}")
-        error = traceback.format_exc().replace("\n", " ")
-        Logger.error(error)
-        continue
-
-    # # Create coursework in new course
-    # if final_coursewok_material is not None:
-    #   classroom_crud.create_coursework_material(new_course["id"],
-    #                                             final_coursewok_material)
+    course_copy.copy_items(coursework_material_list, COURSEWORK_MATERIAL,
+                           topic_id_map)
+    error_flag = course_copy.error_flag
 
     # Classroom copy is successful then the section status is changed to active
     if error_flag:
@@ -920,138 +743,6 @@ def sort_titles(courseworks):
   titles.sort()
   return titles
 
-def update_coursework_material(materials,
-                               target_folder_id,
-                               error_flag,
-                               lti_assignment_details=None,
-                               logs=None):
-  """Takes the material attached to any type of cursework and copy it in the
-    target folder Id also removes duplicates from material list
-  Args:
-    materials (list of dictionary): Coursework materials list which is obtained
-      from list coursework method
-    url_mapping (dict):Dict of view url as key and edit url, fileid as values
-    target_folder_id(str):Drive folder Id of section
-  Returns:
-    updated_material : (list of dict) returns a updated
-  """
-  drive_ids = []
-  youtube_ids = []
-  link_urls = []
-  updated_material = []
-  lti_assignment_ids = []
-  # Loop to check the different types of material attached to coursework
-  # 1.If a material is driveFile call called copy_material function which
-  #  copies is drivefile in target_folder_id and updates the driveFile
-  #  dict with new file id for section drive folder
-  # 2.If a material is YoutubeVideo or link check for duplicate youtube
-  #   video and link
-  # 3.If a material is form use url_mapping dictionary to get the file_id
-  # of form which is used to copy form in target_folder_id of section and
-  # attach form as link in coursework since attaching forms via api is not
-  # supported by classroom
-
-  for material in materials:
-    if "driveFile" in material.keys():
-      if material["driveFile"]["driveFile"]["id"] not in drive_ids:
-        classroom_crud.copy_material(material, target_folder_id)
-        drive_ids.append(material["driveFile"]["driveFile"]["id"])
-        updated_material.append({"driveFile": material["driveFile"]})
-
-    if "youtubeVideo" in material.keys():
-      if material["youtubeVideo"]["id"] not in youtube_ids:
-        youtube_ids.append(material["youtubeVideo"]["id"])
-        updated_material.append({"youtubeVideo": material["youtubeVideo"]})
-    if "link" in material.keys():
-      if material["link"]["url"] not in link_urls:
-        link = material["link"]
-
-        # Update lti assignment with the course work/course work material details
-        if "/classroom-shim/api/v1/launch?lti_assignment_id=" in link["url"]:
-          split_url = link["url"].split(
-              "/classroom-shim/api/v1/launch?lti_assignment_id=")
-          lti_assignment_id = split_url[-1]
-          coursework_title = lti_assignment_details.get("coursework_title")
-          logs["info"].append(
-              f"LTI Course copy started for assignment - {lti_assignment_id}, coursework title - '{coursework_title}'")
-          Logger.info(
-              f"LTI Course copy started for assignment - {lti_assignment_id}, coursework title - '{coursework_title}'")
-          copy_assignment = requests.post(
-              "http://classroom-shim/classroom-shim/api/v1/lti-assignment/copy",
-              headers={
-                  "Authorization": f"Bearer {auth_client.get_id_token()}"
-              },
-              json={
-                  "lti_assignment_id": lti_assignment_id,
-                  "context_id": lti_assignment_details.get("section_id"),
-                  "source_context_id": lti_assignment_details.get("source_context_id"),
-                  "start_date": lti_assignment_details.get("start_date"),
-                  "end_date": lti_assignment_details.get("end_date"),
-                  "due_date": lti_assignment_details.get("due_date")
-              },
-              timeout=60)
-
-          if copy_assignment.status_code == 200:
-            new_lti_assignment_id = copy_assignment.json().get("data").get(
-                "id")
-            updated_material_link_url = link["url"].replace(
-                lti_assignment_id, new_lti_assignment_id)
-            lti_assignment_ids.append(new_lti_assignment_id)
-
-            updated_material.append(
-                {"link": {
-                    "url": updated_material_link_url
-                }})
-            Logger.info(
-                f"LTI Course copy completed for assignment - {lti_assignment_id}, coursework title - '{coursework_title}', new assignment id - {new_lti_assignment_id}"
-            )
-            logs["info"].append(
-                f"LTI Course copy completed for assignment - {lti_assignment_id}, coursework title - '{coursework_title}', new assignment id - {new_lti_assignment_id}"
-            )
-          else:
-            logs["info"].append(
-                f"LTI Course copy failed for assignment - {lti_assignment_id}, coursework title - '{coursework_title}'"
-            )
-            error_msg = f"Copying an LTI Assignment failed for {lti_assignment_id}, coursework title - '{coursework_title}'\
-                          in the new section {lti_assignment_details.get('section_id')} with status code: \
-                          {copy_assignment.status_code} and error msg: {copy_assignment.text}"
-
-            logs["errors"].append(error_msg)
-            Logger.error(error_msg)
-            error_flag = True
-        else:
-          updated_material.append({"link": material["link"]})
-
-        link_urls.append(material["link"]["url"])
-
-    if "form" in material.keys():
-      if "title" not in material["form"].keys():
-        raise ResourceNotFound("Form to be copied is deleted")
-      # check_form = url_mapping.get(material["form"]["formUrl"])
-      # if not check_form:
-      #   raise ResourceNotFound("Google form attachment not found.\
-      #   Please verify if form is present classroom template drive folder")
-      form_url = material["form"]["formUrl"]
-      form_l = form_url.split("/")
-      form_id = form_l[-2]
-      Logger.info(f"This is form ID {form_id}")
-      result1 = classroom_crud.drive_copy(
-          form_id, target_folder_id,
-          material["form"]["title"])
-      material["link"] = {
-          "title": material["form"]["title"],
-          "url": result1["webViewLink"]
-      }
-      updated_material.append({"link": material["link"]})
-      material.pop("form")
-
-  return {
-      "material": updated_material,
-      "error_flag": error_flag,
-      "lti_assignment_ids": lti_assignment_ids
-  }
-
-
 def update_grades(material, section, coursework_id, lms_job_id, classroom_course):
   """Takes the forms all responses ,section, and coursework_id and
   updates the grades of student who have responsed to form and
@@ -44,10 +44,10 @@ def course_template_enrollment_instructional_designer_model(
 def get_user_id(user, headers):
   regex = r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b"
   if re.fullmatch(regex, user):
-    if classroom_crud.get_user_details_by_email(user_email=user.lower(),
-                                                headers=headers)["data"] != []:
-      return classroom_crud.get_user_details_by_email(
-          user_email=user.lower(), headers=headers)["data"][0]["user_id"]
+    result = classroom_crud.get_user_details_by_email(user_email=user.lower(),
+                                                      headers=headers)["data"]
+    if result != []:
+      return result[0]["user_id"]
     else:
       raise ResourceNotFoundException(f"user {user} not found")
   return user
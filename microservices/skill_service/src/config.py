@@ -85,6 +85,20 @@ SKILL_PARSER_RERANKED_THRESHOLD = 0.2
 # If the ratio (number of mapped children nodes)/(total number of child nodes)
 # crosses this threshold, the parent node is semantically similar to the query.
 RATIO_THRESHOLD = 0.5
+# Skill to node alignment scores passages with the "cross_encoder" or with
+# the dot product of "bi_encoder" embeddings, mapped from the threshold
+SKILL_TO_NODE_SCORER = os.getenv("SKILL_TO_NODE_SCORER", "cross_encoder")
+SKILL_TO_NODE_BI_ENCODER_THRESHOLD = float(
+  os.getenv("SKILL_TO_NODE_BI_ENCODER_THRESHOLD", "0.5"))
+# Skills scored together against a learning resource
+SKILL_TO_NODE_BATCH_SIZE = int(os.getenv("SKILL_TO_NODE_BATCH_SIZE", "32"))
+# Seconds the flattened topic tree of a learning resource is reused
+TOPIC_TREE_INDEX_TTL = int(os.getenv("TOPIC_TREE_INDEX_TTL", "600"))
+# Candidate documents read per Firestore get_all call and (query, doc)
+# pairs scored per CrossEncoder batch when reranking a batch of queries
+CANDIDATE_FETCH_BATCH_SIZE = int(
+  os.getenv("CANDIDATE_FETCH_BATCH_SIZE", "300"))
+RERANKER_BATCH_SIZE = int(os.getenv("RERANKER_BATCH_SIZE", "128"))
 
 DEPLOYMENT_NAME = os.getenv("DEPLOYMENT_NAME")
 CONTAINER_NAME = os.getenv("CONTAINER_NAME")
@@ -98,7 +112,28 @@ EMBEDDINGS_DIMENSION = 768
 APPROXIMATE_NEIGHBOR_COUNT = 50
 DISTANCE_MEASURE_TYPE = "DOT_PRODUCT_DISTANCE"
 LEAF_NODE_EMB_COUNT = 500
+# Number of texts encoded and appended to an embedding CSV at a time
+EMBEDDING_EXPORT_BATCH_SIZE = int(
+  os.getenv("EMBEDDING_EXPORT_BATCH_SIZE", "1024"))
 LEAF_NODES_TO_SEARCH_PRECENT = 70
+# Directory of the persistent embedding store reused by embedding exports,
+# disabled when empty. Should be a volume that outlives the batch jobs
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "")
+# Seconds an index id resolved from the matching engine is reused
+INDEX_ID_CACHE_TTL = int(os.getenv("INDEX_ID_CACHE_TTL", "300"))
+
+# Vector search backend, "matching_engine" or "local" for the in-process
+# index built from the exported embedding CSVs
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "matching_engine")
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "/tmp/vector_index")
+# Local indexes with at least this many vectors are IVF instead of exact
+VECTOR_INDEX_IVF_THRESHOLD = int(
+  os.getenv("VECTOR_INDEX_IVF_THRESHOLD", "50000"))
+VECTOR_INDEX_N_PROBE = int(os.getenv("VECTOR_INDEX_N_PROBE", "8"))
+# Seconds between checks whether the embeddings of a local index were
+# exported again, in which case the index is rebuilt
+VECTOR_INDEX_CHECK_INTERVAL = int(
+  os.getenv("VECTOR_INDEX_CHECK_INTERVAL", "300"))
 
 BI_ENCODER_MODELS = {
     "SKILL_PARSING": "all-mpnet-base-v2",
@@ -114,6 +149,10 @@ CROSS_ENCODER_MODELS = {
     "SKILL_TO_PASSAGE": "cross-encoder/ms-marco-MiniLM-L-12-v2"
 }
 
+# Parameters of the loaded encoder models kept per process before the
+# least recently used one is evicted, 0 for no limit
+MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+
 PAYLOAD_FILE_SIZE = 2097152 #2MB
 
 ERROR_RESPONSES = {
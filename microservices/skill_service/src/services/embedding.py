@@ -1,79 +1,116 @@
 """Module to create and save embedding to Embedding Database"""
 
-from sentence_transformers import SentenceTransformer, CrossEncoder
 from services.data_source import update_data_source_fields
 import numpy as np
-from torch import nn
 import pandas as pd
 import json
 import uuid
 import requests
 import time
 import os
-from common.utils.gcs_adapter import upload_blob
+import shutil
+import hashlib
+from google.cloud import storage
+from common.utils.gcs_adapter import upload_blob, download_blob
 from common.utils.logging_handler import Logger
+from services.model_registry import get_bi_encoder, get_cross_encoder
+from services.embedding_cache import get_embedding_store, text_digest
+from services.vector_index import (IndexRegistry, build_index,
+  read_embedding_csvs, to_matching_engine_response)
 from config import (
   MATCHING_ENGINE_BUCKET_NAME, SERVICES, EMBEDDING_ENDPOINT_ID,
   EMBEDDINGS_DIMENSION,
   APPROXIMATE_NEIGHBOR_COUNT,
   DISTANCE_MEASURE_TYPE,
   LEAF_NODE_EMB_COUNT,
-  LEAF_NODES_TO_SEARCH_PRECENT
+  LEAF_NODES_TO_SEARCH_PRECENT,
+  EMBEDDING_EXPORT_BATCH_SIZE,
+  EMBEDDING_CACHE_DIR,
+  CANDIDATE_FETCH_BATCH_SIZE,
+  RERANKER_BATCH_SIZE,
+  INDEX_ID_CACHE_TTL,
+  VECTOR_INDEX_BACKEND,
+  VECTOR_INDEX_DIR,
+  VECTOR_INDEX_IVF_THRESHOLD,
+  VECTOR_INDEX_N_PROBE,
+  VECTOR_INDEX_CHECK_INTERVAL
 )
 
 # pylint: disable=broad-exception-raised,consider-using-f-string
 
 class Embedding():
-  """Creates Embeddings and save to Embedding Database"""
-  bi_encoders = {
-    "all-mpnet-base-v2": SentenceTransformer("all-mpnet-base-v2"),
-    "msmarco-bert-base-dot-v5": SentenceTransformer(
-      "msmarco-bert-base-dot-v5")
-  }
-
-  cross_encoders = {
-    "cross-encoder/ms-marco-MiniLM-L-12-v2": CrossEncoder(
-                                "cross-encoder/ms-marco-MiniLM-L-12-v2",
-                                default_activation_function=nn.Sigmoid()),
-    "cross-encoder/nli-distilroberta-base": CrossEncoder(
-                                "cross-encoder/nli-distilroberta-base",
-                                default_activation_function=nn.Sigmoid()),
-    "cross-encoder/stsb-roberta-large": CrossEncoder(
-                                "cross-encoder/stsb-roberta-large",
-                                default_activation_function=nn.Sigmoid())
-  }
+  """Creates Embeddings and save to Embedding Database. The encoder
+  models are loaded on first use and shared through the model registry"""
+
+  # (display_name, check_deployed) -> (expiry, (exists, index_id))
+  index_ids = {}
+  local_indexes = IndexRegistry(VECTOR_INDEX_DIR)
+  # index_name -> time of the next check of its exported embeddings
+  local_index_checks = {}
 
   def __init__(
       self,
       bi_encoder_model_name,
       cross_encoder_model_name,
       max_seq_length = 256):
-    Embedding.bi_encoders[
-      bi_encoder_model_name].max_seq_length = max_seq_length
-    Embedding.cross_encoders[
-      cross_encoder_model_name].max_seq_length = max_seq_length
-    self.bi_encoder = Embedding.bi_encoders[bi_encoder_model_name]
-    self.cross_encoder = Embedding.cross_encoders[cross_encoder_model_name]
-
-  def generate_embeddings(self, docs):
+    self.bi_encoder_model_name = bi_encoder_model_name
+    self.cross_encoder_model_name = cross_encoder_model_name
+    self.max_seq_length = max_seq_length
+    self.embedding_store = None
+    if EMBEDDING_CACHE_DIR:
+      self.embedding_store = get_embedding_store(
+        EMBEDDING_CACHE_DIR, bi_encoder_model_name, max_seq_length)
+
+  @property
+  def bi_encoder(self):
+    return get_bi_encoder(self.bi_encoder_model_name, self.max_seq_length)
+
+  @property
+  def cross_encoder(self):
+    return get_cross_encoder(self.cross_encoder_model_name,
+                             self.max_seq_length)
+
+  def generate_embeddings(self, docs, use_cache=False):
     """
     Method to generate document embeddings
 
     Args:
       docs (List[str]): List of texts to be converted into embeddings
+      use_cache (bool): reuse the embeddings of texts encoded before and
+        store the new ones, when EMBEDDING_CACHE_DIR is set
 
     Returns:
       embeddings: List of generated embeddings
     """
+    if not use_cache or self.embedding_store is None:
+      return self._encode(docs)
+    digests = [text_digest(doc) for doc in docs]
+    cached = self.embedding_store.get_many(digests)
+    missing = {}
+    for digest, doc in zip(digests, docs):
+      if digest not in cached:
+        missing.setdefault(digest, doc)
+    Logger.info("Embedding cache hits: {} of {}".format(
+      len(docs) - sum(d not in cached for d in digests), len(docs)))
+    if missing:
+      embeddings = self._encode(list(missing.values()))
+      self.embedding_store.add(list(missing), embeddings)
+      cached.update(zip(missing, embeddings))
+    embeddings = np.stack([cached[digest] for digest in digests])
+    return embeddings / np.linalg.norm(embeddings, axis=1)[:, None]
+
+  def _encode(self, docs):
+    """Encodes texts with the bi_encoder into normalized embeddings"""
     embeddings = self.bi_encoder.encode(
       docs, convert_to_numpy=True, show_progress_bar=True)
     embeddings = embeddings / np.linalg.norm(embeddings, axis=1)[:, None]
     return embeddings
 
-  def search_docs(self, queries, top_k): # pylint: disable=W0613
+  def search_docs(self, queries, top_k):
     """
     Given a list of queries, this method returns the top_k matches
-    from the bi_encoder search result
+    from the bi_encoder search result. top_k is only honoured by the local
+    backend, the matching engine returns its configured neighbor count
 
     Args:
       queries List(str) - List of all queries
@@ -82,10 +119,92 @@ class Embedding():
     Results:
       doc_ids List(str) - Firestore document ids of each skill candidate
     """
-    skill_embeddings = self.generate_embeddings(queries).tolist()
-    doc_ids = self.batch_search_ann_service(self.DB_INDEX, skill_embeddings)
+    skill_embeddings = self.generate_embeddings(queries)
+    if VECTOR_INDEX_BACKEND == "local":
+      return self.search_local_index(self.DB_INDEX, skill_embeddings, top_k)
+    doc_ids = self.batch_search_ann_service(
+      self.DB_INDEX, skill_embeddings.tolist())
     return doc_ids
 
+  def search_local_index(self, index_name, query_embeddings, top_k):
+    """
+    Given a list of query embeddings, this method retrieves the top k
+    documents from the in-process index
+
+    Args:
+      index_name (str) - index to search
+      query_embeddings (np.ndarray) - n X 768 dimension query vectors
+      top_k (int) - number of expected results
+
+    Results:
+      prediction (list) - document ids and distances of each query vector,
+        in the format of the ANN matching service
+    """
+    index = self.get_local_index(index_name)
+    if index is None:
+      raise Exception("Please create an embeddings index first.")
+    return to_matching_engine_response(index.search(query_embeddings, top_k))
+
+  def get_local_index(self, index_name):
+    """Returns the in-process index, building it from the embedding CSVs
+    exported for the index if this pod has not saved it yet, or rebuilding
+    it once the embeddings were exported again, e.g. by another pod.
+    Returns None if no embeddings were exported"""
+    index = Embedding.local_indexes.get(index_name)
+    gcs_path = "gs://{}/matching-engine/{}".format(
+      MATCHING_ENGINE_BUCKET_NAME, index_name)
+    if index is None:
+      return self.build_local_index(gcs_path, index_name)
+    now = time.monotonic()
+    if Embedding.local_index_checks.get(index_name, 0) > now:
+      return index
+    Embedding.local_index_checks[index_name] = \
+      now + VECTOR_INDEX_CHECK_INTERVAL
+    generation = self.get_export_generation(gcs_path)
+    if generation is not None and generation != index.generation:
+      Logger.info("Embeddings of local index {} were exported again".format(
+        index_name))
+      index = self.build_local_index(gcs_path, index_name) or index
+    return index
+
+  @staticmethod
+  def get_export_generation(gcs_path):
+    """Returns a digest of the names and GCS generations of the embedding
+    CSVs exported under gcs_path, None if there are none"""
+    bucket_name, prefix = gcs_path.replace("gs://", "").split("/", 1)
+    blobs = sorted(
+      "{}#{}".format(blob.name, blob.generation)
+      for blob in storage.Client().list_blobs(
+        bucket_name, prefix=prefix + "/"))
+    if not blobs:
+      return None
+    return hashlib.sha256("\n".join(blobs).encode("utf-8")).hexdigest()
+
+  def build_local_index(self, gcs_path, index_name):
+    """Downloads the embedding CSVs of an index and builds, saves and
+    serves the in-process index from them
+    Args:
+      gcs_path: str - GCS path of embedding CSV files
+      index_name: str - Name of index to build
+    Returns:
+      index - the built index, None if there are no CSV files"""
+    generation = self.get_export_generation(gcs_path)
+    folder = os.path.join(VECTOR_INDEX_DIR, index_name + "-csv")
+    shutil.rmtree(folder, ignore_errors=True)
+    try:
+      download_blob(gcs_path, folder)
+      if not os.path.isdir(folder):
+        return None
+      ids, vectors = read_embedding_csvs(folder)
+    finally:
+      shutil.rmtree(folder, ignore_errors=True)
+    index = build_index(ids, vectors, VECTOR_INDEX_IVF_THRESHOLD,
+                        VECTOR_INDEX_N_PROBE)
+    Embedding.local_indexes.put(index_name, index, generation)
+    Logger.info("Built local {} index {} with {} embeddings".format(
+      index.index_type, index_name, len(index)))
+    return Embedding.local_indexes.get(index_name)
+
 
   def batch_search_ann_service(self, index_name, query_embeddings):
     """
@@ -124,7 +243,7 @@ class Embedding():
       raise Exception("Please create an embeddings index first.")
 
 
-  def rerank_docs(self, query_doc_list):
+  def rerank_docs(self, query_doc_list, batch_size=32):
     """
     Given a list of query and bi_encoder retrieved docs,
     this method reranks the docs
@@ -132,16 +251,88 @@ class Embedding():
     Args:
       query_doc_list List[List[str]] -
         Two dimensional list containing query doc pair
+      batch_size (int) - number of pairs scored per model call
 
     Returns: scores for each pair of query and doc
     """
-    scores = self.cross_encoder.predict(query_doc_list)
+    scores = self.cross_encoder.predict(query_doc_list, batch_size=batch_size)
     scores = [np.round(score.item(), 3) for score in scores]
     return scores
 
+  def rerank_candidates(self, queries, search_results, model, text_func):
+    """
+    Reranks the bi_encoder candidates of a batch of queries. Candidate ids
+    are de-duplicated across the queries and read with batched get_all
+    calls, and the (query, doc) pairs of all the queries are scored in
+    large CrossEncoder batches. Throughput metrics of the last call are
+    kept in self.rerank_metrics
+
+    Args:
+      queries List(str) - List of all queries
+      search_results (list) - search_docs result for the queries
+      model - FireO model class of the indexed documents
+      text_func (callable) - returns the reranker text of a document
+
+    Returns:
+      candidates List[List[Tuple[str, Model, float]]] - (doc id, doc, score)
+        of the candidates of each query in search order. Candidates that
+        are deleted or no longer exist are skipped
+    """
+    start = time.perf_counter()
+    doc_ids = [[candidate["id"] for candidate in result.values()]
+               for result in search_results]
+    unique_ids = list(dict.fromkeys(
+      doc_id for query_doc_ids in doc_ids for doc_id in query_doc_ids))
+    docs = {}
+    for i in range(0, len(unique_ids), CANDIDATE_FETCH_BATCH_SIZE):
+      chunk = unique_ids[i:i + CANDIDATE_FETCH_BATCH_SIZE]
+      docs.update(zip(chunk, model.get_by_ids(chunk)))
+    fetch_seconds = time.perf_counter() - start
+
+    texts = {}
+    pairs = []
+    candidates = []
+    for query, query_doc_ids in zip(queries, doc_ids):
+      query_candidates = []
+      for doc_id in query_doc_ids:
+        doc = docs.get(doc_id)
+        if doc is None or doc.deleted_at_timestamp is not None:
+          continue
+        if doc_id not in texts:
+          texts[doc_id] = text_func(doc)
+        pairs.append([query, texts[doc_id]])
+        query_candidates.append((doc_id, doc))
+      candidates.append(query_candidates)
+    missing = len(unique_ids) - len(texts)
+    if missing:
+      Logger.warning("{} candidates of {} were not found".format(
+        missing, model.collection_name))
+
+    start = time.perf_counter()
+    scores = iter(self.rerank_docs(pairs, batch_size=RERANKER_BATCH_SIZE)
+                  if pairs else [])
+    rerank_seconds = time.perf_counter() - start
+    self.rerank_metrics = {
+      "queries": len(queries),
+      "candidates": sum(len(query_doc_ids) for query_doc_ids in doc_ids),
+      "unique_docs": len(unique_ids),
+      "read_batches": -(-len(unique_ids) // CANDIDATE_FETCH_BATCH_SIZE),
+      "pairs": len(pairs),
+      "fetch_seconds": round(fetch_seconds, 3),
+      "rerank_seconds": round(rerank_seconds, 3),
+      "pairs_per_second": round(len(pairs) / rerank_seconds, 1)
+        if rerank_seconds else None
+    }
+    Logger.info("Reranked candidates: {}".format(self.rerank_metrics))
+    return [[(doc_id, doc, float(next(scores)))
+             for doc_id, doc in query_candidates]
+            for query_candidates in candidates]
+
   def check_index_exist(self, display_name, check_deployed=False):
     """
-    Check if an index with a "display_name" exists in ANN service
+    Check if an index with a "display_name" exists in ANN service, or in
+    process for the local backend. Existing indexes are cached for
+    INDEX_ID_CACHE_TTL seconds so queries do not list all the indexes
 
     Args:
       display_name - display name for the index
@@ -151,6 +342,12 @@ class Embedding():
       exists (bool) - True if index exists, else False
       index_id (str) - index id with the display name
     """
+    if VECTOR_INDEX_BACKEND == "local":
+      return (self.get_local_index(display_name) is not None, display_name)
+    cache_key = (display_name, check_deployed)
+    cached = Embedding.index_ids.get(cache_key)
+    if cached and cached[0] > time.monotonic():
+      return cached[1]
     exists = False
     index_id = None
     data = json.loads(
@@ -172,8 +369,17 @@ class Embedding():
         if index_info["display_name"] == display_name:
           exists = True
           index_id = index_info["index_id"]
+    if exists:
+      Embedding.index_ids[cache_key] = (
+        time.monotonic() + INDEX_ID_CACHE_TTL, (exists, index_id))
     return (exists, index_id)
 
+  @classmethod
+  def invalidate_index_id(cls, display_name):
+    """Drops the cached index ids of an index after it is (re)created"""
+    for check_deployed in (False, True):
+      cls.index_ids.pop((display_name, check_deployed), None)
+
   def populate_embedding_db(
       self, gcs_path, index_name, index_desc, object_type=None):
     """Populate the embedding database and deploy the index
@@ -185,6 +391,11 @@ class Embedding():
       object_type: str - type of object (skill/knowledge)
     Returns:
       None"""
+    if VECTOR_INDEX_BACKEND == "local":
+      if self.build_local_index(gcs_path, index_name) is None:
+        raise Exception("Failed to created index")
+      return
+    self.invalidate_index_id(index_name)
     output = self.update_matching_engine_index(
       gcs_path, index_name, index_desc)
     Logger.info("INDEX CREATED : {}".format(output))
@@ -203,6 +414,7 @@ class Embedding():
       self.DB_INDEX + "-deployed-index",
       output["name"],
       index_endpoint_id=EMBEDDING_ENDPOINT_ID)
+    self.invalidate_index_id(index_name)
 
 
   def update_matching_engine_index(
@@ -342,18 +554,59 @@ class Embedding():
     return:
       output: str - GCS bucket in which CSV is stored
     """
+    output, _ = self.export_embedding_records(
+      zip(doc_ids, docs), index_name, file_name)
+    return output
+
+  def export_embedding_records(
+      self, records, index_name, file_name=None,
+      batch_size=EMBEDDING_EXPORT_BATCH_SIZE):
+    """Generates the embeddings of a stream of records batch by batch,
+    appending them to the CSV so only one batch of texts and embeddings is
+    held in memory, and exports the csv to GCS
+    Args:
+      records: Iterable[Tuple[str, str]] - (doc id, text) pairs
+      index_name: str - Name of Index to store embeddings
+      file_name: str - Name of csv file
+      batch_size: int - number of texts to encode at a time
+    return:
+      output: str - GCS bucket in which CSV is stored, None if there were
+        no records
+      count: int - number of exported records
+    """
     if file_name:
       file_name = file_name + ".csv"
     else:
       file_name = str(uuid.uuid4()) + ".csv"
 
-    embeddings = self.generate_embeddings(docs)
-    df = pd.DataFrame(doc_ids)
-    df = pd.concat([df, pd.DataFrame(embeddings)], axis=1)
-    df.to_csv(file_name, index=False,header=False)
+    count = 0
+    with open(file_name, "w", encoding="utf-8") as csv_file:
+      doc_ids, docs = [], []
+      for doc_id, doc in records:
+        doc_ids.append(doc_id)
+        docs.append(doc)
+        if len(docs) == batch_size:
+          self._append_embeddings_csv(csv_file, doc_ids, docs)
+          count += len(docs)
+          doc_ids, docs = [], []
+      if docs:
+        self._append_embeddings_csv(csv_file, doc_ids, docs)
+        count += len(docs)
+    if self.embedding_store is not None:
+      self.embedding_store.flush()
+    if not count:
+      os.remove(file_name)
+      return None, 0
     blob_name = "matching-engine/" + index_name
     blob_with_filename = blob_name + "/" + file_name
     upload_blob(MATCHING_ENGINE_BUCKET_NAME, file_name, blob_with_filename)
     os.remove(file_name)
     output = "gs://{}/{}".format(MATCHING_ENGINE_BUCKET_NAME, blob_name)
-    return output
+    return output, count
+
+  def _append_embeddings_csv(self, csv_file, doc_ids, docs):
+    """Encodes a batch of texts and appends the rows to an open CSV file"""
+    embeddings = self.generate_embeddings(docs, use_cache=True)
+    df = pd.DataFrame(doc_ids)
+    df = pd.concat([df, pd.DataFrame(embeddings)], axis=1)
+    df.to_csv(csv_file, index=False, header=False)
@@ -0,0 +1,125 @@
+"""Persistent store of bi-encoder embeddings keyed by text hash
+
+Embeddings are stored per (model name, max_seq_length) as float16 shards of
+.npy arrays, memory mapped on load. A shard is a pair of files, the
+embeddings and the sha256 of the text of every row; the keys file is
+written last so a partially written shard is never read. Re-embedding a
+source then only encodes the texts that are new or changed.
+"""
+import hashlib
+import os
+import threading
+import uuid
+import numpy as np
+
+KEYS_SUFFIX = ".keys.npy"
+VECTORS_SUFFIX = ".vectors.npy"
+
+
+def text_digest(text):
+  """Returns the hex sha256 of a text as bytes"""
+  return hashlib.sha256(text.encode("utf-8")).hexdigest().encode("ascii")
+
+
+class EmbeddingStore():
+  """Embeddings of one model and max_seq_length, keyed by text digest.
+  Added embeddings are served from memory until flush writes them as a new
+  shard"""
+
+  def __init__(self, path, shard_size=4096):
+    self.path = path
+    self.shard_size = shard_size
+    self._shards = []
+    self._rows = {}
+    self._pending = {}
+    self._lock = threading.Lock()
+    os.makedirs(path, exist_ok=True)
+    self.reload()
+
+  def __len__(self):
+    return len(self._rows) + len(self._pending)
+
+  def reload(self):
+    """Indexes every complete shard of the store directory"""
+    with self._lock:
+      self._shards = []
+      self._rows = {}
+      for file_name in sorted(os.listdir(self.path)):
+        if not file_name.endswith(KEYS_SUFFIX):
+          continue
+        name = file_name[:-len(KEYS_SUFFIX)]
+        keys = np.load(os.path.join(self.path, file_name))
+        vectors = np.load(os.path.join(self.path, name + VECTORS_SUFFIX),
+                          mmap_mode="r")
+        shard = len(self._shards)
+        self._shards.append(vectors)
+        for row, key in enumerate(keys):
+          self._rows[bytes(key)] = (shard, row)
+
+  def get_many(self, digests):
+    """
+    Returns the stored embeddings of the given digests
+
+    Args:
+      digests (List[bytes]) - text digests
+
+    Returns:
+      embeddings (dict) - digest to float32 embedding, for the digests that
+        are stored
+    """
+    found = {}
+    for digest in digests:
+      if digest in found:
+        continue
+      vector = self._pending.get(digest)
+      if vector is None:
+        location = self._rows.get(digest)
+        if location is None:
+          continue
+        shard, row = location
+        vector = self._shards[shard][row]
+      found[digest] = np.asarray(vector, dtype=np.float32)
+    return found
+
+  def add(self, digests, embeddings):
+    """Adds embeddings, writing a shard once shard_size are pending"""
+    with self._lock:
+      for digest, vector in zip(digests, embeddings):
+        if digest not in self._rows:
+          self._pending[digest] = np.asarray(vector, dtype=np.float16)
+    if len(self._pending) >= self.shard_size:
+      self.flush()
+
+  def flush(self):
+    """Writes the pending embeddings as a new shard"""
+    with self._lock:
+      if not self._pending:
+        return
+      digests = list(self._pending)
+      name = "shard-{}".format(uuid.uuid4().hex)
+      vectors_path = os.path.join(self.path, name + VECTORS_SUFFIX)
+      keys_path = os.path.join(self.path, name + KEYS_SUFFIX)
+      np.save(vectors_path, np.stack([self._pending[d] for d in digests]))
+      # np.save appends .npy to paths that do not end with it
+      np.save(keys_path + ".tmp.npy", np.array(digests, dtype="S64"))
+      os.replace(keys_path + ".tmp.npy", keys_path)
+      shard = len(self._shards)
+      self._shards.append(np.load(vectors_path, mmap_mode="r"))
+      for row, digest in enumerate(digests):
+        self._rows[digest] = (shard, row)
+      self._pending = {}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_embedding_store(base_dir, model_name, max_seq_length):
+  """Returns the process wide store of a model and max_seq_length"""
+  key = (base_dir, model_name, max_seq_length)
+  with _stores_lock:
+    if key not in _stores:
+      directory = "{}-{}".format(model_name.replace("/", "--"),
+                                 max_seq_length)
+      _stores[key] = EmbeddingStore(os.path.join(base_dir, directory))
+    return _stores[key]
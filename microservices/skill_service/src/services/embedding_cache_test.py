@@ -0,0 +1,35 @@
+"""
+  Unit tests for the persistent embedding store
+"""
+import numpy as np
+from services.embedding_cache import (EmbeddingStore, get_embedding_store,
+                                      text_digest)
+
+
+def test_store_round_trip(tmp_path):
+  store = EmbeddingStore(str(tmp_path), shard_size=2)
+  texts = ["IT Privacy & Protection", "IT Security Framework", "Networking"]
+  digests = [text_digest(text) for text in texts]
+  vectors = np.random.default_rng(3).normal(size=(3, 8)).astype(np.float32)
+
+  store.add(digests[:1], vectors[:1])
+  assert set(store.get_many(digests)) == {digests[0]}
+  assert not list(tmp_path.iterdir())
+
+  store.add(digests[1:], vectors[1:])
+  assert len(list(tmp_path.glob("*.keys.npy"))) == 1
+
+  reopened = EmbeddingStore(str(tmp_path))
+  found = reopened.get_many(digests + [text_digest("unknown")])
+  assert set(found) == set(digests)
+  assert isinstance(reopened._shards[0], np.memmap)  # pylint: disable=protected-access
+  np.testing.assert_allclose(found[digests[2]], vectors[2], rtol=1e-3)
+
+
+def test_get_embedding_store_is_keyed_by_model_and_length(tmp_path):
+  store = get_embedding_store(str(tmp_path), "cross-encoder/model", 256)
+  assert get_embedding_store(str(tmp_path), "cross-encoder/model", 256) \
+    is store
+  assert get_embedding_store(str(tmp_path), "cross-encoder/model", 128) \
+    is not store
+  assert (tmp_path / "cross-encoder--model-256").is_dir()
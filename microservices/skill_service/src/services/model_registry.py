@@ -0,0 +1,141 @@
+"""Process wide registry of the bi-encoder and cross-encoder models
+
+Models are loaded on first use and shared by every Embedding subclass and
+SkillSimilarity. Models are registered per (model name, max_seq_length), so
+that the sequence length of a shared model is set once when it is loaded and
+never changed by another user of the model. When MODEL_MEMORY_BUDGET_MB is set, the least recently used
+models are evicted once the loaded models exceed the budget.
+"""
+import threading
+import time
+from collections import OrderedDict
+from sentence_transformers import SentenceTransformer, CrossEncoder
+from torch import nn
+from common.utils.logging_handler import Logger
+from config import MODEL_MEMORY_BUDGET_MB
+
+
+def model_size(model):
+  """Returns the bytes taken by the parameters of a model"""
+  module = model if hasattr(model, "parameters") else getattr(
+    model, "model", None)
+  if module is None:
+    return 0
+  return sum(p.numel() * p.element_size() for p in module.parameters())
+
+
+class ModelRegistry():
+  """Loads registered models on first use and keeps them in LRU order"""
+
+  def __init__(self, memory_budget=0):
+    """
+    Args:
+      memory_budget (int) - bytes of model parameters to keep loaded,
+        0 for no limit. The most recently used model is always kept
+    """
+    self.memory_budget = memory_budget
+    self.metrics = {}
+    self._loaders = {}
+    self._models = OrderedDict()
+    self._sizes = {}
+    self._lock = threading.Lock()
+    self._load_locks = {}
+
+  def register(self, name, loader):
+    """Registers the loader of a model, once per name"""
+    with self._lock:
+      if name not in self._loaders:
+        self._loaders[name] = loader
+        self._load_locks[name] = threading.Lock()
+        self.metrics[name] = {"loads": 0, "hits": 0, "evictions": 0,
+                              "load_seconds": 0.0, "bytes": 0}
+
+  def get(self, name):
+    """Returns a loaded model, loading it if needed"""
+    model = self._get_loaded(name)
+    if model is not None:
+      return model
+    if name not in self._loaders:
+      raise KeyError(f"Model {name} is not registered")
+    with self._load_locks[name]:
+      model = self._get_loaded(name)
+      if model is not None:
+        return model
+      start = time.perf_counter()
+      model = self._loaders[name]()
+      load_seconds = time.perf_counter() - start
+      size = model_size(model)
+      with self._lock:
+        self._models[name] = model
+        self._sizes[name] = size
+        metrics = self.metrics[name]
+        metrics["loads"] += 1
+        metrics["load_seconds"] = round(load_seconds, 3)
+        metrics["bytes"] = size
+        self._evict_over_budget()
+    Logger.info(f"Loaded model {name} in {load_seconds:.1f}s "
+                f"({size / 2**20:.0f} MB)")
+    return model
+
+  def evict(self, name):
+    """Unloads a model, it is loaded again on its next use"""
+    with self._lock:
+      if self._models.pop(name, None) is not None:
+        self._sizes.pop(name)
+        self.metrics[name]["evictions"] += 1
+
+  def loaded(self):
+    """Returns the names of the loaded models, least recently used first"""
+    return list(self._models)
+
+  def _get_loaded(self, name):
+    with self._lock:
+      model = self._models.get(name)
+      if model is not None:
+        self._models.move_to_end(name)
+        self.metrics[name]["hits"] += 1
+      return model
+
+  def _evict_over_budget(self):
+    while (self.memory_budget and len(self._models) > 1 and
+           sum(self._sizes.values()) > self.memory_budget):
+      name, _ = self._models.popitem(last=False)
+      self._sizes.pop(name)
+      self.metrics[name]["evictions"] += 1
+      Logger.info(f"Evicted model {name} to stay within the memory budget")
+
+
+model_registry = ModelRegistry(MODEL_MEMORY_BUDGET_MB * 2**20)
+
+
+def registry_name(model_name, max_seq_length=None):
+  """Returns the registry name of a model with a max_seq_length, the
+  default length of the model if None"""
+  if max_seq_length is None:
+    return model_name
+  return f"{model_name}@{max_seq_length}"
+
+
+def get_bi_encoder(model_name, max_seq_length=None):
+  """Returns the shared SentenceTransformer of a model and max_seq_length"""
+  def load():
+    model = SentenceTransformer(model_name)
+    if max_seq_length is not None:
+      model.max_seq_length = max_seq_length
+    return model
+  name = registry_name(model_name, max_seq_length)
+  model_registry.register(name, load)
+  return model_registry.get(name)
+
+
+def get_cross_encoder(model_name, max_seq_length=None):
+  """Returns the shared CrossEncoder of a model and max_seq_length"""
+  def load():
+    model = CrossEncoder(model_name,
+                         default_activation_function=nn.Sigmoid())
+    if max_seq_length is not None:
+      model.max_seq_length = max_seq_length
+    return model
+  name = registry_name(model_name, max_seq_length)
+  model_registry.register(name, load)
+  return model_registry.get(name)
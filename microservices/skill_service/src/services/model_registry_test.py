@@ -0,0 +1,55 @@
+"""
+  Unit tests for the model registry
+"""
+from types import SimpleNamespace
+from unittest import mock
+from services.model_registry import ModelRegistry, get_bi_encoder
+
+
+class FakeModel():
+  def __init__(self, size):
+    self.size = size
+
+  def parameters(self):
+    return [SimpleNamespace(numel=lambda: self.size, element_size=lambda: 1)]
+
+
+def test_models_load_once_on_first_use():
+  loads = []
+  registry = ModelRegistry()
+  registry.register("bi", lambda: loads.append("bi") or FakeModel(10))
+  assert not registry.loaded()
+
+  model = registry.get("bi")
+  assert registry.get("bi") is model
+  assert loads == ["bi"]
+  assert registry.metrics["bi"]["loads"] == 1
+  assert registry.metrics["bi"]["hits"] == 1
+  assert registry.metrics["bi"]["bytes"] == 10
+
+
+def test_least_recently_used_model_is_evicted_over_budget():
+  registry = ModelRegistry(memory_budget=25)
+  for name in ("a", "b", "c"):
+    registry.register(name, lambda: FakeModel(10))
+  registry.get("a")
+  registry.get("b")
+  registry.get("a")
+  registry.get("c")
+  assert registry.loaded() == ["a", "c"]
+  assert registry.metrics["b"]["evictions"] == 1
+
+  registry.get("b")
+  assert registry.metrics["b"]["loads"] == 2
+
+
+def test_encoders_are_registered_per_max_seq_length():
+  with mock.patch("services.model_registry.model_registry", ModelRegistry()), \
+    mock.patch("services.model_registry.SentenceTransformer",
+               side_effect=lambda name: SimpleNamespace(max_seq_length=512)):
+    short = get_bi_encoder("bi", 128)
+    long = get_bi_encoder("bi", 256)
+    assert short is not long
+    assert get_bi_encoder("bi", 128) is short
+    assert (short.max_seq_length, long.max_seq_length) == (128, 256)
+    assert get_bi_encoder("bi").max_seq_length == 512
@@ -53,34 +53,24 @@ class SearchSkillGraph(Embedding):
 
   def prepare_and_save_embeddings(self, documents):
     """Prepares input text from given documents and save the
-      embeddings
+      embeddings. The documents are consumed as a stream and encoded in
+      batches, so a level is never held in memory at once
 
       Args:
-        documents: list(FireoModels)
+        documents: Iterable[dict] - documents with id, name, description
+          and source_name keys, as yielded by BaseModel.iter_documents
     """
-    texts = []
-    doc_ids = []
-    filtered_documents = []
-    Logger.info("Len of documents: {}".format(len(documents)))
-    if self.source_name:
+    def records():
       for doc in documents:
-        if doc.source_name == self.source_name:
-          filtered_documents.append(doc)
-    else:
-      filtered_documents = documents
-    for doc in filtered_documents:
-      if self.level == "competency":
-        texts.append(self.prepare_text_for_embedding(
-          doc.name, doc.description))
-      else:
-        texts.append(self.prepare_text_for_embedding(
-          doc.name, doc.description))
-      doc_ids.append(doc.id)
-    Logger.info("Len texts: {}".format(len(texts)))
-    Logger.info("Len ids: {}".format(len(doc_ids)))
-    if doc_ids:
-      gcs_path = self.export_embedding_csv(
-        texts, doc_ids, self.DB_INDEX , self.DB_INDEX)
+        if self.source_name and doc.get("source_name") != self.source_name:
+          continue
+        yield doc["id"], self.prepare_text_for_embedding(
+          doc.get("name"), doc.get("description"))
+
+    gcs_path, count = self.export_embedding_records(
+      records(), self.DB_INDEX, self.DB_INDEX)
+    Logger.info("No of {} : {} ".format(self.level, count))
+    if count:
       self.populate_embedding_db(
         gcs_path, self.DB_INDEX, self.index_description, self.level)
     else:
@@ -91,12 +81,12 @@ class SearchSkillGraph(Embedding):
     in Skill Graph
     """
     level_obj = self.get_level_obj()
-    documents = level_obj.fetch_all_documents()
-    if not documents:
-      return
-    else:
-      Logger.info("No of {} : {} ".format(self.level, len(documents)))
-
+    filters = None
+    if self.source_name:
+      filters = [("source_name", "==", self.source_name)]
+    documents = level_obj.iter_documents(
+      fields=["name", "description", "source_name"], filters=filters,
+      as_dict=True)
     self.prepare_and_save_embeddings(documents)
 
   def get_level_obj(self):
@@ -130,22 +120,16 @@ class SearchSkillGraph(Embedding):
         for given query
     """
     document_ids = self.search_docs([query], self.BI_ENCODER_TOP_K)
-    document_ids = [doc_ids["id"] for _, doc_ids in document_ids[0].items()]
-    docs = []
-    level_obj = self.get_level_obj()
-    for doc_id in document_ids:
-      doc_obj = level_obj.find_by_id(doc_id)
-      docs.append(doc_obj)
+    candidates = self.rerank_candidates(
+      [query], document_ids, self.get_level_obj(),
+      lambda doc: self.prepare_text_for_embedding(doc.name, doc.description))
     matched = []
-    reranker_input = [[query, self.prepare_text_for_embedding(
-      doc.name, doc.description)] for doc in docs]
-    scores_passages = self.rerank_docs(reranker_input)
-    for i, score in enumerate(scores_passages):
-      name = docs[i].name
+    for doc_id, doc, score in candidates[0]:
+      name = doc.name
       if not name:
         name = ""
       matched.append({
-        "id": document_ids[i],
+        "id": doc_id,
         "name": name,
         "score": score
       })
@@ -236,25 +220,28 @@ class KnowledgeGraph(Embedding):
 
   def prepare_and_save_embeddings(self, documents):
     """Prepares input text from given documents and save the
-      embeddings
+      embeddings. The documents are consumed as a stream and encoded in
+      batches, so a level is never held in memory at once
 
       Args:
-        documents: list(FireoModels)
+        documents: Iterable[dict] - documents with id, title and
+          description keys, as yielded by BaseModel.iter_documents
     """
-    texts = []
-    doc_ids = []
-    Logger.info("Len of documents: {}".format(len(documents)))
-    for doc in documents:
-      if self.level in ["learning_units", "e2e_test_LU"]:
-        texts.append(self.prepare_text_for_embedding(doc.title))
-      else:
-        texts.append(self.prepare_text_for_embedding(
-            doc.title, doc.description))
-      doc_ids.append(doc.id)
-    Logger.info("Len texts: {}".format(len(texts)))
-    Logger.info("Len ids: {}".format(len(doc_ids)))
-    gcs_path = self.export_embedding_csv(
-            texts, doc_ids, self.level , self.level)
+    def records():
+      for doc in documents:
+        if self.level in ["learning_units", "e2e_test_LU"]:
+          text = self.prepare_text_for_embedding(doc.get("title"))
+        else:
+          text = self.prepare_text_for_embedding(
+            doc.get("title"), doc.get("description"))
+        yield doc["id"], text
+
+    gcs_path, count = self.export_embedding_records(
+      records(), self.level, self.level)
+    if not count:
+      Logger.info("No docs found for {}".format(self.level))
+      return
+    Logger.info("No of {} : {} ".format(self.level, count))
     self.populate_embedding_db(
           gcs_path, self.level, self.index_description, object_type="knowledge")
 
@@ -263,13 +250,8 @@ class KnowledgeGraph(Embedding):
     in Knowledge Graph
     """
     level_obj = self.get_level_obj()
-    documents = level_obj.fetch_all_documents()
-    if not documents:
-      Logger.info("No docs found for {}".format(self.level))
-      return
-    else:
-      Logger.info("No of {} : {} ".format(self.level, len(documents)))
-
+    documents = level_obj.iter_documents(
+      fields=["title", "description"], as_dict=True)
     self.prepare_and_save_embeddings(documents)
 
   def get_level_obj(self):
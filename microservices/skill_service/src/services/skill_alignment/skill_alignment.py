@@ -54,21 +54,17 @@ class SkillAlignment(Embedding):
     """
 
     document_ids = self.search_docs(queries, self.BI_ENCODER_TOP_K)
-    document_ids = [
-      [v["id"] for k, v in document.items()] for document in document_ids]
-    skill_docs = []
-    for doc_ids in document_ids:
-      skill_docs.append([Skill.find_by_uuid(id) for id in doc_ids])
+    candidates = self.rerank_candidates(
+      queries, document_ids, Skill,
+      lambda doc: SkillAlignment.prepare_text_for_embedding(
+        doc.name, doc.description))
     response_list = []
-    for query, doc_ids, skill_doc in zip(queries, document_ids, skill_docs):
+    for query_candidates in candidates:
       matched_skills = []
-      reranker_input = [[query, SkillAlignment.prepare_text_for_embedding(
-        doc.name, doc.description)] for doc in skill_doc]
-      scores_passages = self.rerank_docs(reranker_input)
-      for i, score in enumerate(scores_passages):
+      for doc_id, doc, score in query_candidates:
         matched_skills.append({
-          "name": skill_doc[i].name,
-          "id": doc_ids[i],
+          "name": doc.name,
+          "id": doc_id,
           "score": score
         })
       matched_skills = sorted(matched_skills,
@@ -89,6 +89,28 @@ def test_align_skills(clean_firestore, mocker, get_skill_alignment_object, add_s
   assert expected_response == response, "Expected response not same"
 
 
+def test_align_skills_batches_candidates(clean_firestore, mocker, get_skill_alignment_object, add_skills):
+  queries = ["IT Services", "IT Security"]
+
+  mocker.patch(
+    "services.skill_alignment.skill_alignment.SkillAlignment.search_docs",
+    return_value= [{"0": {"id": add_skills[0], "distance":0.678}, "1": {"id": add_skills[1], "distance": 0.878}},
+                   {"0": {"id": add_skills[1], "distance":0.778}, "1": {"id": "missing-skill", "distance": 0.578}}])
+  get_by_ids = mocker.spy(Skill, "get_by_ids")
+  rerank_docs = mocker.patch(
+    "services.skill_alignment.skill_alignment.SkillAlignment.rerank_docs",
+    return_value= [0.699, 0.579, 0.811])
+  response = get_skill_alignment_object.align_skills(queries, 5)
+
+  assert get_by_ids.call_count == 1
+  assert rerank_docs.call_count == 1
+  assert len(rerank_docs.call_args[0][0]) == 3
+  assert [[skill["id"] for skill in skills] for skills in response] == [[add_skills[0], add_skills[1]], [add_skills[1]]]
+  assert response[1][0]["score"] == 0.811
+  metrics = get_skill_alignment_object.rerank_metrics
+  assert metrics["unique_docs"] == 3 and metrics["pairs"] == 3
+
+
 @pytest.mark.parametrize("idx", [0,1,2])
 def test_align_skills_by_ids(clean_firestore, mocker, get_skill_alignment_object, add_skills, idx):
   update_flag = False
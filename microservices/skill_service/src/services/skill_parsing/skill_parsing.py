@@ -81,28 +81,16 @@ class SkillParser(Embedding):
       query = name + ". " + description
     top_k = req_body.get("top_k", 10)
     document_ids = self.search_docs([query], top_k)
-    document_ids = document_ids = [
-      [v["id"] for k, v in document.items()] for document in document_ids]
-    document_ids = [item for doc_id in document_ids for item in doc_id]
-    skill_desc = []
-    skill_name = []
-    skill_id = []
-    docs = []
-    for doc_id in document_ids:
-      doc_obj = Skill.find_by_uuid(doc_id)
-      if doc_obj.name not in skill_name:
-        skill_desc.append(doc_obj.description)
-        skill_name.append(doc_obj.name)
-        skill_id.append(doc_obj.uuid)
-        docs.append(doc_obj.to_dict())
-
-    reranker_input = self.create_reranker_input(query, skill_desc)
-    Logger.info("Created Re-ranked Input")
-    ranked_scores = self.rerank_docs(reranker_input)
+    candidates = self.rerank_candidates(
+      [query], document_ids, Skill, lambda doc: doc.description)
     Logger.info("Re-ranked the passages")
-    skills = [{"score": score.item(), "desc": desc, "name": name,
-          "id": id_} for score, desc, name, id_ in zip(
-        ranked_scores, skill_desc, skill_name, skill_id)]
+    skills = []
+    skill_names = set()
+    for _, doc, score in candidates[0]:
+      if doc.name not in skill_names:
+        skill_names.add(doc.name)
+        skills.append({"score": score, "desc": doc.description,
+                       "name": doc.name, "id": doc.uuid})
     filtered_skills = self.filter_docs(skills)
     ranked_skills = sorted(filtered_skills,
       key = lambda x: x["score"], reverse = True)
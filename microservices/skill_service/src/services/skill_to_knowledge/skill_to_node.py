@@ -1,13 +1,14 @@
 """Maps skill to nodes from topic tree of learning resource."""
 
-from common.models.knowledge import Concept, KnowledgeServiceLearningObjective, KnowledgeServiceLearningUnit, SubConcept
+import numpy as np
 from common.models import (Skill, KnowledgeServiceLearningContent)
 from common.utils.logging_handler import Logger
-from common.utils.parent_child_nodes_handler import ParentChildNodesHandler
-from services.skill_to_knowledge.skill_to_node_data import (Skill_Passage,
-                                                            Skill_LU, Skill_LO,
-                                                            Skill_SubConcept,
-                                                            Skill_Concept)
+from services.embedding import Embedding
+from services.skill_to_knowledge.topic_tree_index import get_topic_tree_index
+from config import (BI_ENCODER_MODELS, CROSS_ENCODER_MODELS,
+                    RERANKER_THRESHOLD, RERANKER_BATCH_SIZE,
+                    SKILL_TO_NODE_SCORER, SKILL_TO_NODE_BI_ENCODER_THRESHOLD,
+                    SKILL_TO_NODE_BATCH_SIZE)
 
 # pylint: disable=broad-exception-raised,invalid-name
 
@@ -24,6 +25,10 @@ class Skill_Query:
 class SkillNodeAlignment:
   """skill to knowledge node alignment"""
 
+  def __init__(self):
+    self.embedding = Embedding(BI_ENCODER_MODELS["SKILL_TO_PASSAGE"],
+                               CROSS_ENCODER_MODELS["SKILL_TO_PASSAGE"])
+
   def map_skill_to_nodes_by_ids(self, req_body, update_flag=False):
     """
     Given the skill ids, this method maps knowledge nodes from given
@@ -57,12 +62,13 @@ class SkillNodeAlignment:
     else:
       raise Exception("Both Skill ID and Source name cannot be empty.")
 
-    if skill_list:
-      for skill in skill_list:
-        Logger.info(f"Processing skill_id: {skill.uuid}")
-        query = skill.name if skill.source_name == "emsi" else skill.name +\
-            ". " + skill.description
-        response = self.map_nodes(query, learning_resource_ids)
+    for start in range(0, len(skill_list), SKILL_TO_NODE_BATCH_SIZE):
+      skills = skill_list[start:start + SKILL_TO_NODE_BATCH_SIZE]
+      Logger.info(f"Processing skills {start} to {start + len(skills)}")
+      queries = [skill.name if skill.source_name == "emsi" else skill.name +\
+            ". " + skill.description for skill in skills]
+      responses = self.map_nodes_batch(queries, learning_resource_ids)
+      for skill, response in zip(skills, responses):
         if response:
           response_dict[skill.uuid] = response
           aligned_nodes.append(response)
@@ -176,85 +182,50 @@ class SkillNodeAlignment:
                   all_mapped_lus - list containing all mapped learning unit
                                    firestore document ids
     """
-    response = {}
+    return self.map_nodes_batch([query], learning_resource_ids)[0]
+
+  def map_nodes_batch(self, queries, learning_resource_ids):
+    """Maps a batch of skills to the knowledge nodes of learning resources.
+      The passages of every learning resource are scored against all the
+      skills at once and the scores are rolled up the flattened topic tree
+      Args:
+        queries: List[str] - Skill name and/or description of each skill
+        learning_resource_ids - list of learning resource ids to use
+                                for knowledge nodes
+      Returns:
+        responses: List[dict] - map_nodes response of each skill
+    """
+    responses = [{} for _ in queries]
     for learning_resource_id in learning_resource_ids:
-      skill_to_passage_nodes = []
-      skill_to_lu_nodes = []
-      skill_to_lo_nodes = []
-      skill_to_subconcept_nodes = []
-      skill_to_concept_nodes = []
-      skill_to_lr_nodes = []
-      learning_resource = KnowledgeServiceLearningContent.find_by_id(
-        learning_resource_id)
-      lr_mapped = False
-      #learning_resource.load_tree()
-      lr_fields = learning_resource.get_fields()
-      lr_data = ParentChildNodesHandler.return_child_nodes_data(lr_fields)
-      lr_specific_concepts = []
-      for concept_dict in lr_data["child_nodes"]["concepts"]:
-        concept = Concept.find_by_uuid(concept_dict["uuid"])
-        concept_specific_subconcepts = []
-        for sub_concept_dict in concept_dict["child_nodes"]["sub_concepts"]:
-          sub_concept = SubConcept.find_by_uuid(sub_concept_dict["uuid"])
-          subconcept_specific_los = []
-          for learning_objective_dict in sub_concept_dict\
-            ["child_nodes"]["learning_objectives"]:
-            learning_objective = KnowledgeServiceLearningObjective.\
-              find_by_uuid(learning_objective_dict["uuid"])
-            lo_specific_lus = []
-            for learning_unit_dict in learning_objective_dict\
-              ["child_nodes"]["learning_units"]:
-              learning_unit = KnowledgeServiceLearningUnit.\
-                find_by_uuid(learning_unit_dict["uuid"])
-              passages = learning_unit.text.split("<p>")
-              lu_specific_passages = []
-              for i, passage in enumerate(passages):
-                metadata = {"passage_text": passage, "skill_description": query}
-                passage_id = learning_unit.id + "##" + str(i)
-                passage_title = learning_unit.title + "_##Passage_" + str(i)
-                skill_to_passage_node = Skill_Passage(passage_id, passage_title,
-                                                      metadata)
-                lu_specific_passages.append(skill_to_passage_node)
-                if skill_to_passage_node.mapped:
-                  skill_to_passage_nodes.append(skill_to_passage_node)
-                  if not lr_mapped:
-                    lr_mapped = True
-                    skill_to_lr_nodes.append(learning_resource_id)
-              skill_to_lu_node = Skill_LU(learning_unit.id, learning_unit.title,
-                                          lu_specific_passages)
-              if skill_to_lu_node.mapped:
-                skill_to_lu_nodes.append(skill_to_lu_node)
-              lo_specific_lus.append(skill_to_lu_node)
-            skill_to_lo_node = Skill_LO(learning_objective.id,
-                                        learning_objective.title,
-                                        lo_specific_lus)
-            if skill_to_lo_node.mapped:
-              skill_to_lo_nodes.append(skill_to_lo_node)
-            subconcept_specific_los.append(skill_to_lo_node)
-          skill_to_subconcept_node = Skill_SubConcept(sub_concept.id,
-                                                      sub_concept.title,
-                                                      subconcept_specific_los)
-          if skill_to_subconcept_node.mapped:
-            skill_to_subconcept_nodes.append(skill_to_subconcept_node)
-          concept_specific_subconcepts.append(skill_to_subconcept_node)
-        skill_to_concept_node = Skill_Concept(concept.id, concept.title,
-                                              concept_specific_subconcepts)
-        if skill_to_concept_node.mapped:
-          skill_to_concept_nodes.append(skill_to_concept_node)
-        lr_specific_concepts.append(skill_to_concept_node)
+      index = get_topic_tree_index(learning_resource_id)
+      passage_scores, threshold = self.score_passages(queries, index)
+      for response, lr_response in zip(
+        responses, index.align(passage_scores, threshold)):
+        response[learning_resource_id] = lr_response
+    return responses
 
-      response[learning_resource_id] = {}
-      response[learning_resource_id]["mapped_passages"] = \
-        self.filter_nodes(skill_to_passage_nodes)
-      response[learning_resource_id]["mapped_lus"] = \
-        self.filter_nodes(skill_to_lu_nodes)
-      response[learning_resource_id]["mapped_los"] = \
-        self.filter_nodes(skill_to_lo_nodes)
-      response[learning_resource_id]["mapped_subconcepts"] = \
-        self.filter_nodes(skill_to_subconcept_nodes)
-      response[learning_resource_id]["mapped_concepts"] = \
-        self.filter_nodes(skill_to_concept_nodes)
-    return response
+  def score_passages(self, queries, index):
+    """Scores every passage of a topic tree index against every skill
+      Args:
+        queries: List[str] - Skill name and/or description of each skill
+        index: TopicTreeIndex - index of a learning resource
+      Returns:
+        scores: np.ndarray - skills X passages similarity scores
+        threshold: float - score from which a node is mapped
+    """
+    if not index.passage_texts:
+      return np.zeros((len(queries), 0)), RERANKER_THRESHOLD
+    if SKILL_TO_NODE_SCORER == "bi_encoder":
+      if index.passage_embeddings is None:
+        index.passage_embeddings = self.embedding.generate_embeddings(
+          index.passage_texts, use_cache=True)
+      query_embeddings = self.embedding.generate_embeddings(queries)
+      return (query_embeddings @ index.passage_embeddings.T,
+              SKILL_TO_NODE_BI_ENCODER_THRESHOLD)
+    pairs = [[query, passage] for query in queries
+             for passage in index.passage_texts]
+    scores = self.embedding.rerank_docs(pairs, batch_size=RERANKER_BATCH_SIZE)
+    return (np.array(scores).reshape(len(queries), -1), RERANKER_THRESHOLD)
 
   def filter_nodes(self, list_nodes):
     """Returns dictionary of only those nodes which are mapped to the skill.
@@ -2,14 +2,14 @@
 
 # pylint: disable=invalid-name
 
-from services.embedding import Embedding
+from services.model_registry import get_cross_encoder
 
 from config import RERANKER_THRESHOLD
 
 # pylint: disable=redefined-builtin
 class Skill_Passage:
   """Skill to passage node alignment"""
-  model = Embedding.cross_encoders["cross-encoder/ms-marco-MiniLM-L-12-v2"]
+  CROSS_ENCODER_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-12-v2"
 
 
   def __init__(self, id, title, metadata) -> None:
@@ -43,7 +43,8 @@ class Skill_Passage:
       Returns:
         score: returns the weighted semantic similarity score
     """
-    score = Skill_Passage.model.predict(
+    score = get_cross_encoder(
+      Skill_Passage.CROSS_ENCODER_MODEL_NAME).predict(
         [metadata["skill_description"], metadata["passage_text"]]).tolist()
     return round(score, 3)
 
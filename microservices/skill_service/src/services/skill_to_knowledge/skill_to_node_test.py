@@ -203,8 +203,8 @@ def test_map_skill_to_nodes_by_ids(clean_firestore, mocker, add_data,
     ][idx]
 
   mocker.patch(
-    "services.skill_to_knowledge.skill_to_node.SkillNodeAlignment.map_nodes",
-    return_value = {"mapped_passages": [{"id": str(add_data[1].id)+"##0", "title": str(add_data[1].title)+"_##Passage_0", "score": 0.848}, {"id": str(add_data[2].id)+"##0", "title": str(add_data[2].title)+"_##Passage_0", "score": 0.934}], "mapped_lus": [{"id":add_data[1].id , "title": add_data[1].title, "score": 0.848}, {"id": add_data[2].id, "title": add_data[2].title, "score": 0.934}], "mapped_los": [{"id": add_data[6].id, "title": add_data[6].title, "score": 0.665}], "mapped_subcompetencies": [{"id": add_data[5].id, "title": add_data[5].title, "score": 0.665}], "mapped_competencies": [{"id": add_data[4].id, "title": add_data[4].title, "score": 0.665}, {"id": add_data[4].id, "title": add_data[4].title, "score": 0.665}], "mapped_learning_content": [add_data[0].id]})
+    "services.skill_to_knowledge.skill_to_node.SkillNodeAlignment.map_nodes_batch",
+    side_effect = lambda queries, learning_resource_ids: [{"mapped_passages": [{"id": str(add_data[1].id)+"##0", "title": str(add_data[1].title)+"_##Passage_0", "score": 0.848}, {"id": str(add_data[2].id)+"##0", "title": str(add_data[2].title)+"_##Passage_0", "score": 0.934}], "mapped_lus": [{"id":add_data[1].id , "title": add_data[1].title, "score": 0.848}, {"id": add_data[2].id, "title": add_data[2].title, "score": 0.934}], "mapped_los": [{"id": add_data[6].id, "title": add_data[6].title, "score": 0.665}], "mapped_subcompetencies": [{"id": add_data[5].id, "title": add_data[5].title, "score": 0.665}], "mapped_competencies": [{"id": add_data[4].id, "title": add_data[4].title, "score": 0.665}, {"id": add_data[4].id, "title": add_data[4].title, "score": 0.665}], "mapped_learning_content": [add_data[0].id]} for _ in queries])
 
   if expected_response == Exception:
     with pytest.raises(Exception) as exc:
@@ -0,0 +1,162 @@
+"""Flattened topic tree of a learning resource for skill to node alignment
+
+The passages of all the learning units of a learning resource are kept in
+tree order, so the children of every node are a contiguous range of the
+level below. Scoring a batch of skills is then one score matrix over the
+passages, rolled up level by level with segment sums.
+"""
+import threading
+import time
+import numpy as np
+from common.models import (KnowledgeServiceLearningContent, Concept,
+                           SubConcept, KnowledgeServiceLearningObjective,
+                           KnowledgeServiceLearningUnit)
+from common.utils.errors import ResourceNotFoundException
+from config import (RERANKER_THRESHOLD, RATIO_THRESHOLD,
+                    TOPIC_TREE_INDEX_TTL)
+
+# pylint: disable=invalid-name
+
+LEVELS = [
+  ("mapped_concepts", Concept, "sub_concepts"),
+  ("mapped_subconcepts", SubConcept, "learning_objectives"),
+  ("mapped_los", KnowledgeServiceLearningObjective, "learning_units"),
+  ("mapped_lus", KnowledgeServiceLearningUnit, None)
+]
+
+
+class TopicTreeLevel():
+  """Nodes of one level. The children of node i are the rows
+  offsets[i]:offsets[i + 1] of the level below"""
+
+  def __init__(self, key, ids, titles, offsets):
+    self.key = key
+    self.ids = ids
+    self.titles = titles
+    self.offsets = np.asarray(offsets, dtype=np.int64)
+
+
+class TopicTreeIndex():
+  """Passages of a learning resource with their ancestor levels"""
+
+  def __init__(self, learning_resource_id, levels, passage_ids,
+               passage_titles, passage_texts):
+    self.learning_resource_id = learning_resource_id
+    self.levels = levels
+    self.passage_ids = passage_ids
+    self.passage_titles = passage_titles
+    self.passage_texts = passage_texts
+    self.passage_lengths = np.array(
+      [len(text.split(" ")) for text in passage_texts], dtype=np.float64)
+    self.passage_embeddings = None
+    self.built_at = time.monotonic()
+
+  @classmethod
+  def build(cls, learning_resource_id):
+    """Reads the topic tree of a learning resource level by level, one
+    batched read per level"""
+    learning_resource = KnowledgeServiceLearningContent.find_by_id(
+      learning_resource_id)
+    child_ids = list(learning_resource.child_nodes.get("concepts", []))
+    levels = []
+    passage_ids, passage_titles, passage_texts = [], [], []
+    for key, model, child_collection in LEVELS:
+      nodes = model.get_by_ids(child_ids)
+      for node_id, node in zip(child_ids, nodes):
+        if node is None:
+          raise ResourceNotFoundException(
+            f"{model.collection_name} with uuid {node_id} not found")
+      child_ids = []
+      offsets = [0]
+      for node in nodes:
+        if child_collection:
+          child_ids.extend(node.child_nodes.get(child_collection, []))
+          offsets.append(len(child_ids))
+          continue
+        for i, passage in enumerate(node.text.split("<p>")):
+          passage_ids.append(node.id + "##" + str(i))
+          passage_titles.append(node.title + "_##Passage_" + str(i))
+          passage_texts.append(passage)
+        offsets.append(len(passage_ids))
+      levels.append(TopicTreeLevel(key, [node.id for node in nodes],
+                                   [node.title for node in nodes], offsets))
+    return cls(learning_resource_id, levels, passage_ids, passage_titles,
+               passage_texts)
+
+  def align(self, passage_scores, threshold=RERANKER_THRESHOLD):
+    """
+    Rolls passage scores up the topic tree
+
+    Args:
+      passage_scores (np.ndarray) - skills X passages similarity scores
+      threshold (float) - score from which a node is mapped
+
+    Returns:
+      responses List[dict] - mapped nodes of each level for every skill
+    """
+    scores = np.round(np.asarray(passage_scores, dtype=np.float64), 3)
+    mapped = scores >= threshold
+    lengths = self.passage_lengths
+    responses = [{"mapped_passages": _mapped_items(
+      self.passage_ids, self.passage_titles, row_scores, row_mapped)}
+      for row_scores, row_mapped in zip(scores, mapped)]
+    for level in reversed(self.levels):
+      scores, mapped, lengths = _rollup(scores, mapped, lengths,
+                                        level.offsets, threshold)
+      for response, row_scores, row_mapped in zip(responses, scores, mapped):
+        response[level.key] = _mapped_items(level.ids, level.titles,
+                                            row_scores, row_mapped)
+    ordered = []
+    for response in responses:
+      ordered.append({key: response[key] for key in (
+        "mapped_passages", "mapped_lus", "mapped_los", "mapped_subconcepts",
+        "mapped_concepts")})
+    return ordered
+
+
+def _rollup(scores, mapped, lengths, offsets, threshold):
+  """Scores the parents of a level as the length weighted mean of their
+  children. A parent is mapped if RATIO_THRESHOLD of its children are
+  mapped or its score crosses the threshold"""
+  counts = np.diff(offsets)
+  filled = counts > 0
+  starts = offsets[:-1][filled]
+  n_rows, n_parents = scores.shape[0], len(counts)
+  parent_lengths = np.zeros(n_parents)
+  weighted = np.zeros((n_rows, n_parents))
+  mapped_counts = np.zeros((n_rows, n_parents))
+  if len(starts):
+    parent_lengths[filled] = np.add.reduceat(lengths, starts)
+    weighted[:, filled] = np.add.reduceat(scores * lengths, starts, axis=1)
+    mapped_counts[:, filled] = np.add.reduceat(
+      mapped.astype(np.float64), starts, axis=1)
+  with np.errstate(divide="ignore", invalid="ignore"):
+    parent_scores = np.where(parent_lengths > 0,
+                             weighted / parent_lengths, 0.0)
+    ratios = np.where(filled, mapped_counts / counts, 0.0)
+  parent_scores = np.round(parent_scores, 3)
+  parent_mapped = filled & ((ratios >= RATIO_THRESHOLD) |
+                            (parent_scores >= threshold))
+  return parent_scores, parent_mapped, parent_lengths
+
+
+def _mapped_items(ids, titles, scores, mapped):
+  return [{"id": ids[i], "title": titles[i], "score": float(scores[i])}
+          for i in np.flatnonzero(mapped)]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_topic_tree_index(learning_resource_id):
+  """Returns the index of a learning resource, rebuilt once it is older
+  than TOPIC_TREE_INDEX_TTL seconds"""
+  with _indexes_lock:
+    index = _indexes.get(learning_resource_id)
+  if index is None or time.monotonic() - index.built_at >= \
+    TOPIC_TREE_INDEX_TTL:
+    index = TopicTreeIndex.build(learning_resource_id)
+    with _indexes_lock:
+      _indexes[learning_resource_id] = index
+  return index
@@ -0,0 +1,44 @@
+"""
+  Unit tests for the flattened topic tree index
+"""
+import numpy as np
+from services.skill_to_knowledge.topic_tree_index import (TopicTreeIndex,
+                                                          TopicTreeLevel)
+
+
+def get_index():
+  # concept c1 -> sub concept s1 -> lo o1 -> lus u1 (2 passages), u2
+  # (1 passage) and lo o2 without learning units
+  levels = [
+    TopicTreeLevel("mapped_concepts", ["c1"], ["C1"], [0, 1]),
+    TopicTreeLevel("mapped_subconcepts", ["s1"], ["S1"], [0, 2]),
+    TopicTreeLevel("mapped_los", ["o1", "o2"], ["O1", "O2"], [0, 2, 2]),
+    TopicTreeLevel("mapped_lus", ["u1", "u2"], ["U1", "U2"], [0, 2, 3])
+  ]
+  return TopicTreeIndex("lr", levels, ["u1##0", "u1##1", "u2##0"],
+                        ["U1_##Passage_0", "U1_##Passage_1",
+                         "U2_##Passage_0"],
+                        ["one two three", "one", "one two three four"])
+
+
+def test_align_rolls_scores_up_by_length():
+  index = get_index()
+  responses = index.align(np.array([[0.9, 0.1, 0.2],
+                                    [0.1, 0.1, 0.1]]))
+
+  assert list(responses[0]) == ["mapped_passages", "mapped_lus",
+                                "mapped_los", "mapped_subconcepts",
+                                "mapped_concepts"]
+  assert responses[0]["mapped_passages"] == [
+    {"id": "u1##0", "title": "U1_##Passage_0", "score": 0.9}]
+  # u1 = (3 * 0.9 + 1 * 0.1) / 4, half of its passages are mapped
+  assert responses[0]["mapped_lus"] == [
+    {"id": "u1", "title": "U1", "score": 0.7}]
+  # o1 = (4 * 0.7 + 4 * 0.2) / 8, o2 has no learning units
+  assert responses[0]["mapped_los"] == [
+    {"id": "o1", "title": "O1", "score": 0.45}]
+  assert responses[0]["mapped_subconcepts"] == [
+    {"id": "s1", "title": "S1", "score": 0.45}]
+  assert responses[0]["mapped_concepts"] == [
+    {"id": "c1", "title": "C1", "score": 0.45}]
+  assert all(not nodes for nodes in responses[1].values())
@@ -0,0 +1,298 @@
+"""In-process vector indexes over the exported embedding CSVs
+
+Used by Embedding.search_docs when VECTOR_INDEX_BACKEND is "local". Small
+indexes are searched exactly with a single matrix product, large ones with an
+inverted file (IVF) of k-means lists of which only the n_probe lists closest
+to the query are scanned. Indexes are persisted as .npy arrays and memory
+mapped on load, so every worker of a pod shares the same pages. The
+generation of the embeddings an index was built from is saved with it, and a
+registry reloads an index once another worker of the pod saved a new one.
+"""
+import glob
+import json
+import os
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+
+# pylint: disable=broad-exception-raised
+
+EXACT_INDEX = "exact"
+IVF_INDEX = "ivf"
+META_FILE = "meta.json"
+
+
+class ExactIndex():
+  """Brute force dot product search over all the vectors"""
+  index_type = EXACT_INDEX
+
+  def __init__(self, ids, vectors):
+    self.ids = ids
+    self.vectors = vectors
+
+  def __len__(self):
+    return len(self.ids)
+
+  def search(self, queries, top_k):
+    """
+    Returns the top_k neighbors of each query
+
+    Args:
+      queries (np.ndarray) - m X d normalized query vectors
+      top_k (int) - number of neighbors per query
+
+    Returns:
+      neighbors List[List[Tuple[str, float]]] - (id, score) pairs of each
+        query, best first
+    """
+    scores = np.asarray(queries, dtype=np.float32) @ self.vectors.T
+    return [_top_k(self.ids, row, top_k) for row in scores]
+
+  def arrays(self):
+    return {"ids": self.ids, "vectors": self.vectors}
+
+
+class IVFIndex():
+  """Inverted file index. Vectors are stored grouped by their closest
+  centroid, list i spanning rows offsets[i]:offsets[i + 1]"""
+  index_type = IVF_INDEX
+
+  def __init__(self, ids, vectors, centroids, offsets, n_probe=8):
+    self.ids = ids
+    self.vectors = vectors
+    self.centroids = centroids
+    self.offsets = offsets
+    self.n_probe = n_probe
+
+  def __len__(self):
+    return len(self.ids)
+
+  @classmethod
+  def build(cls, ids, vectors, n_lists=None, n_probe=8, iterations=10,
+            seed=0):
+    """Clusters the vectors with spherical k-means and groups them by list"""
+    if n_lists is None:
+      n_lists = max(1, int(np.sqrt(len(ids))))
+    centroids = _kmeans(vectors, n_lists, iterations, seed)
+    assignments = _assign(vectors, centroids)
+    order = np.argsort(assignments, kind="stable")
+    counts = np.bincount(assignments, minlength=len(centroids))
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    return cls(ids[order], vectors[order], centroids, offsets, n_probe)
+
+  def search(self, queries, top_k):
+    """
+    Returns the approximate top_k neighbors of each query by scanning the
+    n_probe lists whose centroids are closest to it
+
+    Args:
+      queries (np.ndarray) - m X d normalized query vectors
+      top_k (int) - number of neighbors per query
+
+    Returns:
+      neighbors List[List[Tuple[str, float]]] - (id, score) pairs of each
+        query, best first
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    n_probe = min(self.n_probe, len(self.centroids))
+    centroid_scores = queries @ self.centroids.T
+    probes = np.argpartition(-centroid_scores, n_probe - 1,
+                             axis=1)[:, :n_probe]
+    results = []
+    for query, lists in zip(queries, probes):
+      rows = np.concatenate([
+        np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists])
+      scores = self.vectors[rows] @ query
+      results.append(_top_k(self.ids[rows], scores, top_k))
+    return results
+
+  def arrays(self):
+    return {"ids": self.ids, "vectors": self.vectors,
+            "centroids": self.centroids, "offsets": self.offsets}
+
+
+def build_index(ids, vectors, ivf_threshold, n_probe=8):
+  """
+  Builds an exact index, or an IVF index once there are at least
+  ivf_threshold vectors
+
+  Args:
+    ids (List[str]) - document id of each vector
+    vectors (np.ndarray) - n X d normalized embeddings
+    ivf_threshold (int) - minimum number of vectors for an IVF index
+    n_probe (int) - number of lists an IVF index scans per query
+
+  Returns:
+    index - ExactIndex or IVFIndex
+  """
+  ids = np.asarray(ids, dtype=str)
+  vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+  if len(ids) >= ivf_threshold:
+    return IVFIndex.build(ids, vectors, n_probe=n_probe)
+  return ExactIndex(ids, vectors)
+
+
+def save_index(index, path, generation=None):
+  """Saves the arrays of an index under path, replacing any index that was
+  saved there before. generation identifies the embeddings the index was
+  built from"""
+  tmp_path = path + ".tmp"
+  shutil.rmtree(tmp_path, ignore_errors=True)
+  os.makedirs(tmp_path)
+  for name, array in index.arrays().items():
+    np.save(os.path.join(tmp_path, name + ".npy"), array)
+  meta = {"type": index.index_type, "count": len(index),
+          "generation": generation}
+  if index.index_type == IVF_INDEX:
+    meta["n_probe"] = index.n_probe
+  with open(os.path.join(tmp_path, META_FILE), "w", encoding="utf-8") as f:
+    json.dump(meta, f)
+  shutil.rmtree(path, ignore_errors=True)
+  os.rename(tmp_path, path)
+
+
+def load_index(path):
+  """Loads an index saved with save_index, memory mapping its arrays.
+  Returns None if no index was saved under path"""
+  meta_path = os.path.join(path, META_FILE)
+  if not os.path.isfile(meta_path):
+    return None
+  with open(meta_path, "r", encoding="utf-8") as f:
+    meta = json.load(f)
+  arrays = {
+    name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+    for name in ("ids", "vectors")}
+  if meta["type"] == IVF_INDEX:
+    index = IVFIndex(arrays["ids"], arrays["vectors"],
+                     np.load(os.path.join(path, "centroids.npy")),
+                     np.load(os.path.join(path, "offsets.npy")),
+                     meta.get("n_probe", 8))
+  else:
+    index = ExactIndex(arrays["ids"], arrays["vectors"])
+  index.generation = meta.get("generation")
+  return index
+
+
+def read_embedding_csvs(folder):
+  """
+  Reads the embedding CSVs written by Embedding.export_embedding_records,
+  one row per document with the id followed by the embedding and no header
+
+  Args:
+    folder (str) - local folder containing the CSV files
+
+  Returns:
+    ids (List[str]) - document ids
+    vectors (np.ndarray) - n X d embeddings
+  """
+  paths = sorted(glob.glob(os.path.join(folder, "**", "*.csv"),
+                           recursive=True))
+  if not paths:
+    raise Exception(f"No embedding CSV files found in {folder}")
+  ids, vectors = [], []
+  for path in paths:
+    df = pd.read_csv(path, header=None, dtype={0: str})
+    ids.extend(df[0].tolist())
+    vectors.append(df.iloc[:, 1:].to_numpy(dtype=np.float32))
+  return ids, np.concatenate(vectors)
+
+
+def to_matching_engine_response(neighbors):
+  """Formats search results like the matching engine query API, a dict per
+  query mapping the rank to the neighbor id and distance"""
+  return [{str(rank): {"id": doc_id, "distance": score}
+           for rank, (doc_id, score) in enumerate(query_neighbors)}
+          for query_neighbors in neighbors]
+
+
+class IndexRegistry():
+  """Per process cache of the loaded indexes, keyed by index name. An index
+  is reloaded when the index saved on disk changed since it was loaded"""
+
+  def __init__(self, base_dir):
+    self.base_dir = base_dir
+    # index name -> (index, inode and modification time of its meta file)
+    self._indexes = {}
+    self._lock = threading.Lock()
+
+  def path(self, index_name):
+    return os.path.join(self.base_dir, index_name)
+
+  def _saved_version(self, index_name):
+    try:
+      stat = os.stat(os.path.join(self.path(index_name), META_FILE))
+      return (stat.st_ino, stat.st_mtime_ns)
+    except FileNotFoundError:
+      return None
+
+  def get(self, index_name):
+    """Returns the loaded index, None if it was never saved"""
+    version = self._saved_version(index_name)
+    entry = self._indexes.get(index_name)
+    if entry is not None and (version is None or entry[1] == version):
+      return entry[0]
+    with self._lock:
+      entry = self._indexes.get(index_name)
+      version = self._saved_version(index_name)
+      if entry is not None and (version is None or entry[1] == version):
+        return entry[0]
+      index = load_index(self.path(index_name))
+      if index is None:
+        return entry[0] if entry is not None else None
+      self._indexes[index_name] = (index, version)
+      return index
+
+  def put(self, index_name, index, generation=None):
+    """Saves an index and makes it the one served for index_name"""
+    with self._lock:
+      save_index(index, self.path(index_name), generation)
+      self._indexes[index_name] = (load_index(self.path(index_name)),
+                                   self._saved_version(index_name))
+
+  def evict(self, index_name):
+    with self._lock:
+      self._indexes.pop(index_name, None)
+
+
+def _top_k(ids, scores, top_k):
+  """Returns the (id, score) pairs of the top_k scores, best first"""
+  top_k = min(top_k, len(scores))
+  if top_k <= 0:
+    return []
+  top = np.argpartition(-scores, top_k - 1)[:top_k]
+  top = top[np.argsort(-scores[top], kind="stable")]
+  return [(str(ids[i]), float(scores[i])) for i in top]
+
+
+def _assign(vectors, centroids, chunk_size=8192):
+  """Returns the closest centroid of every vector, in chunks to bound the
+  size of the score matrix"""
+  assignments = np.empty(len(vectors), dtype=np.int64)
+  for start in range(0, len(vectors), chunk_size):
+    chunk = vectors[start:start + chunk_size]
+    assignments[start:start + chunk_size] = np.argmax(
+      chunk @ centroids.T, axis=1)
+  return assignments
+
+
+def _kmeans(vectors, n_lists, iterations, seed, sample_size=256):
+  """Spherical k-means trained on a sample of at most sample_size vectors
+  per list"""
+  rng = np.random.default_rng(seed)
+  n_lists = min(n_lists, len(vectors))
+  sample = vectors
+  if len(vectors) > sample_size * n_lists:
+    sample = vectors[rng.choice(len(vectors), sample_size * n_lists,
+                                replace=False)]
+  centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+  for _ in range(iterations):
+    assignments = _assign(sample, centroids)
+    order = np.argsort(assignments, kind="stable")
+    counts = np.bincount(assignments, minlength=n_lists)
+    filled = counts > 0
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+    sums = centroids.copy()
+    sums[filled] = np.add.reduceat(sample[order], starts, axis=0)
+    centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+  return centroids.astype(np.float32)
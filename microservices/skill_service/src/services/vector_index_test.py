@@ -0,0 +1,81 @@
+"""
+  Unit tests for the in-process vector indexes
+"""
+# disabling pylint rules that conflict with pytest fixtures
+# pylint: disable=redefined-outer-name
+
+import numpy as np
+import pytest
+from services.vector_index import (ExactIndex, IVFIndex, IndexRegistry,
+                                   build_index, read_embedding_csvs,
+                                   to_matching_engine_response)
+
+
+@pytest.fixture
+def embeddings():
+  rng = np.random.default_rng(7)
+  vectors = rng.normal(size=(600, 32)).astype(np.float32)
+  vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+  ids = [f"doc-{i}" for i in range(len(vectors))]
+  return ids, vectors
+
+
+def test_exact_index_search(embeddings):
+  ids, vectors = embeddings
+  index = build_index(ids, vectors, ivf_threshold=1000)
+  assert isinstance(index, ExactIndex)
+  neighbors = index.search(vectors[[3, 42]], top_k=5)
+  assert [query[0][0] for query in neighbors] == ["doc-3", "doc-42"]
+  scores = [score for _, score in neighbors[0]]
+  assert scores == sorted(scores, reverse=True)
+  assert scores[0] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_ivf_index_recall(embeddings):
+  ids, vectors = embeddings
+  index = build_index(ids, vectors, ivf_threshold=100, n_probe=4)
+  assert isinstance(index, IVFIndex)
+  assert index.offsets[-1] == len(ids)
+  exact = ExactIndex(np.asarray(ids), vectors)
+  queries = vectors[:50] + 0.05
+  queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+  hits = [query[0][0] == truth[0][0] for query, truth in
+          zip(index.search(queries, 10), exact.search(queries, 10))]
+  assert sum(hits) >= 40
+
+
+def test_registry_persists_memory_mapped_index(tmp_path, embeddings):
+  ids, vectors = embeddings
+  registry = IndexRegistry(str(tmp_path))
+  assert registry.get("skill") is None
+  registry.put("skill", build_index(ids, vectors, ivf_threshold=100))
+
+  loaded = IndexRegistry(str(tmp_path)).get("skill")
+  assert isinstance(loaded.vectors, np.memmap)
+  response = to_matching_engine_response(loaded.search(vectors[:1], 3))
+  assert list(response[0]) == ["0", "1", "2"]
+  assert response[0]["0"]["id"] == "doc-0"
+
+
+def test_read_embedding_csvs(tmp_path, embeddings):
+  ids, vectors = embeddings
+  with open(tmp_path / "part.csv", "w", encoding="utf-8") as csv_file:
+    for doc_id, vector in zip(ids[:3], vectors[:3]):
+      csv_file.write(",".join([doc_id] + [str(v) for v in vector]) + "\n")
+  read_ids, read_vectors = read_embedding_csvs(str(tmp_path))
+  assert read_ids == ids[:3]
+  np.testing.assert_allclose(read_vectors, vectors[:3], rtol=1e-6)
+
+
+def test_registry_reloads_index_saved_by_another_worker(tmp_path, embeddings):
+  ids, vectors = embeddings
+  registry = IndexRegistry(str(tmp_path))
+  registry.put("skill", build_index(ids[:100], vectors[:100], ivf_threshold=1000), "gen-1")
+  assert registry.get("skill").generation == "gen-1"
+  assert len(registry.get("skill")) == 100
+
+  IndexRegistry(str(tmp_path)).put(
+    "skill", build_index(ids, vectors, ivf_threshold=1000), "gen-2")
+  reloaded = registry.get("skill")
+  assert reloaded.generation == "gen-2"
+  assert len(reloaded) == len(ids)
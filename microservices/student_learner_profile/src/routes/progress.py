@@ -13,7 +13,7 @@ from common.models import LearnerProfile
 from common.utils.logging_handler import Logger
 from common.utils.errors import ResourceNotFoundException
 from common.utils.collection_references import collection_references
-from common.utils.parent_child_nodes_handler import ParentChildNodesHandler
+from common.utils.parent_child_nodes_handler import HierarchyLoader
 from common.utils.http_exceptions import (
   InternalServerError,
   ResourceNotFound
@@ -75,8 +75,11 @@ def get_learner_progress(learner_id: str, node_id: str,
     # Variable to identify if recent child nodes are to be added in response
     # and if child nodes are to be sorted based on recent activity
     # Currently, added only when node_type == curriculum_pathways
-    root_node = ParentChildNodesHandler.load_hierarchy_progress(
+    loader = HierarchyLoader()
+    root_node = loader.load_hierarchy_progress(
         root_node, node_type, learner_profile)
+    Logger.info(f"Loaded {node_type} progress for {node_id} with "
+                f"{loader.round_trips} Firestore round trips")
     return {
       "success": True,
       "message": f"Successfully fetched the {node_type} progress for the"
@@ -9,7 +9,8 @@ from typing_extensions import Literal
 from fastapi import APIRouter, UploadFile, File, Request, Query
 from common.models import User, Staff, UserGroup
 from common.utils.logging_handler import Logger
-from common.utils.sorting_logic import collection_sorting
+from common.utils.sorting_logic import (collection_sorting,
+                                        collection_sorting_page)
 from common.utils.errors import ConflictError, ResourceNotFoundException, \
   ValidationError
 from common.utils.http_exceptions import (Conflict, InternalServerError,
@@ -133,9 +134,11 @@ def get_users(user_type: Optional[str] = None,
               sort_by: Optional[Literal["first_name", "last_name",
               "email", "created_time"]] = "created_time",
               sort_order: Optional[Literal["ascending", "descending"]] =
-              "descending"):
+              "descending",
+              page_token: Optional[str] = None):
   """The get users endpoint will return an array users from
-  firestore
+  firestore. Pass the next_page_token of a response as page_token to fetch
+  the following page without an offset scan, skip is ignored then
 
   ### Args:
       skip (int): Number of objects to be skipped
@@ -147,8 +150,10 @@ def get_users(user_type: Optional[str] = None,
       user_type (str): Type of the user example: faculty or learner etc.
       sort_by (str): sorting field name
       sort_order (str): ascending / descending
+      page_token (str): token to fetch the next page
 
   ### Raises:
+      ValidationError: 400 if the page token is invalid
       Exception: 500 Internal Server Error if something went wrong
 
   ### Returns:
@@ -171,15 +176,22 @@ def get_users(user_type: Optional[str] = None,
     # for idx, i in enumerate(total_users):
     #   count = idx + 1
 
-    users = collection_sorting(collection_manager=collection_manager,
-                               sort_by=sort_by, sort_order=sort_order,
-                               skip=skip, limit=limit)
+    next_page_token = None
+    if page_token or skip == 0:
+      users, next_page_token = collection_sorting_page(
+          collection_manager=collection_manager, sort_by=sort_by,
+          sort_order=sort_order, limit=limit, page_token=page_token)
+    else:
+      users = collection_sorting(collection_manager=collection_manager,
+                                 sort_by=sort_by, sort_order=sort_order,
+                                 skip=skip, limit=limit)
     if fetch_tree:
       users = get_data_for_fetch_tree(users, sort_by, sort_order)
     else:
       users = [i.get_fields(reformat_datetime=True) for i in users]
 
-    response = {"records": users, "total_count": count}
+    response = {"records": users, "total_count": count,
+                "next_page_token": next_page_token}
 
     return {
         "success": True,
@@ -222,6 +222,7 @@ class DeleteUser(BaseModel):
 class TotalCountResponseModel(BaseModel):
   records: Optional[List[FullUserDataModel]]
   total_count: int
+  next_page_token: Optional[str] = None
 
 class AllUserResponseModel(BaseModel):
   """User Response Pydantic Model"""
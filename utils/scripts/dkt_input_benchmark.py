@@ -0,0 +1,95 @@
+"""
+  Script to compare the training throughput and peak memory of the one-hot
+  and sparse DKT input pipelines on synthetic sessions
+
+  Every input mode is trained in its own process, so that the peak RSS of one
+  does not hide the other.
+
+  Usage:
+    PYTHONPATH=microservices/deep_knowledge_tracing/src:common/src \
+      python utils/scripts/dkt_input_benchmark.py --lus 2000 --sessions 5000
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+
+INPUT_MODES = ["one_hot", "sparse"]
+
+
+def synthetic_sequences(nb_lus, nb_sessions, max_length, seed=0):
+  """Returns random sessions shaped like Dataset.session_sequences"""
+  rng = np.random.default_rng(seed)
+  lengths = rng.integers(2, max_length + 1, nb_sessions)
+  offsets = np.concatenate([[0], np.cumsum(lengths)])
+  skills = rng.integers(0, nb_lus, offsets[-1]).astype(np.int32)
+  labels = rng.integers(0, 2, offsets[-1]).astype(np.float32)
+  features = (skills * 2 + labels).astype(np.int32)
+  return features, skills, labels, offsets
+
+
+def run(args):
+  """Trains one epoch in args.mode, returns its throughput and peak RSS"""
+  # pylint: disable=import-outside-toplevel
+  import tensorflow as tf
+  from services.dataset import Dataset
+  from services.dkt import DKTModel
+
+  Dataset.batch_size = args.batch_size
+  Dataset.features_depth = 2 * args.lus
+  Dataset.skill_depth = args.lus
+  dataset, length = Dataset.build_tf_dataset(
+    *synthetic_sequences(args.lus, args.sessions, args.max_length),
+    input_mode=args.mode)
+
+  model = DKTModel(nb_features=Dataset.features_depth,
+                   nb_skills=Dataset.skill_depth, input_mode=args.mode)
+  model.compile(optimizer=tf.keras.optimizers.legacy.Adam())
+  # traces the training step before timing
+  model.fit(dataset.take(2), verbose=0)
+
+  start = time.perf_counter()
+  model.fit(dataset, verbose=0)
+  seconds = time.perf_counter() - start
+  return {
+    "mode": args.mode,
+    "batches": length,
+    "seconds": round(seconds, 2),
+    "samples_per_sec": round(length * args.batch_size / seconds, 1),
+    # ru_maxrss is in kilobytes on Linux
+    "peak_rss_mb": round(
+      resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--lus", type=int, default=2000)
+  parser.add_argument("--sessions", type=int, default=5000)
+  parser.add_argument("--max-length", type=int, default=50)
+  parser.add_argument("--batch-size", type=int, default=32)
+  parser.add_argument("--mode", choices=INPUT_MODES,
+                      help="runs a single input mode in this process")
+  args = parser.parse_args()
+
+  if args.mode:
+    print(json.dumps(run(args)))
+    return
+
+  print(f"{args.sessions} sessions of up to {args.max_length} events over "
+        f"{args.lus} learning units, batch size {args.batch_size}")
+  for mode in INPUT_MODES:
+    output = subprocess.run(
+      [sys.executable, __file__, *sys.argv[1:], "--mode", mode],
+      check=True, capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    print(f"{mode:>8}: {result['samples_per_sec']:>8} samples/sec, "
+          f"peak RSS {result['peak_rss_mb']} MB "
+          f"({result['batches']} batches in {result['seconds']}s)")
+
+
+if __name__ == "__main__":
+  main()
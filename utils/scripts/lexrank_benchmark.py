@@ -0,0 +1,81 @@
+"""
+  Script to compare the LexRank rankings of synthetic sentence embeddings,
+  from 100 to 10,000 sentences, on the dense similarity matrix, without it
+  (cosine) and on the sparse top-k similarity graph
+
+  Reports the seconds and the peak memory allocated by NumPy of every mode,
+  and how many of the 10 most central sentences of the cosine ranking every
+  mode also finds. Dense rankings above --dense-max sentences are skipped.
+
+  Usage:
+    PYTHONPATH=common_ml/src python utils/scripts/lexrank_benchmark.py \
+      --sizes 100 1000 10000 --top-k 20
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+from common_ml.lexrank import (degree_centrality_scores, similarity_graph,
+                              cosine_centrality_scores)
+
+
+def synthetic_embeddings(nb_sentences, dimension, nb_topics=20, seed=0):
+  """Returns embeddings of sentences scattered around a few topics"""
+  rng = np.random.default_rng(seed)
+  topics = rng.normal(size=(nb_topics, dimension))
+  assignments = rng.integers(0, nb_topics, nb_sentences)
+  return (topics[assignments] + rng.normal(
+    scale=1.5, size=(nb_sentences, dimension))).astype(np.float32)
+
+
+def dense_scores(embeddings):
+  """Ranks with the dense similarity matrix, as get_ranked_sentences did"""
+  normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+  similarities = np.clip(normalized @ normalized.T * 0.5 + 0.5, 0.0, 1.0)
+  return degree_centrality_scores(similarities, threshold=None)
+
+
+def sparse_scores(embeddings, top_k):
+  return degree_centrality_scores(similarity_graph(embeddings, top_k),
+                                  threshold=None)
+
+
+def measure(function, *args):
+  """Returns the result, seconds and peak traced MB of a call"""
+  tracemalloc.start()
+  start = time.perf_counter()
+  result = function(*args)
+  seconds = time.perf_counter() - start
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return result, seconds, peak / 2**20
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--sizes", type=int, nargs="+",
+                      default=[100, 300, 1000, 3000, 10000])
+  parser.add_argument("--dimension", type=int, default=384)
+  parser.add_argument("--top-k", type=int, default=20)
+  parser.add_argument("--dense-max", type=int, default=3000)
+  args = parser.parse_args()
+
+  print(f"{'sentences':>9} {'mode':>6} {'seconds':>8} {'peak MB':>8} "
+        f"{'top-10 overlap':>14}")
+  for nb_sentences in args.sizes:
+    embeddings = synthetic_embeddings(nb_sentences, args.dimension)
+    modes = [("cosine", cosine_centrality_scores, (embeddings,)),
+             ("sparse", sparse_scores, (embeddings, args.top_k))]
+    if nb_sentences <= args.dense_max:
+      modes.append(("dense", dense_scores, (embeddings,)))
+    top = None
+    for mode, function, function_args in modes:
+      scores, seconds, peak = measure(function, *function_args)
+      ranked = set(np.argsort(-scores)[:10])
+      top = ranked if top is None else top
+      print(f"{nb_sentences:>9} {mode:>6} {seconds:>8.2f} {peak:>8.1f} "
+            f"{len(top & ranked):>14}")
+
+
+if __name__ == "__main__":
+  main()
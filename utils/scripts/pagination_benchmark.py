@@ -0,0 +1,91 @@
+"""
+  Script to compare page-N latency of offset and keyset pagination against
+  the Firestore emulator
+
+  Usage:
+    firebase emulators:start --only firestore --project fake-project
+    FIRESTORE_EMULATOR_HOST=localhost:8080 PROJECT_ID=fake-project \
+      PYTHONPATH=common/src python utils/scripts/pagination_benchmark.py \
+      --documents 5000 --page-size 50
+"""
+import argparse
+import os
+import time
+from common.models import LmsJob
+from common.utils.pagination import fetch_page
+
+# disabling for linting to pass
+# pylint: disable = broad-exception-raised
+
+BENCHMARK_PREFIX = "pagination-benchmark-"
+
+
+def seed(count, job_ids):
+  """Creates count LMS jobs to paginate over, adding their ids to job_ids"""
+  for index in range(count):
+    job = LmsJob(job_type=f"{BENCHMARK_PREFIX}{index}", status="success")
+    job.save()
+    job_ids.append(job.id)
+
+
+def clean_up(job_ids):
+  """Deletes the LMS jobs created by seed"""
+  for job_id in job_ids:
+    LmsJob.delete_by_id(job_id)
+
+
+def query():
+  return LmsJob.collection.filter("deleted_at_timestamp", "==", None)
+
+
+def time_offset_page(page, page_size):
+  """Returns the seconds to fetch the given page with an offset"""
+  start = time.perf_counter()
+  list(query().order("-created_time").offset(page * page_size).fetch(
+      page_size))
+  return time.perf_counter() - start
+
+
+def time_keyset_pages(pages, page_size):
+  """Returns the seconds to fetch each page by following page tokens"""
+  timings = []
+  page_token = None
+  for _ in range(pages):
+    start = time.perf_counter()
+    _, page_token = fetch_page(query(), "-created_time", page_size,
+                               page_token)
+    timings.append(time.perf_counter() - start)
+    if page_token is None:
+      break
+  return timings
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--documents", type=int, default=5000)
+  parser.add_argument("--page-size", type=int, default=50)
+  parser.add_argument("--skip-seed", action="store_true")
+  args = parser.parse_args()
+
+  if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+    raise Exception("FIRESTORE_EMULATOR_HOST must point to the emulator")
+  job_ids = []
+  try:
+    if not args.skip_seed:
+      seed(args.documents, job_ids)
+
+    pages = args.documents // args.page_size
+    keyset_timings = time_keyset_pages(pages, args.page_size)
+    print(f"{'page':>6} {'offset ms':>10} {'keyset ms':>10}")
+    for page in sorted({0, pages // 4, pages // 2, pages - 1}):
+      if page >= len(keyset_timings):
+        continue
+      offset_ms = time_offset_page(page, args.page_size) * 1000
+      print(f"{page:>6} {offset_ms:>10.1f}"
+            f" {keyset_timings[page] * 1000:>10.1f}")
+  finally:
+    clean_up(job_ids)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,28 @@
+CREATE OR REPLACE VIEW
+  `lms_analytics.sectionProgressView` AS
+WITH courseWork AS (
+SELECT courseId, id FROM `lms_analytics.courseWorkCollectionView`
+WHERE state = 'PUBLISHED'),
+courseWorkCount AS (
+SELECT courseId, COUNT(*) AS courseWorkCount FROM courseWork
+GROUP BY courseId),
+submission AS (SELECT * FROM(
+SELECT *, ROW_NUMBER() OVER(PARTITION BY id ORDER BY timestamp DESC) AS row_num
+FROM `lms_analytics.submittedCourseWorkCollections`
+) a
+    WHERE
+      a.row_num = 1
+      AND a.event_type != 'DELETED')
+
+SELECT
+submission.courseId AS courseId,
+submission.userId AS userId,
+ANY_VALUE(courseWorkCount.courseWorkCount) AS courseWorkCount,
+COUNTIF(submission.state = 'TURNED_IN') AS turnedInCount,
+COUNTIF(submission.assignedGrade IS NOT NULL) AS gradedCount,
+MAX(submission.timestamp) AS timestamp
+FROM submission
+JOIN courseWork ON submission.courseId = courseWork.courseId
+AND submission.courseWorkId = courseWork.id
+JOIN courseWorkCount ON submission.courseId = courseWorkCount.courseId
+GROUP BY submission.courseId, submission.userId